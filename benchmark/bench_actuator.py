@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+アクチュエータの制御ループ (control_worker, monitor_worker) の負荷のベンチマークです。
+
+ダミーの GPIO と流量計 (DUMMY_MODE) を使い、時短モード (SPEEDUP 倍) で HOURS 時間分の
+Duty 制御を動かして、シミュレーション上の 1 時間あたりの次の値を計測し、
+benchmark/baseline/actuator.json と比較します。
+
+- CPU 時間 (ワーカのループ 1 回あたりの CPU 時間から、等倍で動かした場合の値を求める)
+- 状態ファイル (my_lib.footprint) と GPIO の操作回数 (ループ毎に発生するので、
+  等倍で動かした場合のループの回数に換算する)
+- 電磁弁の開閉回数、作動ログの件数、メトリクスの SQLite への書き込み回数
+
+制御メッセージは、gen_metrics_db.py と同じ合成の気象データから決めた冷却モードで、
+1 分毎に subscribe_worker と同じ処理 (worker.queue_put) で積みます。Duty の ON/OFF の時間は
+SPEEDUP 分の一にします。(コントローラの engine.ON_SEC_MIN による下限は適用しません)
+
+NOTE: ワーカの周期と Duty の ON/OFF の時間は SPEEDUP 分の一にしているので、unit_cooler.clock は
+now だけをシミュレーション上の時刻 (SPEEDUP 倍で進む) にします。(ScaledClock) MetricsCollector は
+now の分・時の境界で書き込むので、SQLite への書き込み回数も等倍で動かした場合と同じになります。
+
+NOTE: 電磁弁の状態ファイルは実機と同じ /dev/shm/unit_cooler 以下に作るので、
+アクチュエータが動作しているマシンでは実行しないでください。
+
+Usage:
+  bench_actuator.py [-t SPEEDUP] [-H HOURS] [-d DATE] [-z ZONES] [-T TOLERANCE] [-u] [-D]
+
+Options:
+  -t SPEEDUP        : 時短モードの倍率をカンマ区切りで指定します。[default: 1000]
+  -H HOURS          : シミュレーションする時間 [時間] を指定します。[default: 24]
+  -d DATE           : 合成の気象データの日付を指定します。[default: 2025-08-01]
+  -z ZONES          : ゾーンの数をカンマ区切りで指定します。0 はゾーンを使わない場合です。[default: 0]
+  -T TOLERANCE      : ベースラインからの悪化をこの割合まで許容します。[default: 0.3]
+  -u                : 計測結果でベースラインを更新します。
+  -D                : デバッグモードで動作します。
+"""
+
+import collections
+import concurrent.futures
+import datetime
+import functools
+import logging
+import math
+import multiprocessing
+import os
+import pathlib
+import queue
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import common
+import gen_metrics_db
+import numpy as np
+
+import unit_cooler.clock
+import unit_cooler.controller.message
+
+# NOTE: ダミーの流量計を使うため、unit_cooler.actuator を import する前に設定する
+os.environ["DUMMY_MODE"] = "true"
+
+# 比較する値と、誤差とみなす差の絶対値
+COMPARE_MARGIN_MAP = {
+    "cpu_sec_per_hour": 1.0,
+    "footprint_per_hour": 100,
+    "gpio_per_hour": 100,
+    "work_log_per_hour": 5,
+    "sqlite_write_per_hour": 5,
+}
+
+# ワーカ毎の、等倍で動かした場合の 1 時間あたりのループの回数を決める設定
+LOOP_INTERVAL_KEY_MAP = {
+    "control": ("actuator", "control", "interval_sec"),
+    "monitor": ("actuator", "monitor", "interval_sec"),
+    "subscribe": ("controller", "interval_sec"),
+}
+
+_counter = collections.Counter()
+_counter_lock = threading.Lock()
+
+
+class ScaledClock(unit_cooler.clock.RealClock):
+    """
+    now だけが SPEEDUP 倍で進む時刻
+
+    timestamp・sleep・wait は実時間のままなので、状態ファイルは実機と同じく作られます。
+    """
+
+    def __init__(self, start, speedup):
+        """シミュレーション上の開始時刻 start から進める"""
+        self.start = start
+        self.speedup = speedup
+        self.real_start = time.time()
+
+    def now(self):
+        return self.start + datetime.timedelta(seconds=(time.time() - self.real_start) * self.speedup)
+
+
+def gen_config(temp_dir_path, zone_count):
+    control_config = {
+        "valve": {"pin_no": 17, "on": {"min": 0.02, "max": 3.8}, "off": {"max": 0.01}, "power_off_sec": 7200},
+        "interval_sec": 1,
+        "hazard": {"file": str(temp_dir_path / "hazard")},
+        "liveness": {"file": str(temp_dir_path / "healthz.control")},
+    }
+    if zone_count != 0:
+        control_config["zones"] = [{"name": f"zone{i}", "pin_no": 17 + i} for i in range(zone_count)]
+
+    return {
+        "controller": {"interval_sec": 60},
+        "actuator": {
+            "subscribe": {"liveness": {"file": str(temp_dir_path / "healthz.subscribe")}},
+            "control": control_config,
+            "monitor": {
+                "flow": {
+                    "on": {"min": 0.02, "max": [12, 12, 5, 3.0]},
+                    "off": {"max": 0.01},
+                    "power_off_sec": 7200,
+                },
+                "fluent": {"host": "localhost"},
+                "sense": {"giveup": 5},
+                "interval_sec": 1,
+                "liveness": {"file": str(temp_dir_path / "healthz.monitor")},
+            },
+            "web_server": {"webapp": {"data": {"log_file_path": str(temp_dir_path / "log.db")}}},
+            "metrics": {"data": str(temp_dir_path / "metrics.db")},
+        },
+    }
+
+
+def gen_message_list(date, hours, speedup):
+    """1 分毎の制御メッセージを、合成の気象データから決めた冷却モードで生成する"""
+    rng = np.random.default_rng(0)
+    state = {"temp_offset": 0.0, "valve_open": False}
+    day = datetime.datetime.combine(date, datetime.time(), gen_metrics_db.TIMEZONE)
+
+    message_list = []
+    for i in range(math.ceil(hours / 24)):
+        column_map = gen_metrics_db.gen_day(rng, day + datetime.timedelta(days=i), state)
+
+        for minute in range(gen_metrics_db.MINUTE_PER_DAY):
+            mode_index = int(column_map["cooling_mode"][minute])
+            control_msg = unit_cooler.controller.message.CONTROL_MESSAGE_LIST[mode_index]
+            message_list.append(
+                {
+                    "state": control_msg["state"],
+                    "mode_index": mode_index,
+                    "duty": {
+                        "enable": control_msg["duty"]["enable"],
+                        "on_sec": control_msg["duty"]["on_sec"] / speedup,
+                        "off_sec": control_msg["duty"]["off_sec"] / speedup,
+                    },
+                    "env": [
+                        float(column_map[key][minute])
+                        for key in ["temperature", "humidity", "lux", "solar_radiation", "rain_amount"]
+                    ],
+                }
+            )
+
+    return message_list[: round(hours * 60)]
+
+
+def count_call(owner, name, key):
+    """関数 owner.name を、呼び出し回数を key で数えるものに置き換える"""
+    func = getattr(owner, name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _counter_lock:
+            _counter[key] += 1
+        return func(*args, **kwargs)
+
+    setattr(owner, name, wrapper)
+
+
+def install_counter():
+    import my_lib.footprint
+    import my_lib.rpi
+
+    import unit_cooler.actuator.valve
+    import unit_cooler.actuator.work_log
+    import unit_cooler.metrics.collector
+
+    for name in ["update", "clear", "exists", "elapsed"]:
+        count_call(my_lib.footprint, name, "footprint")
+    for name in ["input", "output"]:
+        count_call(my_lib.rpi.gpio, name, "gpio")
+
+    count_call(unit_cooler.actuator.work_log, "add", "work_log")
+    count_call(unit_cooler.actuator.valve.Valve, "record_operation", "valve_operation")
+    count_call(unit_cooler.metrics.collector.MetricsCollector, "_measure_write", "sqlite_write")
+
+
+def get_loop_per_hour(config, worker):
+    value = config
+    for key in LOOP_INTERVAL_KEY_MAP[worker]:
+        value = value[key]
+    return 3600 / value
+
+
+def calc_result(config, hours, elapsed_sec, cpu_sec):
+    import unit_cooler.actuator.timing
+
+    worker_stat_map = unit_cooler.actuator.timing.get_stat()["worker"]
+
+    result = {"elapsed_sec": elapsed_sec, "process_cpu_ratio": cpu_sec / elapsed_sec}
+
+    # NOTE: 時短モードでループが間に合わなかった分は、ループ 1 回あたりの値から換算する
+    cpu_sec_per_hour = 0.0
+    loop_count = loop_count_expected = 0
+    for worker in LOOP_INTERVAL_KEY_MAP:
+        worker_stat = worker_stat_map.get(worker)
+        if (worker_stat is None) or (worker_stat["loop"]["count"] == 0):
+            continue
+
+        loop_per_hour = get_loop_per_hour(config, worker)
+        cpu_sec_per_hour += worker_stat["cpu_sec"] / worker_stat["loop"]["count"] * loop_per_hour
+        result[f"{worker}_loop_ratio"] = worker_stat["loop"]["count"] / (loop_per_hour * hours)
+
+        if worker != "subscribe":
+            loop_count += worker_stat["loop"]["count"]
+            loop_count_expected += loop_per_hour * hours
+
+    loop_ratio = loop_count / loop_count_expected if loop_count_expected else 1.0
+
+    result["cpu_sec_per_hour"] = cpu_sec_per_hour
+    for key in ["footprint", "gpio"]:
+        result[f"{key}_per_hour"] = _counter[key] / hours / loop_ratio
+    for key in ["valve_operation", "work_log", "sqlite_write"]:
+        result[f"{key}_per_hour"] = _counter[key] / hours
+
+    return result
+
+
+def run_case(speedup, hours, date, zone_count, result_queue, debug_mode):  # noqa: PLR0913
+    if not debug_mode:
+        # NOTE: ループ毎のログで計測が歪まないようにする
+        logging.getLogger().setLevel(logging.WARNING)
+
+    import my_lib.webapp.config
+    import my_lib.webapp.log
+
+    import unit_cooler.actuator.timing
+    import unit_cooler.actuator.work_log
+    import unit_cooler.actuator.worker
+    import unit_cooler.actuator.zone
+
+    result = None
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = gen_config(pathlib.Path(temp_dir), zone_count)
+            message_list = gen_message_list(date, hours, speedup)
+            liveness_file = pathlib.Path(config["actuator"]["subscribe"]["liveness"]["file"])
+
+            my_lib.webapp.config.init(config["actuator"]["web_server"])
+            my_lib.webapp.log.init(config)
+            unit_cooler.actuator.work_log.init(config, queue.Queue())
+            unit_cooler.actuator.zone.init(config)
+
+            install_counter()
+            unit_cooler.actuator.worker.SLEEP_MIN_SEC = 0
+            unit_cooler.actuator.timing.clear()
+
+            message_queue = queue.Queue()
+            setting = {
+                "control_host": "localhost",
+                "pub_port": 0,
+                "speedup": speedup,
+                "msg_count": 0,
+                "dummy_mode": True,
+            }
+            worker_def = [
+                worker_info
+                for worker_info in unit_cooler.actuator.worker.get_worker_def(config, message_queue, setting)
+                if worker_info["name"] != "subscribe_worker"
+            ]
+            executor = concurrent.futures.ThreadPoolExecutor()
+
+            usage_start = resource.getrusage(resource.RUSAGE_SELF)
+            start_time = time.perf_counter()
+
+            unit_cooler.clock.set_clock(
+                ScaledClock(
+                    datetime.datetime.combine(date, datetime.time(), gen_metrics_db.TIMEZONE), speedup
+                )
+            )
+            thread_list = unit_cooler.actuator.worker.start(executor, worker_def)
+            for i, message in enumerate(message_list):
+                unit_cooler.actuator.worker.queue_put(message_queue, message, liveness_file)
+                time.sleep(max(start_time + (i + 1) * 60 / speedup - time.perf_counter(), 0))
+
+            unit_cooler.actuator.worker.term()
+            for thread_info in thread_list:
+                if thread_info["future"].result() != 0:
+                    logging.error("Error occurred in %s", thread_info["name"])
+
+            elapsed_sec = time.perf_counter() - start_time
+            usage_end = resource.getrusage(resource.RUSAGE_SELF)
+            executor.shutdown()
+
+            cpu_sec = (usage_end.ru_utime - usage_start.ru_utime) + (
+                usage_end.ru_stime - usage_start.ru_stime
+            )
+            result = calc_result(config, hours, elapsed_sec, cpu_sec)
+
+            unit_cooler.actuator.work_log.term()
+    finally:
+        # NOTE: 途中で失敗しても、親のプロセスが待ち続けないようにする
+        result_queue.put(result)
+
+
+def run(speedup_list, hours, date, zone_count_list, debug_mode=False):
+    ctx = multiprocessing.get_context()
+
+    result_map = {}
+    for zone_count in zone_count_list:
+        for speedup in speedup_list:
+            case = f"speedup{speedup}" if zone_count == 0 else f"zone{zone_count}/speedup{speedup}"
+            logging.info("Measure %s (%g hours in %.1f sec)...", case, hours, hours * 3600 / speedup)
+
+            # NOTE: 電磁弁やメトリクスの状態はプロセスで 1 つなので、ケース毎にプロセスを分ける
+            result_queue = ctx.Queue()
+            process = ctx.Process(
+                target=run_case, args=(speedup, hours, date, zone_count, result_queue, debug_mode)
+            )
+            process.start()
+            result = result_queue.get()
+            process.join()
+
+            if result is None:
+                logging.error("Failed to measure %s", case)
+                continue
+            result_map[case] = result
+
+    return result_map
+
+
+def report(result_map, baseline_map):
+    logging.info(
+        "%-24s %7s %7s %10s %10s %10s %8s %8s %8s",
+        "case",
+        "loop %",
+        "busy %",
+        "CPU s/h",
+        "baseline",
+        "file/h",
+        "valve/h",
+        "log/h",
+        "sqlite/h",
+    )
+    for case, result in result_map.items():
+        baseline = baseline_map.get(case, {})
+        logging.info(
+            "%-24s %7.1f %7.1f %10.2f %10s %10.0f %8.1f %8.1f %8.1f",
+            case,
+            result.get("control_loop_ratio", 0) * 100,
+            result["process_cpu_ratio"] * 100,
+            result["cpu_sec_per_hour"],
+            f"{baseline['cpu_sec_per_hour']:.2f}" if "cpu_sec_per_hour" in baseline else "-",
+            result["footprint_per_hour"],
+            result["valve_operation_per_hour"],
+            result["work_log_per_hour"],
+            result["sqlite_write_per_hour"],
+        )
+
+
+if __name__ == "__main__":
+    import docopt
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    speedup_list = [int(speedup) for speedup in args["-t"].split(",")]
+    hours = float(args["-H"])
+    date = datetime.date.fromisoformat(args["-d"])
+    zone_count_list = [int(count) for count in args["-z"].split(",")]
+    tolerance = float(args["-T"])
+    update = args["-u"]
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("bench", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    result_map = run(speedup_list, hours, date, zone_count_list, debug_mode)
+
+    ret = common.finish("actuator", result_map, update, tolerance, COMPARE_MARGIN_MAP, report)
+    if len(result_map) != len(speedup_list) * len(zone_count_list):
+        ret = 1
+
+    sys.exit(ret)
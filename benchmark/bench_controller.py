@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+コントローラの冷却モードの判定処理のベンチマークです。
+
+エアコンの台数を変えた合成のセンサーデータで、次の処理の 1 回あたりの処理時間と
+メモリ確保量を計測し、benchmark/baseline/controller.json と比較します。
+
+- controller.sensor.get_outdoor_status
+- controller.sensor.get_cooler_activity
+- controller.engine.judge_cooling_mode
+- controller.engine.gen_control_msg (InfluxDB はスタブのサーバーに置き換え)
+
+gen_control_msg は、最新の値を取得する場合 (my_lib.sensor_data) と、InfluxDB 側で集計する
+場合 (controller.aggregate を全てのセンサーに指定) の 2 通りを計測します。
+
+Usage:
+  bench_controller.py [-n COUNTS] [-r REPEAT] [-R REPEAT_IO] [-l LATENCY] [-k PATTERN] [-T TOLERANCE]
+                      [-u] [-D]
+
+Options:
+  -n COUNTS         : エアコンの台数をカンマ区切りで指定します。[default: 1,5,10,20,50]
+  -r REPEAT         : 判定処理の計測回数を指定します。[default: 200]
+  -R REPEAT_IO      : gen_control_msg の計測回数を指定します。[default: 20]
+  -l LATENCY        : InfluxDB のスタブの応答の遅延 [ms] を指定します。[default: 0]
+  -k PATTERN        : 名前に PATTERN を含むケースのみ計測します。
+  -T TOLERANCE      : ベースラインからの悪化をこの割合まで許容します。[default: 0.3]
+  -u                : 計測結果でベースラインを更新します。
+  -D                : デバッグモードで動作します。(判定処理のログも出力します)
+"""
+
+import contextlib
+import datetime
+import logging
+import sys
+
+import common
+import influxdb_stub
+
+import unit_cooler.controller.engine
+import unit_cooler.controller.sensor
+
+# エアコンの消費電力 [W] (台数分、順に繰り返して使う)
+POWER_LIST = [0, 30, 400, 900, 1500]
+
+SENSOR_KIND_LIST = ["temp", "humi", "lux", "solar_rad", "rain"]
+
+
+def gen_power_map(aircon_count):
+    return {f"aircon-{i}": POWER_LIST[i % len(POWER_LIST)] for i in range(aircon_count)}
+
+
+def gen_sense_data(aircon_count):
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    sense_data = {
+        kind: [{"name": kind, "time": now, "value": influxdb_stub.VALUE_MAP[kind]}]
+        for kind in SENSOR_KIND_LIST
+    }
+    sense_data["power"] = [
+        {"name": name, "time": now, "value": value} for name, value in gen_power_map(aircon_count).items()
+    ]
+
+    return sense_data
+
+
+def gen_config(aircon_count, influxdb_url, aggregate=False):
+    sensor_config = {
+        kind: [{"name": kind, "measure": "sensor.bench", "hostname": f"bench-{kind}"}]
+        for kind in SENSOR_KIND_LIST
+    }
+    sensor_config["power"] = [
+        {"name": name, "measure": "sensor.bench", "hostname": name} for name in gen_power_map(aircon_count)
+    ]
+
+    controller_config = {
+        "influxdb": {"url": influxdb_url, "token": "bench", "org": "bench", "bucket": "bench"},
+        "sensor": sensor_config,
+        "interval_sec": 60,
+    }
+    if aggregate:
+        controller_config["aggregate"] = {kind: {"window_min": 10} for kind in sensor_config}
+
+    return {"controller": controller_config}
+
+
+def gen_case_list(aircon_count_list, stub):
+    sense_data = gen_sense_data(1)
+    case_list = [
+        (
+            "get_outdoor_status",
+            "judge",
+            lambda: unit_cooler.controller.sensor.get_outdoor_status(sense_data),
+        )
+    ]
+
+    for aircon_count in aircon_count_list:
+        sense_data = gen_sense_data(aircon_count)
+        config = gen_config(aircon_count, stub.url)
+        config_aggregate = gen_config(aircon_count, stub.url, True)
+
+        case_list += [
+            (
+                f"get_cooler_activity[{aircon_count}]",
+                "judge",
+                lambda sense_data=sense_data: unit_cooler.controller.sensor.get_cooler_activity(sense_data),
+            ),
+            (
+                f"judge_cooling_mode[{aircon_count}]",
+                "judge",
+                lambda config=config, sense_data=sense_data: unit_cooler.controller.engine.judge_cooling_mode(
+                    config, sense_data
+                ),
+            ),
+            (
+                f"gen_control_msg[{aircon_count}]",
+                "io",
+                lambda config=config: unit_cooler.controller.engine.gen_control_msg(config),
+            ),
+            (
+                f"gen_control_msg_aggregate[{aircon_count}]",
+                "io",
+                lambda config=config_aggregate: unit_cooler.controller.engine.gen_control_msg(config),
+            ),
+        ]
+
+    return case_list
+
+
+def run(aircon_count_list, repeat_map, latency_sec=0.0, pattern=None, debug_mode=False):
+    stub = influxdb_stub.InfluxDBStub(
+        {"power": gen_power_map(max(aircon_count_list))}, latency_sec=latency_sec
+    ).start()
+
+    result_map = {}
+    try:
+        for name, kind, func in gen_case_list(aircon_count_list, stub):
+            if (pattern is not None) and (pattern not in name):
+                continue
+
+            query_count = stub.query_count
+            # NOTE: 判定処理のログの出力時間は計測に含めない
+            with contextlib.nullcontext() if debug_mode else disable_logging():
+                result = common.measure(func, repeat_map[kind])
+
+            if kind == "io":
+                # NOTE: ウォームアップと、メモリ確保量の計測の分も含まれる
+                result["query_per_cycle"] = (stub.query_count - query_count) / (repeat_map[kind] + 4)
+
+            result_map[name] = result
+    finally:
+        stub.stop()
+
+    return result_map
+
+
+@contextlib.contextmanager
+def disable_logging():
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    import docopt
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    aircon_count_list = [int(count) for count in args["-n"].split(",")]
+    repeat_map = {"judge": int(args["-r"]), "io": int(args["-R"])}
+    latency_ms = float(args["-l"])
+    pattern = args["-k"]
+    tolerance = float(args["-T"])
+    update = args["-u"]
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("bench", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    result_map = run(aircon_count_list, repeat_map, latency_ms / 1000, pattern, debug_mode)
+
+    # NOTE: 遅延を指定した場合は、別のベースラインと比較する
+    name = "controller" if latency_ms == 0 else f"controller_latency{latency_ms:g}ms"
+
+    sys.exit(common.finish(name, result_map, update, tolerance))
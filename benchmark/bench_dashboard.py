@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+メトリクスのダッシュボードが、蓄積したデータの量に対してどう遅くなるかを計測するベンチマークです。
+
+gen_metrics_db.py で YEARS 年分の合成データを生成し (benchmark/data/ に保存して再利用)、
+データベース毎に別のプロセスで次の処理の処理時間、ピーク時の常駐メモリ、応答の大きさを
+計測します。
+
+- MetricsCollector.get_minute_data (全期間と、時系列グラフが読み込む直近 100 日)
+- MetricsAnalyzer.get_hourly_boxplot_data, get_correlation_analysis (pandas が無い場合は省略)
+- Flask のテストクライアントでの /unit-cooler/api/metrics と、各パネルの JSON API の表示
+  (キャッシュを破棄してから計算する場合と、計算済みのキャッシュから返す場合)
+
+NOTE: 常駐メモリのピークは、ケース毎に /proc/self/clear_refs でリセットしてから計測します。
+リセットできない場合は、プロセス全体のピークになります。
+
+NOTE: MetricsAnalyzer は現在時刻から遡った期間を読むので、最後のデータが 1 日以上前の
+データベースは生成し直します。
+
+Usage:
+  bench_dashboard.py [-y YEARS] [-d DIR] [-r REPEAT] [-k PATTERN] [-o OUTPUT] [-D]
+
+Options:
+  -y YEARS          : 計測するデータの期間 [年] をカンマ区切りで指定します。[default: 1,3,5]
+  -d DIR            : 合成したデータベースを保存するディレクトリを指定します。[default: benchmark/data]
+  -r REPEAT         : 1 つのケースあたりの計測回数を指定します。[default: 3]
+  -k PATTERN        : 名前に PATTERN を含むケースのみ計測します。
+  -o OUTPUT         : 計測結果を JSON で保存します。
+  -D                : デバッグモードで動作します。
+"""
+
+import datetime
+import json
+import logging
+import multiprocessing
+import pathlib
+import resource
+import statistics
+import time
+
+import gen_metrics_db
+
+import unit_cooler.metrics.collector
+
+# データベースを生成し直すまでの、最後のデータからの経過時間
+DB_EXPIRE = datetime.timedelta(days=1)
+# ブラウザと同じく圧縮した応答を受け取る
+ACCEPT_ENCODING = "gzip, deflate, br"
+PANEL_LIST = ["stats", "hourly", "timeseries", "correlation"]
+
+
+def reset_peak_rss():
+    try:
+        pathlib.Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def read_rss():
+    """現在の常駐メモリと、そのピーク [MiB] を返す"""
+    rss_map = {}
+    for line in pathlib.Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(("VmRSS:", "VmHWM:")):
+            rss_map[line.split(":")[0]] = int(line.split()[1]) / 1024
+
+    if "VmHWM" not in rss_map:
+        rss_map["VmHWM"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return rss_map.get("VmRSS", rss_map["VmHWM"]), rss_map["VmHWM"]
+
+
+def measure(func, repeat):
+    """関数 func を repeat 回実行して、処理時間とピーク時の常駐メモリを計測する (func は応答の大きさを返す)"""
+    # NOTE: 初回のみのインポートなどを含めないようにする
+    func()
+
+    reset_peak_rss()
+    rss_start, _ = read_rss()
+
+    elapsed_list = []
+    response_size = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        response_size = func()
+        elapsed_list.append((time.perf_counter() - start_time) * 1000)
+
+    _, rss_peak = read_rss()
+
+    return {
+        "repeat": repeat,
+        "min_ms": min(elapsed_list),
+        "median_ms": statistics.median(elapsed_list),
+        "max_ms": max(elapsed_list),
+        "rss_peak_mb": rss_peak,
+        "rss_growth_mb": rss_peak - rss_start,
+        "response_kb": response_size / 1024 if response_size is not None else None,
+    }
+
+
+def create_app(db_path):
+    """ダッシュボードの部分だけを登録した Flask アプリを返す"""
+    import flask
+    import my_lib.webapp.config
+
+    my_lib.webapp.config.URL_PREFIX = "/unit-cooler"
+
+    import unit_cooler.compress
+    import unit_cooler.metrics.webapi.page
+
+    app = flask.Flask("unit-cooler-bench")
+    unit_cooler.compress.init(app)
+    app.config["CONFIG"] = {"actuator": {"metrics": {"data": str(db_path)}}}
+    app.register_blueprint(
+        unit_cooler.metrics.webapi.page.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX
+    )
+
+    return app
+
+
+def gen_case_list(db_path):
+    import unit_cooler.metrics.analyzer
+    import unit_cooler.metrics.webapi.page
+
+    page = unit_cooler.metrics.webapi.page
+
+    collector = unit_cooler.metrics.collector.get_metrics_collector(db_path)
+    last_minute = collector.get_last_minute_timestamp()
+    client = create_app(db_path).test_client()
+
+    def get(path, cached=False):
+        if not cached:
+            page.cache_clear()
+        response = client.get(f"/unit-cooler{path}", headers={"Accept-Encoding": ACCEPT_ENCODING})
+        if response.status_code != 200:
+            raise RuntimeError(f"{path}: {response.status_code}")  # noqa: TRY003, EM102
+        return len(response.data)
+
+    def get_all(cached=False):
+        return sum(get(path, cached) for path in ["/api/metrics"] + [f"/api/metrics/{x}" for x in PANEL_LIST])
+
+    def get_minute_data_all():
+        collector.get_minute_data()
+
+    def get_minute_data_recent():
+        collector.get_minute_data(last_minute - datetime.timedelta(days=100), last_minute)
+
+    case_list = [
+        ("get_minute_data[all]", get_minute_data_all),
+        ("get_minute_data[100d]", get_minute_data_recent),
+    ]
+
+    if unit_cooler.metrics.analyzer._ANALYSIS_AVAILABLE:  # noqa: SLF001
+        analyzer = unit_cooler.metrics.analyzer.MetricsAnalyzer(collector)
+
+        def get_hourly_boxplot_data():
+            analyzer.get_hourly_boxplot_data()
+
+        def get_correlation_analysis():
+            analyzer.get_correlation_analysis()
+
+        case_list += [
+            ("get_hourly_boxplot_data", get_hourly_boxplot_data),
+            ("get_correlation_analysis", get_correlation_analysis),
+        ]
+    else:
+        logging.warning("Skip MetricsAnalyzer (pandas or scipy is not installed)")
+
+    case_list += [("api/metrics", lambda: get("/api/metrics"))]
+    case_list += [
+        (f"api/metrics/{name}", lambda name=name: get(f"/api/metrics/{name}")) for name in PANEL_LIST
+    ]
+    case_list += [
+        ("dashboard", get_all),
+        # NOTE: 分データの保存時に事前計算している場合 (actuator.metrics.precompute) に相当する
+        ("dashboard[cached]", lambda: get_all(True)),
+    ]
+
+    return case_list
+
+
+def measure_db(db_path, repeat, pattern, result_queue, debug_mode):
+    if not debug_mode:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    result_map = {}
+    try:
+        for name, func in gen_case_list(db_path):
+            if (pattern is not None) and (pattern not in name):
+                continue
+            result_map[name] = measure(func, repeat)
+    finally:
+        # NOTE: 途中で失敗しても、親のプロセスが待ち続けないようにする
+        result_queue.put(result_map)
+
+
+def prepare_db(db_dir, years):
+    db_path = pathlib.Path(db_dir) / f"metrics_{years:g}y.db"
+
+    if db_path.exists():
+        last_minute = unit_cooler.metrics.collector.MetricsCollector(db_path).get_last_minute_timestamp()
+        if (last_minute is not None) and (
+            datetime.datetime.now(unit_cooler.metrics.collector.TIMEZONE) - last_minute < DB_EXPIRE
+        ):
+            return db_path
+
+    gen_metrics_db.generate(db_path, years)
+
+    return db_path
+
+
+def run(year_list, db_dir, repeat, pattern=None, debug_mode=False):
+    ctx = multiprocessing.get_context()
+
+    result_map = {}
+    for years in year_list:
+        db_path = prepare_db(db_dir, years)
+        logging.info("Measure %s (%.1f MiB)...", db_path, db_path.stat().st_size / 1024 / 1024)
+
+        # NOTE: メトリクスのコレクタはプロセスで 1 つなので、データベース毎にプロセスを分ける
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=measure_db, args=(db_path, repeat, pattern, result_queue, debug_mode))
+        process.start()
+        db_result_map = result_queue.get()
+        process.join()
+
+        for name, result in db_result_map.items():
+            result_map[f"{years:g}y/{name}"] = result
+
+    return result_map
+
+
+def format_value(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def report(result_map):
+    logging.info(
+        "%-36s %10s %10s %10s %10s %10s", "case", "median ms", "max ms", "RSS MiB", "growth", "resp KiB"
+    )
+    for case, result in result_map.items():
+        logging.info(
+            "%-36s %10.1f %10.1f %10.1f %10.1f %10s",
+            case,
+            result["median_ms"],
+            result["max_ms"],
+            result["rss_peak_mb"],
+            result["rss_growth_mb"],
+            format_value(result["response_kb"], ".1f"),
+        )
+
+
+if __name__ == "__main__":
+    import docopt
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    year_list = [float(years) for years in args["-y"].split(",")]
+    db_dir = args["-d"]
+    repeat = int(args["-r"])
+    pattern = args["-k"]
+    output = args["-o"]
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("bench", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    result_map = run(year_list, db_dir, repeat, pattern, debug_mode)
+    report(result_map)
+
+    if output is not None:
+        pathlib.Path(output).write_text(json.dumps(result_map, indent=4) + "\n")
+        logging.info("Save result: %s", output)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+制御メッセージの Pub/Sub (ZeroMQ) の処理速度と遅延のベンチマークです。
+
+publish.start_server, publish.start_proxy と、N 個の subscribe.start_client を localhost 上で
+別々のプロセスとして動かし、メッセージの大きさ (sense_data の有無とエアコンの台数) と
+購読者の数を変えながら、次の値を計測します。
+
+- 購読者 1 つあたりの受信数 [msg/s] と、送信したメッセージのうち受信できた割合
+- 送信から受信までの遅延のパーセンタイル
+- 各プロセスの CPU 使用率と常駐メモリ (Linux の /proc から取得)
+
+NOTE: 送信の間隔は publish.SLEEP_MIN_SEC を 0 にした上で、-r で指定した送信速度に合わせます。
+
+Usage:
+  bench_pubsub.py [-r RATE] [-d DURATION] [-s SUBSCRIBERS] [-n COUNTS] [-o OUTPUT] [-D]
+
+Options:
+  -r RATE           : 1 秒あたりの送信数を指定します。0 の場合は可能な限り速く送信します。[default: 500]
+  -d DURATION       : 1 つの条件あたりの計測時間 [秒] を指定します。[default: 5]
+  -s SUBSCRIBERS    : 購読者の数をカンマ区切りで指定します。[default: 1,4,16]
+  -n COUNTS         : sense_data に含めるエアコンの台数をカンマ区切りで指定します。[default: 10,50]
+  -o OUTPUT         : 計測結果を JSON で保存します。
+  -D                : デバッグモードで動作します。
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import socket
+import statistics
+import time
+
+import bench_controller
+import common
+
+import unit_cooler.controller.engine
+import unit_cooler.pubsub.publish
+import unit_cooler.pubsub.subscribe
+
+SERVER_HOST = "localhost"
+# 購読者の受信を待つ時間の上限 (最初の接続は publish.wait_first_client の待ち時間がかかる)
+READY_TIMEOUT_SEC = 30
+
+
+def find_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def gen_message_map(aircon_count_list):
+    """条件の名前をキーとして、送信するメッセージを返す"""
+    template = unit_cooler.controller.engine.get_control_msg_template()[1]["message"]
+
+    message_map = {}
+    for aircon_count in [0, *aircon_count_list]:
+        sense_data = bench_controller.gen_sense_data(max(aircon_count, 1))
+        message = {**template, "env": unit_cooler.controller.engine.gen_env(sense_data)}
+
+        if aircon_count == 0:
+            # NOTE: テレメトリ用のチャンネルを使う場合と同じく、センサーの詳細は含めない
+            message_map["control"] = message
+        else:
+            message_map[f"sense_data[{aircon_count}]"] = {**message, "sense_data": sense_data}
+
+    return message_map
+
+
+def init_child_logging(debug_mode):
+    # NOTE: 1 メッセージ毎のログで計測が歪まないようにする
+    if not debug_mode:
+        logging.getLogger().setLevel(logging.ERROR)
+
+
+def run_publisher(real_port, interval_sec, message_list, variant, send_count, debug_mode):  # noqa: PLR0913
+    init_child_logging(debug_mode)
+    unit_cooler.pubsub.publish.SLEEP_MIN_SEC = 0
+
+    def gen_message():
+        with send_count.get_lock():
+            send_count.value += 1
+        return {**message_list[variant.value], "bench_time": time.time()}
+
+    unit_cooler.pubsub.publish.start_server(real_port, gen_message, interval_sec)
+
+
+def run_proxy(real_port, proxy_port, debug_mode):
+    init_child_logging(debug_mode)
+
+    unit_cooler.pubsub.publish.start_proxy(SERVER_HOST, real_port, proxy_port)
+
+
+def run_subscriber(proxy_port, window, ready, should_terminate, result_queue, debug_mode):  # noqa: PLR0913
+    init_child_logging(debug_mode)
+
+    record_list = []
+
+    def on_message(message):
+        record_list.append((message["bench_time"], time.time()))
+        ready.set()
+
+    unit_cooler.pubsub.subscribe.start_client(SERVER_HOST, proxy_port, on_message, 0, should_terminate)
+
+    start_time, end_time = window[0], window[1]
+    latency_list = [
+        (recv_time - send_time) * 1000
+        for send_time, recv_time in record_list
+        if start_time <= send_time <= end_time
+    ]
+    result_queue.put(latency_list)
+
+
+def read_proc_stat(pid):
+    """プロセスの CPU 時間 [秒] と常駐メモリ [MiB] を返す"""
+    field_list = pathlib.Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    # NOTE: utime, stime は ")" の後の 12, 13 番目
+    cpu_sec = (int(field_list[11]) + int(field_list[12])) / os.sysconf("SC_CLK_TCK")
+
+    rss_mb = 0.0
+    for line in pathlib.Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            rss_mb = int(line.split()[1]) / 1024
+
+    return {"cpu_sec": cpu_sec, "rss_mb": rss_mb}
+
+
+def measure_point(ctx, setting, subscriber_count, process_map):
+    window = ctx.Array("d", [0.0, 0.0])
+    should_terminate = ctx.Event()
+    result_queue = ctx.Queue()
+
+    subscriber_list = []
+    for _ in range(subscriber_count):
+        ready = ctx.Event()
+        process = ctx.Process(
+            target=run_subscriber,
+            args=(
+                setting["proxy_port"],
+                window,
+                ready,
+                should_terminate,
+                result_queue,
+                setting["debug_mode"],
+            ),
+            daemon=True,
+        )
+        process.start()
+        subscriber_list.append({"process": process, "ready": ready})
+
+    for subscriber in subscriber_list:
+        if not subscriber["ready"].wait(READY_TIMEOUT_SEC):
+            logging.error("Subscriber did not receive any message")
+
+    pid_map = {
+        "publisher": process_map["publisher"].pid,
+        "proxy": process_map["proxy"].pid,
+        **{f"subscriber{i}": subscriber["process"].pid for i, subscriber in enumerate(subscriber_list)},
+    }
+
+    stat_start = {name: read_proc_stat(pid) for name, pid in pid_map.items()}
+    send_count_start = setting["send_count"].value
+    window[0] = time.time()
+
+    time.sleep(setting["duration"])
+
+    window[1] = time.time()
+    send_count = setting["send_count"].value - send_count_start
+    stat_end = {name: read_proc_stat(pid) for name, pid in pid_map.items()}
+
+    # NOTE: 計測期間の終わりに送信されたメッセージが届くのを待ってから止める
+    time.sleep(0.5)
+    should_terminate.set()
+
+    latency_list = []
+    receive_count_list = []
+    for _ in subscriber_list:
+        subscriber_latency_list = result_queue.get()
+        latency_list += subscriber_latency_list
+        receive_count_list.append(len(subscriber_latency_list))
+    for subscriber in subscriber_list:
+        subscriber["process"].join()
+
+    elapsed_sec = window[1] - window[0]
+    cpu_map = {
+        name: (stat_end[name]["cpu_sec"] - stat_start[name]["cpu_sec"]) / elapsed_sec * 100
+        for name in pid_map
+    }
+    subscriber_name_list = [name for name in pid_map if name.startswith("subscriber")]
+
+    return {
+        "send_per_sec": send_count / elapsed_sec,
+        "receive_per_sec": statistics.mean(receive_count_list) / elapsed_sec,
+        "delivery_ratio": (statistics.mean(receive_count_list) / send_count) if send_count else None,
+        "latency_p50_ms": common.percentile(latency_list, 0.5) if latency_list else None,
+        "latency_p95_ms": common.percentile(latency_list, 0.95) if latency_list else None,
+        "latency_p99_ms": common.percentile(latency_list, 0.99) if latency_list else None,
+        "latency_max_ms": max(latency_list) if latency_list else None,
+        "cpu_publisher": cpu_map["publisher"],
+        "cpu_proxy": cpu_map["proxy"],
+        "cpu_subscriber": statistics.mean(cpu_map[name] for name in subscriber_name_list),
+        "rss_publisher_mb": stat_end["publisher"]["rss_mb"],
+        "rss_proxy_mb": stat_end["proxy"]["rss_mb"],
+        "rss_subscriber_mb": statistics.mean(stat_end[name]["rss_mb"] for name in subscriber_name_list),
+    }
+
+
+def run(rate, duration, subscriber_count_list, aircon_count_list, debug_mode=False):
+    ctx = multiprocessing.get_context()
+
+    message_map = gen_message_map(aircon_count_list)
+    message_list = list(message_map.values())
+
+    setting = {
+        "proxy_port": find_free_port(),
+        "duration": duration,
+        "send_count": ctx.Value("q", 0),
+        "debug_mode": debug_mode,
+    }
+    real_port = find_free_port()
+    variant = ctx.Value("i", 0)
+
+    process_map = {
+        "proxy": ctx.Process(
+            target=run_proxy, args=(real_port, setting["proxy_port"], debug_mode), daemon=True
+        ),
+        "publisher": ctx.Process(
+            target=run_publisher,
+            args=(
+                real_port,
+                1 / rate if rate > 0 else 0,
+                message_list,
+                variant,
+                setting["send_count"],
+                debug_mode,
+            ),
+            daemon=True,
+        ),
+    }
+    for process in process_map.values():
+        process.start()
+
+    result_map = {}
+    try:
+        for index, (name, message) in enumerate(message_map.items()):
+            variant.value = index
+            size = len(unit_cooler.pubsub.publish.gen_message_list(message)[0][1])
+
+            for subscriber_count in subscriber_count_list:
+                case = f"{name}/sub{subscriber_count}"
+                logging.info("Measure %s (%d bytes)...", case, size)
+
+                result_map[case] = {
+                    "message_bytes": size,
+                    **measure_point(ctx, setting, subscriber_count, process_map),
+                }
+    finally:
+        for process in process_map.values():
+            process.terminate()
+            process.join()
+
+    return result_map
+
+
+def format_value(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def report(result_map):
+    logging.info(
+        "%-24s %8s %9s %7s %9s %9s %9s %7s %7s %7s %8s",
+        "case",
+        "bytes",
+        "recv/s",
+        "ratio",
+        "p50 ms",
+        "p95 ms",
+        "p99 ms",
+        "pub %",
+        "proxy %",
+        "sub %",
+        "sub MiB",
+    )
+    for case, result in result_map.items():
+        logging.info(
+            "%-24s %8d %9.1f %7s %9s %9s %9s %7.1f %7.1f %7.1f %8.1f",
+            case,
+            result["message_bytes"],
+            result["receive_per_sec"],
+            format_value(result["delivery_ratio"], ".3f"),
+            format_value(result["latency_p50_ms"], ".3f"),
+            format_value(result["latency_p95_ms"], ".3f"),
+            format_value(result["latency_p99_ms"], ".3f"),
+            result["cpu_publisher"],
+            result["cpu_proxy"],
+            result["cpu_subscriber"],
+            result["rss_subscriber_mb"],
+        )
+
+
+if __name__ == "__main__":
+    import docopt
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    rate = float(args["-r"])
+    duration = float(args["-d"])
+    subscriber_count_list = [int(count) for count in args["-s"].split(",")]
+    aircon_count_list = [int(count) for count in args["-n"].split(",")]
+    output = args["-o"]
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("bench", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    result_map = run(rate, duration, subscriber_count_list, aircon_count_list, debug_mode)
+    report(result_map)
+
+    if output is not None:
+        pathlib.Path(output).write_text(json.dumps(result_map, indent=4) + "\n")
+        logging.info("Save result: %s", output)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+ベンチマークの計測と、保存したベースラインとの比較を行う共通処理です。
+
+各ケースは、処理時間 (1 回あたりの中央値・95 パーセンタイルなど) と、1 回あたりのメモリ確保量
+(tracemalloc で計測したピーク) を計測します。ベースラインより tolerance の割合を超えて
+悪化したものを退行とみなします。ベースラインの無いケースを計測した場合も、比較できないので
+失敗とします。(新しいケースは -u で保存してください)
+
+NOTE: 処理時間のベースラインは計測したマシンに依存するので、別のマシンで比較する場合は
+-u で保存し直してください。
+"""
+
+import gc
+import json
+import logging
+import pathlib
+import statistics
+import time
+import tracemalloc
+
+BASELINE_DIR_PATH = pathlib.Path(__file__).parent / "baseline"
+
+# 退行とみなす悪化の割合のデフォルト値
+TOLERANCE = 0.3
+# 比較する値 (いずれも小さいほど良い) と、誤差とみなす差の絶対値
+COMPARE_MARGIN_MAP = {"median_ms": 0.05, "alloc_peak_kb": 4.0}
+
+
+def percentile(value_list, ratio):
+    value_list = sorted(value_list)
+    return value_list[min(int(len(value_list) * ratio), len(value_list) - 1)]
+
+
+def measure(func, repeat=100, warmup=3):
+    """関数 func を repeat 回呼び出して、1 回あたりの処理時間とメモリ確保量を計測する"""
+    for _ in range(warmup):
+        func()
+
+    gc.collect()
+    elapsed_list = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        elapsed_list.append((time.perf_counter() - start_time) * 1000)
+
+    # NOTE: tracemalloc を有効にすると遅くなるので、処理時間とは別に計測する
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeat": repeat,
+        "min_ms": min(elapsed_list),
+        "median_ms": statistics.median(elapsed_list),
+        "p95_ms": percentile(elapsed_list, 0.95),
+        "max_ms": max(elapsed_list),
+        "alloc_peak_kb": (peak - base_current) / 1024,
+        "alloc_retained_kb": (current - base_current) / 1024,
+    }
+
+
+def load_baseline(name):
+    path = BASELINE_DIR_PATH / f"{name}.json"
+    if not path.exists():
+        return {}
+
+    return json.loads(path.read_text())
+
+
+def save_baseline(name, result_map, margin_map=COMPARE_MARGIN_MAP):
+    BASELINE_DIR_PATH.mkdir(parents=True, exist_ok=True)
+    path = BASELINE_DIR_PATH / f"{name}.json"
+    path.write_text(
+        json.dumps(
+            {
+                case: {key: round(result[key], 4) for key in margin_map}
+                for case, result in sorted(result_map.items())
+            },
+            indent=4,
+        )
+        + "\n"
+    )
+    logging.info("Save baseline: %s", path)
+
+
+def compare(result_map, baseline_map, tolerance=TOLERANCE, margin_map=COMPARE_MARGIN_MAP):
+    """ベースラインより悪化したケースの一覧を返す (margin_map のキーの値を比較する)"""
+    regression_list = []
+    for case, result in result_map.items():
+        baseline = baseline_map.get(case)
+        if baseline is None:
+            continue
+
+        for key, margin in margin_map.items():
+            if (key not in baseline) or (baseline[key] <= 0):
+                continue
+            if (result[key] > baseline[key] * (1 + tolerance)) and (result[key] - baseline[key] > margin):
+                regression_list.append(
+                    {"case": case, "key": key, "value": result[key], "baseline": baseline[key]}
+                )
+
+    return regression_list
+
+
+def report(result_map, baseline_map):
+    logging.info(
+        "%-40s %10s %10s %10s %12s %12s",
+        "case",
+        "median ms",
+        "p95 ms",
+        "baseline",
+        "alloc KiB",
+        "baseline",
+    )
+    for case, result in result_map.items():
+        baseline = baseline_map.get(case, {})
+        logging.info(
+            "%-40s %10.3f %10.3f %10s %12.1f %12s",
+            case,
+            result["median_ms"],
+            result["p95_ms"],
+            f"{baseline['median_ms']:.3f}" if "median_ms" in baseline else "-",
+            result["alloc_peak_kb"],
+            f"{baseline['alloc_peak_kb']:.1f}" if "alloc_peak_kb" in baseline else "-",
+        )
+
+
+def finish(  # noqa: PLR0913
+    name, result_map, update=False, tolerance=TOLERANCE, margin_map=COMPARE_MARGIN_MAP, report_func=report
+):
+    """
+    結果を表示し、ベースラインと比較する (退行があるか、ベースラインの無いケースがあれば 1 を返す)
+
+    処理時間とメモリ確保量以外の値を比較する場合は、margin_map と、それを表示する report_func を指定します。
+    """
+    baseline_map = load_baseline(name)
+    report_func(result_map, baseline_map)
+
+    if update:
+        save_baseline(name, {**baseline_map, **result_map}, margin_map)
+        return 0
+
+    missing_list = [case for case in result_map if case not in baseline_map]
+    for case in missing_list:
+        logging.error("No baseline: %s (save it with -u)", case)
+
+    regression_list = compare(result_map, baseline_map, tolerance, margin_map)
+    for regression in regression_list:
+        logging.error(
+            "Regression: %s %s = %.3f (baseline: %.3f)",
+            regression["case"],
+            regression["key"],
+            regression["value"],
+            regression["baseline"],
+        )
+
+    return 1 if (regression_list or missing_list) else 0
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+ダッシュボードのベンチマーク用に、合成のメトリクスデータベース (metrics.db) を生成します。
+
+MetricsCollector と同じスキーマで、YEARS 年分の次のデータを END (省略時は現在時刻) まで
+作成します。乱数のシードが同じであれば、END が同じ限り同じデータになります。
+
+- minute_metrics: 季節と 1 日の変化を持つ気温・湿度・日射量・照度と、にわか雨、
+  それらから決めた冷却モード・Duty 比・流量 (数時間の欠測も含む)
+- hourly_metrics: 分データのバルブの開閉から数えた 1 時間あたりの操作回数
+- error_events: 1 日あたり平均 ERROR_PER_DAY 件のエラー
+
+Usage:
+  gen_metrics_db.py [-o OUTPUT] [-y YEARS] [-e END] [-s SEED] [-D]
+
+Options:
+  -o OUTPUT         : 生成するデータベースのパスを指定します。[default: benchmark/data/metrics.db]
+  -y YEARS          : 生成する期間 [年] を指定します。[default: 1]
+  -e END            : 最後のデータの日時 (ISO 8601) を指定します。
+  -s SEED           : 乱数のシードを指定します。[default: 0]
+  -D                : デバッグモードで動作します。
+"""
+
+import datetime
+import logging
+import math
+import pathlib
+import time
+
+import numpy as np
+
+import unit_cooler.controller.message
+import unit_cooler.metrics.collector
+
+TIMEZONE = unit_cooler.metrics.collector.TIMEZONE
+
+MINUTE_PER_DAY = 24 * 60
+# 冷却モード毎の Duty 比と、15 分周期のうち ON にする分数
+DUTY_RATIO_LIST = [
+    (msg["duty"]["on_sec"] / (msg["duty"]["on_sec"] + msg["duty"]["off_sec"]))
+    if msg["duty"]["enable"]
+    else 0.0
+    for msg in unit_cooler.controller.message.CONTROL_MESSAGE_LIST
+]
+ON_MIN_LIST = [msg["duty"]["on_sec"] // 60 for msg in unit_cooler.controller.message.CONTROL_MESSAGE_LIST]
+CYCLE_MIN = 15
+
+# 流量 [L/min]
+FLOW_LPM = 2.2
+# 雨が降る日の割合
+RAIN_DAY_RATIO = 0.3
+# 欠測がある日の割合
+GAP_DAY_RATIO = 0.01
+# 1 日あたりのエラーの件数の平均値
+ERROR_PER_DAY = 0.2
+ERROR_LIST = [
+    ("sensor_read_error", "Flow sensor read failed"),
+    ("work_log_error", "Failed to read valve state"),
+    ("work_log_error", "Unable to receive control message"),
+]
+
+
+def gen_day(rng, day, state):
+    """1 日分の分データの列 (各項目の ndarray) を生成する"""
+    minute = np.arange(MINUTE_PER_DAY)
+    hour = minute / 60
+
+    # NOTE: 8 月上旬に最も暑く、2 月上旬に最も寒くなるようにする
+    season = math.cos(2 * math.pi * (day.timetuple().tm_yday - 217) / 365)
+
+    # 日毎の気温の変動は前日からの自己回帰とする
+    state["temp_offset"] = 0.7 * state["temp_offset"] + rng.normal(0, 1.5)
+    cloud = rng.beta(1.2, 2.0)
+
+    raining = np.zeros(MINUTE_PER_DAY, dtype=bool)
+    rain_amount = np.zeros(MINUTE_PER_DAY)
+    if rng.random() < RAIN_DAY_RATIO:
+        cloud = max(cloud, 0.8)
+        begin = rng.integers(0, MINUTE_PER_DAY)
+        length = rng.integers(30, 8 * 60)
+        raining[begin : begin + length] = True
+        rain_amount[raining] = rng.gamma(1.5, 0.05, int(raining.sum()))
+
+    # 日射量 [W/m^2] と照度 [lux]
+    sunrise = 5.7 - 1.1 * season
+    sunset = 18.3 + 1.1 * season
+    elevation = np.clip(np.sin(np.pi * (hour - sunrise) / (sunset - sunrise)), 0, None)
+    elevation[(hour < sunrise) | (hour > sunset)] = 0
+    solar_radiation = (
+        (650 + 300 * season)
+        * elevation
+        * (1 - 0.7 * cloud)
+        * np.where(raining, 0.3, 1.0)
+        * rng.normal(1, 0.05, MINUTE_PER_DAY).clip(0.5, 1.5)
+    )
+    lux = solar_radiation * 110
+
+    # 気温 [℃] は 15 時頃に最も高くなる
+    temp_mean = 16.5 + 11 * season + state["temp_offset"]
+    temperature = (
+        temp_mean
+        + (3 + 3 * (1 - cloud)) * np.sin(2 * np.pi * (hour - 9) / 24)
+        - np.where(raining, 2.0, 0.0)
+        + rng.normal(0, 0.2, MINUTE_PER_DAY)
+    )
+    humidity = np.clip(
+        65
+        + 10 * season
+        - 2.5 * (temperature - temp_mean)
+        + np.where(raining, 25, 0)
+        + rng.normal(0, 1.5, MINUTE_PER_DAY),
+        15,
+        100,
+    )
+
+    # NOTE: コントローラと同じく、暑くて日差しが強いほど冷却モードを上げ、雨の間は止める
+    cooling_mode = np.where(
+        (temperature >= 29) & ~raining & (humidity < 90),
+        np.clip(np.floor((temperature - 29) / 1.2 + solar_radiation / 400) + 1, 1, 8),
+        0,
+    ).astype(int)
+    duty_ratio = np.take(DUTY_RATIO_LIST, cooling_mode)
+
+    valve_open = (minute % CYCLE_MIN) < np.take(ON_MIN_LIST, cooling_mode)
+    flow_value = np.where(valve_open, FLOW_LPM + rng.normal(0, 0.1, MINUTE_PER_DAY), 0.0)
+
+    return {
+        "cooling_mode": cooling_mode,
+        "duty_ratio": duty_ratio,
+        "temperature": temperature,
+        "humidity": humidity,
+        "lux": lux,
+        "solar_radiation": solar_radiation,
+        "rain_amount": rain_amount,
+        "flow_value": flow_value,
+        "valve_open": valve_open,
+    }
+
+
+def gen_gap(rng):
+    """欠測にする分の範囲を返す (欠測が無い場合は None)"""
+    if rng.random() >= GAP_DAY_RATIO:
+        return None
+
+    begin = int(rng.integers(0, MINUTE_PER_DAY))
+    return (begin, begin + int(rng.integers(60, 6 * 60)))
+
+
+def gen_day_row(rng, day, column_map, state):
+    """1 日分の minute_metrics, hourly_metrics, error_events の行を返す"""
+    gap = gen_gap(rng)
+
+    valve_open = column_map["valve_open"]
+    # NOTE: 開閉の回数は前日の最後の状態からの変化も数える
+    operation = np.diff(valve_open.astype(int), prepend=int(state["valve_open"])) != 0
+    state["valve_open"] = bool(valve_open[-1])
+
+    minute_row_list = []
+    for i, row in enumerate(
+        zip(
+            *(
+                column_map[name].tolist()
+                for name in [
+                    "cooling_mode",
+                    "duty_ratio",
+                    "temperature",
+                    "humidity",
+                    "lux",
+                    "solar_radiation",
+                    "rain_amount",
+                    "flow_value",
+                ]
+            ),
+            strict=True,
+        )
+    ):
+        if (gap is not None) and (gap[0] <= i < gap[1]):
+            continue
+        timestamp = day + datetime.timedelta(minutes=i)
+        minute_row_list.append(
+            (
+                str(timestamp),
+                row[0],
+                round(row[1], 4),
+                round(row[2], 2),
+                round(row[3], 1),
+                round(row[4], 1),
+                round(row[5], 1),
+                round(row[6], 2),
+                round(row[7], 2) if row[7] > 0 else None,
+            )
+        )
+
+    hourly_row_list = [
+        (str(day + datetime.timedelta(hours=hour)), int(operation[hour * 60 : (hour + 1) * 60].sum()))
+        for hour in range(24)
+    ]
+
+    error_row_list = []
+    for _ in range(rng.poisson(ERROR_PER_DAY)):
+        error_type, error_message = ERROR_LIST[rng.integers(0, len(ERROR_LIST))]
+        timestamp = day + datetime.timedelta(seconds=int(rng.integers(0, MINUTE_PER_DAY * 60)))
+        error_row_list.append((str(timestamp), error_type, error_message))
+
+    return minute_row_list, hourly_row_list, error_row_list
+
+
+def generate(db_path, years, end=None, seed=0):
+    """YEARS 年分の合成データでデータベースを作成し、minute_metrics の行数を返す"""
+    db_path = pathlib.Path(db_path)
+    if end is None:
+        end = datetime.datetime.now(TIMEZONE)
+    end = end.astimezone(TIMEZONE).replace(second=0, microsecond=0)
+
+    # NOTE: 最後の日は END の分までにするため、日単位で生成してから切り詰める
+    end_day = end.replace(hour=0, minute=0)
+    start_day = end_day - datetime.timedelta(days=round(365 * years) - 1)
+
+    db_path.unlink(missing_ok=True)
+    collector = unit_cooler.metrics.collector.MetricsCollector(db_path)
+
+    rng = np.random.default_rng(seed)
+    state = {"temp_offset": 0.0, "valve_open": False}
+    start_time = time.perf_counter()
+    row_count = 0
+
+    with collector._get_db_connection() as conn:  # noqa: SLF001
+        # NOTE: 生成するだけなので、書き込みの安全性より速度を優先する
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+
+        day = start_day
+        while day <= end_day:
+            minute_row_list, hourly_row_list, error_row_list = gen_day_row(
+                rng, day, gen_day(rng, day, state), state
+            )
+            if day == end_day:
+                last = str(end)
+                minute_row_list = [row for row in minute_row_list if row[0] <= last]
+                hourly_row_list = [row for row in hourly_row_list if row[0] <= last]
+                error_row_list = [row for row in error_row_list if row[0] <= last]
+
+            conn.executemany(
+                """
+                INSERT INTO minute_metrics
+                (timestamp, cooling_mode, duty_ratio, temperature, humidity,
+                 lux, solar_radiation, rain_amount, flow_value)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                minute_row_list,
+            )
+            conn.executemany(
+                "INSERT INTO hourly_metrics (timestamp, valve_operations) VALUES (?, ?)", hourly_row_list
+            )
+            conn.executemany(
+                "INSERT INTO error_events (timestamp, error_type, error_message) VALUES (?, ?, ?)",
+                error_row_list,
+            )
+            row_count += len(minute_row_list)
+
+            day += datetime.timedelta(days=1)
+
+    logging.info(
+        "Generate %s (%g years, %s minute rows, %.1f MiB) in %.1f sec",
+        db_path,
+        years,
+        f"{row_count:,}",
+        db_path.stat().st_size / 1024 / 1024,
+        time.perf_counter() - start_time,
+    )
+
+    return row_count
+
+
+if __name__ == "__main__":
+    import docopt
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    output = args["-o"]
+    years = float(args["-y"])
+    end = datetime.datetime.fromisoformat(args["-e"]) if args["-e"] is not None else None
+    seed = int(args["-s"])
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("bench", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    if (end is not None) and (end.tzinfo is None):
+        end = end.replace(tzinfo=TIMEZONE)
+
+    generate(output, years, end, seed)
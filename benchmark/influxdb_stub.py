@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用に、InfluxDB の Flux クエリ API (/api/v2/query) を模擬するサーバーです。
+
+クエリの _field と hostname に応じて固定の値を返します。応答前に latency 秒待つので、
+ネットワークや InfluxDB の遅延を模擬できます。集計のクエリ (stat 列を付けるもの) には、
+last, mean, max の 3 つの値を返します。
+
+Usage:
+  influxdb_stub.py [-p PORT] [-l LATENCY] [-D]
+
+Options:
+  -p PORT           : サーバーを動作させるポートを指定します。[default: 8086]
+  -l LATENCY        : 応答を返すまでの遅延 [ms] を指定します。[default: 0]
+  -D                : デバッグモードで動作します。
+"""
+
+import datetime
+import http.server
+import json
+import logging
+import re
+import threading
+import time
+
+# _field 毎に返す値 (hostname をキーとする dict の場合は hostname 毎の値)
+VALUE_MAP = {
+    "temp": 33.0,
+    "humi": 50.0,
+    "lux": 30000.0,
+    "solar_rad": 700.0,
+    "rain": 0.0,
+    "power": 800.0,
+}
+
+CSV_HEADER = """#datatype,string,long,dateTime:RFC3339,double,string,string,string
+#group,false,false,false,false,true,true,true
+#default,_result,,,,,,
+,result,table,_time,_value,_field,hostname,stat
+"""
+
+FIELD_PATTERN = re.compile(r'r\._field == "([^"]+)"')
+HOSTNAME_PATTERN = re.compile(r'r\.hostname == "([^"]+)"')
+
+
+class InfluxDBStub:
+    def __init__(self, value_map=None, latency_sec=0.0, port=0):
+        """value_map で VALUE_MAP の値を上書きし、応答を latency_sec 秒遅らせる (port 0 は空きポート)"""
+        self.value_map = {**VALUE_MAP, **(value_map or {})}
+        self.latency_sec = latency_sec
+        self.query_count = 0
+        self.lock = threading.Lock()
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", port), self.gen_handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def get_value(self, field, hostname):
+        value = self.value_map.get(field, 0.0)
+        if isinstance(value, dict):
+            value = value.get(hostname, 0.0)
+        return value
+
+    def gen_response(self, query):
+        field_match = FIELD_PATTERN.search(query)
+        hostname_match = HOSTNAME_PATTERN.search(query)
+        field = field_match.group(1) if field_match else ""
+        hostname = hostname_match.group(1) if hostname_match else ""
+
+        value = self.get_value(field, hostname)
+        # NOTE: 最新の値は 1 分前に記録されたものとする
+        record_time = (
+            (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=1))
+            .isoformat()
+            .replace("+00:00", "Z")
+        )
+
+        # NOTE: 集計のクエリの場合は、stat 毎に別のテーブルとして返す
+        stat_list = ["last", "mean", "max"] if 'key: "stat"' in query else [""]
+        row_list = [
+            f",,{table},{record_time},{value},{field},{hostname},{stat}"
+            for table, stat in enumerate(stat_list)
+        ]
+
+        return CSV_HEADER + "\n".join(row_list) + "\n\n"
+
+    def gen_handler(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                query = json.loads(self.rfile.read(length) or b"{}").get("query", "")
+
+                with stub.lock:
+                    stub.query_count += 1
+
+                if stub.latency_sec > 0:
+                    time.sleep(stub.latency_sec)
+
+                body = stub.gen_response(query).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # noqa: A002
+                logging.debug(format, *args)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        logging.info("Start InfluxDB stub (%s, latency: %.1f ms)", self.url, self.latency_sec * 1000)
+
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+
+if __name__ == "__main__":
+    # TEST Code
+    import docopt
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    port = int(args["-p"])
+    latency_sec = float(args["-l"]) / 1000
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("test", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    stub = InfluxDBStub(latency_sec=latency_sec, port=port).start()
+    stub.thread.join()
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+コントローラ、プロキシ、アクチュエータ、メトリクスを仮想時間で動かす、決定的な離散事象シミュレータです。
+
+時刻を unit_cooler.clock.VirtualClock に差し替え、START から DAYS 日分 (デフォルトは夏の 92 日分) の
+次の事象を、スレッドを使わずに時刻順に処理します。実時間は待たないので、1 シーズン分を
+1 分弱でシミュレーションでき、閾値や安定化の設定を変えた場合の回帰や容量の確認に使えます。
+
+- controller: controller.interval_sec 毎に、gen_metrics_db.py と同じ合成の気象データと、
+  気温に応じたエアコンの消費電力から sense_data を作り、engine.gen_control_msg で判定する
+  (InfluxDB は使わない)
+- proxy: 制御メッセージを engine.encode_control_msg で JSON にして、LATENCY ミリ秒後に
+  subscribe_worker と同じ処理 (worker.queue_put) でアクチュエータに届ける
+- control: メッセージが届いた時と、Duty の ON/OFF を切り替える時刻 (actuator.control.interval_sec
+  単位に切り上げる) に、control_worker のループ 1 回分 (worker.control_step) を実行する
+- monitor: MONITOR 秒毎に、monitor_worker のループ 1 回分 (worker.monitor_step) を実行する
+
+結果として、1 日あたりの電磁弁の開閉回数・開いていた時間・散水量 (gen_metrics_db.FLOW_LPM で
+換算)・作動ログの件数と、冷却モード毎の時間の割合、シミュレーションにかかった時間を求め、
+benchmark/baseline/simulate.json と比較します。
+
+NOTE: Duty の ON/OFF の時間は実機と同じです。(時短モードではないので、engine.ON_SEC_MIN などの
+下限の影響も受けない) 電磁弁の状態ファイルはメモリ上にのみ作り、メトリクスは一時ディレクトリ
+(-m を指定した場合はそのパス) の SQLite に、シミュレーション上の 1 時間毎にまとめて書き込みます。
+
+NOTE: ZeroMQ や fluentd との通信、Web サーバーは動かしません。監視は MONITOR 秒毎なので、
+電磁弁を開いてから数秒後の水漏れの判定は実機より遅れます。
+
+Usage:
+  simulate.py [-c CONFIG] [-s START] [-d DAYS] [-z ZONES] [-k MAX] [-l LATENCY] [-M MONITOR]
+              [-S SEED] [-m METRICS_DB] [-T TOLERANCE] [-u] [-D]
+
+Options:
+  -c CONFIG         : CONFIG を設定ファイルとして読み込んで実行します。[default: config.example.yaml]
+  -s START          : シミュレーションを開始する日付を指定します。[default: 2025-06-01]
+  -d DAYS           : シミュレーションする日数を指定します。[default: 92]
+  -z ZONES          : ゾーンの数を指定します。0 は設定ファイルのままです。[default: 0]
+  -k MAX            : 同時に開く電磁弁の数の上限を指定します。(省略時は設定ファイルの値)
+  -l LATENCY        : プロキシを経由した配送の遅延 [ms] を指定します。[default: 50]
+  -M MONITOR        : 流量を監視する間隔 [秒] を指定します。[default: 60]
+  -S SEED           : 乱数のシードを指定します。[default: 0]
+  -m METRICS_DB     : メトリクスのデータベースを保存するパスを指定します。(ダッシュボードで確認できます)
+  -T TOLERANCE      : ベースラインからの悪化をこの割合まで許容します。[default: 0.3]
+  -u                : 結果でベースラインを更新します。
+  -D                : デバッグモードで動作します。
+"""
+
+import collections
+import copy
+import datetime
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import pathlib
+import queue
+import random
+import sys
+import tempfile
+import time
+
+import common
+import gen_metrics_db
+import numpy as np
+
+import unit_cooler.clock
+import unit_cooler.const
+import unit_cooler.controller.engine
+import unit_cooler.controller.message
+
+# NOTE: ダミーの GPIO と流量計を使うため、unit_cooler.actuator を import する前に設定する
+os.environ["DUMMY_MODE"] = "true"
+
+TIMEZONE = unit_cooler.clock.TIMEZONE
+
+# 比較する値と、誤差とみなす差の絶対値
+COMPARE_MARGIN_MAP = {
+    "elapsed_sec": 5.0,
+    "valve_operation_per_day": 5,
+    "water_liter_per_day": 20,
+    "work_log_per_day": 5,
+    "error_log_per_day": 0.5,
+}
+
+# エアコン毎の使う時間帯 [時] (部屋の数が多い場合は順に繰り返して使う)
+AIRCON_HOUR_LIST = [(7, 24), (18, 24), (20, 24), (9, 18), (13, 23)]
+# エアコンを使い始める気温 [℃] と、消費電力 [W] のモデル (気温が高いほど大きくなる)
+AIRCON_TEMP_MIN = 25
+AIRCON_POWER_BASE = 250
+AIRCON_POWER_PER_TEMP = 70
+AIRCON_POWER_MAX = 1600
+
+# Duty の切り替え時刻を求める際に、丸めの誤差とみなす値
+EPSILON = 1e-6
+
+# NOTE: メトリクスや作動ログの SQLite は、可能であればメモリ上のファイルシステムに置く
+TEMP_DIR_PATH = pathlib.Path("/dev/shm") if pathlib.Path("/dev/shm").is_dir() else None  # noqa: S108
+
+
+def gen_config(config, temp_dir_path, zone_count, concurrent_max):
+    """状態を書き込むファイルを一時ディレクトリに置き換えた設定を返す"""
+    config = copy.deepcopy(config)
+
+    config["controller"]["liveness"]["file"] = str(temp_dir_path / "healthz.controller")
+    if "stabilize" in config["controller"]:
+        config["controller"]["stabilize"]["file"] = str(temp_dir_path / "stabilize.json")
+
+    actuator_config = config["actuator"]
+    for name in ["subscribe", "control", "monitor"]:
+        actuator_config[name]["liveness"]["file"] = str(temp_dir_path / f"healthz.{name}")
+    actuator_config["control"]["hazard"]["file"] = str(temp_dir_path / "hazard")
+    actuator_config["web_server"]["webapp"]["data"]["log_file_path"] = str(temp_dir_path / "log.db")
+    actuator_config["metrics"]["data"] = str(temp_dir_path / "metrics.db")
+
+    if zone_count != 0:
+        actuator_config["control"]["zones"] = [
+            {"name": f"zone{i}", "pin_no": 17 + i} for i in range(zone_count)
+        ]
+    if concurrent_max is not None:
+        actuator_config["control"]["concurrent_max"] = concurrent_max
+
+    # NOTE: シミュレーションから Slack に通知しないようにする
+    config.pop("slack", None)
+
+    return config
+
+
+def gen_power_day(rng, column_map, aircon_count):
+    """1 日分のエアコン毎の消費電力 [W] (エアコン × 分の ndarray) を生成する"""
+    hour = np.arange(gen_metrics_db.MINUTE_PER_DAY) / 60
+    temperature = column_map["temperature"]
+
+    power = np.zeros((aircon_count, gen_metrics_db.MINUTE_PER_DAY))
+    for i in range(aircon_count):
+        begin, end = AIRCON_HOUR_LIST[i % len(AIRCON_HOUR_LIST)]
+        begin += rng.normal(0, 0.5)
+
+        in_use = (hour >= begin) & (hour < end) & (temperature >= AIRCON_TEMP_MIN)
+        power[i] = np.where(
+            in_use,
+            np.clip(
+                AIRCON_POWER_BASE
+                + AIRCON_POWER_PER_TEMP * (temperature - AIRCON_TEMP_MIN)
+                + rng.normal(0, 60, gen_metrics_db.MINUTE_PER_DAY),
+                AIRCON_POWER_BASE / 2,
+                AIRCON_POWER_MAX,
+            ),
+            0.0,
+        )
+
+    return power
+
+
+class Simulator:
+    """
+    事象を時刻順に処理するシミュレータ
+
+    事象は (時刻, 通し番号, 種類, 引数) のヒープで管理するので、同じ時刻の事象は追加した順に
+    処理されます。乱数のシードが同じであれば、結果は毎回同じになります。
+    """
+
+    def __init__(self, config, start, days, setting):
+        """開始日時 start から days 日分の事象を処理する (setting はコマンドラインで指定した値)"""
+        import unit_cooler.actuator.zone
+
+        self.config = config
+        self.setting = setting
+        self.start_time = start.timestamp()
+        self.end_time = (start + datetime.timedelta(days=days)).timestamp()
+        self.days = days
+
+        self.event_list = []
+        self.event_seq = itertools.count()
+        self.event_count = collections.Counter()
+
+        self.rng = np.random.default_rng(setting["seed"])
+        self.weather_state = {"temp_offset": 0.0}
+        self.weather_day = None
+        self.weather = None
+
+        self.message_queue = queue.Queue()
+        # NOTE: Duty の切り替えのために予定した control の事象のうち、最新のもの以外は無視する
+        self.control_gen = 0
+
+        self.valve_list = unit_cooler.actuator.zone.get_valve_list()
+        self.open_count = 0
+        self.open_sec = 0.0
+        self.mode_sec = collections.Counter()
+        self.last_time = self.start_time
+
+        self.work_log_id = 0
+        self.work_log_count = collections.Counter()
+
+    def schedule(self, timestamp, kind, *args):
+        heapq.heappush(self.event_list, (timestamp, next(self.event_seq), kind, args))
+
+    def run(self):
+        import unit_cooler.actuator.control
+        import unit_cooler.actuator.worker
+
+        worker = unit_cooler.actuator.worker
+        actuator_config = self.config["actuator"]
+
+        self.liveness_map = {
+            name: pathlib.Path(actuator_config[name]["liveness"]["file"])
+            for name in ["subscribe", "control", "monitor"]
+        }
+        self.control_handle = unit_cooler.actuator.control.gen_handle(self.config, self.message_queue)
+        self.monitor_handle_list = worker.gen_monitor_handle_list(self.config, self.setting["monitor_sec"])
+
+        handler_map = {
+            "controller": self.on_controller,
+            "deliver": self.on_deliver,
+            "control": self.on_control,
+            "monitor": self.on_monitor,
+        }
+
+        self.schedule(self.start_time, "controller")
+        self.schedule(self.start_time, "monitor")
+
+        clock = unit_cooler.clock.get_clock()
+        while self.event_list:
+            timestamp, _, kind, args = heapq.heappop(self.event_list)
+            if timestamp >= self.end_time:
+                break
+
+            clock.move_to(timestamp)
+            self.account(timestamp)
+
+            handler_map[kind](*args)
+
+        clock.move_to(self.end_time)
+        self.account(self.end_time)
+        self.count_work_log()
+
+    def account(self, timestamp):
+        """前回からの経過時間を、電磁弁が開いていた時間と冷却モード毎の時間に加える"""
+        import unit_cooler.actuator.worker
+
+        elapsed_sec = timestamp - self.last_time
+        self.open_sec += elapsed_sec * self.open_count
+        self.mode_sec[unit_cooler.actuator.worker.get_last_control_message()["mode_index"]] += elapsed_sec
+        self.last_time = timestamp
+
+    def update_open_count(self):
+        self.open_count = sum(
+            valve.get_state() == unit_cooler.const.VALVE_STATE.OPEN for valve in self.valve_list
+        )
+
+    def update_weather(self, now):
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if day == self.weather_day:
+            return
+
+        # NOTE: 作動ログはメモリ上に LOG_BUFFER_SIZE 件しか残らないので、1 日毎に数える
+        self.count_work_log()
+
+        column_map = gen_metrics_db.gen_day(self.rng, day, self.weather_state)
+        power = gen_power_day(self.rng, column_map, len(self.config["controller"]["sensor"]["power"]))
+
+        # NOTE: センサーは雨量を 1 分毎に観測するので、コントローラと同じく 1 時間雨量に換算する
+        self.weather = {
+            "temp": column_map["temperature"].tolist(),
+            "humi": column_map["humidity"].tolist(),
+            "lux": column_map["lux"].tolist(),
+            "solar_rad": column_map["solar_radiation"].tolist(),
+            "rain": (column_map["rain_amount"] * 60).tolist(),
+            "power": power.tolist(),
+        }
+        self.weather_day = day
+
+    def gen_sense_data(self, now):
+        """controller.sensor.get_sense_data と同じ形式のセンサーデータを返す"""
+        self.update_weather(now)
+        minute = now.hour * 60 + now.minute
+
+        sense_data = {}
+        for kind, sensor_list in self.config["controller"]["sensor"].items():
+            if kind == "power":
+                sense_data[kind] = [
+                    {"name": sensor["name"], "time": now, "value": self.weather["power"][i][minute]}
+                    for i, sensor in enumerate(sensor_list)
+                ]
+            else:
+                sense_data[kind] = [
+                    {"name": sensor["name"], "time": now, "value": self.weather[kind][minute]}
+                    for sensor in sensor_list
+                ]
+
+        return sense_data
+
+    def on_controller(self):
+        self.event_count["controller"] += 1
+        now = unit_cooler.clock.now()
+
+        control_msg = unit_cooler.controller.engine.gen_control_msg(
+            self.config, sense_data=self.gen_sense_data(now)
+        )
+        # NOTE: センサーの詳細は、メトリクスには使わないので送らない
+        json_str = unit_cooler.controller.engine.encode_control_msg(control_msg, with_sense_data=False)
+
+        timestamp = now.timestamp()
+        self.schedule(timestamp + self.setting["latency_sec"], "deliver", json_str)
+        self.schedule(timestamp + self.config["controller"]["interval_sec"], "controller")
+
+    def on_deliver(self, json_str):
+        import unit_cooler.actuator.worker
+
+        self.event_count["deliver"] += 1
+        unit_cooler.actuator.worker.queue_put(
+            self.message_queue, json.loads(json_str), self.liveness_map["subscribe"]
+        )
+        self.on_control(None)
+
+    def on_control(self, control_gen):
+        """control_gen が None の場合はメッセージの受信による実行"""
+        import unit_cooler.actuator.worker
+
+        if control_gen is not None:
+            if control_gen != self.control_gen:
+                return
+            # NOTE: メッセージの受信による実行は、on_deliver で数える
+            self.event_count["control"] += 1
+        self.control_gen += 1
+
+        current_message = unit_cooler.actuator.worker.control_step(
+            self.config, self.control_handle, self.liveness_map["control"]
+        )
+        self.update_open_count()
+
+        next_time = self.calc_duty_switch_time(current_message)
+        if next_time is not None:
+            self.schedule(next_time, "control", self.control_gen)
+
+    def on_monitor(self):
+        import unit_cooler.actuator.worker
+
+        self.event_count["monitor"] += 1
+        unit_cooler.actuator.worker.monitor_step(
+            self.monitor_handle_list, self.liveness_map["monitor"], True, dummy_mode=True
+        )
+        self.update_open_count()
+
+        self.schedule(unit_cooler.clock.timestamp() + self.setting["monitor_sec"], "monitor")
+
+    def calc_duty_switch_time(self, control_message):
+        """次に電磁弁の Duty の ON/OFF が切り替わる時刻を返す (切り替わらない場合は None)"""
+        import unit_cooler.actuator.scheduler
+        import unit_cooler.actuator.zone
+
+        duty_info = control_message["duty"]
+        if (control_message["state"] != unit_cooler.const.COOLING_STATE.WORKING) or not duty_info["enable"]:
+            return None
+
+        now = unit_cooler.clock.timestamp()
+        zone_list = unit_cooler.actuator.zone.get_zone_list()
+        scheduler = unit_cooler.actuator.scheduler
+
+        if zone_list and (self.config["actuator"]["control"].get("concurrent_max") is not None):
+            # NOTE: スケジューラを使う場合は、各電磁弁の ON 期間の開始と終了が切り替え時刻
+            period = duty_info["on_sec"] + duty_info["off_sec"]
+            remaining_list = []
+            for offset in scheduler.calc_offset_list(len(zone_list), duty_info):
+                phase = (now - scheduler.cycle["start_time"] - offset) % period
+                remaining_list.append(
+                    (duty_info["on_sec"] - phase) if phase < duty_info["on_sec"] else (period - phase)
+                )
+        else:
+            remaining_list = []
+            for valve in self.valve_list:
+                status = valve.get_status()
+                if status["state"] == unit_cooler.const.VALVE_STATE.OPEN:
+                    remaining_list.append(duty_info["on_sec"] - status["duration"])
+                else:
+                    remaining_list.append(duty_info["off_sec"] - status["duration"])
+
+        # NOTE: 実機と同じく、control_worker のループの間隔の倍数の時刻に切り替える
+        interval_sec = self.config["actuator"]["control"]["interval_sec"]
+        return now + max(math.ceil(min(remaining_list) / interval_sec - EPSILON), 1) * interval_sec
+
+    def count_work_log(self):
+        import unit_cooler.actuator.work_log
+
+        entry_list = unit_cooler.actuator.work_log.get_since(self.work_log_id)
+        if not entry_list:
+            return
+
+        if entry_list[0]["id"] > self.work_log_id + 1:
+            logging.warning("Some work logs are dropped before counting")
+
+        for entry in entry_list:
+            self.work_log_count[entry["level"]] += 1
+        self.work_log_id = entry_list[-1]["id"]
+
+    def get_result(self, elapsed_sec):
+        import unit_cooler.actuator.timing
+        import unit_cooler.metrics
+
+        collector = unit_cooler.metrics.get_metrics_collector(self.config["actuator"]["metrics"]["data"])
+        valve_operation = sum(row["valve_operations"] for row in collector.get_hourly_data())
+
+        sim_sec = self.end_time - self.start_time
+        mode_count = len(unit_cooler.controller.message.CONTROL_MESSAGE_LIST)
+        worker_stat_map = unit_cooler.actuator.timing.get_stat()["worker"]
+
+        return {
+            "elapsed_sec": elapsed_sec,
+            "speedup": sim_sec / elapsed_sec,
+            "event_count": dict(sorted(self.event_count.items())),
+            "cpu_ms_per_loop": {
+                worker: worker_stat["cpu_sec"] / worker_stat["loop"]["count"] * 1000
+                for worker, worker_stat in sorted(worker_stat_map.items())
+                if worker_stat["loop"]["count"] != 0
+            },
+            "valve_operation_per_day": valve_operation / self.days,
+            "valve_open_hour_per_day": self.open_sec / 3600 / self.days,
+            "water_liter_per_day": self.open_sec / 60 * gen_metrics_db.FLOW_LPM / self.days,
+            "work_log_per_day": sum(self.work_log_count.values()) / self.days,
+            "error_log_per_day": self.work_log_count[unit_cooler.const.LOG_LEVEL.ERROR.name] / self.days,
+            "error_event_count": len(collector.get_error_data()),
+            "minute_row_count": len(collector.get_minute_data()),
+            "mode_ratio": [self.mode_sec[mode_index] / sim_sec for mode_index in range(mode_count)],
+        }
+
+
+def run(config, start, days, setting, debug_mode=False):
+    import my_lib.webapp.config
+    import my_lib.webapp.log
+
+    import unit_cooler.actuator.timing
+    import unit_cooler.actuator.work_log
+    import unit_cooler.actuator.zone
+    import unit_cooler.metrics
+
+    if not debug_mode:
+        # NOTE: 事象毎のログで処理時間が歪まないようにする
+        logging.getLogger().setLevel(logging.WARNING)
+
+    random.seed(setting["seed"])
+
+    with tempfile.TemporaryDirectory(dir=TEMP_DIR_PATH) as temp_dir:
+        config = gen_config(config, pathlib.Path(temp_dir), setting["zone_count"], setting["concurrent_max"])
+        if setting["metrics_db"] is not None:
+            pathlib.Path(setting["metrics_db"]).unlink(missing_ok=True)
+            config["actuator"]["metrics"]["data"] = setting["metrics_db"]
+
+        prev_clock = unit_cooler.clock.set_clock(unit_cooler.clock.VirtualClock(start))
+        try:
+            my_lib.webapp.config.init(config["actuator"]["web_server"])
+            my_lib.webapp.log.init(config)
+            unit_cooler.actuator.work_log.init(config, queue.Queue())
+            unit_cooler.actuator.zone.init(config)
+            unit_cooler.actuator.timing.clear()
+
+            simulator = Simulator(config, start, days, setting)
+
+            start_time = time.perf_counter()
+            simulator.run()
+            elapsed_sec = time.perf_counter() - start_time
+
+            unit_cooler.actuator.work_log.term()
+
+            return simulator.get_result(elapsed_sec)
+        finally:
+            # NOTE: 仮想時間ではメトリクスをまとめてコミットしているので、残りを書き込む
+            unit_cooler.metrics.get_metrics_collector(config["actuator"]["metrics"]["data"]).flush()
+            unit_cooler.clock.set_clock(prev_clock)
+
+
+def report(result_map, baseline_map):
+    logging.info(
+        "%-24s %8s %8s %9s %9s %10s %8s %8s %8s",
+        "case",
+        "sec",
+        "baseline",
+        "speedup",
+        "valve/d",
+        "water L/d",
+        "open h/d",
+        "log/d",
+        "error/d",
+    )
+    for case, result in result_map.items():
+        baseline = baseline_map.get(case, {})
+        logging.info(
+            "%-24s %8.1f %8s %9.0f %9.1f %10.1f %8.2f %8.1f %8.2f",
+            case,
+            result["elapsed_sec"],
+            f"{baseline['elapsed_sec']:.1f}" if "elapsed_sec" in baseline else "-",
+            result["speedup"],
+            result["valve_operation_per_day"],
+            result["water_liter_per_day"],
+            result["valve_open_hour_per_day"],
+            result["work_log_per_day"],
+            result["error_log_per_day"],
+        )
+        logging.info(
+            "%-24s mode ratio: %s", "", " ".join(f"{ratio * 100:.1f}%" for ratio in result["mode_ratio"])
+        )
+        logging.info("%-24s events: %s", "", result["event_count"])
+
+
+if __name__ == "__main__":
+    import docopt
+    import my_lib.config
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    config_file = args["-c"]
+    start = datetime.datetime.combine(datetime.date.fromisoformat(args["-s"]), datetime.time(), TIMEZONE)
+    days = int(args["-d"])
+    setting = {
+        "zone_count": int(args["-z"]),
+        "concurrent_max": int(args["-k"]) if args["-k"] is not None else None,
+        "latency_sec": float(args["-l"]) / 1000,
+        "monitor_sec": float(args["-M"]),
+        "seed": int(args["-S"]),
+        "metrics_db": args["-m"],
+    }
+    tolerance = float(args["-T"])
+    update = args["-u"]
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("bench", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    config = my_lib.config.load(config_file)
+
+    case = f"{start.date()}/{days}d"
+    if setting["zone_count"] != 0:
+        case += f"/zone{setting['zone_count']}"
+    if setting["concurrent_max"] is not None:
+        case += f"/max{setting['concurrent_max']}"
+
+    logging.info("Simulate %s...", case)
+    result = run(config, start, days, setting, debug_mode)
+
+    logging.getLogger().setLevel(logging.DEBUG if debug_mode else logging.INFO)
+    sys.exit(common.finish("simulate", {case: result}, update, tolerance, COMPARE_MARGIN_MAP, report))
@@ -1,4 +1,4 @@
-import { useState, useMemo, useCallback } from "react";
+import { useState, useMemo, useCallback, useEffect, useRef } from "react";
 import "./App.css";
 
 import "bootstrap/dist/css/bootstrap.min.css";
@@ -64,11 +64,6 @@ function App() {
             },
         ],
     };
-    const emptyLog: ApiResponse.Log = {
-        data: [],
-        last_time: 0,
-    };
-
     const emptySysInfo: ApiResponse.SysInfo = {
         date: "",
         image_build_date: "",
@@ -77,7 +72,20 @@ function App() {
     };
 
     const [updateTime, setUpdateTime] = useState("Unknown");
-    const [isLogFirstLoad, setIsLogFirstLoad] = useState(true);
+
+    // NOTE: 初回は最新のログとその位置を 1 回の応答で取得し、以降は差分 API で新しいログだけを
+    // 取得して先頭に追加する
+    const LOG_DELTA_LIMIT = 100;
+    // NOTE: 表示するログの件数の上限 (アクチュエータがメモリ上に保持する件数と同じ)
+    const LOG_SIZE = 1000;
+    const [log, setLog] = useState<ApiResponse.LogEntry[]>([]);
+    const [logLoading, setLogLoading] = useState(true);
+    const [logError, setLogError] = useState<string | null>(null);
+    const logCursor = useRef<number | null>(null);
+    // NOTE: ID はアクチュエータが起動する度に振り直されるので、どの起動の ID なのかも保持する
+    const logEpoch = useRef<string | null>(null);
+    const logFetching = useRef(false);
+    const logPending = useRef(false);
 
     // API calls using custom hooks
     const {
@@ -87,18 +95,71 @@ function App() {
         refetch: refetchStat
     } = useApi(`${API_ENDPOINT}/stat`, emptyStat, { interval: 58000 });
 
-    const {
-        data: log,
-        loading: logLoading,
-        error: logError,
-        refetch: refetchLog
-    } = useApi(`${API_ENDPOINT}/proxy/json/api/log_view`, emptyLog);
-
     const {
         data: sysInfo,
         error: sysInfoError
     } = useApi(`${API_ENDPOINT}/sysinfo`, emptySysInfo, { interval: 58000 });
 
+    const fetchLogDelta = useCallback(async () => {
+        // NOTE: 取得中にイベントが届いた場合は、取得後にもう一度取得する
+        if (logFetching.current) {
+            logPending.current = true;
+            return;
+        }
+        logFetching.current = true;
+
+        try {
+            do {
+                logPending.current = false;
+
+                let hasMore = true;
+                while (hasMore) {
+                    // NOTE: 位置が分からない場合は since を付けずに、最新のログと位置を同時に取得する
+                    const isInit = logCursor.current === null;
+                    const response = await fetch(
+                        isInit
+                            ? `${API_ENDPOINT}/proxy/json/api/work_log?limit=${LOG_SIZE}`
+                            : `${API_ENDPOINT}/proxy/json/api/work_log?since=${logCursor.current}` +
+                              `&epoch=${logEpoch.current}&limit=${LOG_DELTA_LIMIT}`
+                    );
+                    if (!response.ok) {
+                        throw new Error(`HTTP error! status: ${response.status}`);
+                    }
+                    const delta: ApiResponse.LogDelta = await response.json();
+
+                    if (!isInit && (delta.reset || delta.epoch !== logEpoch.current)) {
+                        // NOTE: アクチュエータの再起動などで差分を取れない場合は、最新のログから取り直す
+                        logCursor.current = null;
+                        continue;
+                    }
+
+                    logCursor.current = delta.last_id;
+                    logEpoch.current = delta.epoch;
+                    hasMore = delta.has_more;
+
+                    if (isInit) {
+                        setLog(delta.data);
+                    } else if (delta.data.length !== 0) {
+                        // NOTE: 際限なく増えないように、古いログは捨てる
+                        setLog(prev => [...delta.data, ...prev].slice(0, LOG_SIZE));
+                    }
+                }
+            } while (logPending.current);
+            setLogError(null);
+        } catch (err) {
+            console.error("Log delta fetch error:", err);
+            setLogError(err instanceof Error ? err.message : "通信に失敗しました");
+            logCursor.current = null;
+        } finally {
+            logFetching.current = false;
+            setLogLoading(false);
+        }
+    }, []);
+
+    useEffect(() => {
+        fetchLogDelta();
+    }, [fetchLogDelta]);
+
     const {
         data: actuatorSysInfo,
         error: actuatorSysInfoError
@@ -108,7 +169,7 @@ function App() {
     useEventSource(`${API_ENDPOINT}/proxy/event/api/event`, {
         onMessage: (e) => {
             if (e.data === "log") {
-                refetchLog();
+                fetchLogDelta();
                 refetchStat();
                 setUpdateTime(dayjs().format("llll"));
                 setLogUpdateTrigger(prev => prev + 1);
@@ -116,11 +177,6 @@ function App() {
         }
     });
 
-    // Update isLogFirstLoad when logLoading changes
-    if (!logLoading && isLogFirstLoad) {
-        setIsLogFirstLoad(false);
-    }
-
     // Update time when stat data changes
     if (!statLoading && stat && updateTime === "Unknown") {
         setUpdateTime(dayjs().format("LLL"));
@@ -139,8 +195,9 @@ function App() {
 
     const handleRetry = useCallback(() => {
         refetchStat();
-        refetchLog();
-    }, [refetchStat, refetchLog]);
+        logCursor.current = null;
+        fetchLogDelta();
+    }, [refetchStat, fetchLogDelta]);
 
     // Format system info data with memoization
     const systemInfoMemo = useMemo(() => ({
@@ -177,7 +234,7 @@ function App() {
                             <CoolingMode isReady={isReady} stat={stat} logUpdateTrigger={logUpdateTrigger} />
                             <AirConditioner isReady={isReady} stat={stat} />
                             <Sensor isReady={isReady} stat={stat} />
-                            <Log isReady={!logLoading || !isLogFirstLoad} log={log} />
+                            <Log isReady={!logLoading} log={log} />
                         </div>
                     </div>
                 </div>
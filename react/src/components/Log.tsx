@@ -13,7 +13,7 @@ import { ApiResponse } from "../lib/ApiResponse";
 
 type Props = {
     isReady: boolean;
-    log: ApiResponse.Log;
+    log: ApiResponse.LogEntry[];
 };
 
 const Log = React.memo(({ isReady, log }: Props) => {
@@ -147,7 +147,7 @@ const Log = React.memo(({ isReady, log }: Props) => {
                     <div className="card-header">
                         <h4 className="my-0 font-weight-normal">作動ログ</h4>
                     </div>
-                    <div className="card-body">{isReady ? logData(log.data) : loading()}</div>
+                    <div className="card-body">{isReady ? logData(log) : loading()}</div>
                 </div>
             </div>
         </div>
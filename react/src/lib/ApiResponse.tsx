@@ -4,9 +4,12 @@ export namespace ApiResponse {
         date: string;
         message: string;
     }
-    export interface Log {
+    export interface LogDelta {
         data: LogEntry[];
-        last_time: number;
+        last_id: number;
+        epoch: string;
+        has_more: boolean;
+        reset: boolean;
     }
 
     export interface CoolerStatus {
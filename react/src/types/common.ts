@@ -9,5 +9,5 @@ export interface StatComponentProps extends BaseComponentProps {
 }
 
 export interface LogComponentProps extends BaseComponentProps {
-    log: ApiResponse.Log;
+    log: ApiResponse.LogEntry[];
 }
@@ -73,16 +73,14 @@ def start(config, arg):
         # なり、電磁弁の故障を誤判定する可能性がある。
         wait_before_start(config)
 
-    import unit_cooler.actuator.monitor
-    import unit_cooler.actuator.valve
     import unit_cooler.actuator.work_log
     import unit_cooler.actuator.worker
+    import unit_cooler.actuator.zone
 
     unit_cooler.actuator.work_log.init(config, event_queue)
 
     logging.info("Initialize valve")
-    unit_cooler.actuator.valve.init(config["actuator"]["control"]["valve"]["pin_no"], config)
-    unit_cooler.actuator.monitor.init(config["actuator"]["control"]["valve"]["pin_no"])
+    unit_cooler.actuator.zone.init(config)
 
     # NOTE: Blueprint のパス指定を YAML で行いたいので、my_lib.webapp の import 順を制御
     import unit_cooler.actuator.web_server
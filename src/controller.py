@@ -24,13 +24,17 @@ import traceback
 
 import my_lib.footprint
 
+import unit_cooler.const
 import unit_cooler.controller.engine
 import unit_cooler.controller.message
+import unit_cooler.exporter
 import unit_cooler.pubsub.publish
 import unit_cooler.util
 
 SCHEMA_CONFIG = "config.schema"
 
+exporter_handle = None
+
 
 def test_client(server_host, server_port):
     logging.info("Start test client (host: %s:%d)", server_host, server_port)
@@ -57,7 +61,20 @@ def gen_control_msg(config, dummy_mode, speedup):
     control_msg = unit_cooler.controller.engine.gen_control_msg(config, dummy_mode, speedup)
     my_lib.footprint.update(pathlib.Path(config["controller"]["liveness"]["file"]))
 
-    return control_msg
+    if config["controller"].get("telemetry", False):
+        # NOTE: センサーの詳細は、テレメトリ用のチャンネルで別に送る
+        return [
+            (
+                unit_cooler.const.PUBSUB_CH,
+                unit_cooler.controller.engine.encode_control_msg(control_msg, dummy_mode, speedup, False),
+            ),
+            (
+                unit_cooler.const.PUBSUB_TELEMETRY_CH,
+                unit_cooler.controller.engine.encode_telemetry_msg(control_msg),
+            ),
+        ]
+
+    return unit_cooler.controller.engine.encode_control_msg(control_msg, dummy_mode, speedup)
 
 
 def control_server_start(config, real_port, dummy_mode, speedup, msg_count):
@@ -76,6 +93,8 @@ def control_server_start(config, real_port, dummy_mode, speedup, msg_count):
 
 
 def start(config, arg):
+    global exporter_handle  # noqa: PLW0603
+
     setting = {
         "server_host": "localhost",
         "server_port": 2222,
@@ -112,6 +131,9 @@ def start(config, arg):
             setting["speedup"],
             setting["msg_count"],
         )
+
+        if "exporter" in config["controller"]:
+            exporter_handle = unit_cooler.exporter.start_server(config["controller"]["exporter"]["port"])
     except Exception:
         logging.exception("Failed to start controller")
         unit_cooler.util.notify_error(config, traceback.format_exc())
@@ -120,11 +142,17 @@ def start(config, arg):
 
 
 def wait_and_term(control_thread, proxy_thread):
+    global exporter_handle  # noqa: PLW0603
+
     if proxy_thread is not None:
         proxy_thread.join()
     if control_thread is not None:
         control_thread.join()
 
+    if exporter_handle is not None:
+        unit_cooler.exporter.term(exporter_handle)
+        exporter_handle = None
+
     logging.warning("Terminate cooler_controller")
 
     return 0
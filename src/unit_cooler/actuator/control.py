@@ -2,10 +2,14 @@
 import logging
 import os
 
-import my_lib.time
-
+import unit_cooler.actuator.scheduler
+import unit_cooler.actuator.timing
 import unit_cooler.actuator.valve
+import unit_cooler.actuator.zone
+import unit_cooler.clock
 import unit_cooler.const
+import unit_cooler.exporter
+import unit_cooler.footprint
 import unit_cooler.util
 from unit_cooler.metrics import get_metrics_collector
 
@@ -16,33 +20,34 @@ def gen_handle(config, message_queue):
     return {
         "config": config,
         "message_queue": message_queue,
-        "receive_time": my_lib.time.now(),
+        "receive_time": unit_cooler.clock.now(),
         "receive_count": 0,
     }
 
 
 def hazard_register(config):
-    my_lib.footprint.update(config["actuator"]["control"]["hazard"]["file"])
+    unit_cooler.footprint.update(config["actuator"]["control"]["hazard"]["file"])
 
 
 def hazard_clear(config):
-    my_lib.footprint.clear(config["actuator"]["control"]["hazard"]["file"])
+    unit_cooler.footprint.clear(config["actuator"]["control"]["hazard"]["file"])
 
 
 def hazard_notify(config, message):
     if (
-        my_lib.footprint.elapsed(config["actuator"]["control"]["hazard"]["file"]) / 60
+        unit_cooler.footprint.elapsed(config["actuator"]["control"]["hazard"]["file"]) / 60
         > HAZARD_NOTIFY_INTERVAL_MIN
     ):
         unit_cooler.actuator.work_log.add(message, unit_cooler.const.LOG_LEVEL.ERROR)
 
         hazard_register(config)
 
-    unit_cooler.actuator.valve.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+    for valve in unit_cooler.actuator.zone.get_valve_list():
+        valve.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
 
 
 def hazard_check(config):
-    if my_lib.footprint.exists(config["actuator"]["control"]["hazard"]["file"]):
+    if unit_cooler.footprint.exists(config["actuator"]["control"]["hazard"]["file"]):
         hazard_notify(config, "過去に水漏れもしくは電磁弁の故障が検出されているので制御を停止しています。")
         return True
     else:
@@ -51,9 +56,9 @@ def hazard_check(config):
 
 def get_control_message_impl(handle, last_message):
     if handle["message_queue"].empty():
-        if (my_lib.time.now() - handle["receive_time"]).total_seconds() > handle["config"]["controller"][
-            "interval_sec"
-        ] * 3:
+        if (unit_cooler.clock.now() - handle["receive_time"]).total_seconds() > handle["config"][
+            "controller"
+        ]["interval_sec"] * 3:
             unit_cooler.actuator.work_log.add(
                 "冷却モードの指示を受信できません。", unit_cooler.const.LOG_LEVEL.ERROR
             )
@@ -66,8 +71,13 @@ def get_control_message_impl(handle, last_message):
 
         logging.info("Receive: %s", control_message)
 
-        handle["receive_time"] = my_lib.time.now()
+        handle["receive_time"] = unit_cooler.clock.now()
         handle["receive_count"] += 1
+        unit_cooler.exporter.inc_counter(
+            f"{unit_cooler.exporter.PREFIX}_message_receive_total",
+            "Number of received control messages",
+            component="actuator",
+        )
         if os.environ.get("TEST", "false") == "true":
             # NOTE: テスト時は、コマンドの数を整合させたいので、
             # 1 回に1個のコマンドのみ処理する。
@@ -93,17 +103,18 @@ def get_control_message(handle, last_message):
         return last_message
 
 
-def execute(config, control_message):
-    if hazard_check(config):
-        control_message = {"mode_index": 0, "state": unit_cooler.const.COOLING_STATE.IDLE}
-
+def collect_metrics(config, control_message):
     # メトリクス収集
+    cooling_mode = control_message.get("mode_index", 0)
+    unit_cooler.exporter.set_gauge(
+        f"{unit_cooler.exporter.PREFIX}_cooling_mode", cooling_mode, "Cooling mode", component="actuator"
+    )
+
     try:
         metrics_db_path = config["actuator"]["metrics"]["data"]
         metrics_collector = get_metrics_collector(metrics_db_path)
 
         # 冷却モードの記録
-        cooling_mode = control_message.get("mode_index", 0)
         metrics_collector.update_cooling_mode(cooling_mode)
 
         # Duty比の記録（control_messageに含まれている場合）
@@ -117,4 +128,31 @@ def execute(config, control_message):
     except Exception:
         logging.exception("Failed to collect metrics data")
 
-    unit_cooler.actuator.valve.set_cooling_state(control_message)
+
+def execute(config, control_message):
+    if hazard_check(config):
+        control_message = {"mode_index": 0, "state": unit_cooler.const.COOLING_STATE.IDLE}
+
+    with unit_cooler.actuator.timing.measure_stage("metrics"):
+        collect_metrics(config, control_message)
+
+    concurrent_max = config["actuator"]["control"].get("concurrent_max")
+    zone_list = unit_cooler.actuator.zone.get_zone_list()
+    if (
+        (concurrent_max is not None)
+        and zone_list
+        and (control_message["state"] == unit_cooler.const.COOLING_STATE.WORKING)
+    ):
+        # NOTE: 同時に開く電磁弁の数を抑えるため、各ゾーンの Duty 周期の位相をずらす
+        state_list = unit_cooler.actuator.scheduler.get_state_list(
+            len(zone_list), control_message["duty"], concurrent_max
+        )
+        for zone, valve_state in zip(zone_list, state_list, strict=True):
+            zone.valve.set_cooling_scheduled(valve_state)
+        return
+
+    unit_cooler.actuator.scheduler.reset()
+
+    # NOTE: 各ゾーンの電磁弁は、それぞれの状態に応じて Duty 制御する
+    for valve in unit_cooler.actuator.zone.get_valve_list():
+        valve.set_cooling_state(control_message)
@@ -5,36 +5,120 @@ import os
 import socket
 
 import fluent.sender
-import my_lib.footprint
 import my_lib.pretty
 
 import unit_cooler.actuator.sensor
+import unit_cooler.actuator.timing
 import unit_cooler.actuator.valve
 import unit_cooler.actuator.work_log
+import unit_cooler.actuator.zone
+import unit_cooler.clock
 import unit_cooler.const
+import unit_cooler.exporter
+import unit_cooler.footprint
+
+# 同じ状態が続いている間、作動ログを再度出力するまでの間隔
+LOG_REPEAT_INTERVAL_SEC = 600
+# 電磁弁が開いている間にだけ判定する状態
+VALVE_OPEN_CONDITION_LIST = ["flow_source_closed"]
 
 
 def init(pin_no):
     unit_cooler.actuator.sensor.init(pin_no)
 
 
-def gen_handle(config, interval_sec):
+def gen_handle(config, interval_sec, zone=None):
     return {
         "config": config,
+        "zone": zone,  # 監視するゾーン (ゾーンを使わない場合は None)
         "hostname": os.environ.get("NODE_HOSTNAME", socket.gethostname()),
         "sender": fluent.sender.FluentSender("sensor", host=config["actuator"]["monitor"]["fluent"]["host"]),
         "log_period": max(math.ceil(60 / interval_sec), 1),  # この回数毎にログを出力する
         "flow_unknown": 0,  # 流量不明が続いた回数
         "monitor_count": 0,  # 観測した回数
+        "condition_log": {},  # 継続中の状態毎の作動ログの出力状況
+        "condition_active": set(),  # 今回の観測で検出した状態
+        "condition_checked": set(),  # 今回の観測で判定した VALVE_OPEN_CONDITION_LIST の状態
+        "condition_count": {},  # 状態毎の累計検出回数
     }
 
 
+def get_valve(zone):
+    # NOTE: ゾーンを使わない場合は、Valve と同じ名前の関数を持つモジュールを使う
+    return unit_cooler.actuator.valve if zone is None else zone.valve
+
+
+def get_flow_sensor(zone):
+    # NOTE: ゾーンを使わない場合は、FlowSensor と同じ名前の関数を持つモジュールを使う
+    return unit_cooler.actuator.sensor if zone is None else zone.flow_sensor
+
+
+def gen_zone_message(zone, message):
+    return message if zone is None else f"[{zone.name}] {message}"
+
+
+def log_condition(handle, key, message, level=unit_cooler.const.LOG_LEVEL.INFO):
+    """
+    状態に応じた作動ログを出力
+
+    同じ状態が続いている間は最初の 1 回だけ出力し、以降は LOG_REPEAT_INTERVAL_SEC 毎に
+    繰り返し回数を付けて出力します。状態が解消されると次回はすぐに出力します。
+    """
+    message = gen_zone_message(handle["zone"], message)
+
+    handle["condition_active"].add(key)
+    handle["condition_count"][key] = handle["condition_count"].get(key, 0) + 1
+
+    now = unit_cooler.clock.timestamp()
+    condition = handle["condition_log"].get(key)
+    if condition is None:
+        handle["condition_log"][key] = {"last_time": now, "repeat": 0}
+        unit_cooler.actuator.work_log.add(message, level)
+        return
+
+    condition["repeat"] += 1
+    if now - condition["last_time"] < LOG_REPEAT_INTERVAL_SEC:
+        logging.debug("Suppress repeated log: %s", message)
+        return
+
+    unit_cooler.actuator.work_log.add(
+        "{message} (この状態が続いています。{repeat}回繰り返し)".format(
+            message=message, repeat=condition["repeat"]
+        ),
+        level,
+    )
+    condition["last_time"] = now
+    condition["repeat"] = 0
+
+
+def clear_inactive_condition(handle):
+    """
+    今回の観測で検出されなかった状態の作動ログの出力状況をクリア
+
+    VALVE_OPEN_CONDITION_LIST の状態は、電磁弁が開いていて今回の観測で判定できた場合にだけ
+    クリアします。Duty 制御で閉じている間に解消したとみなすと、開く度に同じ作動ログが出力されるためです。
+    """
+    for key in [
+        key
+        for key in handle["condition_log"]
+        if (key not in handle["condition_active"])
+        and ((key not in VALVE_OPEN_CONDITION_LIST) or (key in handle["condition_checked"]))
+    ]:
+        del handle["condition_log"][key]
+
+    handle["condition_active"] = set()
+    handle["condition_checked"] = set()
+
+
 def send_mist_condition(handle, mist_condition, control_message, dummy_mode=False):
     send_data = {"hostname": handle["hostname"], "state": mist_condition["valve"]["state"].value}
 
     if mist_condition["flow"] is not None:
         send_data["flow"] = mist_condition["flow"]
 
+    if handle["zone"] is not None:
+        send_data["zone"] = handle["zone"].name
+
     if control_message is not None:
         send_data["cooling_mode"] = control_message["mode_index"]
 
@@ -43,26 +127,36 @@ def send_mist_condition(handle, mist_condition, control_message, dummy_mode=Fals
     if dummy_mode:
         return
 
-    if handle["sender"].emit("rasp", send_data):
+    with unit_cooler.actuator.timing.measure_stage("fluent"):
+        is_success = handle["sender"].emit("rasp", send_data)
+
+    if is_success:
         logging.debug("Send OK")
     else:
         logging.error(handle["sender"].last_error)
 
 
-def get_mist_condition():
-    valve_status = unit_cooler.actuator.valve.get_status()
+def get_mist_condition(zone=None):
+    valve = get_valve(zone)
+    flow_sensor = get_flow_sensor(zone)
+    last_flow = get_mist_condition.last_flow if zone is None else zone.last_flow
+
+    valve_status = valve.get_status()
 
     if valve_status["state"] == unit_cooler.const.VALVE_STATE.OPEN:
-        flow = unit_cooler.actuator.sensor.get_flow()
+        flow = flow_sensor.get_flow()
         # NOTE: get_flow() の内部で流量センサーの電源を入れている場合は計測に時間がかかるので、
         # その間に電磁弁の状態が変化している可能性があるので、再度状態を取得する。
-        valve_status = unit_cooler.actuator.valve.get_status()
+        valve_status = valve.get_status()
     else:
         # NOTE: 電磁弁が閉じている場合、流量が 0 になるまでは計測を継続する。
         # (電磁弁の電源を切るため、流量が 0 になった場合は、電磁弁が開かれるまで計測は再開しない)
-        flow = unit_cooler.actuator.sensor.get_flow() if get_mist_condition.last_flow != 0 else 0
+        flow = flow_sensor.get_flow() if last_flow != 0 else 0
 
-    get_mist_condition.last_flow = flow
+    if zone is None:
+        get_mist_condition.last_flow = flow
+    else:
+        zone.last_flow = flow
 
     return {"valve": valve_status, "flow": flow}
 
@@ -70,14 +164,42 @@ def get_mist_condition():
 get_mist_condition.last_flow = 0
 
 
-def hazard_notify(config, message):
+def collect_exporter_metrics():
+    """電磁弁の状態と最後に測定した流量を記録 (スクレイプ時に呼ばれる)"""
+    prefix = unit_cooler.exporter.PREFIX
+
+    for zone in unit_cooler.actuator.zone.get_zone_list() or [None]:
+        label_map = {} if zone is None else {"zone": zone.name}
+        valve_status = get_valve(zone).get_status()
+        last_flow = get_mist_condition.last_flow if zone is None else zone.last_flow
+
+        unit_cooler.exporter.set_gauge(
+            f"{prefix}_valve_open",
+            int(valve_status["state"] == unit_cooler.const.VALVE_STATE.OPEN),
+            "Whether the valve is open",
+            **label_map,
+        )
+        unit_cooler.exporter.set_gauge(
+            f"{prefix}_valve_state_duration_seconds",
+            valve_status["duration"],
+            "Elapsed time since the valve entered the current state",
+            **label_map,
+        )
+        if last_flow is not None:
+            unit_cooler.exporter.set_gauge(
+                f"{prefix}_flow_liters_per_minute", last_flow, "Last measured flow", **label_map
+            )
+
+
+def hazard_notify(config, message, zone=None):
     hazard_file = config["actuator"]["control"]["hazard"]["file"]
-    logging.error(my_lib.footprint.exists(hazard_file))
-    if not my_lib.footprint.exists(hazard_file):
-        unit_cooler.actuator.work_log.add(message, unit_cooler.const.LOG_LEVEL.ERROR)
-        my_lib.footprint.update(hazard_file)
+    logging.error(unit_cooler.footprint.exists(hazard_file))
+    if not unit_cooler.footprint.exists(hazard_file):
+        unit_cooler.actuator.work_log.add(gen_zone_message(zone, message), unit_cooler.const.LOG_LEVEL.ERROR)
+        unit_cooler.footprint.update(hazard_file)
 
-    unit_cooler.actuator.valve.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+    # NOTE: 他のゾーンは、制御ワーカがハザードを検出して閉じる
+    get_valve(zone).set_state(unit_cooler.const.VALVE_STATE.CLOSE)
 
 
 def check_sensing(handle, mist_condition):
@@ -87,12 +209,15 @@ def check_sensing(handle, mist_condition):
         handle["flow_unknown"] = 0
 
     if handle["flow_unknown"] > handle["config"]["actuator"]["monitor"]["sense"]["giveup"]:
-        unit_cooler.actuator.work_log.add("流量計が使えません。", unit_cooler.const.LOG_LEVEL.ERROR)
+        log_condition(handle, "flow_giveup", "流量計が使えません。", unit_cooler.const.LOG_LEVEL.ERROR)
     elif handle["flow_unknown"] > (handle["config"]["actuator"]["monitor"]["sense"]["giveup"] / 2):
-        unit_cooler.actuator.work_log.add(
-            "流量計が応答しないので一旦、リセットします。", unit_cooler.const.LOG_LEVEL.WARN
+        log_condition(
+            handle,
+            "flow_reset",
+            "流量計が応答しないので一旦、リセットします。",
+            unit_cooler.const.LOG_LEVEL.WARN,
         )
-        unit_cooler.actuator.sensor.stop()
+        get_flow_sensor(handle["zone"]).stop()
 
 
 def check_mist_condition(handle, mist_condition):
@@ -114,19 +239,23 @@ def check_mist_condition(handle, mist_condition):
                         flow=mist_condition["flow"],
                         threshold=handle["config"]["actuator"]["monitor"]["flow"]["on"]["max"][i],
                     ),
+                    handle["zone"],
                 )
 
-        if (mist_condition["flow"] < handle["config"]["actuator"]["monitor"]["flow"]["on"]["min"]) and (
-            mist_condition["valve"]["duration"] > 5
-        ):
-            # NOTE: ハザード扱いにはしない
-            unit_cooler.actuator.work_log.add(
-                (
-                    "元栓が閉じています。"
-                    "(バルブを開いてから{duration:.1f}秒経過しても流量が {flow:.1f} L/min)"
-                ).format(duration=mist_condition["valve"]["duration"], flow=mist_condition["flow"]),
-                unit_cooler.const.LOG_LEVEL.ERROR,
-            )
+        if mist_condition["valve"]["duration"] > 5:
+            handle["condition_checked"].add("flow_source_closed")
+
+            if mist_condition["flow"] < handle["config"]["actuator"]["monitor"]["flow"]["on"]["min"]:
+                # NOTE: ハザード扱いにはしない
+                log_condition(
+                    handle,
+                    "flow_source_closed",
+                    (
+                        "元栓が閉じています。"
+                        "(バルブを開いてから{duration:.1f}秒経過しても流量が {flow:.1f} L/min)"
+                    ).format(duration=mist_condition["valve"]["duration"], flow=mist_condition["flow"]),
+                    unit_cooler.const.LOG_LEVEL.ERROR,
+                )
     else:
         logging.debug("Valve is close for %.1f sec", mist_condition["valve"]["duration"])
         if (
@@ -134,11 +263,14 @@ def check_mist_condition(handle, mist_condition):
             >= handle["config"]["actuator"]["monitor"]["flow"]["power_off_sec"]
         ) and (mist_condition["flow"] == 0):
             # バルブが閉じてから長い時間が経っていて流量も 0 の場合、センサーを停止する
-            if unit_cooler.actuator.sensor.get_power_state():
+            flow_sensor = get_flow_sensor(handle["zone"])
+            if flow_sensor.get_power_state():
                 unit_cooler.actuator.work_log.add(
-                    "長い間バルブが閉じられていますので、流量計の電源を OFF します。"
+                    gen_zone_message(
+                        handle["zone"], "長い間バルブが閉じられていますので、流量計の電源を OFF します。"
+                    )
                 )
-                unit_cooler.actuator.sensor.stop()
+                flow_sensor.stop()
         elif (mist_condition["valve"]["duration"] > 120) and (
             mist_condition["flow"] > handle["config"]["actuator"]["monitor"]["flow"]["off"]["max"]
         ):
@@ -148,6 +280,7 @@ def check_mist_condition(handle, mist_condition):
                 + "(バルブを閉じてから{duration:.1f}秒経過しても流量が {flow:.1f} L/min)".format(
                     duration=mist_condition["valve"]["duration"], flow=mist_condition["flow"]
                 ),
+                handle["zone"],
             )
 
 
@@ -156,7 +289,8 @@ def check(handle, mist_condition, need_logging):
 
     if need_logging:
         logging.info(
-            "Valve Condition: %s (flow = %s L/min)",
+            "Valve Condition%s: %s (flow = %s L/min)",
+            "" if handle["zone"] is None else f" [{handle['zone'].name}]",
             mist_condition["valve"]["state"].name,
             "?" if mist_condition["flow"] is None else "{flow:.2f}".format(flow=mist_condition["flow"]),
         )
@@ -166,4 +300,6 @@ def check(handle, mist_condition, need_logging):
     if mist_condition["flow"] is not None:
         check_mist_condition(handle, mist_condition)
 
+    clear_inactive_condition(handle)
+
     return True
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+複数の電磁弁 (ゾーン) の Duty 周期の位相をずらし、同時に開く電磁弁の数を抑えます。
+
+各電磁弁の ON 期間の開始時刻を Duty 周期 (on_sec + off_sec) の中で均等にずらすので、
+それぞれの ON/OFF の比率は指定通りのまま、同時に開く数は ceil(台数 × ON 比率) 以下になります。
+それでも上限 (concurrent_max) を超える場合は、先に開いたものを優先し、残りは閉じたままにします。
+(この場合、ON 比率は指定より小さくなります)
+
+Usage:
+  scheduler.py [-c CONFIG] [-n ZONES] [-k MAX] [-f FLOW] [-D]
+
+Options:
+  -c CONFIG         : CONFIG を設定ファイルとして読み込んで実行します。[default: config.yaml]
+  -n ZONES          : 電磁弁の数。(省略時は設定ファイルのゾーンの数)
+  -k MAX            : 同時に開く電磁弁の数の上限。(省略時は設定ファイルの値)
+  -f FLOW           : 電磁弁 1 つを開いた時の流量 [L/min]。[default: 2.0]
+  -D                : デバッグモードで動作します。
+"""
+
+import logging
+import math
+
+import unit_cooler.clock
+import unit_cooler.const
+
+# 現在の Duty 周期の開始時刻と、その時の Duty の設定
+cycle = {"start_time": None, "duty": None}
+
+
+def reset():
+    cycle.update(start_time=None, duty=None)
+
+
+def calc_offset_list(count, duty_info):
+    """各電磁弁の ON 期間の開始を、Duty 周期の中で均等にずらす"""
+    if not duty_info["enable"]:
+        return [0] * count
+
+    period = duty_info["on_sec"] + duty_info["off_sec"]
+
+    return [period * i / count for i in range(count)]
+
+
+def calc_peak_count(count, duty_info):
+    """位相をずらした場合に、同時に開く電磁弁の数の最大値"""
+    if not duty_info["enable"]:
+        return count
+
+    period = duty_info["on_sec"] + duty_info["off_sec"]
+
+    return min(math.ceil(count * duty_info["on_sec"] / period - 1e-9), count)
+
+
+def schedule(elapsed_sec, duty_info, offset_list, concurrent_max=None):
+    """
+    周期の開始から elapsed_sec 経過した時点での、各電磁弁の状態を返す
+
+    concurrent_max を指定すると、開く数がこれを超えないようにします。
+    """
+    if duty_info["enable"]:
+        period = duty_info["on_sec"] + duty_info["off_sec"]
+        position_list = [(elapsed_sec - offset) % period for offset in offset_list]
+        is_open_list = [position < duty_info["on_sec"] for position in position_list]
+    else:
+        position_list = [0] * len(offset_list)
+        is_open_list = [True] * len(offset_list)
+
+    if (concurrent_max is not None) and (sum(is_open_list) > concurrent_max):
+        # NOTE: 上限を超える場合は、ON 期間に入ってからの時間が長いものを優先する
+        open_index_list = sorted(
+            (i for i, is_open in enumerate(is_open_list) if is_open), key=lambda i: -position_list[i]
+        )
+        allowed = set(open_index_list[:concurrent_max])
+        is_open_list = [i in allowed for i in range(len(is_open_list))]
+
+    return [
+        unit_cooler.const.VALVE_STATE.OPEN if is_open else unit_cooler.const.VALVE_STATE.CLOSE
+        for is_open in is_open_list
+    ]
+
+
+def get_state_list(count, duty_info, concurrent_max=None, now=None):
+    """
+    現在の各電磁弁の状態を返す
+
+    Duty の設定が変わった場合は、その時点を新しい周期の開始とします。
+    """
+    if now is None:
+        now = unit_cooler.clock.timestamp()
+
+    if (cycle["start_time"] is None) or (cycle["duty"] != duty_info):
+        cycle.update(start_time=now, duty=dict(duty_info))
+
+        if (concurrent_max is not None) and (calc_peak_count(count, duty_info) > concurrent_max):
+            logging.warning(
+                "同時に開く電磁弁の上限 (%d) では、指定された ON 比率を満たせません。"
+                "(on: %s sec, off: %s sec)",
+                concurrent_max,
+                duty_info["on_sec"],
+                duty_info["off_sec"],
+            )
+
+    return schedule(now - cycle["start_time"], duty_info, calc_offset_list(count, duty_info), concurrent_max)
+
+
+def simulate(count, duty_info, concurrent_max=None, flow=1.0, staggered=True, step_sec=1):  # noqa: PLR0913
+    """
+    Duty 周期 1 回分の動作を模擬し、同時に開く電磁弁の数と流量の最大値を求める
+
+    staggered が False の場合は、位相をずらさずに全ての電磁弁を同時に動かします。
+    """
+    period = duty_info["on_sec"] + duty_info["off_sec"] if duty_info["enable"] else step_sec
+    offset_list = calc_offset_list(count, duty_info) if staggered else [0] * count
+
+    step_count = max(math.ceil(period / step_sec), 1)
+    open_count_list = []
+    on_step_list = [0] * count
+    for step in range(step_count):
+        state_list = schedule(step * step_sec, duty_info, offset_list, concurrent_max)
+        is_open_list = [state == unit_cooler.const.VALVE_STATE.OPEN for state in state_list]
+
+        open_count_list.append(sum(is_open_list))
+        for i, is_open in enumerate(is_open_list):
+            on_step_list[i] += is_open
+
+    peak_open = max(open_count_list)
+
+    return {
+        "peak_open": peak_open,
+        "peak_flow": peak_open * flow,
+        "mean_flow": sum(open_count_list) * flow / step_count,
+        "on_ratio_list": [on_step / step_count for on_step in on_step_list],
+    }
+
+
+if __name__ == "__main__":
+    # TEST Code
+    import docopt
+    import my_lib.config
+    import my_lib.logger
+
+    import unit_cooler.controller.message
+
+    args = docopt.docopt(__doc__)
+
+    config_file = args["-c"]
+    flow = float(args["-f"])
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("test", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    config = my_lib.config.load(config_file)
+    count = int(args["-n"]) if args["-n"] else max(len(config["actuator"]["control"].get("zones", [])), 1)
+    concurrent_max = int(args["-k"]) if args["-k"] else config["actuator"]["control"].get("concurrent_max")
+
+    logging.info("zones: %d, concurrent_max: %s, flow: %.1f L/min", count, concurrent_max, flow)
+
+    for mode_index, control_msg in enumerate(unit_cooler.controller.message.CONTROL_MESSAGE_LIST):
+        if control_msg["state"] != unit_cooler.const.COOLING_STATE.WORKING:
+            continue
+
+        duty_info = control_msg["duty"]
+        naive = simulate(count, duty_info, None, flow, False)
+        staggered = simulate(count, duty_info, concurrent_max, flow)
+
+        logging.info(
+            "mode %d: peak flow %.1f → %.1f L/min (open: %d → %d), on ratio: %.1f%% → %s",
+            mode_index,
+            naive["peak_flow"],
+            staggered["peak_flow"],
+            naive["peak_open"],
+            staggered["peak_open"],
+            naive["on_ratio_list"][0] * 100,
+            ", ".join(f"{on_ratio * 100:.1f}%" for on_ratio in staggered["on_ratio_list"]),
+        )
@@ -5,103 +5,130 @@ import random
 
 import my_lib.rpi
 
+import unit_cooler.actuator.timing
 import unit_cooler.const
 
 fd_q10c = None
 pin_no = None
+default_flow_sensor = None
 
 if os.environ.get("DUMMY_MODE", "false") != "true":  # pragma: no cover
     from my_lib.sensor.fd_q10c import FD_Q10C
 else:
 
     class FD_Q10C:  # noqa: N801
-        # ワーカーごとの電源状態を管理する辞書（初期値はTrue）
+        # ワーカーと電磁弁ごとの電源状態を管理する辞書（初期値はTrue）
         _power_states = {}
 
         def __init__(self, lock_file="DUMMY", timeout=2):  # noqa: D107, ARG002
-            worker_id = self._get_worker_id()
-            self._power_states[worker_id] = True
+            # NOTE: 流量を返す際に参照する電磁弁の端子番号 (FlowSensor が設定する)
+            self.valve_pin_no = pin_no
+            self._power_states[self._get_key()] = True
 
-        def _get_worker_id(self):
-            """現在のワーカーIDを取得"""
-            return os.environ.get("PYTEST_XDIST_WORKER", "main")
+        def _get_key(self):
+            """現在のワーカーIDと電磁弁の端子番号を取得"""
+            return (os.environ.get("PYTEST_XDIST_WORKER", "main"), self.valve_pin_no)
 
         def get_value(self, force_power_on=True):
-            global pin_no
-            worker_id = self._get_worker_id()
-
             # force_power_on=Trueで呼ばれた場合、電源状態をTrueに設定
             if force_power_on:
-                self._power_states[worker_id] = True
+                self._power_states[self._get_key()] = True
 
-            if my_lib.rpi.gpio.input(pin_no) == unit_cooler.const.VALVE_STATE.OPEN.value:
+            if my_lib.rpi.gpio.input(self.valve_pin_no) == unit_cooler.const.VALVE_STATE.OPEN.value:
                 return 1 + random.random() * 1.5  # noqa: S311
             else:
                 return 0
 
         def get_state(self):
-            worker_id = self._get_worker_id()
-
-            return self._power_states[worker_id]
+            return self._power_states.get(self._get_key(), True)
 
         def stop(self):
-            worker_id = self._get_worker_id()
             # stopが呼ばれたら電源状態をFalseに設定
-            self._power_states[worker_id] = False
+            self._power_states[self._get_key()] = False
 
 
-def init(pin_no_):
-    global fd_q10c  # noqa: PLW0603
-    global pin_no  # noqa: PLW0603
-
-    pin_no = pin_no_
-    fd_q10c = FD_Q10C()
+class FlowSensor:
+    """
+    電磁弁 1 つ分の流量計
 
+    実機の流量計 (FD-Q10C) は lock_file で区別するので、ゾーン毎に指定しないと同じ流量計を
+    読むことになります。ダミーの流量計のみ、電磁弁の端子毎に流量を返します。
+    """
 
-def stop():
-    global fd_q10c
+    def __init__(self, valve_pin_no, name=None, lock_file=None):
+        """lock_file を省略した場合は、FD_Q10C の既定の流量計を使う"""
+        self.name = name
+        self.fd_q10c = FD_Q10C() if lock_file is None else FD_Q10C(lock_file=lock_file)
+        if hasattr(self.fd_q10c, "valve_pin_no"):
+            # NOTE: ダミーの流量計は、対応する電磁弁の状態に応じた流量を返す
+            self.fd_q10c.valve_pin_no = valve_pin_no
 
-    logging.info("Stop flow sensing")
+    def get_label(self):
+        return "" if self.name is None else f" [{self.name}]"
 
-    try:
-        fd_q10c.stop()
-    except RuntimeError:
-        logging.exception("Failed to stop FD-Q10C")
+    def stop(self):
+        logging.info("Stop flow sensing%s", self.get_label())
 
+        try:
+            self.fd_q10c.stop()
+        except RuntimeError:
+            logging.exception("Failed to stop FD-Q10C")
 
-def get_power_state():
-    global fd_q10c
-
-    return fd_q10c.get_state()
-
+    def get_power_state(self):
+        return self.fd_q10c.get_state()
 
-def get_flow(force_power_on=True):
-    global fd_q10c
-
-    try:
-        flow = fd_q10c.get_value(force_power_on)
-    except Exception:
-        logging.exception("バグの可能性あり。")
-        flow = None
-        # エラーメトリクス記録
+    def get_flow(self, force_power_on=True):
+        try:
+            with unit_cooler.actuator.timing.measure_stage("sensor"):
+                flow = self.fd_q10c.get_value(force_power_on)
+        except Exception:
+            logging.exception("バグの可能性あり。")
+            flow = None
+            # エラーメトリクス記録
+            try:
+                from unit_cooler.actuator.webapi.metrics import record_error
+
+                record_error("sensor_read_error", "Flow sensor read failed")
+            except ImportError:
+                pass
+
+        if flow is not None:
+            logging.info("Valve%s flow = %.2f", self.get_label(), flow)
+        else:
+            logging.info("Valve%s flow = UNKNOWN", self.get_label())
+
+        # センサー読み取りメトリクス記録
         try:
-            from unit_cooler.actuator.webapi.metrics import record_error
+            from unit_cooler.actuator.webapi.metrics import record_sensor_read
 
-            record_error("sensor_read_error", "Flow sensor read failed")
+            record_sensor_read("flow_sensor", flow)
         except ImportError:
             pass
 
-    if flow is not None:
-        logging.info("Valve flow = %.2f", flow)
-    else:
-        logging.info("Valve flow = UNKNOWN")
+        return flow
+
 
-    # センサー読み取りメトリクス記録
-    try:
-        from unit_cooler.actuator.webapi.metrics import record_sensor_read
+############################################################
+# NOTE: 以下は、ゾーンを使わない場合の 1 つの流量計を操作する関数
 
-        record_sensor_read("flow_sensor", flow)
-    except ImportError:
-        pass
 
-    return flow
+def init(pin_no_):
+    global fd_q10c  # noqa: PLW0603
+    global pin_no  # noqa: PLW0603
+    global default_flow_sensor  # noqa: PLW0603
+
+    pin_no = pin_no_
+    default_flow_sensor = FlowSensor(pin_no_)
+    fd_q10c = default_flow_sensor.fd_q10c
+
+
+def stop():
+    default_flow_sensor.stop()
+
+
+def get_power_state():
+    return default_flow_sensor.get_power_state()
+
+
+def get_flow(force_power_on=True):
+    return default_flow_sensor.get_flow(force_power_on)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+アクチュエータの各ワーカのループの処理時間を計測します。
+
+ワーカ毎に次の値を記録し、JSON と Prometheus のテキスト形式で返します。
+
+- ループ 1 回あたりの経過時間 (ヒストグラム)
+- 次のループの予定時刻からの起床の遅れ (ジッタ, ヒストグラム)
+- ループ 1 回あたりのスレッドの CPU 時間 (time.thread_time)
+- 処理の段階 (gpio, footprint, metrics, work_log, fluent など) 毎の経過時間 (ヒストグラム)
+
+段階の計測は、measure_loop や set_worker で設定した、呼び出し元のスレッドのワーカに記録します。
+ワーカ以外のスレッド (Web サーバーなど) から呼ばれた場合は "other" に記録します。
+"""
+
+import bisect
+import contextlib
+import copy
+import threading
+import time
+
+# ヒストグラムのバケットの上限 [秒]
+BUCKET_LIST = [0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
+STAGE_LIST = ["gpio", "footprint", "metrics", "work_log", "fluent", "sensor"]
+WORKER_OTHER = "other"
+
+_lock = threading.Lock()
+_local = threading.local()
+_stat = {}
+
+
+def gen_histogram():
+    # NOTE: bucket の最後は BUCKET_LIST の上限を超えたもの
+    return {"bucket": [0] * (len(BUCKET_LIST) + 1), "count": 0, "sum": 0.0, "max": 0.0}
+
+
+def gen_worker_stat():
+    return {
+        "loop": gen_histogram(),
+        "jitter": gen_histogram(),
+        "cpu_sec": 0.0,
+        "stage": {},
+    }
+
+
+def observe(hist, value):
+    hist["bucket"][bisect.bisect_left(BUCKET_LIST, value)] += 1
+    hist["count"] += 1
+    hist["sum"] += value
+    hist["max"] = max(hist["max"], value)
+
+
+def _get_worker_stat(worker):
+    # NOTE: _lock を取得した状態で呼ぶこと
+    if worker not in _stat:
+        _stat[worker] = gen_worker_stat()
+    return _stat[worker]
+
+
+def set_worker(worker):
+    """呼び出し元のスレッドで記録するワーカの名前を設定"""
+    _local.worker = worker
+
+
+def get_worker():
+    return getattr(_local, "worker", WORKER_OTHER)
+
+
+@contextlib.contextmanager
+def measure_loop(worker):
+    """ループ 1 回分の経過時間と CPU 時間を計測"""
+    set_worker(worker)
+
+    start_time = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        wall_sec = time.perf_counter() - start_time
+        cpu_sec = time.thread_time() - start_cpu
+
+        with _lock:
+            stat = _get_worker_stat(worker)
+            observe(stat["loop"], wall_sec)
+            stat["cpu_sec"] += cpu_sec
+
+
+@contextlib.contextmanager
+def measure_stage(stage):
+    """処理の段階の経過時間を計測"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_sec = time.perf_counter() - start_time
+
+        with _lock:
+            stage_map = _get_worker_stat(get_worker())["stage"]
+            if stage not in stage_map:
+                stage_map[stage] = gen_histogram()
+            observe(stage_map[stage], elapsed_sec)
+
+
+def record_jitter(worker, delay_sec):
+    """予定時刻からの起床の遅れを記録 (早く起きた場合は 0 とみなす)"""
+    with _lock:
+        observe(_get_worker_stat(worker)["jitter"], max(delay_sec, 0.0))
+
+
+def clear():
+    with _lock:
+        _stat.clear()
+
+
+def get_stat():
+    """記録した値を JSON で返せる形式で返す"""
+    with _lock:
+        stat = copy.deepcopy(_stat)
+
+    for worker_stat in stat.values():
+        loop_sum = worker_stat["loop"]["sum"]
+        worker_stat["cpu_ratio"] = worker_stat["cpu_sec"] / loop_sum if loop_sum > 0 else None
+
+    return {"bucket": BUCKET_LIST, "worker": stat}
+
+
+def _format_label(label_map):
+    return ",".join(f'{key}="{value}"' for key, value in label_map.items())
+
+
+def _format_histogram(name, label_map, hist):
+    line_list = []
+    cumulative = 0
+    for le, count in zip([*BUCKET_LIST, "+Inf"], hist["bucket"], strict=True):
+        cumulative += count
+        line_list.append(f"{name}_bucket{{{_format_label({**label_map, 'le': le})}}} {cumulative}")
+    line_list.append(f"{name}_sum{{{_format_label(label_map)}}} {hist['sum']}")
+    line_list.append(f"{name}_count{{{_format_label(label_map)}}} {hist['count']}")
+
+    return line_list
+
+
+def format_prometheus(prefix="unit_cooler_actuator"):
+    """記録した値を Prometheus のテキスト形式で返す"""
+    stat = get_stat()["worker"]
+
+    line_list = []
+    for metric, help_text in [
+        ("loop", "Elapsed time of one worker loop"),
+        ("jitter", "Delay of worker wakeup from scheduled time"),
+    ]:
+        name = f"{prefix}_worker_{metric}_seconds"
+        line_list += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for worker, worker_stat in sorted(stat.items()):
+            line_list += _format_histogram(name, {"worker": worker}, worker_stat[metric])
+
+    name = f"{prefix}_worker_cpu_seconds_total"
+    line_list += [f"# HELP {name} CPU time consumed by worker thread", f"# TYPE {name} counter"]
+    for worker, worker_stat in sorted(stat.items()):
+        line_list.append(f"{name}{{{_format_label({'worker': worker})}}} {worker_stat['cpu_sec']}")
+
+    name = f"{prefix}_worker_stage_seconds"
+    line_list += [f"# HELP {name} Elapsed time of each processing stage", f"# TYPE {name} histogram"]
+    for worker, worker_stat in sorted(stat.items()):
+        for stage, hist in sorted(worker_stat["stage"].items()):
+            line_list += _format_histogram(name, {"worker": worker, "stage": stage}, hist)
+
+    return "\n".join(line_list) + "\n"
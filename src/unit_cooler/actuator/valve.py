@@ -11,215 +11,320 @@ Options:
 """
 
 import logging
+import os
 import pathlib
 import threading
 import time
 
-import my_lib.footprint
 import my_lib.rpi
 
+import unit_cooler.actuator.timing
 import unit_cooler.actuator.work_log
 import unit_cooler.const
+import unit_cooler.exporter
+import unit_cooler.footprint
 
 STAT_DIR_PATH = pathlib.Path("/dev/shm")  # noqa: S108
 
+# 電磁弁の状態を示すファイルを置くディレクトリ
+VALVE_STAT_DIR_PATH = STAT_DIR_PATH / "unit_cooler" / "valve"
+# ゾーン毎の電磁弁の状態を示すファイルを置くディレクトリ (この下にゾーン名のディレクトリを作る)
+ZONE_STAT_DIR_PATH = STAT_DIR_PATH / "unit_cooler" / "zone"
+
 # STATE が WORKING になった際に作られるファイル。Duty 制御している場合、
 # OFF Duty から ON Duty に遷移する度に変更日時が更新される。
 # STATE が IDLE になった際に削除される。
 # (OFF Duty になって実際にバルブを閉じただけでは削除されない)
-STAT_PATH_VALVE_STATE_WORKING = STAT_DIR_PATH / "unit_cooler" / "valve" / "state" / "working"
+STAT_PATH_VALVE_STATE_WORKING = VALVE_STAT_DIR_PATH / "state" / "working"
 
 # STATE が IDLE になった際に作られるファイル。
 # (OFF Duty になって実際にバルブを閉じただけでは作られない)
 # STATE が WORKING になった際に削除される。
-STAT_PATH_VALVE_STATE_IDLE = STAT_DIR_PATH / "unit_cooler" / "valve" / "state" / "idle"
+STAT_PATH_VALVE_STATE_IDLE = VALVE_STAT_DIR_PATH / "state" / "idle"
 
 # 実際にバルブを開いた際に作られるファイル。
 # 実際にバルブを閉じた際に削除される。
-STAT_PATH_VALVE_OPEN = STAT_DIR_PATH / "unit_cooler" / "valve" / "open"
+STAT_PATH_VALVE_OPEN = VALVE_STAT_DIR_PATH / "open"
 
 # 実際にバルブを閉じた際に作られるファイル。
 # 実際にバルブを開いた際に削除される。
-STAT_PATH_VALVE_CLOSE = STAT_DIR_PATH / "unit_cooler" / "valve" / "close"
+STAT_PATH_VALVE_CLOSE = VALVE_STAT_DIR_PATH / "close"
+
+
+class Valve:
+    """
+    1 つの電磁弁と、その Duty 制御の状態
+
+    状態を示すファイルは stat_dir_path の下に作ります。name を指定すると作動ログの先頭に付けます。
+    """
+
+    def __init__(self, pin_no, config, name=None, stat_dir_path=VALVE_STAT_DIR_PATH, ctrl_hist=None):
+        """ctrl_hist を指定すると、制御履歴をその一覧に記録する (モジュールの ctrl_hist と共有する場合)"""
+        self.pin_no = pin_no
+        self.config = config
+        self.name = name
+        self.lock = threading.Lock()
+        self.ctrl_hist = [] if ctrl_hist is None else ctrl_hist
+
+        self.stat_path_state_working = stat_dir_path / "state" / "working"
+        self.stat_path_state_idle = stat_dir_path / "state" / "idle"
+        self.stat_path_open = stat_dir_path / "open"
+        self.stat_path_close = stat_dir_path / "close"
+
+    def init(self):
+        unit_cooler.footprint.clear(self.stat_path_state_working)
+        unit_cooler.footprint.update(self.stat_path_state_idle)
+
+        my_lib.rpi.gpio.setwarnings(False)
+        my_lib.rpi.gpio.setmode(my_lib.rpi.gpio.BCM)
+        my_lib.rpi.gpio.setup(self.pin_no, my_lib.rpi.gpio.OUT)
+
+        self.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+
+    # NOTE: テスト用
+    def clear_stat(self):
+        unit_cooler.footprint.clear(self.stat_path_state_working)
+        unit_cooler.footprint.clear(self.stat_path_state_idle)
+        unit_cooler.footprint.clear(self.stat_path_open)
+        unit_cooler.footprint.clear(self.stat_path_close)
+        self.ctrl_hist.clear()
+
+    def add_work_log(self, message):
+        if self.name is not None:
+            message = f"[{self.name}] {message}"
+
+        unit_cooler.actuator.work_log.add(message)
+
+    def record_operation(self):
+        unit_cooler.exporter.inc_counter(
+            f"{unit_cooler.exporter.PREFIX}_valve_operation_total",
+            "Number of valve state changes",
+            **({} if self.name is None else {"zone": self.name}),
+        )
+
+        # メトリクス記録
+        try:
+            from unit_cooler.metrics import get_metrics_collector
+
+            if self.config and "actuator" in self.config and "metrics" in self.config["actuator"]:
+                metrics_db_path = self.config["actuator"]["metrics"]["data"]
+                metrics_collector = get_metrics_collector(metrics_db_path)
+                metrics_collector.record_valve_operation()
+        except Exception:
+            logging.debug("Failed to record valve operation metrics")
+
+    # NOTE: 実際にバルブを開きます。
+    # 現在のバルブの状態と、バルブが現在の状態になってからの経過時間を返します。
+    def set_state(self, valve_state):
+        with self.lock:
+            curr_state = self.get_state()
+
+            if valve_state != curr_state:
+                logging.info("VALVE%s: %s -> %s", self.get_label(), curr_state.name, valve_state.name)
+                # NOTE: テスト時のみ履歴を記録
+                if os.environ.get("TEST") == "true":
+                    self.ctrl_hist.append(curr_state)
+
+                with unit_cooler.actuator.timing.measure_stage("metrics"):
+                    self.record_operation()
+
+            with unit_cooler.actuator.timing.measure_stage("gpio"):
+                my_lib.rpi.gpio.output(self.pin_no, valve_state.value)
+
+            with unit_cooler.actuator.timing.measure_stage("footprint"):
+                if valve_state == unit_cooler.const.VALVE_STATE.OPEN:
+                    unit_cooler.footprint.clear(self.stat_path_close)
+                    if not unit_cooler.footprint.exists(self.stat_path_open):
+                        unit_cooler.footprint.update(self.stat_path_open)
+                else:
+                    unit_cooler.footprint.clear(self.stat_path_open)
+                    if not unit_cooler.footprint.exists(self.stat_path_close):
+                        unit_cooler.footprint.update(self.stat_path_close)
+
+        return self.get_status()
+
+    # NOTE: 実際のバルブの状態を返します
+    def get_state(self):
+        with unit_cooler.actuator.timing.measure_stage("gpio"):
+            value = my_lib.rpi.gpio.input(self.pin_no)
+
+        if value == 1:
+            return unit_cooler.const.VALVE_STATE.OPEN
+        else:
+            return unit_cooler.const.VALVE_STATE.CLOSE
+
+    # NOTE: 実際のバルブの状態と、その状態になってからの経過時間を返します
+    def get_status(self):
+        with self.lock:
+            valve_state = self.get_state()
+
+            if valve_state == unit_cooler.const.VALVE_STATE.OPEN:
+                assert unit_cooler.footprint.exists(self.stat_path_open)  # noqa: S101
+
+                return {
+                    "state": valve_state,
+                    "duration": unit_cooler.footprint.elapsed(self.stat_path_open),
+                }
+            else:  # noqa: PLR5501
+                if unit_cooler.footprint.exists(self.stat_path_close):
+                    return {
+                        "state": valve_state,
+                        "duration": unit_cooler.footprint.elapsed(self.stat_path_close),
+                    }
+                else:
+                    return {"state": valve_state, "duration": 0}
+
+    def get_label(self):
+        return "" if self.name is None else f" [{self.name}]"
+
+    # NOTE: バルブを動作状態にします。
+    # Duty 制御を実現するため、OFF Duty 期間の場合はバルブを閉じます。
+    # 実際にバルブを開いてからの経過時間を返します。
+    # duty_info = { "enable": bool, "on": on_sec, "off": off_sec }
+    def set_cooling_working(self, duty_info):
+        logging.debug(duty_info)
+
+        label = self.get_label()
+
+        unit_cooler.footprint.clear(self.stat_path_state_idle)
+
+        if not unit_cooler.footprint.exists(self.stat_path_state_working):
+            unit_cooler.footprint.update(self.stat_path_state_working)
+            self.add_work_log("冷却を開始します。")
+            logging.info("COOLING%s: IDLE -> WORKING", label)
+            return self.set_state(unit_cooler.const.VALVE_STATE.OPEN)
+
+        if not duty_info["enable"]:
+            # NOTE Duty 制御しない場合
+            logging.info("COOLING%s: WORKING", label)
+            return self.set_state(unit_cooler.const.VALVE_STATE.OPEN)
+
+        status = self.get_status()
+
+        if status["state"] == unit_cooler.const.VALVE_STATE.OPEN:
+            # NOTE: 現在バルブが開かれている
+            if status["duration"] >= duty_info["on_sec"]:
+                logging.info("COOLING%s: WORKING (OFF duty, %d sec left)", label, duty_info["off_sec"])
+                self.add_work_log("OFF Duty になったのでバルブを締めます。")
+                return self.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+            else:
+                logging.info(
+                    "COOLING%s: WORKING (ON duty, %d sec left)",
+                    label,
+                    duty_info["on_sec"] - status["duration"],
+                )
+
+                return self.set_state(unit_cooler.const.VALVE_STATE.OPEN)
+        else:  # noqa: PLR5501
+            # NOTE: 現在バルブが閉じられている
+            if status["duration"] >= duty_info["off_sec"]:
+                logging.info("COOLING%s: WORKING (ON duty, %d sec left)", label, duty_info["on_sec"])
+                self.add_work_log("ON Duty になったのでバルブを開けます。")
+                return self.set_state(unit_cooler.const.VALVE_STATE.OPEN)
+            else:
+                logging.info(
+                    "COOLING%s: WORKING (OFF duty, %d sec left)",
+                    label,
+                    duty_info["off_sec"] - status["duration"],
+                )
+                return self.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+
+    # NOTE: スケジューラが決めた状態で、バルブを動作状態にします。
+    # (Duty 制御の ON/OFF の切り替えはスケジューラが行う)
+    def set_cooling_scheduled(self, valve_state):
+        label = self.get_label()
+
+        unit_cooler.footprint.clear(self.stat_path_state_idle)
+
+        if not unit_cooler.footprint.exists(self.stat_path_state_working):
+            unit_cooler.footprint.update(self.stat_path_state_working)
+            self.add_work_log("冷却を開始します。")
+            logging.info("COOLING%s: IDLE -> WORKING (%s)", label, valve_state.name)
+        elif valve_state != self.get_state():
+            if valve_state == unit_cooler.const.VALVE_STATE.OPEN:
+                self.add_work_log("ON Duty になったのでバルブを開けます。")
+            else:
+                self.add_work_log("OFF Duty になったのでバルブを締めます。")
+            logging.info("COOLING%s: WORKING (%s)", label, valve_state.name)
+
+        return self.set_state(valve_state)
+
+    def set_cooling_idle(self):
+        unit_cooler.footprint.clear(self.stat_path_state_working)
+
+        if not unit_cooler.footprint.exists(self.stat_path_state_idle):
+            unit_cooler.footprint.update(self.stat_path_state_idle)
+            self.add_work_log("冷却を停止しました。")
+            logging.info("COOLING%s: WORKING -> IDLE", self.get_label())
+            return self.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+        else:
+            logging.info("COOLING%s: IDLE", self.get_label())
+            return self.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+
+    def set_cooling_state(self, control_message):
+        if control_message["state"] == unit_cooler.const.COOLING_STATE.WORKING:
+            return self.set_cooling_working(control_message["duty"])
+        else:
+            return self.set_cooling_idle()
+
+
+############################################################
+# NOTE: 以下は、ゾーンを使わない場合の 1 つの電磁弁を操作する関数
+# (actuator.control.valve の設定を使う)
 
 pin_no = None
 valve_lock = None
 ctrl_hist = []
 config = None
+default_valve = None
 
 
 def init(pin, valve_config):
     global pin_no  # noqa: PLW0603
     global valve_lock  # noqa: PLW0603
     global config  # noqa: PLW0603
+    global default_valve  # noqa: PLW0603
 
     pin_no = pin
-    valve_lock = threading.Lock()
     config = valve_config
+    default_valve = Valve(pin, valve_config, ctrl_hist=ctrl_hist)
+    valve_lock = default_valve.lock
 
-    my_lib.footprint.clear(STAT_PATH_VALVE_STATE_WORKING)
-    my_lib.footprint.update(STAT_PATH_VALVE_STATE_IDLE)
-
-    my_lib.rpi.gpio.setwarnings(False)
-    my_lib.rpi.gpio.setmode(my_lib.rpi.gpio.BCM)
-    my_lib.rpi.gpio.setup(pin_no, my_lib.rpi.gpio.OUT)
-
-    set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+    default_valve.init()
 
 
 # NOTE: テスト用
 def clear_stat():
-    global ctrl_hist  # noqa: PLW0603
-
-    my_lib.footprint.clear(STAT_PATH_VALVE_STATE_WORKING)
-    my_lib.footprint.clear(STAT_PATH_VALVE_STATE_IDLE)
-    my_lib.footprint.clear(STAT_PATH_VALVE_OPEN)
-    my_lib.footprint.clear(STAT_PATH_VALVE_CLOSE)
-    ctrl_hist = []
+    unit_cooler.footprint.clear(STAT_PATH_VALVE_STATE_WORKING)
+    unit_cooler.footprint.clear(STAT_PATH_VALVE_STATE_IDLE)
+    unit_cooler.footprint.clear(STAT_PATH_VALVE_OPEN)
+    unit_cooler.footprint.clear(STAT_PATH_VALVE_CLOSE)
+    ctrl_hist.clear()
 
 
 # NOTE: テスト用
 def get_hist():
-    global ctrl_hist
-
     return ctrl_hist
 
 
-# NOTE: 実際にバルブを開きます。
-# 現在のバルブの状態と、バルブが現在の状態になってからの経過時間を返します。
 def set_state(valve_state):
-    global pin_no
-    global valve_lock
-    global ctrl_hist
-
-    with valve_lock:
-        curr_state = get_state()
-
-        if valve_state != curr_state:
-            logging.info("VALVE: %s -> %s", curr_state.name, valve_state.name)
-            # NOTE: テスト時のみ履歴を記録
-            import os
+    return default_valve.set_state(valve_state)
 
-            if os.environ.get("TEST") == "true":
-                ctrl_hist.append(curr_state)
 
-            # メトリクス記録
-            try:
-                from unit_cooler.metrics import get_metrics_collector
-
-                global config
-
-                if config and "actuator" in config and "metrics" in config["actuator"]:
-                    metrics_db_path = config["actuator"]["metrics"]["data"]
-                    metrics_collector = get_metrics_collector(metrics_db_path)
-                    metrics_collector.record_valve_operation()
-            except Exception:
-                logging.debug("Failed to record valve operation metrics")
-
-        my_lib.rpi.gpio.output(pin_no, valve_state.value)
-
-        if valve_state == unit_cooler.const.VALVE_STATE.OPEN:
-            my_lib.footprint.clear(STAT_PATH_VALVE_CLOSE)
-            if not my_lib.footprint.exists(STAT_PATH_VALVE_OPEN):
-                my_lib.footprint.update(STAT_PATH_VALVE_OPEN)
-        else:
-            my_lib.footprint.clear(STAT_PATH_VALVE_OPEN)
-            if not my_lib.footprint.exists(STAT_PATH_VALVE_CLOSE):
-                my_lib.footprint.update(STAT_PATH_VALVE_CLOSE)
-
-    return get_status()
-
-
-# NOTE: 実際のバルブの状態を返します
 def get_state():
-    global pin_no
-
-    if my_lib.rpi.gpio.input(pin_no) == 1:
-        return unit_cooler.const.VALVE_STATE.OPEN
-    else:
-        return unit_cooler.const.VALVE_STATE.CLOSE
+    return default_valve.get_state()
 
 
-# NOTE: 実際のバルブの状態と、その状態になってからの経過時間を返します
 def get_status():
-    global valve_lock
-
-    with valve_lock:
-        valve_state = get_state()
-
-        if valve_state == unit_cooler.const.VALVE_STATE.OPEN:
-            assert my_lib.footprint.exists(STAT_PATH_VALVE_OPEN)  # noqa: S101
-
-            return {
-                "state": valve_state,
-                "duration": my_lib.footprint.elapsed(STAT_PATH_VALVE_OPEN),
-            }
-        else:  # noqa: PLR5501
-            if my_lib.footprint.exists(STAT_PATH_VALVE_CLOSE):
-                return {
-                    "state": valve_state,
-                    "duration": my_lib.footprint.elapsed(STAT_PATH_VALVE_CLOSE),
-                }
-            else:
-                return {"state": valve_state, "duration": 0}
+    return default_valve.get_status()
 
 
-# NOTE: バルブを動作状態にします。
-# Duty 制御を実現するため、OFF Duty 期間の場合はバルブを閉じます。
-# 実際にバルブを開いてからの経過時間を返します。
-# duty_info = { "enable": bool, "on": on_sec, "off": off_sec }
 def set_cooling_working(duty_info):
-    logging.debug(duty_info)
-
-    my_lib.footprint.clear(STAT_PATH_VALVE_STATE_IDLE)
-
-    if not my_lib.footprint.exists(STAT_PATH_VALVE_STATE_WORKING):
-        my_lib.footprint.update(STAT_PATH_VALVE_STATE_WORKING)
-        unit_cooler.actuator.work_log.add("冷却を開始します。")
-        logging.info("COOLING: IDLE -> WORKING")
-        return set_state(unit_cooler.const.VALVE_STATE.OPEN)
-
-    if not duty_info["enable"]:
-        # NOTE Duty 制御しない場合
-        logging.info("COOLING: WORKING")
-        return set_state(unit_cooler.const.VALVE_STATE.OPEN)
-
-    status = get_status()
-
-    if status["state"] == unit_cooler.const.VALVE_STATE.OPEN:
-        # NOTE: 現在バルブが開かれている
-        if status["duration"] >= duty_info["on_sec"]:
-            logging.info("COOLING: WORKING (OFF duty, %d sec left)", duty_info["off_sec"])
-            unit_cooler.actuator.work_log.add("OFF Duty になったのでバルブを締めます。")
-            return set_state(unit_cooler.const.VALVE_STATE.CLOSE)
-        else:
-            logging.info("COOLING: WORKING (ON duty, %d sec left)", duty_info["on_sec"] - status["duration"])
-
-            return set_state(unit_cooler.const.VALVE_STATE.OPEN)
-    else:  # noqa: PLR5501
-        # NOTE: 現在バルブが閉じられている
-        if status["duration"] >= duty_info["off_sec"]:
-            logging.info("COOLING: WORKING (ON duty, %d sec left)", duty_info["on_sec"])
-            unit_cooler.actuator.work_log.add("ON Duty になったのでバルブを開けます。")
-            return set_state(unit_cooler.const.VALVE_STATE.OPEN)
-        else:
-            logging.info(
-                "COOLING: WORKING (OFF duty, %d sec left)", duty_info["off_sec"] - status["duration"]
-            )
-            return set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+    return default_valve.set_cooling_working(duty_info)
 
 
 def set_cooling_idle():
-    my_lib.footprint.clear(STAT_PATH_VALVE_STATE_WORKING)
-
-    if not my_lib.footprint.exists(STAT_PATH_VALVE_STATE_IDLE):
-        my_lib.footprint.update(STAT_PATH_VALVE_STATE_IDLE)
-        unit_cooler.actuator.work_log.add("冷却を停止しました。")
-        logging.info("COOLING: WORKING -> IDLE")
-        return set_state(unit_cooler.const.VALVE_STATE.CLOSE)
-    else:
-        logging.info("COOLING: IDLE")
-        return set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+    return default_valve.set_cooling_idle()
 
 
 def set_cooling_state(control_message):
@@ -23,8 +23,14 @@ import my_lib.webapp.log
 import my_lib.webapp.util
 import werkzeug.serving
 
+import unit_cooler.actuator.monitor
+import unit_cooler.actuator.timing
 import unit_cooler.actuator.webapi.flow_status
+import unit_cooler.actuator.webapi.timing
 import unit_cooler.actuator.webapi.valve_status
+import unit_cooler.actuator.webapi.work_log
+import unit_cooler.compress
+import unit_cooler.exporter
 import unit_cooler.metrics.webapi.page
 from unit_cooler.metrics import get_metrics_collector
 
@@ -39,6 +45,7 @@ def create_app(config, event_queue):
     app = flask.Flask("unit-cooler-web")
 
     flask_cors.CORS(app)
+    unit_cooler.compress.init(app)
 
     app.config["CONFIG"] = config
     app.config["CONFIG_FILE_NORMAL"] = "config.yaml"  # メトリクス用設定
@@ -54,9 +61,19 @@ def create_app(config, event_queue):
     app.register_blueprint(
         unit_cooler.actuator.webapi.flow_status.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX
     )
+    app.register_blueprint(
+        unit_cooler.actuator.webapi.work_log.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX
+    )
+    app.register_blueprint(
+        unit_cooler.actuator.webapi.timing.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX
+    )
     app.register_blueprint(
         unit_cooler.metrics.webapi.page.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX
     )
+    # NOTE: Prometheus からスクレイプするので、/metrics はプレフィックス無しで提供する
+    app.register_blueprint(unit_cooler.exporter.blueprint)
+    unit_cooler.exporter.add_collector(unit_cooler.actuator.monitor.collect_exporter_metrics)
+    unit_cooler.exporter.add_collector(unit_cooler.actuator.timing.format_prometheus)
 
     my_lib.webapp.config.show_handler_list(app, True)
 
@@ -69,6 +86,10 @@ def create_app(config, event_queue):
         metrics_collector = get_metrics_collector(metrics_db_path)
         logging.info("Metrics database initialized at: %s", metrics_db_path)
         app.config["METRICS_COLLECTOR"] = metrics_collector
+
+        # NOTE: 分データが保存される度にダッシュボードのデータを事前計算しておく
+        if config["actuator"].get("metrics", {}).get("precompute", False):
+            unit_cooler.metrics.webapi.page.start_precompute(metrics_collector)
     except Exception:
         logging.exception("Failed to initialize metrics database")
 
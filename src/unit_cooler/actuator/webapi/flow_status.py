@@ -6,6 +6,7 @@ import my_lib.flask_util
 import my_lib.webapp.config
 
 import unit_cooler.actuator.monitor
+import unit_cooler.actuator.zone
 
 blueprint = flask.Blueprint("flow-status", __name__)
 
@@ -13,8 +14,18 @@ blueprint = flask.Blueprint("flow-status", __name__)
 @blueprint.route("/api/get_flow", methods=["GET"])
 @my_lib.flask_util.support_jsonp
 def get_flow():
-    """最後に測定された流量を JSON 形式で返します。"""
-    flow = unit_cooler.actuator.monitor.get_mist_condition.last_flow
+    """
+    最後に測定された流量を JSON 形式で返します。
+
+    ゾーンを使う場合は ?zone=<名前> で対象を指定します。(省略時は先頭のゾーン)
+    """
+    if unit_cooler.actuator.zone.get_zone_list():
+        zone = unit_cooler.actuator.zone.get_zone(flask.request.args.get("zone"))
+        if zone is None:
+            return flask.jsonify({"error": "Unknown zone"}), 404
+        flow = zone.last_flow
+    else:
+        flow = unit_cooler.actuator.monitor.get_mist_condition.last_flow
 
     response = {
         "flow": flow,
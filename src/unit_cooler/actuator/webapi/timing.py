@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""ワーカのループの処理時間を JSON と Prometheus のテキスト形式で返す API エンドポイントを提供します。"""
+
+import flask
+import my_lib.flask_util
+
+import unit_cooler.actuator.timing
+
+blueprint = flask.Blueprint("timing", __name__)
+
+
+@blueprint.route("/api/timing", methods=["GET"])
+@my_lib.flask_util.support_jsonp
+def get_timing():
+    """ワーカ毎のループの処理時間、ジッタ、CPU 時間、処理の段階毎の時間を JSON 形式で返します。"""
+    return flask.jsonify(unit_cooler.actuator.timing.get_stat())
+
+
+@blueprint.route("/api/timing/prometheus", methods=["GET"])
+def get_timing_prometheus():
+    """get_timing と同じ値を Prometheus のテキスト形式で返します。"""
+    return flask.Response(
+        unit_cooler.actuator.timing.format_prometheus(), mimetype="text/plain; version=0.0.4"
+    )
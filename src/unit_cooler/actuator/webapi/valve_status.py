@@ -6,6 +6,7 @@ import my_lib.flask_util
 import my_lib.webapp.config
 
 import unit_cooler.actuator.valve
+import unit_cooler.actuator.zone
 import unit_cooler.const
 
 blueprint = flask.Blueprint("valve-status", __name__)
@@ -14,8 +15,18 @@ blueprint = flask.Blueprint("valve-status", __name__)
 @blueprint.route("/api/valve_status", methods=["GET"])
 @my_lib.flask_util.support_jsonp
 def get_valve_status():
-    """バルブの状態を JSON 形式で返します。"""
-    status = unit_cooler.actuator.valve.get_status()
+    """
+    バルブの状態を JSON 形式で返します。
+
+    ゾーンを使う場合は ?zone=<名前> で対象を指定します。(省略時は先頭のゾーン)
+    """
+    if unit_cooler.actuator.zone.get_zone_list():
+        zone = unit_cooler.actuator.zone.get_zone(flask.request.args.get("zone"))
+        if zone is None:
+            return flask.jsonify({"error": "Unknown zone"}), 404
+        status = zone.valve.get_status()
+    else:
+        status = unit_cooler.actuator.valve.get_status()
 
     # VALVE_STATE を JSON シリアライズ可能な形式に変換
     response = {
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""作動ログの差分を返す API エンドポイントを提供します。"""
+
+import flask
+import my_lib.flask_util
+
+import unit_cooler.actuator.work_log
+
+# 差分 API で一度に返すログの件数 (デフォルト値と上限値)
+LOG_LIMIT = 100
+LOG_LIMIT_MAX = 1000
+
+blueprint = flask.Blueprint("work-log", __name__)
+
+
+def _parse_uint(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+@blueprint.route("/api/work_log", methods=["GET"])
+@my_lib.flask_util.support_jsonp
+def work_log_delta():
+    """
+    ID が since より後の作動ログを新しい順に返します。
+
+    古い方から limit 件までを返し、続きがある場合は has_more が true になります。
+    since を省略した場合は最新のログを limit 件まで返します。ログと last_id は同じ時点の
+    バッファから取り出すので、クライアントは初回やリセット時にこの応答だけでログの表示と
+    差分取得の起点を揃えられます。
+
+    ID はアクチュエータが起動する度に 1 から振り直すので、応答の epoch を保持して次の
+    リクエストで ?epoch=<epoch> として渡してください。epoch が異なる場合や、バッファから
+    溢れて since からの差分を返せない場合は reset が true になるので、クライアントは
+    ログ全体を取得し直す必要があります。
+    """
+    epoch = unit_cooler.actuator.work_log.epoch()
+
+    limit = _parse_uint(flask.request.args.get("limit"))
+    limit = LOG_LIMIT if limit is None else min(limit, LOG_LIMIT_MAX)
+
+    since = _parse_uint(flask.request.args.get("since"))
+    if since is None:
+        entry_list, last_id = unit_cooler.actuator.work_log.get_latest(limit)
+        return flask.jsonify(
+            {"data": entry_list, "last_id": last_id, "epoch": epoch, "has_more": False, "reset": False}
+        )
+
+    last_id = unit_cooler.actuator.work_log.last_id()
+
+    client_epoch = flask.request.args.get("epoch")
+    first_id = unit_cooler.actuator.work_log.first_id()
+    if (
+        ((client_epoch is not None) and (client_epoch != epoch))
+        or (since > last_id)
+        or (since < first_id - 1)
+    ):
+        return flask.jsonify(
+            {"data": [], "last_id": last_id, "epoch": epoch, "has_more": False, "reset": True}
+        )
+
+    entry_list = unit_cooler.actuator.work_log.get_since(since, limit + 1)
+    has_more = len(entry_list) > limit
+    entry_list = entry_list[:limit]
+
+    return flask.jsonify(
+        {
+            "data": entry_list[::-1],
+            "last_id": entry_list[-1]["id"] if entry_list else since,
+            "epoch": epoch,
+            "has_more": has_more,
+            "reset": False,
+        }
+    )
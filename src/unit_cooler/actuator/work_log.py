@@ -10,18 +10,37 @@ Options:
   -D                : デバッグモードで動作します。
 """
 
+import collections
+import itertools
 import logging
+import threading
+import uuid
 
 import my_lib.webapp.event
 import my_lib.webapp.log
 
+import unit_cooler.actuator.timing
+import unit_cooler.clock
 import unit_cooler.const
 import unit_cooler.util
 
+# メモリ上に保持するログの件数
+LOG_BUFFER_SIZE = 1000
+# この時間内に追加されたログはまとめて 1 回のイベントで通知する
+EVENT_BATCH_SEC = 0.5
+
 config = None
-enven_queue = None
+event_queue = None
+
+# NOTE: ID は単調増加で、バッファから溢れた古いログは捨てる
+log_buffer = collections.deque(maxlen=LOG_BUFFER_SIZE)
+log_id_counter = itertools.count(1)
+# NOTE: ID はプロセスが起動する度に 1 から振り直すので、クライアントが再起動を検出できるように
+# 起動毎に異なる値を ID と組にして返す
+log_epoch = uuid.uuid4().hex
+log_lock = threading.Lock()
 
-log_hist = []
+event_timer = None
 
 
 def init(config_, event_queue_):
@@ -33,33 +52,98 @@ def init(config_, event_queue_):
 
 
 def term():
-    global event_queue
+    if event_timer is not None:
+        event_timer.cancel()
+
     my_lib.webapp.log.term()
 
 
 # NOTE: テスト用
 def hist_clear():
-    global log_hist  # noqa: PLW0603
-
-    log_hist = []
+    with log_lock:
+        log_buffer.clear()
 
 
 # NOTE: テスト用
 def hist_get():
-    global log_hist
+    with log_lock:
+        return [entry["message"] for entry in log_buffer]
+
+
+def epoch():
+    """ID の系列を識別する値 (プロセスの起動毎に異なる)"""
+    return log_epoch
+
+
+def last_id():
+    """最新のログの ID (ログが無い場合は 0)"""
+    with log_lock:
+        return log_buffer[-1]["id"] if log_buffer else 0
+
+
+def first_id():
+    """バッファに残っている最も古いログの ID (ログが無い場合は 0)"""
+    with log_lock:
+        return log_buffer[0]["id"] if log_buffer else 0
+
 
-    return log_hist
+def get_since(since=0, limit=None):
+    """ID が since より大きいログを古い順に返す (limit 件まで)"""
+    with log_lock:
+        entry_list = [entry for entry in log_buffer if entry["id"] > since]
+
+    if limit is not None:
+        entry_list = entry_list[:limit]
+
+    return entry_list
+
+
+def get_latest(limit):
+    """最新のログを新しい順に limit 件まで返す (その時点の最新の ID と組にして返す)"""
+    with log_lock:
+        entry_list = list(itertools.islice(reversed(log_buffer), limit))
+        return entry_list, (log_buffer[-1]["id"] if log_buffer else 0)
+
+
+def _put_event():
+    global event_timer  # noqa: PLW0603
+
+    event_timer = None
+    try:
+        event_queue.put(my_lib.webapp.event.EVENT_TYPE.LOG)
+    except Exception:
+        logging.exception("Failed to notify log event")
+
+
+def _notify_event():
+    global event_timer  # noqa: PLW0603
+
+    # NOTE: 連続してログが追加された場合でも、イベントキューへの送信は 1 回にまとめる
+    if event_timer is None:
+        event_timer = threading.Timer(EVENT_BATCH_SEC, _put_event)
+        event_timer.daemon = True
+        event_timer.start()
 
 
 def add(message, level=unit_cooler.const.LOG_LEVEL.INFO):
-    global log_hist
-    global config
-    global event_queue
+    with unit_cooler.actuator.timing.measure_stage("work_log"):
+        _add(message, level)
+
 
-    event_queue.put(my_lib.webapp.event.EVENT_TYPE.LOG)
+def _add(message, level):
     my_lib.webapp.log.add(message, level)
 
-    log_hist.append(message)
+    with log_lock:
+        log_buffer.append(
+            {
+                "id": next(log_id_counter),
+                "date": unit_cooler.clock.now().isoformat(),
+                "level": level.name,
+                "message": message,
+            }
+        )
+
+        _notify_event()
 
     if level == unit_cooler.const.LOG_LEVEL.ERROR:
         unit_cooler.util.notify_error(config, message)
@@ -19,14 +19,15 @@ import logging
 import os
 import pathlib
 import threading
-import time
 import traceback
 
-import my_lib.footprint
-
 import unit_cooler.actuator.control
 import unit_cooler.actuator.monitor
+import unit_cooler.actuator.timing
+import unit_cooler.actuator.zone
+import unit_cooler.clock
 import unit_cooler.const
+import unit_cooler.footprint
 import unit_cooler.pubsub.subscribe
 import unit_cooler.util
 
@@ -37,6 +38,10 @@ _should_terminate = {}
 # メッセージの初期値
 MESSAGE_INIT = {"mode_index": 0, "state": unit_cooler.const.COOLING_STATE.IDLE}
 
+# ループ 1 回あたりの最小の待ち時間 [秒]
+# NOTE: ベンチマークでは、時短モードの間隔で動かすために 0 にする
+SLEEP_MIN_SEC = 0.5
+
 
 def get_worker_id():
     return os.environ.get("PYTEST_XDIST_WORKER", "")
@@ -78,38 +83,34 @@ def collect_environmental_metrics(config, current_message):
         metrics_db_path = config["actuator"]["metrics"]["data"]
         metrics_collector = get_metrics_collector(metrics_db_path)
 
-        # current_messageのsense_dataからセンサーデータを取得
+        env = current_message.get("env")
         sense_data = current_message.get("sense_data", {})
 
-        if sense_data:
+        if env is not None:
+            # NOTE: 数値のベクトルで送られてきた場合は、それを使う
+            value_map = dict(zip(unit_cooler.const.ENV_KEY_LIST, env, strict=False))
+        elif sense_data:
             # 各センサーデータの最新値を取得
-            temperature = None
-            humidity = None
-            lux = None
-            solar_radiation = None
-            rain_amount = None
-
-            if sense_data.get("temp") and len(sense_data["temp"]) > 0:
-                temperature = sense_data["temp"][0].get("value")
-            if sense_data.get("humi") and len(sense_data["humi"]) > 0:
-                humidity = sense_data["humi"][0].get("value")
-            if sense_data.get("lux") and len(sense_data["lux"]) > 0:
-                lux = sense_data["lux"][0].get("value")
-            if sense_data.get("solar_rad") and len(sense_data["solar_rad"]) > 0:
-                solar_radiation = sense_data["solar_rad"][0].get("value")
-                logging.debug("Solar radiation data found: %s W/m²", solar_radiation)
-            else:
-                logging.debug(
-                    "No solar radiation data in sense_data: %s",
-                    list(sense_data.keys()) if sense_data else "empty",
-                )
-            if sense_data.get("rain") and len(sense_data["rain"]) > 0:
-                rain_amount = sense_data["rain"][0].get("value")
-
-            # 環境データをメトリクスに記録
-            metrics_collector.update_environmental_data(
-                temperature, humidity, lux, solar_radiation, rain_amount
-            )
+            value_map = {
+                key: sense_data[key][0].get("value") if sense_data.get(key) else None
+                for key in unit_cooler.const.ENV_KEY_LIST
+            }
+        else:
+            return
+
+        if value_map.get("solar_rad") is not None:
+            logging.debug("Solar radiation data found: %s W/m²", value_map["solar_rad"])
+        else:
+            logging.debug("No solar radiation data in control message")
+
+        # 環境データをメトリクスに記録
+        metrics_collector.update_environmental_data(
+            value_map.get("temp"),
+            value_map.get("humi"),
+            value_map.get("lux"),
+            value_map.get("solar_rad"),
+            value_map.get("rain"),
+        )
 
     except Exception:
         logging.exception("Failed to collect environmental metrics")
@@ -120,16 +121,24 @@ def queue_put(message_queue, message, liveness_file):
 
     logging.info("Receive message: %s", message)
 
-    message_queue.put(message)
-    my_lib.footprint.update(liveness_file)
+    with unit_cooler.actuator.timing.measure_loop("subscribe"):
+        message_queue.put(message)
+        with unit_cooler.actuator.timing.measure_stage("footprint"):
+            unit_cooler.footprint.update(liveness_file)
 
 
-def sleep_until_next_iter(start_time, interval_sec):
-    sleep_sec = max(interval_sec - (time.time() - start_time), 0.5)
+def sleep_until_next_iter(start_time, interval_sec, worker=None):
+    sleep_sec = max(interval_sec - (unit_cooler.clock.timestamp() - start_time), SLEEP_MIN_SEC)
     logging.debug("Seep %.1f sec...", sleep_sec)
 
+    wakeup_time = unit_cooler.clock.timestamp() + sleep_sec
     # should_terminate が設定されるまで待機（最大 sleep_sec 秒）
-    get_should_terminate().wait(timeout=sleep_sec)
+    if unit_cooler.clock.wait(get_should_terminate(), sleep_sec):
+        return
+
+    if worker is not None:
+        # NOTE: 予定時刻からの起床の遅れをジッタとして記録する
+        unit_cooler.actuator.timing.record_jitter(worker, unit_cooler.clock.timestamp() - wakeup_time)
 
 
 # NOTE: コントローラから制御指示を受け取ってキューに積むワーカ
@@ -152,13 +161,58 @@ def subscribe_worker(config, control_host, pub_port, message_queue, liveness_fil
     return ret
 
 
+def gen_monitor_handle_list(config, interval_sec):
+    # NOTE: ゾーンを使わない場合は、zone が None の 1 つのみ
+    return [
+        unit_cooler.actuator.monitor.gen_handle(config, interval_sec, zone)
+        for zone in (unit_cooler.actuator.zone.get_zone_list() or [None])
+    ]
+
+
+def monitor_step(handle_list, liveness_file, need_logging, dummy_mode=False):
+    """monitor_worker のループ 1 回分の処理 (シミュレータからも呼ぶ)"""
+    with unit_cooler.actuator.timing.measure_loop("monitor"):
+        for zone_handle in handle_list:
+            mist_condition = unit_cooler.actuator.monitor.get_mist_condition(zone_handle["zone"])
+            unit_cooler.actuator.monitor.check(zone_handle, mist_condition, need_logging)
+            unit_cooler.actuator.monitor.send_mist_condition(
+                zone_handle, mist_condition, get_last_control_message(), dummy_mode
+            )
+
+        with unit_cooler.actuator.timing.measure_stage("footprint"):
+            unit_cooler.footprint.update(liveness_file)
+
+
+def control_step(config, handle, liveness_file):
+    """control_worker のループ 1 回分の処理 (シミュレータからも呼ぶ)"""
+    with unit_cooler.actuator.timing.measure_loop("control"):
+        current_message = unit_cooler.actuator.control.get_control_message(handle, get_last_control_message())
+
+        set_last_control_message(current_message)
+
+        unit_cooler.actuator.control.execute(config, current_message)
+
+        # 環境データのメトリクス収集（定期的に実行）
+        try:
+            with unit_cooler.actuator.timing.measure_stage("metrics"):
+                collect_environmental_metrics(config, current_message)
+        except Exception:
+            logging.debug("Failed to collect environmental metrics")
+
+        with unit_cooler.actuator.timing.measure_stage("footprint"):
+            unit_cooler.footprint.update(liveness_file)
+
+    return current_message
+
+
 # NOTE: バルブの状態をモニタするワーカ
 def monitor_worker(config, liveness_file, dummy_mode=False, speedup=1, msg_count=0):
     logging.info("Start monitor worker")
 
     interval_sec = config["actuator"]["monitor"]["interval_sec"] / speedup
     try:
-        handle = unit_cooler.actuator.monitor.gen_handle(config, interval_sec)
+        handle_list = gen_monitor_handle_list(config, interval_sec)
+        handle = handle_list[0]
     except Exception:
         logging.exception("Failed to create handle")
 
@@ -171,18 +225,12 @@ def monitor_worker(config, liveness_file, dummy_mode=False, speedup=1, msg_count
     ret = 0
     try:
         while True:
-            start_time = time.time()
+            start_time = unit_cooler.clock.timestamp()
 
             need_logging = (i % handle["log_period"]) == 0
             i += 1
 
-            mist_condition = unit_cooler.actuator.monitor.get_mist_condition()
-            unit_cooler.actuator.monitor.check(handle, mist_condition, need_logging)
-            unit_cooler.actuator.monitor.send_mist_condition(
-                handle, mist_condition, get_last_control_message(), dummy_mode
-            )
-
-            my_lib.footprint.update(liveness_file)
+            monitor_step(handle_list, liveness_file, need_logging, dummy_mode)
 
             if get_should_terminate().is_set():
                 logging.info("Terminate monitor worker")
@@ -197,7 +245,7 @@ def monitor_worker(config, liveness_file, dummy_mode=False, speedup=1, msg_count
                     )
                     break
 
-            sleep_until_next_iter(start_time, interval_sec)
+            sleep_until_next_iter(start_time, interval_sec, "monitor")
     except Exception:
         unit_cooler.util.notify_error(config, traceback.format_exc())
         ret = -1
@@ -219,23 +267,9 @@ def control_worker(config, message_queue, liveness_file, dummy_mode=False, speed
     ret = 0
     try:
         while True:
-            start_time = time.time()
-
-            current_message = unit_cooler.actuator.control.get_control_message(
-                handle, get_last_control_message()
-            )
-
-            set_last_control_message(current_message)
+            start_time = unit_cooler.clock.timestamp()
 
-            unit_cooler.actuator.control.execute(config, current_message)
-
-            # 環境データのメトリクス収集（定期的に実行）
-            try:
-                collect_environmental_metrics(config, current_message)
-            except Exception:
-                logging.debug("Failed to collect environmental metrics")
-
-            my_lib.footprint.update(liveness_file)
+            control_step(config, handle, liveness_file)
 
             if get_should_terminate().is_set():
                 logging.info("Terminate control worker")
@@ -247,7 +281,7 @@ def control_worker(config, message_queue, liveness_file, dummy_mode=False, speed
                     logging.info("Terminate control, because the specified number of times has been reached.")
                     break
 
-            sleep_until_next_iter(start_time, interval_sec)
+            sleep_until_next_iter(start_time, interval_sec, "control")
     except Exception:
         logging.exception("Failed to control valve")
         unit_cooler.util.notify_error(config, traceback.format_exc())
@@ -329,8 +363,6 @@ if __name__ == "__main__":
     import my_lib.pretty
     import my_lib.webapp.config
 
-    import unit_cooler.actuator.valve
-
     args = docopt.docopt(__doc__)
 
     config_file = args["-c"]
@@ -352,8 +384,7 @@ if __name__ == "__main__":
     my_lib.webapp.log.init(config)
     unit_cooler.actuator.work_log.init(config, event_queue)
 
-    unit_cooler.actuator.valve.init(config["actuator"]["control"]["valve"]["pin_no"], config)
-    unit_cooler.actuator.monitor.init(config["actuator"]["control"]["valve"]["pin_no"])
+    unit_cooler.actuator.zone.init(config)
 
     # NOTE: テストしやすいように、threading.Thread ではなく multiprocessing.pool.ThreadPool を使う
     executor = concurrent.futures.ThreadPoolExecutor()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+1 つのアクチュエータで複数の電磁弁 (ゾーン) を制御するための、ゾーンの一覧を管理します。
+
+actuator.control.zones が指定されていない場合はゾーンを作らず、これまで通り
+unit_cooler.actuator.valve と unit_cooler.actuator.sensor のモジュールの関数で
+actuator.control.valve の電磁弁を 1 つだけ制御します。
+
+実機の流量計はゾーン毎に sensor.lock_file で指定する必要があります。ダミーの流量計のみ、
+電磁弁の端子毎に流量を返すので指定は不要です。
+"""
+
+import logging
+import os
+
+import unit_cooler.actuator.sensor
+import unit_cooler.actuator.valve
+
+
+class Zone:
+    """電磁弁と流量計の組"""
+
+    def __init__(self, name, pin_no, config, lock_file=None):
+        """lock_file は流量計を区別するためのもの (省略時は既定の流量計)"""
+        self.name = name
+        self.pin_no = pin_no
+        self.valve = unit_cooler.actuator.valve.Valve(
+            pin_no, config, name, unit_cooler.actuator.valve.ZONE_STAT_DIR_PATH / name
+        )
+        self.flow_sensor = unit_cooler.actuator.sensor.FlowSensor(pin_no, name, lock_file)
+        # 最後に測定した流量
+        self.last_flow = 0
+
+
+zone_list = []
+
+
+def check_sensor(zone_config_list):
+    """
+    ゾーン毎に別の流量計を読むことを確認する
+
+    同じ流量計を読むと、閉じているゾーンで他のゾーンの流量を検出し、電磁弁の故障と誤判定します。
+    """
+    if os.environ.get("DUMMY_MODE", "false") == "true":
+        return
+
+    lock_file_list = [zone_config.get("sensor", {}).get("lock_file") for zone_config in zone_config_list]
+    if (len(zone_config_list) > 1) and (
+        (None in lock_file_list) or (len(set(lock_file_list)) != len(lock_file_list))
+    ):
+        raise ValueError("ゾーン毎に異なる流量計 (sensor.lock_file) を指定してください")  # noqa: EM101, TRY003
+
+
+def init(config):
+    """設定に応じて電磁弁と流量計を初期化し、ゾーンの一覧を返す (ゾーンを使わない場合は空)"""
+    global zone_list  # noqa: PLW0603
+
+    zone_config_list = config["actuator"]["control"].get("zones", [])
+    if not zone_config_list:
+        pin_no = config["actuator"]["control"]["valve"]["pin_no"]
+
+        unit_cooler.actuator.valve.init(pin_no, config)
+        unit_cooler.actuator.sensor.init(pin_no)
+
+        zone_list = []
+        return zone_list
+
+    check_sensor(zone_config_list)
+
+    zone_list = [
+        Zone(
+            zone_config["name"],
+            zone_config["pin_no"],
+            config,
+            zone_config.get("sensor", {}).get("lock_file"),
+        )
+        for zone_config in zone_config_list
+    ]
+    for zone in zone_list:
+        logging.info("Initialize zone %s (pin: %d)", zone.name, zone.pin_no)
+        zone.valve.init()
+
+    return zone_list
+
+
+def get_zone_list():
+    return zone_list
+
+
+def get_zone(name):
+    """名前でゾーンを探す (name が None の場合は先頭のゾーン。無い場合は None)"""
+    for zone in zone_list:
+        if (name is None) or (zone.name == name):
+            return zone
+
+    return None
+
+
+def get_valve_list():
+    """
+    制御対象の電磁弁の一覧を返す
+
+    ゾーンを使わない場合は、Valve と同じ名前の関数を持つ unit_cooler.actuator.valve を返します。
+    """
+    if not zone_list:
+        return [unit_cooler.actuator.valve]
+
+    return [zone.valve for zone in zone_list]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+制御に使う時刻を提供します。
+
+通常は実時間 (RealClock) を使います。シミュレータでは VirtualClock に差し替えることで、
+コントローラ、アクチュエータのワーカ、電磁弁の Duty 制御、メトリクスの分・時の境界を、
+実時間を待たずに進めることができます。
+
+NOTE: テストで time.time や datetime.datetime.now をモックできるように、RealClock は
+呼び出しの度にそれらを参照します。
+"""
+
+import datetime
+import threading
+import time
+import zoneinfo
+
+TIMEZONE = zoneinfo.ZoneInfo("Asia/Tokyo")
+
+
+class RealClock:
+    """実時間"""
+
+    def timestamp(self):
+        return time.time()
+
+    def now(self):
+        return datetime.datetime.now(TIMEZONE)
+
+    def sleep(self, sec):
+        time.sleep(sec)
+
+    def wait(self, event, timeout):
+        return event.wait(timeout=timeout)
+
+
+class VirtualClock:
+    """
+    advance で進めた分だけ進む仮想時間
+
+    sleep と wait は待たずに、その時間だけ時刻を進めます。状態を示すファイル
+    (unit_cooler.footprint) の更新時刻も、ファイルを作らずにここで保持します。
+    """
+
+    def __init__(self, start):
+        """時刻 start (datetime) から始める"""
+        self.current = start.timestamp()
+        self.mtime_map = {}
+        self.lock = threading.Lock()
+
+    def timestamp(self):
+        return self.current
+
+    def now(self):
+        return datetime.datetime.fromtimestamp(self.current, TIMEZONE)
+
+    def advance(self, sec):
+        with self.lock:
+            self.current += sec
+
+    def move_to(self, timestamp):
+        """UNIX 時間 timestamp まで進める (過去には戻さない)"""
+        with self.lock:
+            self.current = max(self.current, timestamp)
+
+    def sleep(self, sec):
+        self.advance(sec)
+
+    def wait(self, event, timeout):
+        if event.is_set():
+            return True
+
+        self.advance(timeout)
+        return event.is_set()
+
+
+_clock = RealClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """使用する時刻を差し替え、元の時刻を返す"""
+    global _clock  # noqa: PLW0603
+
+    prev_clock = _clock
+    _clock = clock
+
+    return prev_clock
+
+
+def is_virtual():
+    return isinstance(_clock, VirtualClock)
+
+
+def timestamp():
+    """現在時刻の UNIX 時間 [秒] (time.time の代わり)"""
+    return _clock.timestamp()
+
+
+def now():
+    """現在時刻 (datetime.datetime.now(TIMEZONE) の代わり)"""
+    return _clock.now()
+
+
+def sleep(sec):
+    _clock.sleep(sec)
+
+
+def wait(event, timeout):
+    """イベント event が設定されるまで最大 timeout 秒待ち、設定されたかを返す"""
+    return _clock.wait(event, timeout)
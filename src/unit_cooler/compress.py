@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Flask のレスポンスを Accept-Encoding に応じて圧縮します。
+
+brotli モジュールがインストールされていれば br を優先し、無ければ gzip を使います。
+既に Content-Encoding が付いているレスポンス (プロキシで中継したものなど) はそのまま返します。
+"""
+
+import logging
+import zlib
+
+import flask
+
+try:
+    import brotli
+
+    _BROTLI_AVAILABLE = True
+except ImportError:
+    _BROTLI_AVAILABLE = False
+
+# サーバー側の優先順
+ENCODING_LIST = ["br", "gzip"] if _BROTLI_AVAILABLE else ["gzip"]
+
+# これより小さいレスポンスは圧縮しない
+COMPRESS_SIZE_MIN = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESS_MIMETYPE_LIST = [
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+]
+
+
+def negotiate(accept_encodings) -> str | None:
+    """Accept-Encoding から使用するエンコーディングを決める (圧縮しない場合は None)"""
+    return accept_encodings.best_match(ENCODING_LIST)
+
+
+def _compressor(encoding: str):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    if encoding == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress, compressor.flush
+
+    raise ValueError(f"Unsupported encoding: {encoding}")  # noqa: TRY003, EM102
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """データを圧縮"""
+    process, finish = _compressor(encoding)
+    return process(body) + finish()
+
+
+def compress_stream(chunk_iter, encoding: str):
+    """チャンク毎にデータを圧縮しながら返すジェネレータ"""
+    process, finish = _compressor(encoding)
+    for chunk in chunk_iter:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()  # noqa: PLW2901
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def is_compressible(response: flask.Response) -> bool:
+    """圧縮対象のレスポンスかどうか"""
+    if response.status_code != 200:
+        return False
+    if response.direct_passthrough or ("Content-Encoding" in response.headers):
+        return False
+
+    # NOTE: text/event-stream はイベント毎に届かないといけないので圧縮しない
+    return response.mimetype in COMPRESS_MIMETYPE_LIST
+
+
+def compress_response(response: flask.Response) -> flask.Response:
+    """after_request として登録し、レスポンスを圧縮する"""
+    if not is_compressible(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = negotiate(flask.request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # NOTE: 全体を組み立てずに、チャンク毎に圧縮して送る
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_SIZE_MIN:
+            return response
+        response.set_data(compress(body, encoding))
+
+    response.headers["Content-Encoding"] = encoding
+
+    # NOTE: 圧縮後は別の表現なので、強い ETag は弱い ETag にする
+    etag, is_weak = response.get_etag()
+    if (etag is not None) and not is_weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def init(app: flask.Flask) -> None:
+    """アプリのレスポンスを圧縮するように設定"""
+    app.after_request(compress_response)
+    logging.info("Response compression enabled: %s", ", ".join(ENCODING_LIST))
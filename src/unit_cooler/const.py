@@ -4,6 +4,11 @@ import enum
 import my_lib.webapp.log
 
 PUBSUB_CH = "unit_cooler"
+# NOTE: SUB はチャンネル名の前方一致で購読するので、PUBSUB_CH で始まらない名前にする
+PUBSUB_TELEMETRY_CH = "telemetry"
+
+# 制御メッセージの env に含めるセンサー値の並び
+ENV_KEY_LIST = ["temp", "humi", "lux", "solar_rad", "rain"]
 
 
 class LOG_LEVEL(enum.IntEnum):  # noqa: N801
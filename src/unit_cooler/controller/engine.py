@@ -10,13 +10,18 @@ Options:
   -D                : デバッグモードで動作します。
 """
 
-import copy
 import logging
 
+import my_lib.json_util
 import my_lib.notify.slack
 
+import unit_cooler.clock
+import unit_cooler.const
+import unit_cooler.controller.forecast
 import unit_cooler.controller.message
 import unit_cooler.controller.sensor
+import unit_cooler.controller.stabilizer
+import unit_cooler.exporter
 import unit_cooler.util
 
 # 最低でもこの時間は ON にする (テスト時含む)
@@ -62,11 +67,25 @@ def dummy_cooling_mode():
 dummy_cooling_mode.prev_mode = 0
 
 
-def judge_cooling_mode(config, sense_data):
-    logging.info("Judge cooling mode")
+def get_forecast_handle(config):
+    """予測の状態を返す (controller.forecast が設定されていない場合は None)"""
+    if "forecast" not in config["controller"]:
+        return None
+
+    if get_forecast_handle.handle is None:
+        get_forecast_handle.handle = unit_cooler.controller.forecast.gen_handle(
+            config["controller"]["forecast"]["horizon_min"]
+        )
+
+    return get_forecast_handle.handle
+
 
+get_forecast_handle.handle = None
+
+
+def _judge_cooling_mode(config, sense_data, threshold):
     try:
-        cooler_activity = unit_cooler.controller.sensor.get_cooler_activity(sense_data)
+        cooler_activity = unit_cooler.controller.sensor.get_cooler_activity(sense_data, threshold)
     except RuntimeError as e:
         unit_cooler.util.notify_error(config, e.args[0])
         cooler_activity = {"status": 0, "message": None}
@@ -75,9 +94,22 @@ def judge_cooling_mode(config, sense_data):
         outdoor_status = {"status": None, "message": None}
         cooling_mode = 0
     else:
-        outdoor_status = unit_cooler.controller.sensor.get_outdoor_status(sense_data)
+        outdoor_status = unit_cooler.controller.sensor.get_outdoor_status(sense_data, threshold)
         cooling_mode = max(cooler_activity["status"] + outdoor_status["status"], 0)
 
+    return {"cooling_mode": cooling_mode, "cooler_status": cooler_activity, "outdoor_status": outdoor_status}
+
+
+def judge_cooling_mode(config, sense_data):
+    logging.info("Judge cooling mode")
+
+    threshold = config["controller"].get("threshold")
+
+    mode = _judge_cooling_mode(config, sense_data, threshold)
+    cooling_mode = mode["cooling_mode"]
+    cooler_activity = mode["cooler_status"]
+    outdoor_status = mode["outdoor_status"]
+
     if cooler_activity["message"] is not None:
         logging.info(cooler_activity["message"])
     if outdoor_status["message"] is not None:
@@ -90,38 +122,213 @@ def judge_cooling_mode(config, sense_data):
         outdoor_status["status"],
     )
 
+    forecast = None
+    forecast_handle = get_forecast_handle(config)
+    if forecast_handle is not None:
+        unit_cooler.controller.forecast.update_sense_data(forecast_handle, sense_data)
+        forecast = _judge_cooling_mode(
+            config, unit_cooler.controller.forecast.predict_sense_data(forecast_handle, sense_data), threshold
+        )
+
+        # NOTE: 予測は冷却を早めに強めるためだけに使い、弱める方向には使わない
+        if forecast["cooling_mode"] > cooling_mode:
+            logging.info(
+                "%d 分後の予測に基づき冷却を強化します。(cooling_mode: %d → %d, cooler_status: %s)",
+                forecast_handle["horizon_min"],
+                cooling_mode,
+                forecast["cooling_mode"],
+                forecast["cooler_status"]["status"],
+            )
+            cooling_mode = forecast["cooling_mode"]
+
     return {
         "cooling_mode": cooling_mode,
         "cooler_status": cooler_activity,
         "outdoor_status": outdoor_status,
+        "forecast": forecast,
         "sense_data": sense_data,
     }
 
 
-def gen_control_msg(config, dummy_mode=False, speedup=1):
+def get_stabilizer_state(config):
+    """安定化の状態を返す (初回は保存したファイルから読み込む)"""
+    if get_stabilizer_state.state is None:
+        get_stabilizer_state.state = unit_cooler.controller.stabilizer.load_state(
+            config["controller"]["stabilize"]["file"]
+        )
+
+    return get_stabilizer_state.state
+
+
+get_stabilizer_state.state = None
+
+
+def stabilize_cooling_mode(config, sense_data, mode):
+    """
+    判定した冷却モードを、前回までの状態に基づいて安定化させる
+
+    controller.stabilize が設定されていない場合は、そのまま返します。
+    """
+    if "stabilize" not in config["controller"]:
+        return mode
+
+    stabilize_config = config["controller"]["stabilize"]
+    state = get_stabilizer_state(config)
+    prev_state = dict(state)
+    now = unit_cooler.clock.timestamp()
+
+    if unit_cooler.controller.stabilizer.is_stop(mode):
+        cooling_mode = unit_cooler.controller.stabilizer.force(state, mode["cooling_mode"], now)
+    else:
+        relaxed_mode = None
+        if (
+            ("hysteresis" in stabilize_config)
+            and (state["cooling_mode"] is not None)
+            and (mode["cooling_mode"] < state["cooling_mode"])
+        ):
+            relaxed_mode = _judge_cooling_mode(
+                config,
+                sense_data,
+                unit_cooler.controller.stabilizer.gen_relaxed_threshold(
+                    config["controller"].get("threshold"), stabilize_config["hysteresis"]
+                ),
+            )["cooling_mode"]
+
+        cooling_mode = unit_cooler.controller.stabilizer.update(
+            state,
+            mode["cooling_mode"],
+            relaxed_mode,
+            now,
+            stabilize_config.get("dwell_min", 0) * 60,
+            stabilize_config.get("step_max"),
+        )
+
+    if cooling_mode != mode["cooling_mode"]:
+        logging.info("cooling_mode: %d (安定化前: %d)", cooling_mode, mode["cooling_mode"])
+
+    if state != prev_state:
+        try:
+            unit_cooler.controller.stabilizer.save_state(stabilize_config["file"], state)
+        except Exception:
+            logging.exception("Failed to save stabilizer state")
+
+    return {**mode, "cooling_mode": cooling_mode, "judged_mode": mode["cooling_mode"]}
+
+
+def get_control_msg_template(dummy_mode=False, speedup=1):
+    """
+    モード毎の制御メッセージのひな形を返す
+
+    静的な部分は初回に生成して JSON にしておき、以降は使い回します。
+    返した値は共有しているので、変更しないこと。
+    """
+    message_list = unit_cooler.controller.message.CONTROL_MESSAGE_LIST
+    key = (dummy_mode, speedup)
+
+    # NOTE: CONTROL_MESSAGE_LIST が差し替えられた場合は作り直す
+    cache = get_control_msg_template.cache.get(key)
+    if (cache is not None) and (cache["source"] is message_list):
+        return cache["template_list"]
+
+    template_list = []
+    for mode_index, control_msg in enumerate(message_list):
+        duty = dict(control_msg["duty"])
+        if dummy_mode:
+            duty["on_sec"] = max(duty["on_sec"] / speedup, ON_SEC_MIN)
+            duty["off_sec"] = max(duty["off_sec"] / speedup, OFF_SEC_MIN)
+
+        # NOTE: 参考として、どのモードかも通知する
+        message = {"state": control_msg["state"], "duty": duty, "mode_index": mode_index}
+
+        template_list.append(
+            {
+                "message": message,
+                # NOTE: 動的な部分を後ろに追加できるよう、閉じ括弧を除いておく
+                "json_head": my_lib.json_util.dumps(message).rstrip()[:-1],
+            }
+        )
+
+    get_control_msg_template.cache[key] = {"source": message_list, "template_list": template_list}
+
+    return template_list
+
+
+get_control_msg_template.cache = {}
+
+
+def gen_env(sense_data):
+    """メトリクス用に、各種類の先頭のセンサーの値を ENV_KEY_LIST の順に並べる"""
+    return [
+        sense_data[key][0].get("value") if sense_data.get(key) else None
+        for key in unit_cooler.const.ENV_KEY_LIST
+    ]
+
+
+def gen_control_msg(config, dummy_mode=False, speedup=1, sense_data=None):
+    """
+    制御メッセージを生成する
+
+    sense_data を指定した場合は、InfluxDB から取得せずにそれを使って判定します。(シミュレータ用)
+    dummy_mode の場合は使いません。
+    """
     if dummy_mode:
         sense_data = {}
         mode = dummy_cooling_mode()
     else:
-        sense_data = unit_cooler.controller.sensor.get_sense_data(config)
-        mode = judge_cooling_mode(config, sense_data)
+        if sense_data is None:
+            sense_data = unit_cooler.controller.sensor.get_sense_data(config)
+        mode = stabilize_cooling_mode(config, sense_data, judge_cooling_mode(config, sense_data))
+
+    template_list = get_control_msg_template(dummy_mode, speedup)
+    mode_index = min(mode["cooling_mode"], len(template_list) - 1)
+
+    # NOTE: ひな形は共有しているので、浅いコピーに動的な部分を追加する。
+    # メトリクス用に、センサーデータも送る
+    control_msg = {
+        **template_list[mode_index]["message"],
+        "env": gen_env(sense_data),
+        "sense_data": sense_data,
+    }
 
-    mode_index = min(mode["cooling_mode"], len(unit_cooler.controller.message.CONTROL_MESSAGE_LIST) - 1)
+    logging.info(control_msg)
 
-    control_msg = copy.deepcopy(unit_cooler.controller.message.CONTROL_MESSAGE_LIST[mode_index])
+    unit_cooler.exporter.set_gauge(
+        f"{unit_cooler.exporter.PREFIX}_cooling_mode", mode_index, "Cooling mode", component="controller"
+    )
+    unit_cooler.exporter.inc_counter(
+        f"{unit_cooler.exporter.PREFIX}_control_message_total", "Number of generated control messages"
+    )
 
-    # NOTE: 参考として、どのモードかも通知する
-    control_msg["mode_index"] = mode_index
-    # NOTE: メトリクス用に、センサーデータも送る
-    control_msg["sense_data"] = sense_data
+    return control_msg
 
-    if dummy_mode:
-        control_msg["duty"]["on_sec"] = max(control_msg["duty"]["on_sec"] / speedup, ON_SEC_MIN)
-        control_msg["duty"]["off_sec"] = max(control_msg["duty"]["off_sec"] / speedup, OFF_SEC_MIN)
 
-    logging.info(control_msg)
+def encode_control_msg(control_msg, dummy_mode=False, speedup=1, with_sense_data=True):
+    """
+    制御メッセージを JSON にする (静的な部分はひな形で生成済みのものを使う)
 
-    return control_msg
+    with_sense_data が False の場合、センサーの詳細は含めずに数値のベクトル (env) のみを含めます。
+    """
+    template = get_control_msg_template(dummy_mode, speedup)[control_msg["mode_index"]]
+
+    json_str = "{head}, {key}: {value}".format(
+        head=template["json_head"],
+        key=my_lib.json_util.dumps("env"),
+        value=my_lib.json_util.dumps(control_msg["env"]),
+    )
+    if with_sense_data:
+        json_str += ", {key}: {value}".format(
+            key=my_lib.json_util.dumps("sense_data"),
+            value=my_lib.json_util.dumps(control_msg["sense_data"]),
+        )
+
+    return json_str + "}"
+
+
+def encode_telemetry_msg(control_msg):
+    """センサーの詳細をテレメトリ用のメッセージとして JSON にする"""
+    return my_lib.json_util.dumps(
+        {"mode_index": control_msg["mode_index"], "sense_data": control_msg["sense_data"]}
+    )
 
 
 if __name__ == "__main__":
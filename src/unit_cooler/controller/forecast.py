@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+センサー値の少し先の値を、Holt の線形トレンド法 (二重指数平滑化) で予測します。
+
+観測毎に水準とトレンドを更新するだけなので、1 回あたりの計算量は O(1) です。
+観測間隔が一定でなくても扱えるよう、平滑化係数は経過時間 [分] に応じて補正します。
+
+Usage:
+  forecast.py [-c CONFIG] [-m METRICS_DB] [-d DAYS] [-H HORIZON] [-D]
+
+Options:
+  -c CONFIG         : CONFIG を設定ファイルとして読み込んで実行します。[default: config.yaml]
+  -m METRICS_DB     : バックテストに使うメトリクスのデータベース。(省略時は設定ファイルの値)
+  -d DAYS           : 過去 DAYS 日分のメトリクスでバックテストします。[default: 30]
+  -H HORIZON        : HORIZON 分後の値を予測します。[default: 15]
+  -D                : デバッグモードで動作します。
+"""
+
+import datetime
+import logging
+
+# 1 分あたりの水準とトレンドの平滑化係数
+ALPHA = 0.3
+BETA = 0.05
+# これ未満の観測回数では予測しない
+SAMPLE_MIN = 10
+# 観測がこの時間より空いた場合は、学習し直す
+GAP_MAX_MIN = 30
+
+# 予測するセンサーの種類
+FORECAST_KIND_LIST = ["temp", "solar_rad", "power"]
+
+
+def gen_state():
+    return {"time": None, "level": None, "trend": 0.0, "count": 0}
+
+
+def update(state, time, value):
+    """観測値で予測の状態を更新"""
+    if value is None:
+        return
+
+    if (state["time"] is not None) and (time - state["time"]).total_seconds() / 60 > GAP_MAX_MIN:
+        state.update(gen_state())
+
+    if state["level"] is None:
+        state.update(time=time, level=value, trend=0.0, count=1)
+        return
+
+    dt = (time - state["time"]).total_seconds() / 60
+    if dt <= 0:
+        # NOTE: センサーの値が更新されていない
+        return
+
+    alpha = 1 - (1 - ALPHA) ** dt
+    beta = 1 - (1 - BETA) ** dt
+
+    level = alpha * value + (1 - alpha) * (state["level"] + state["trend"] * dt)
+    state["trend"] = beta * (level - state["level"]) / dt + (1 - beta) * state["trend"]
+    state["level"] = level
+    state["time"] = time
+    state["count"] += 1
+
+
+def predict(state, horizon_min):
+    """最後の観測から horizon_min 分後の値を予測 (学習が足りない場合は None)"""
+    if state["count"] < SAMPLE_MIN:
+        return None
+
+    return state["level"] + state["trend"] * horizon_min
+
+
+def gen_handle(horizon_min):
+    return {"horizon_min": horizon_min, "state": {}}
+
+
+def update_sense_data(handle, sense_data):
+    """sense_data の値で、センサー毎の予測の状態を更新"""
+    for kind in FORECAST_KIND_LIST:
+        for sensor in sense_data.get(kind, []):
+            if ("time" not in sensor) or (sensor["value"] is None):
+                continue
+
+            state = handle["state"].setdefault((kind, sensor["name"]), gen_state())
+            update(state, sensor["time"], sensor["value"])
+
+
+def predict_sense_data(handle, sense_data):
+    """
+    予測した値に置き換えた sense_data を返す
+
+    予測できないセンサーや、現在の値が不明なセンサーは元の値のままにします。
+    """
+    predicted = dict(sense_data)
+    for kind in FORECAST_KIND_LIST:
+        if kind not in sense_data:
+            continue
+
+        sensor_list = []
+        for sensor in sense_data[kind]:
+            state = handle["state"].get((kind, sensor["name"]))
+            value = (
+                None
+                if (state is None) or (sensor["value"] is None)
+                else predict(state, handle["horizon_min"])
+            )
+            if value is not None:
+                if kind != "temp":
+                    # NOTE: 日射量と消費電力は負にならない
+                    value = max(value, 0.0)
+                sensor = dict(sensor, value=value)  # noqa: PLW2901
+            sensor_list.append(sensor)
+
+        predicted[kind] = sensor_list
+
+    return predicted
+
+
+def backtest(minute_data, horizon_min):
+    """
+    メトリクスの 1 分毎のデータで予測の誤差を評価
+
+    同じモデルで 1 分毎に学習しながら horizon_min 分後を予測し、
+    平均絶対誤差を、現在の値をそのまま使った場合 (naive) と比較します。
+    """
+    metric_map = {"temp": "temperature", "solar_rad": "solar_radiation"}
+
+    value_map = {}
+    for row in minute_data:
+        time = datetime.datetime.fromisoformat(str(row["timestamp"]))
+        for kind, column in metric_map.items():
+            if row[column] is not None:
+                value_map.setdefault(kind, {})[time] = row[column]
+
+    result = {}
+    horizon = datetime.timedelta(minutes=horizon_min)
+    for kind, series in value_map.items():
+        state = gen_state()
+        error_list = []
+        naive_error_list = []
+        for time in sorted(series):
+            update(state, time, series[time])
+
+            actual = series.get(time + horizon)
+            value = predict(state, horizon_min)
+            if (actual is None) or (value is None):
+                continue
+            if kind != "temp":
+                value = max(value, 0.0)
+
+            error_list.append(abs(value - actual))
+            naive_error_list.append(abs(series[time] - actual))
+
+        result[kind] = {
+            "count": len(error_list),
+            "mae": sum(error_list) / len(error_list) if error_list else None,
+            "mae_naive": sum(naive_error_list) / len(naive_error_list) if naive_error_list else None,
+        }
+
+    return result
+
+
+if __name__ == "__main__":
+    # TEST Code
+    import docopt
+    import my_lib.config
+    import my_lib.logger
+    import my_lib.pretty
+
+    from unit_cooler.metrics.collector import TIMEZONE, MetricsCollector
+
+    args = docopt.docopt(__doc__)
+
+    config_file = args["-c"]
+    days = int(args["-d"])
+    horizon_min = int(args["-H"])
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("test", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    config = my_lib.config.load(config_file)
+    metrics_db_path = args["-m"] or config["actuator"]["metrics"]["data"]
+
+    end_time = datetime.datetime.now(TIMEZONE)
+    minute_data = MetricsCollector(metrics_db_path).get_minute_data(
+        end_time - datetime.timedelta(days=days), end_time
+    )
+
+    logging.info(my_lib.pretty.format(backtest(minute_data, horizon_min)))
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+過去のセンサーデータに対して冷却モードの判定をまとめて再現し、実際の制御と比較します。
+
+閾値を変更した場合の効果を、天候を待たずに確認するためのものです。
+controller.aggregate を設定している場合は、1 分毎の値から同じ期間の平均・最大値を求めて判定します。
+controller.forecast や controller.stabilize を設定している場合は、前回までの状態に依存するので、
+まとめて判定せずに engine と同じ処理で 1 分毎に順に判定します。
+
+Usage:
+  replay.py [-c CONFIG] -s START -e END [-m METRICS_DB] [-f FLOW] [-t THRESHOLD]... [-o OUTPUT] [-D]
+
+Options:
+  -c CONFIG         : CONFIG を設定ファイルとして読み込んで実行します。[default: config.yaml]
+  -s START          : 再現を開始する日時を ISO 8601 形式で指定します。
+  -e END            : 再現を終了する日時を ISO 8601 形式で指定します。
+  -m METRICS_DB     : 実際の制御と比較するメトリクスのデータベース。(省略時は設定ファイルの値)
+  -f FLOW           : 散水時の流量 [L/min]。省略時はメトリクスの流量から推定します。
+  -t THRESHOLD      : 閾値を NAME=VALUE の形式で上書きします。(例: TEMP_THRESHOLD_HIGH_L=31)
+  -o OUTPUT         : 結果の全体を JSON 形式で OUTPUT に書き出します。
+  -D                : デバッグモードで動作します。
+"""
+
+import copy
+import datetime
+import logging
+import pathlib
+import tempfile
+
+import my_lib.sensor_data
+import my_lib.time
+import numpy as np
+
+import unit_cooler.clock
+import unit_cooler.controller.engine
+import unit_cooler.controller.message
+import unit_cooler.controller.rule
+import unit_cooler.controller.sensor
+from unit_cooler.metrics.collector import MetricsCollector
+
+# NOTE: 実際の制御では過去一時間の最新値を使うので、欠損はこの時間まで直前の値で埋める
+FILL_LIMIT_MIN = 60
+
+# 前回までの状態に依存する判定の設定
+STATEFUL_KEY_LIST = ["forecast", "stabilize"]
+
+
+def get_on_ratio_list():
+    """制御モード毎の ON 時間の比率"""
+    on_ratio_list = []
+    for control_msg in unit_cooler.controller.message.CONTROL_MESSAGE_LIST:
+        duty = control_msg["duty"]
+        total = duty["on_sec"] + duty["off_sec"]
+        on_ratio_list.append(duty["on_sec"] / total if duty["enable"] and (total != 0) else 0.0)
+
+    return np.array(on_ratio_list)
+
+
+def _last_index(value, limit):
+    """各位置で、NaN でない直前の値の位置 (limit 個より離れている場合は -1)"""
+    index = np.arange(value.shape[-1])
+    last = np.where(np.isnan(value), -1, index)
+    last = np.maximum.accumulate(last, axis=-1)
+
+    return np.where((last >= 0) & (index - last <= limit), last, -1)
+
+
+def _fill_forward(value, limit):
+    """NaN を直前の値で埋める (limit 個より離れている場合は埋めない)"""
+    last = _last_index(value, limit)
+    filled = np.take_along_axis(value, np.maximum(last, 0), axis=-1)
+
+    return np.where(last >= 0, filled, np.nan)
+
+
+def _aggregate_window(value, last_value, aggregate):
+    """
+    get_sense_data の集計と同じく、直近 window_min 分間 (その時刻を含む) の平均もしくは最大値を求める
+
+    期間内に値が無い場合は、最新の値 (last_value) を使います。
+    """
+    stat = aggregate.get("value", "mean")
+    if stat == "last":
+        return last_value
+
+    window_min = aggregate["window_min"]
+    padded = np.concatenate((np.full((value.shape[0], window_min - 1), np.nan), value), axis=-1)
+    window = np.lib.stride_tricks.sliding_window_view(padded, window_min, axis=-1)
+    is_valid = ~np.isnan(window)
+    count = is_valid.sum(axis=-1)
+
+    if stat == "max":
+        stat_value = np.where(is_valid, window, -np.inf).max(axis=-1)
+    else:
+        stat_value = np.where(is_valid, window, 0).sum(axis=-1) / np.maximum(count, 1)
+
+    return np.where(count > 0, stat_value, last_value)
+
+
+def _to_minute(time):
+    return int(time.timestamp()) // 60
+
+
+def gen_time_grid(start, end):
+    """期間中の 1 分毎の時刻 (UNIX 時間 [分])"""
+    return np.arange(_to_minute(start), _to_minute(end), dtype=np.int64)
+
+
+def fetch_history(config, start, end):
+    """
+    期間中のセンサーデータを 1 分毎の配列として取得
+
+    センサーの種類毎に (センサー数, 分数) の配列を返します。取得できなかった値は NaN になります。
+    controller.aggregate を指定した種類は、集計した値になります。判定に使った最新の値の時刻
+    (UNIX 時間 [分]、無い場合は -1) も、sample_time に同じ形の配列で返します。
+    """
+    zoneinfo = my_lib.time.get_zoneinfo()
+    time_grid = gen_time_grid(start, end)
+    aggregate_config = config["controller"].get("aggregate", {})
+
+    # NOTE: 取得範囲の最初の値が欠損しないよう、埋める分や集計する分だけ前から取得する
+    lead_min = max([FILL_LIMIT_MIN] + [aggregate["window_min"] for aggregate in aggregate_config.values()])
+    fetch_start = start - datetime.timedelta(minutes=lead_min)
+    base_minute = _to_minute(fetch_start)
+
+    history = {"time": time_grid, "sample_time": {}}
+    for kind in config["controller"]["sensor"]:
+        sensor_list = config["controller"]["sensor"][kind]
+        kind_value = np.full((len(sensor_list), lead_min + len(time_grid)), np.nan)
+
+        for i, sensor in enumerate(sensor_list):
+            data = my_lib.sensor_data.fetch_data(
+                config["controller"]["influxdb"],
+                sensor["measure"],
+                sensor["hostname"],
+                kind,
+                fetch_start.isoformat(),
+                end.isoformat(),
+                every_min=1,
+                window_min=1,
+                create_empty=False,
+            )
+            if not data["valid"]:
+                logging.warning("Failed to fetch history of %s", sensor["name"])
+                continue
+
+            minute = np.array([_to_minute(time.replace(tzinfo=zoneinfo)) for time in data["time"]])
+            value = np.array([np.nan if value is None else value for value in data["value"]], dtype=float)
+            if kind == "rain":
+                # NOTE: 観測している雨量は1分間の降水量なので、1時間雨量に換算
+                value *= 60
+
+            index = minute - base_minute
+            is_target = (index >= 0) & (index < kind_value.shape[1])
+            kind_value[i, index[is_target]] = value[is_target]
+
+        fill_limit = FILL_LIMIT_MIN
+        if kind in aggregate_config:
+            # NOTE: get_sense_data と同じく、最新の値は集計する期間以上は遡って探す
+            fill_limit = max(FILL_LIMIT_MIN, aggregate_config[kind]["window_min"])
+
+        last = _last_index(kind_value, fill_limit)
+        value = np.where(last >= 0, np.take_along_axis(kind_value, np.maximum(last, 0), axis=-1), np.nan)
+        if kind in aggregate_config:
+            value = _aggregate_window(kind_value, value, aggregate_config[kind])
+
+        history[kind] = value[:, lead_min:]
+        history["sample_time"][kind] = np.where(last >= 0, last + base_minute, -1)[:, lead_min:]
+
+    return history
+
+
+def judge_cooler_status_batch(history, compiled):
+    """get_cooler_activity の判定を全時刻に対してまとめて行う"""
+    threshold = compiled["threshold"]
+    temp = history["temp"][0]
+    power = history["power"]
+
+    # NOTE: NaN との比較は False になるので、消費電力が不明なエアコンは OFF とみなされる
+    is_cooling = temp >= threshold["AIRCON_TEMP_THRESHOLD"]
+    is_full = is_cooling & (power > threshold["AIRCON_POWER_THRESHOLD_FULL"])
+    is_normal = is_cooling & (power > threshold["AIRCON_POWER_THRESHOLD_NORMAL"]) & ~is_full
+    is_idle = is_cooling & (power > threshold["AIRCON_POWER_THRESHOLD_WORK"]) & ~is_full & ~is_normal
+
+    cooler_status = unit_cooler.controller.rule.judge_batch(
+        compiled["cooler"],
+        {"full": is_full.sum(axis=0), "normal": is_normal.sum(axis=0), "idle": is_idle.sum(axis=0)},
+        0,
+    )
+
+    # NOTE: 外気温が不明な場合、実際の制御ではエラー通知した上で停止する
+    return np.where(np.isnan(temp), 0, cooler_status)
+
+
+def judge_outdoor_status_batch(history, compiled):
+    """get_outdoor_status の判定を全時刻に対してまとめて行う"""
+    value_map = {key: history[key][0] for key in unit_cooler.controller.sensor.OUTDOOR_KEY_LIST}
+
+    outdoor_status = unit_cooler.controller.rule.judge_batch(compiled["outdoor"], value_map, 0)
+
+    is_senser_valid = ~np.logical_or.reduce(
+        [np.isnan(value_map[key]) for key in ["temp", "humi", "solar_rad", "lux"]]
+    )
+
+    return np.where(is_senser_valid, outdoor_status, -10)
+
+
+def judge_cooling_mode_batch(history, threshold=None):
+    """judge_cooling_mode の判定を全時刻に対してまとめて行う"""
+    compiled = unit_cooler.controller.sensor.compile_rule(threshold)
+
+    cooler_status = judge_cooler_status_batch(history, compiled)
+    outdoor_status = judge_outdoor_status_batch(history, compiled)
+
+    cooling_mode = np.where(cooler_status == 0, 0, np.maximum(cooler_status + outdoor_status, 0))
+    mode_index = np.minimum(cooling_mode, len(unit_cooler.controller.message.CONTROL_MESSAGE_LIST) - 1)
+
+    return {
+        "cooler_status": cooler_status,
+        "outdoor_status": outdoor_status,
+        "cooling_mode": cooling_mode,
+        "mode_index": mode_index,
+    }
+
+
+def is_stateful(config):
+    """予測や安定化など、前回までの状態に依存する判定が設定されているか"""
+    return any(key in config["controller"] for key in STATEFUL_KEY_LIST)
+
+
+def gen_sense_data(config, history, index):
+    """指定した番目の時刻のセンサーデータを、get_sense_data と同じ形式で返す"""
+    zoneinfo = my_lib.time.get_zoneinfo()
+
+    sense_data = {}
+    for kind, sensor_list in config["controller"]["sensor"].items():
+        kind_data = []
+        for i, sensor in enumerate(sensor_list):
+            value = history[kind][i, index]
+            sensor_data = {"name": sensor["name"], "value": None if np.isnan(value) else float(value)}
+
+            sample_time = int(history["sample_time"][kind][i, index])
+            if sample_time >= 0:
+                sensor_data["time"] = datetime.datetime.fromtimestamp(sample_time * 60, zoneinfo)
+
+            kind_data.append(sensor_data)
+        sense_data[kind] = kind_data
+
+    return sense_data
+
+
+def judge_cooling_mode_engine(config, history, threshold=None):
+    """
+    予測による強化と安定化を含め、engine と同じ処理で 1 分毎に順に判定する
+
+    時刻は VirtualClock で各時刻に進めます。安定化の状態は一時ディレクトリに保存し、予測と安定化の
+    状態は終了後に元に戻すので、同じプロセスで動作しているコントローラには影響しません。
+    """
+    engine = unit_cooler.controller.engine
+    zoneinfo = my_lib.time.get_zoneinfo()
+    time_grid = history["time"]
+    mode_count = len(unit_cooler.controller.message.CONTROL_MESSAGE_LIST)
+
+    config = copy.deepcopy(config)
+    # NOTE: 外気温が不明な時刻でエラー通知しないようにする
+    config.pop("slack", None)
+    if threshold is not None:
+        config["controller"]["threshold"] = threshold
+
+    cooling_mode = np.zeros(len(time_grid), dtype=np.int64)
+
+    prev_forecast_handle = engine.get_forecast_handle.handle
+    prev_stabilizer_state = engine.get_stabilizer_state.state
+    prev_disable = logging.root.manager.disable
+    clock = unit_cooler.clock.VirtualClock(datetime.datetime.fromtimestamp(0, zoneinfo))
+    prev_clock = unit_cooler.clock.set_clock(clock)
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if "stabilize" in config["controller"]:
+                config["controller"]["stabilize"]["file"] = str(pathlib.Path(temp_dir) / "stabilize.json")
+
+            engine.get_forecast_handle.handle = None
+            engine.get_stabilizer_state.state = None
+            # NOTE: 1 分毎に判定の詳細がログ出力されるので抑制する
+            logging.disable(logging.INFO)
+
+            for index, minute in enumerate(time_grid):
+                clock.move_to(int(minute) * 60)
+                sense_data = gen_sense_data(config, history, index)
+                mode = engine.stabilize_cooling_mode(
+                    config, sense_data, engine.judge_cooling_mode(config, sense_data)
+                )
+                cooling_mode[index] = mode["cooling_mode"]
+    finally:
+        logging.disable(prev_disable)
+        unit_cooler.clock.set_clock(prev_clock)
+        engine.get_forecast_handle.handle = prev_forecast_handle
+        engine.get_stabilizer_state.state = prev_stabilizer_state
+
+    return {"cooling_mode": cooling_mode, "mode_index": np.minimum(cooling_mode, mode_count - 1)}
+
+
+def gen_timeline(time_grid, value):
+    """値が変化した所で区切った期間のリスト"""
+    if len(time_grid) == 0:
+        return []
+
+    zoneinfo = my_lib.time.get_zoneinfo()
+    change = np.flatnonzero(np.diff(value)) + 1
+    start_list = np.concatenate(([0], change))
+    end_list = np.concatenate((change, [len(value)]))
+
+    return [
+        {
+            "start": datetime.datetime.fromtimestamp(int(time_grid[start]) * 60, zoneinfo).isoformat(),
+            "end": datetime.datetime.fromtimestamp((int(time_grid[end - 1]) + 1) * 60, zoneinfo).isoformat(),
+            "minutes": int(end - start),
+            "value": value[start].item(),
+        }
+        for start, end in zip(start_list, end_list, strict=True)
+    ]
+
+
+def load_actual(metrics_db_path, time_grid):
+    """メトリクスに記録された、実際の制御モードと Duty 比、流量を 1 分毎の配列にする"""
+    zoneinfo = my_lib.time.get_zoneinfo()
+    actual = {key: np.full(len(time_grid), np.nan) for key in ["mode_index", "duty_ratio", "flow"]}
+    if len(time_grid) == 0:
+        return actual
+
+    minute_data = MetricsCollector(metrics_db_path).get_minute_data(
+        datetime.datetime.fromtimestamp(int(time_grid[0]) * 60, zoneinfo),
+        datetime.datetime.fromtimestamp(int(time_grid[-1]) * 60, zoneinfo),
+    )
+
+    for row in minute_data:
+        timestamp = datetime.datetime.fromisoformat(str(row["timestamp"]))
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=zoneinfo)
+
+        index = _to_minute(timestamp) - time_grid[0]
+        if (index < 0) or (index >= len(time_grid)) or (row["cooling_mode"] is None):
+            continue
+
+        actual["mode_index"][index] = row["cooling_mode"]
+        # NOTE: Duty 制御が無効なモードでは duty_ratio は記録されない
+        actual["duty_ratio"][index] = 0.0 if row["duty_ratio"] is None else row["duty_ratio"]
+        if row["flow_value"] is not None:
+            actual["flow"][index] = row["flow_value"]
+
+    return actual
+
+
+def estimate_flow_rate(actual):
+    """メトリクスに記録された、散水中の流量の中央値 [L/min]"""
+    flow = actual["flow"][actual["flow"] > 0]
+
+    return float(np.median(flow)) if len(flow) != 0 else None
+
+
+def estimate_watering(on_min, flow_rate):
+    """散水時間 [分] と流量から、散水量 [L] を見積もる"""
+    return {
+        "on_min": float(on_min),
+        "amount": None if flow_rate is None else float(on_min * flow_rate),
+    }
+
+
+def compare(time_grid, mode_index, actual):
+    """再現した制御モードと、実際の制御モードを比較"""
+    mode_count = len(unit_cooler.controller.message.CONTROL_MESSAGE_LIST)
+    is_known = ~np.isnan(actual["mode_index"])
+
+    replay_mode = mode_index[is_known]
+    actual_mode = actual["mode_index"][is_known].astype(np.int64)
+
+    confusion = np.zeros((mode_count, mode_count), dtype=np.int64)
+    np.add.at(confusion, (replay_mode, np.clip(actual_mode, 0, mode_count - 1)), 1)
+
+    # NOTE: 比較できない時刻は -1 として、差分が続いている期間を求める
+    delta = np.where(is_known, mode_index - np.nan_to_num(actual["mode_index"]).astype(np.int64), 0)
+    state = np.where(is_known, (mode_index * mode_count + np.nan_to_num(actual["mode_index"])), -1)
+    diff_list = [
+        {
+            "start": period["start"],
+            "end": period["end"],
+            "minutes": period["minutes"],
+            "replay": period["value"] // mode_count,
+            "actual": period["value"] % mode_count,
+        }
+        for period in gen_timeline(time_grid, state.astype(np.int64))
+        if (period["value"] >= 0) and (period["value"] // mode_count != period["value"] % mode_count)
+    ]
+
+    return {
+        "minutes": int(is_known.sum()),
+        "match_minutes": int((replay_mode == actual_mode).sum()),
+        "match_rate": float((replay_mode == actual_mode).mean()) if len(replay_mode) != 0 else None,
+        "mode_delta_mean": float(delta[is_known].mean()) if len(replay_mode) != 0 else None,
+        "confusion": confusion.tolist(),
+        "diff": diff_list,
+    }
+
+
+def evaluate(history, actual, threshold=None, flow_rate=None, config=None):
+    """
+    取得済みのセンサーデータとメトリクスに対して、判定の再現と比較を行う
+
+    config を指定し、予測や安定化が設定されている場合は、engine と同じ処理で 1 分毎に順に判定します。
+    """
+    time_grid = history["time"]
+    stateful = (config is not None) and is_stateful(config)
+    if stateful:
+        mode = judge_cooling_mode_engine(config, history, threshold)
+    else:
+        mode = judge_cooling_mode_batch(history, threshold)
+    on_ratio = get_on_ratio_list()
+
+    if flow_rate is None:
+        flow_rate = estimate_flow_rate(actual)
+
+    is_known = ~np.isnan(actual["mode_index"])
+    mode_count = len(unit_cooler.controller.message.CONTROL_MESSAGE_LIST)
+
+    return {
+        "minutes": len(time_grid),
+        "stateful": stateful,
+        "flow_rate": flow_rate,
+        "mode_minutes": np.bincount(mode["mode_index"], minlength=mode_count).tolist(),
+        "timeline": gen_timeline(time_grid, mode["mode_index"]),
+        "watering": {
+            "replay": estimate_watering(on_ratio[mode["mode_index"]].sum(), flow_rate),
+            # NOTE: 実際の制御と同じ時刻の範囲で比較できるよう、記録がある時刻のみ集計したものも返す
+            "replay_recorded": estimate_watering(on_ratio[mode["mode_index"][is_known]].sum(), flow_rate),
+            "actual": estimate_watering(np.nansum(actual["duty_ratio"]), flow_rate),
+        },
+        "compare": compare(time_grid, mode["mode_index"], actual),
+    }
+
+
+def replay(config, start, end, threshold=None, metrics_db_path=None, flow_rate=None):  # noqa: PLR0913
+    """期間中の制御を再現し、実際の制御と比較"""
+    if metrics_db_path is None:
+        metrics_db_path = config["actuator"]["metrics"]["data"]
+
+    # NOTE: 設定ファイルで上書きしている閾値に、さらに指定されたものを上書きする
+    threshold = {**config["controller"].get("threshold", {}), **(threshold or {})}
+
+    history = fetch_history(config, start, end)
+    actual = load_actual(metrics_db_path, history["time"])
+
+    return evaluate(history, actual, threshold, flow_rate, config)
+
+
+def parse_threshold(arg_list):
+    """NAME=VALUE 形式の閾値の指定を解釈"""
+    threshold = {}
+    for arg in arg_list:
+        name, sep, value = arg.partition("=")
+        if sep == "":
+            raise ValueError(f"Invalid threshold: {arg}")  # noqa: TRY003, EM102
+        threshold[name.strip()] = float(value)
+
+    return threshold
+
+
+if __name__ == "__main__":
+    # TEST Code
+    import json
+    import time
+
+    import docopt
+    import my_lib.config
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    config_file = args["-c"]
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("test", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    config = my_lib.config.load(config_file)
+    zoneinfo = my_lib.time.get_zoneinfo()
+
+    start = datetime.datetime.fromisoformat(args["-s"])
+    end = datetime.datetime.fromisoformat(args["-e"])
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=zoneinfo)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=zoneinfo)
+
+    start_time = time.perf_counter()
+    result = replay(
+        config,
+        start,
+        end,
+        parse_threshold(args["-t"]),
+        args["-m"],
+        None if args["-f"] is None else float(args["-f"]),
+    )
+    logging.info(
+        "Replayed %s minutes in %.2f sec", f"{result['minutes']:,}", time.perf_counter() - start_time
+    )
+
+    for mode_index, minutes in enumerate(result["mode_minutes"]):
+        logging.info("mode %d: %s min", mode_index, f"{minutes:,}")
+    for kind, watering in result["watering"].items():
+        logging.info(
+            "watering (%s): %s min, %s L",
+            kind,
+            f"{watering['on_min']:,.1f}",
+            "?" if watering["amount"] is None else f"{watering['amount']:,.1f}",
+        )
+    if result["compare"]["match_rate"] is not None:
+        logging.info(
+            "match rate: %.1f%% (%s / %s min)",
+            result["compare"]["match_rate"] * 100,
+            f"{result['compare']['match_minutes']:,}",
+            f"{result['compare']['minutes']:,}",
+        )
+    for diff in result["compare"]["diff"][:20]:
+        logging.info(
+            "%s - %s: replay %d, actual %d", diff["start"], diff["end"], diff["replay"], diff["actual"]
+        )
+
+    if args["-o"] is not None:
+        with pathlib.Path(args["-o"]).open("w") as f:
+            json.dump(result, f, ensure_ascii=False, indent=4)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+表形式で定義した判定ルールを、評価用の形式に変換して評価します。
+
+ルールは次の形式の dict で、一覧の先頭から順に評価して最初に条件を満たしたものを採用します。
+
+    {
+        "condition": [("temp", ">", "TEMP_THRESHOLD_MID"), ("lux", "<", "LUX_THRESHOLD")],
+        "message": "外気温 ({temp:.1f} ℃) が {TEMP_THRESHOLD_MID:.1f} ℃ より高い...",
+        "status": -1,
+    }
+
+condition の各項目は (値の名前, 比較演算子, 閾値) で、全てを満たす場合に条件成立とします。
+閾値には数値か、閾値の名前を指定します。condition が空の場合は常に成立します。
+message は条件を満たした場合にのみ、値と閾値を使って整形します。
+"""
+
+import operator
+
+import numpy as np
+
+OPERATOR_MAP = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+}
+
+
+class _Placeholder:
+    def __init__(self, key):
+        self.key = key
+
+    def __format__(self, spec):
+        return "{" + self.key + (":" + spec if spec else "") + "}"
+
+
+class _PartialMap(dict):
+    # NOTE: 値の項目は整形せずに、そのまま残す
+    def __missing__(self, key):
+        return _Placeholder(key)
+
+
+def compile_rule_list(rule_list, threshold):
+    """ルールの一覧を、閾値を解決した評価用の形式に変換"""
+    return [
+        {
+            "term_list": [
+                (key, OPERATOR_MAP[op], threshold[ref] if isinstance(ref, str) else ref)
+                for key, op, ref in rule["condition"]
+            ],
+            # NOTE: 閾値の部分は先に整形しておく
+            "message": rule["message"].format_map(_PartialMap(threshold)),
+            "status": rule["status"],
+        }
+        for rule in rule_list
+    ]
+
+
+def judge(compiled, value_map):
+    """
+    最初に条件を満たしたルールを返す (満たすものが無い場合は None)
+
+    value_map は値の名前をキーとする dict です。値が None の項目は条件を満たさないものとします。
+    """
+    for rule in compiled:
+        for key, op, ref in rule["term_list"]:
+            value = value_map[key]
+            if (value is None) or not op(value, ref):
+                break
+        else:
+            return rule
+
+    return None
+
+
+def judge_batch(compiled, value_map, default):
+    """
+    NumPy の配列に対してまとめて判定し、各要素で採用されたルールの status を返す
+
+    条件を満たすルールが無い要素は default になります。NaN の要素は条件を満たさないものとします。
+    """
+    shape = np.broadcast(*value_map.values()).shape
+
+    condition_list = []
+    for rule in compiled:
+        condition = np.ones(shape, dtype=bool)
+        for key, op, ref in rule["term_list"]:
+            condition &= op(value_map[key], ref)
+        condition_list.append(condition)
+
+    return np.select(condition_list, [rule["status"] for rule in compiled], default=default)
+
+
+def format_message(rule, value_map):
+    """ルールのメッセージを整形"""
+    return rule["message"].format(**value_map)
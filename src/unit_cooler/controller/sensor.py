@@ -10,18 +10,23 @@ Options:
   -D                : デバッグモードで動作します。
 """
 
+import functools
 import logging
 import os
 
+import influxdb_client
 import my_lib.notify.slack
 import my_lib.sensor_data
 import my_lib.time
 
 import unit_cooler.const
 import unit_cooler.controller.message
+import unit_cooler.controller.rule
+import unit_cooler.exporter
 
 ############################################################
-# 屋外の状況を判断する際に参照する閾値 (判定対象は過去一時間の平均)
+# 屋外の状況を判断する際に参照する閾値
+# (判定対象は最新の値。controller.aggregate を指定した種類は、その期間の平均か最大値)
 #
 # 屋外の照度がこの値未満の場合、冷却の強度を弱める
 LUX_THRESHOLD = 300
@@ -54,187 +59,215 @@ AIRCON_POWER_THRESHOLD_FULL = 900
 # エアコンの冷房動作と判定する温度閾値(min)
 AIRCON_TEMP_THRESHOLD = 20
 
+# 設定ファイルの controller.threshold で上書きできる閾値
+THRESHOLD_NAME_LIST = [
+    "LUX_THRESHOLD",
+    "SOLAR_RAD_THRESHOLD_LOW",
+    "SOLAR_RAD_THRESHOLD_HIGH",
+    "SOLAR_RAD_THRESHOLD_DAYTIME",
+    "HUMI_THRESHOLD",
+    "TEMP_THRESHOLD_HIGH_H",
+    "TEMP_THRESHOLD_HIGH_L",
+    "TEMP_THRESHOLD_MID",
+    "RAIN_THRESHOLD_MID",
+    "AIRCON_POWER_THRESHOLD_WORK",
+    "AIRCON_POWER_THRESHOLD_NORMAL",
+    "AIRCON_POWER_THRESHOLD_FULL",
+    "AIRCON_TEMP_THRESHOLD",
+]
+
+# 値を上げると冷却を強める方向に働く閾値 (それ以外は値を下げると冷却を強める方向に働く)
+THRESHOLD_RAISE_TO_COOL_LIST = ["HUMI_THRESHOLD", "RAIN_THRESHOLD_MID"]
+
+# NOTE: ルールの形式は unit_cooler.controller.rule を参照。
+# 値はそれぞれの状態のエアコンの台数
 COOLER_ACTIVITY_LIST = [
     {
-        "judge": lambda mode_map: mode_map[unit_cooler.const.AIRCON_MODE.FULL] >= 2,
+        "condition": [("full", ">=", 2)],
         "message": "2 台以上のエアコンがフル稼働しています。(cooler_status: 6)",
         "status": 6,
     },
     {
-        "judge": lambda mode_map: (mode_map[unit_cooler.const.AIRCON_MODE.FULL] >= 1)
-        and (mode_map[unit_cooler.const.AIRCON_MODE.NORMAL] >= 1),
+        "condition": [("full", ">=", 1), ("normal", ">=", 1)],
         "message": "複数台ののエアコンがフル稼働もしくは平常運転しています。(cooler_status: 5)",
         "status": 5,
     },
     {
-        "judge": lambda mode_map: mode_map[unit_cooler.const.AIRCON_MODE.FULL] >= 1,
+        "condition": [("full", ">=", 1)],
         "message": "1 台以上のエアコンがフル稼働しています。(cooler_status: 4)",
         "status": 4,
     },
     {
-        "judge": lambda mode_map: mode_map[unit_cooler.const.AIRCON_MODE.NORMAL] >= 2,
+        "condition": [("normal", ">=", 2)],
         "message": "2 台以上のエアコンが平常運転しています。(cooler_status: 4)",
         "status": 4,
     },
     {
-        "judge": lambda mode_map: mode_map[unit_cooler.const.AIRCON_MODE.NORMAL] >= 1,
+        "condition": [("normal", ">=", 1)],
         "message": "1 台以上のエアコンが平常運転しています。(cooler_status: 3)",
         "status": 3,
     },
     {
-        "judge": lambda mode_map: mode_map[unit_cooler.const.AIRCON_MODE.IDLE] >= 2,
+        "condition": [("idle", ">=", 2)],
         "message": "2 台以上のエアコンがアイドル運転しています。(cooler_status: 2)",
         "status": 2,
     },
     {
-        "judge": lambda mode_map: mode_map[unit_cooler.const.AIRCON_MODE.IDLE] >= 1,
+        "condition": [("idle", ">=", 1)],
         "message": "1 台以上のエアコンがアイドル運転しています。(cooler_status: 1)",
         "status": 1,
     },
     {
-        "judge": lambda mode_map: True,  # noqa: ARG005
+        "condition": [],
         "message": "エアコンは稼働していません。(cooler_status: 0)",
         "status": 0,
     },
 ]
 
 
+# NOTE: 値はそれぞれの種類の先頭のセンサーの値
 OUTDOOR_CONDITION_LIST = [
     {
-        "judge": lambda sense_data: sense_data["rain"][0]["value"] > RAIN_THRESHOLD_MID,
-        "message": lambda sense_data: (
-            "雨が降っているので ({rain:.1f} mm/h) 冷却を停止します。(outdoor_status: -4)"
-        ).format(rain=sense_data["rain"][0]["value"]),
+        "condition": [("rain", ">", "RAIN_THRESHOLD_MID")],
+        "message": "雨が降っているので ({rain:.1f} mm/h) 冷却を停止します。(outdoor_status: -4)",
         "status": -4,
     },
     {
-        "judge": lambda sense_data: sense_data["humi"][0]["value"] > HUMI_THRESHOLD,
-        "message": lambda sense_data: (
-            "湿度 ({humi:.1f} %) が " + "{threshold:.1f} % より高いので冷却を停止します。(outdoor_status: -4)"
-        ).format(humi=sense_data["humi"][0]["value"], threshold=HUMI_THRESHOLD),
+        "condition": [("humi", ">", "HUMI_THRESHOLD")],
+        "message": (
+            "湿度 ({humi:.1f} %) が {HUMI_THRESHOLD:.1f} % より高いので冷却を停止します。(outdoor_status: -4)"
+        ),
         "status": -4,
     },
     {
-        "judge": lambda sense_data: (sense_data["temp"][0]["value"] > TEMP_THRESHOLD_HIGH_H)
-        and (sense_data["solar_rad"][0]["value"] > SOLAR_RAD_THRESHOLD_DAYTIME),
-        "message": lambda sense_data: (
+        "condition": [
+            ("temp", ">", "TEMP_THRESHOLD_HIGH_H"),
+            ("solar_rad", ">", "SOLAR_RAD_THRESHOLD_DAYTIME"),
+        ],
+        "message": (
             "日射量 ({solar_rad:,.0f} W/m^2) が "
-            "{solar_rad_threshold:,.0f} W/m^2 より大きく、"
+            "{SOLAR_RAD_THRESHOLD_DAYTIME:,.0f} W/m^2 より大きく、"
             "外気温 ({temp:.1f} ℃) が "
-            "{threshold:.1f} ℃ より高いので冷却を大きく強化します。(outdoor_status: 3)"
-        ).format(
-            solar_rad=sense_data["solar_rad"][0]["value"],
-            solar_rad_threshold=SOLAR_RAD_THRESHOLD_DAYTIME,
-            temp=sense_data["temp"][0]["value"],
-            threshold=TEMP_THRESHOLD_HIGH_H,
+            "{TEMP_THRESHOLD_HIGH_H:.1f} ℃ より高いので冷却を大きく強化します。(outdoor_status: 3)"
         ),
         "status": 3,
     },
     {
-        "judge": lambda sense_data: (sense_data["temp"][0]["value"] > TEMP_THRESHOLD_HIGH_L)
-        and (sense_data["solar_rad"][0]["value"] > SOLAR_RAD_THRESHOLD_DAYTIME),
-        "message": lambda sense_data: (
+        "condition": [
+            ("temp", ">", "TEMP_THRESHOLD_HIGH_L"),
+            ("solar_rad", ">", "SOLAR_RAD_THRESHOLD_DAYTIME"),
+        ],
+        "message": (
             "日射量 ({solar_rad:,.0f} W/m^2) が "
-            "{solar_rad_threshold:,.0f} W/m^2 より大きく、"
+            "{SOLAR_RAD_THRESHOLD_DAYTIME:,.0f} W/m^2 より大きく、"
             "外気温 ({temp:.1f} ℃) が "
-            "{threshold:.1f} ℃ より高いので冷却を強化します。(outdoor_status: 2)"
-        ).format(
-            solar_rad=sense_data["solar_rad"][0]["value"],
-            solar_rad_threshold=SOLAR_RAD_THRESHOLD_DAYTIME,
-            temp=sense_data["temp"][0]["value"],
-            threshold=TEMP_THRESHOLD_HIGH_L,
+            "{TEMP_THRESHOLD_HIGH_L:.1f} ℃ より高いので冷却を強化します。(outdoor_status: 2)"
         ),
         "status": 2,
     },
     {
-        "judge": lambda sense_data: sense_data["solar_rad"][0]["value"] > SOLAR_RAD_THRESHOLD_HIGH,
-        "message": lambda sense_data: (
+        "condition": [("solar_rad", ">", "SOLAR_RAD_THRESHOLD_HIGH")],
+        "message": (
             "日射量 ({solar_rad:,.0f} W/m^2) が "
-            "{threshold:,.0f} W/m^2 より大きいので冷却を少し強化します。(outdoor_status: 1)"
-        ).format(
-            solar_rad=sense_data["solar_rad"][0]["value"],
-            threshold=SOLAR_RAD_THRESHOLD_HIGH,
+            "{SOLAR_RAD_THRESHOLD_HIGH:,.0f} W/m^2 より大きいので冷却を少し強化します。(outdoor_status: 1)"
         ),
         "status": 1,
     },
     {
-        "judge": lambda sense_data: (sense_data["temp"][0]["value"] > TEMP_THRESHOLD_MID)
-        and (sense_data["lux"][0]["value"] < LUX_THRESHOLD),
-        "message": lambda sense_data: (
-            " 外気温 ({temp:.1f} ℃) が {temp_threshold:.1f} ℃ より高いものの、"
-            "照度 ({lux:,.0f} LUX) が {lux_threshold:,.0f} LUX より小さいので、"
+        "condition": [("temp", ">", "TEMP_THRESHOLD_MID"), ("lux", "<", "LUX_THRESHOLD")],
+        "message": (
+            " 外気温 ({temp:.1f} ℃) が {TEMP_THRESHOLD_MID:.1f} ℃ より高いものの、"
+            "照度 ({lux:,.0f} LUX) が {LUX_THRESHOLD:,.0f} LUX より小さいので、"
             "冷却を少し弱めます。(outdoor_status: -1)"
-        ).format(
-            temp=sense_data["temp"][0]["value"],
-            temp_threshold=TEMP_THRESHOLD_MID,
-            lux=sense_data["lux"][0]["value"],
-            lux_threshold=LUX_THRESHOLD,
         ),
         "status": -1,
     },
     {
-        "judge": lambda sense_data: sense_data["lux"][0]["value"] < LUX_THRESHOLD,
-        "message": lambda sense_data: (
-            "照度 ({lux:,.0f} LUX) が {threshold:,.0f} LUX より小さいので冷却を弱めます。(outdoor_status: -2)"
-        ).format(lux=sense_data["lux"][0]["value"], threshold=LUX_THRESHOLD),
+        "condition": [("lux", "<", "LUX_THRESHOLD")],
+        "message": (
+            "照度 ({lux:,.0f} LUX) が {LUX_THRESHOLD:,.0f} LUX より小さいので"
+            "冷却を弱めます。(outdoor_status: -2)"
+        ),
         "status": -2,
     },
     {
-        "judge": lambda sense_data: sense_data["solar_rad"][0]["value"] < SOLAR_RAD_THRESHOLD_LOW,
-        "message": lambda sense_data: (
+        "condition": [("solar_rad", "<", "SOLAR_RAD_THRESHOLD_LOW")],
+        "message": (
             "日射量 ({solar_rad:,.0f} W/m^2) が "
-            "{threshold:,.0f} W/m^2 より小さいので冷却を少し弱めます。(outdoor_status: -1)"
-        ).format(
-            solar_rad=sense_data["solar_rad"][0]["value"],
-            threshold=SOLAR_RAD_THRESHOLD_LOW,
+            "{SOLAR_RAD_THRESHOLD_LOW:,.0f} W/m^2 より小さいので冷却を少し弱めます。(outdoor_status: -1)"
         ),
         "status": -1,
     },
 ]
 
+OUTDOOR_KEY_LIST = ["temp", "humi", "lux", "solar_rad", "rain"]
+
+
+def get_threshold(override=None):
+    """判定に使う閾値を返す (override で一部を上書き可能)"""
+    threshold = {name: globals()[name] for name in THRESHOLD_NAME_LIST}
+
+    for name, value in (override or {}).items():
+        if name not in threshold:
+            raise ValueError(f"Unknown threshold: {name}")  # noqa: TRY003, EM102
+        threshold[name] = value
+
+    return threshold
+
+
+@functools.lru_cache(maxsize=8)
+def _compile_rule(override_item_list):
+    threshold = get_threshold(dict(override_item_list))
+
+    return {
+        "threshold": threshold,
+        "cooler": unit_cooler.controller.rule.compile_rule_list(COOLER_ACTIVITY_LIST, threshold),
+        "outdoor": unit_cooler.controller.rule.compile_rule_list(OUTDOOR_CONDITION_LIST, threshold),
+    }
+
+
+def compile_rule(override=None):
+    """閾値を解決した判定ルールを返す (閾値の組み合わせ毎にキャッシュする)"""
+    return _compile_rule(tuple(sorted(override.items())) if override else ())
+
+
+def get_outdoor_value_map(sense_data):
+    """判定に使う屋外の値を取り出す"""
+    return {key: sense_data[key][0]["value"] for key in OUTDOOR_KEY_LIST}
+
 
 # NOTE: 外部環境の状況を評価する。
 # (数字が大きいほど冷却を強める)
-def get_outdoor_status(sense_data):
-    temp_str = (
-        f"{sense_data['temp'][0]['value']:.1f}" if sense_data["temp"][0]["value"] is not None else "？",
-    )
-    humi_str = (
-        f"{sense_data['humi'][0]['value']:.1f}" if sense_data["humi"][0]["value"] is not None else "？",
-    )
-    solar_rad_str = (
-        f"{sense_data['solar_rad'][0]['value']:,.0f}"
-        if sense_data["solar_rad"][0]["value"] is not None
-        else "？",
-    )
-    lux_str = (
-        f"{sense_data['lux'][0]['value']:,.0f}" if sense_data["lux"][0]["value"] is not None else "？",
-    )
+def get_outdoor_status(sense_data, threshold=None):
+    value_map = get_outdoor_value_map(sense_data)
 
     logging.info(
-        "気温: %s ℃, 湿度: %s %%, 日射量: %s W/m^2, 照度: %s LUX", temp_str, humi_str, solar_rad_str, lux_str
+        "気温: %s ℃, 湿度: %s %%, 日射量: %s W/m^2, 照度: %s LUX",
+        "？" if value_map["temp"] is None else f"{value_map['temp']:.1f}",
+        "？" if value_map["humi"] is None else f"{value_map['humi']:.1f}",
+        "？" if value_map["solar_rad"] is None else f"{value_map['solar_rad']:,.0f}",
+        "？" if value_map["lux"] is None else f"{value_map['lux']:,.0f}",
     )
 
-    is_senser_valid = all(
-        sense_data[key][0]["value"] is not None for key in ["temp", "humi", "solar_rad", "lux"]
-    )
+    is_senser_valid = all(value_map[key] is not None for key in ["temp", "humi", "solar_rad", "lux"])
 
     if not is_senser_valid:
         return {"status": -10, "message": "センサーデータが欠落していますので、冷却を停止します。"}
 
-    for condition in OUTDOOR_CONDITION_LIST:
-        if condition["judge"](sense_data):
-            return {
-                "status": condition["status"],
-                "message": condition["message"](sense_data),
-            }
+    rule = unit_cooler.controller.rule.judge(compile_rule(threshold)["outdoor"], value_map)
+    if rule is not None:
+        return {
+            "status": rule["status"],
+            "message": unit_cooler.controller.rule.format_message(rule, value_map),
+        }
 
     return {"status": 0, "message": None}
 
 
 # NOTE: クーラーの稼働状況を評価する。
 # (数字が大きいほど稼働状況が活発)
-def get_cooler_activity(sense_data):
+def get_cooler_activity(sense_data, threshold=None):
+    compiled = compile_rule(threshold)
     mode_map = {}
 
     for mode in unit_cooler.const.AIRCON_MODE:
@@ -242,21 +275,26 @@ def get_cooler_activity(sense_data):
 
     temp = sense_data["temp"][0]["value"]
     for aircon_power in sense_data["power"]:
-        mode = get_cooler_state(aircon_power, temp)
+        mode = get_cooler_state(aircon_power, temp, compiled["threshold"])
         mode_map[mode] += 1
 
     logging.info(mode_map)
 
-    for condition in COOLER_ACTIVITY_LIST:
-        if condition["judge"](mode_map):
-            return {
-                "status": condition["status"],
-                "message": condition["message"],
-            }
-    raise AssertionError("This should never be reached.")  # pragma: no cover # noqa: TRY003, EM101
+    value_map = {mode.name.lower(): count for mode, count in mode_map.items()}
+    rule = unit_cooler.controller.rule.judge(compiled["cooler"], value_map)
+    if rule is None:  # pragma: no cover
+        raise AssertionError("This should never be reached.")  # noqa: TRY003, EM101
+
+    return {
+        "status": rule["status"],
+        "message": unit_cooler.controller.rule.format_message(rule, value_map),
+    }
 
 
-def get_cooler_state(aircon_power, temp):
+def get_cooler_state(aircon_power, temp, threshold=None):
+    if threshold is None:
+        threshold = get_threshold()
+
     mode = unit_cooler.const.AIRCON_MODE.OFF
     if temp is None:
         # NOTE: 外気温がわからないと暖房と冷房の区別がつかないので、致命的エラー扱いにする
@@ -268,12 +306,12 @@ def get_cooler_state(aircon_power, temp):
         )
         return unit_cooler.const.AIRCON_MODE.OFF
 
-    if temp >= AIRCON_TEMP_THRESHOLD:
-        if aircon_power["value"] > AIRCON_POWER_THRESHOLD_FULL:
+    if temp >= threshold["AIRCON_TEMP_THRESHOLD"]:
+        if aircon_power["value"] > threshold["AIRCON_POWER_THRESHOLD_FULL"]:
             mode = unit_cooler.const.AIRCON_MODE.FULL
-        elif aircon_power["value"] > AIRCON_POWER_THRESHOLD_NORMAL:
+        elif aircon_power["value"] > threshold["AIRCON_POWER_THRESHOLD_NORMAL"]:
             mode = unit_cooler.const.AIRCON_MODE.NORMAL
-        elif aircon_power["value"] > AIRCON_POWER_THRESHOLD_WORK:
+        elif aircon_power["value"] > threshold["AIRCON_POWER_THRESHOLD_WORK"]:
             mode = unit_cooler.const.AIRCON_MODE.IDLE
 
     logging.info(
@@ -287,42 +325,154 @@ def get_cooler_state(aircon_power, temp):
     return mode
 
 
+# NOTE: 最新の値と、直近 window_min 分間の平均・最大値を 1 回のクエリでサーバー側で集計する
+FLUX_WINDOW_QUERY = """
+data = from(bucket: "{bucket}")
+    |> range(start: -{last_min}m, stop: {stop})
+    |> filter(fn: (r) => r._measurement == "{measure}")
+    |> filter(fn: (r) => r.hostname == "{hostname}")
+    |> filter(fn: (r) => r._field == "{field}")
+    |> filter(fn: (r) => exists r._value)
+
+window = data |> range(start: -{window_min}m, stop: {stop})
+
+union(
+    tables: [
+        data |> last() |> set(key: "stat", value: "last"),
+        window |> mean() |> set(key: "stat", value: "mean"),
+        window |> max() |> set(key: "stat", value: "max")
+    ]
+)
+"""
+
+# 集計する場合の、判定に使う値の種類
+AGGREGATE_STAT_LIST = ["last", "mean", "max"]
+
+# 最新の値を探す期間
+LAST_MIN = 60
+
+FETCH_METRIC = f"{unit_cooler.exporter.PREFIX}_influxdb_fetch_seconds"
+FETCH_METRIC_HELP = "Latency of InfluxDB query"
+
+
+def fetch_window_data(db_config, measure, hostname, field, window_min, offset_min=0):  # noqa: PLR0913
+    """
+    最新の値と、直近 window_min 分間の平均・最大値を取得
+
+    offset_min を指定すると、その分だけ過去の時点を基準にします。
+    """
+    # NOTE: Flux の相対時間は now() 基準なので、オフセットを加えた期間で指定する
+    query = FLUX_WINDOW_QUERY.format(
+        bucket=db_config["bucket"],
+        measure=measure,
+        hostname=hostname,
+        field=field,
+        last_min=max(LAST_MIN, window_min) + offset_min,
+        window_min=window_min + offset_min,
+        stop=f"-{offset_min}m" if offset_min != 0 else "now()",
+    )
+
+    try:
+        with (
+            unit_cooler.exporter.measure(FETCH_METRIC, FETCH_METRIC_HELP, query="window"),
+            influxdb_client.InfluxDBClient(
+                url=db_config["url"], token=db_config["token"], org=db_config["org"]
+            ) as client,
+        ):
+            table_list = client.query_api().query(query=query)
+
+        data = {"valid": False}
+        for table in table_list:
+            for record in table.records:
+                stat = record.values.get("stat")
+                data[stat] = record.get_value()
+                if stat == "last":
+                    data["time"] = record.get_time()
+                    data["valid"] = True
+
+        return data
+    except Exception:
+        logging.exception("Failed to fetch data")
+        return {"valid": False}
+
+
+def _get_last_data(config, sensor, kind, start, stop, zoneinfo):  # noqa: PLR0913
+    with unit_cooler.exporter.measure(FETCH_METRIC, FETCH_METRIC_HELP, query="last"):
+        data = my_lib.sensor_data.fetch_data(
+            config["controller"]["influxdb"],
+            sensor["measure"],
+            sensor["hostname"],
+            kind,
+            start,
+            stop,
+            last=True,
+        )
+    if not data["valid"]:
+        return None
+
+    return {
+        "name": sensor["name"],
+        "time": data["time"][0].replace(tzinfo=zoneinfo),
+        "value": data["value"][0],
+    }
+
+
+def _get_window_data(config, sensor, kind, aggregate, offset_min, zoneinfo):  # noqa: PLR0913
+    data = fetch_window_data(
+        config["controller"]["influxdb"],
+        sensor["measure"],
+        sensor["hostname"],
+        kind,
+        aggregate["window_min"],
+        offset_min,
+    )
+    if not data["valid"]:
+        return None
+
+    sensor_data = {"name": sensor["name"], "time": data["time"].astimezone(zoneinfo)}
+    for stat in AGGREGATE_STAT_LIST:
+        sensor_data[stat] = data.get(stat)
+
+    value = sensor_data[aggregate.get("value", "mean")]
+    # NOTE: 期間内のデータが無い場合は、最新の値を使う
+    sensor_data["value"] = sensor_data["last"] if value is None else value
+
+    return sensor_data
+
+
 def get_sense_data(config):
     zoneinfo = my_lib.time.get_zoneinfo()
 
     if os.environ.get("DUMMY_MODE", "false") == "true":
         start = "-169h"
         stop = "-168h"
+        offset_min = 168 * 60
     else:
         start = "-1h"
         stop = "now()"
+        offset_min = 0
+
+    aggregate_config = config["controller"].get("aggregate", {})
 
     sense_data = {}
     for kind in config["controller"]["sensor"]:
         kind_data = []
         for sensor in config["controller"]["sensor"][kind]:
-            data = my_lib.sensor_data.fetch_data(
-                config["controller"]["influxdb"],
-                sensor["measure"],
-                sensor["hostname"],
-                kind,
-                start,
-                stop,
-                last=True,
-            )
-            if data["valid"]:
-                value = data["value"][0]
+            if kind in aggregate_config:
+                sensor_data = _get_window_data(
+                    config, sensor, kind, aggregate_config[kind], offset_min, zoneinfo
+                )
+            else:
+                sensor_data = _get_last_data(config, sensor, kind, start, stop, zoneinfo)
+
+            if sensor_data is not None:
                 if kind == "rain":
                     # NOTE: 観測している雨量は1分間の降水量なので、1時間雨量に換算
-                    value *= 60
-
-                kind_data.append(
-                    {
-                        "name": sensor["name"],
-                        "time": data["time"][0].replace(tzinfo=zoneinfo),
-                        "value": value,
-                    }
-                )
+                    for key in ["value", *AGGREGATE_STAT_LIST]:
+                        if sensor_data.get(key) is not None:
+                            sensor_data[key] *= 60
+
+                kind_data.append(sensor_data)
             else:
                 unit_cooler.util.notify_error(
                     config,
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+判定した冷却モードを、前回までの状態に基づいて安定化させます。
+
+センサーの値が閾値付近で揺れると冷却モードが頻繁に切り替わり、電磁弁の開閉が増えるため、
+次の 3 つの制限をかけます。
+
+- ヒステリシス: 冷却を弱める場合は、閾値を冷却を強める側に band だけずらして判定し直した
+  モードまでしか下げない。
+- 最小滞在時間: モードを変更してから dwell_min 分間は、次の変更を行わない。
+- 最大変化幅: 1 回の変更で step_max 段階までしか変えない。
+
+ただし、降雨・高湿度・センサーの欠落・エアコンの停止による停止は、制限をかけずに直ちに反映します。
+状態はファイルに保存し、再起動後も引き継ぎます。
+"""
+
+import json
+import logging
+import pathlib
+
+import unit_cooler.clock
+import unit_cooler.controller.sensor
+
+# outdoor_status がこの値以下の場合は停止条件とみなし、直ちに反映する
+STOP_STATUS_MAX = -4
+# 保存した状態がこれより古い場合は使わない
+STATE_EXPIRE_SEC = 60 * 60
+
+
+def gen_state():
+    return {"cooling_mode": None, "time": None}
+
+
+def load_state(file_path, now=None):
+    """保存した状態を読み込む (無い場合や古い場合は初期状態)"""
+    if now is None:
+        now = unit_cooler.clock.timestamp()
+
+    path = pathlib.Path(file_path)
+    if not path.exists():
+        return gen_state()
+
+    try:
+        state = json.loads(path.read_text())
+    except Exception:
+        logging.warning("Failed to load stabilizer state: %s", path)
+        return gen_state()
+
+    if (state.get("time") is None) or (now - state["time"] > STATE_EXPIRE_SEC):
+        logging.info("Stabilizer state is expired")
+        return gen_state()
+
+    return {"cooling_mode": state["cooling_mode"], "time": state["time"]}
+
+
+def save_state(file_path, state):
+    path = pathlib.Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # NOTE: 書き込み途中で止まっても壊れないよう、別ファイルに書いてから置き換える
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(state))
+    tmp_path.replace(path)
+
+
+def gen_relaxed_threshold(threshold, band_map):
+    """閾値を、冷却を強める側に band だけずらす"""
+    relaxed = unit_cooler.controller.sensor.get_threshold(threshold)
+
+    for name, band in band_map.items():
+        if name not in relaxed:
+            raise ValueError(f"Unknown threshold: {name}")  # noqa: TRY003, EM102
+
+        if name in unit_cooler.controller.sensor.THRESHOLD_RAISE_TO_COOL_LIST:
+            relaxed[name] += band
+        else:
+            relaxed[name] -= band
+
+    return relaxed
+
+
+def is_stop(mode):
+    """
+    制限をかけずに直ちに反映する停止条件かどうか
+
+    outdoor_status が STOP_STATUS_MAX 以下の場合に加えて、エアコンが全て停止している場合や、
+    外気温が不明な場合 (cooler_status が 0 で outdoor_status が None) に冷却モードが 0 に
+    なった場合も停止条件とみなします。
+    """
+    outdoor_status = mode["outdoor_status"]["status"]
+    if (outdoor_status is not None) and (outdoor_status <= STOP_STATUS_MAX):
+        return True
+
+    return (mode["cooling_mode"] == 0) and (
+        (mode["cooler_status"]["status"] <= 0) or (outdoor_status is None)
+    )
+
+
+def update(state, cooling_mode, relaxed_mode, now, dwell_sec=0, step_max=None):  # noqa: PLR0913
+    """
+    状態を更新し、安定化した冷却モードを返す
+
+    relaxed_mode はヒステリシス分ずらした閾値で判定したモードです (不要な場合は None)。
+    """
+    current_mode = state["cooling_mode"]
+    if current_mode is None:
+        state.update(cooling_mode=cooling_mode, time=now)
+        return cooling_mode
+
+    target_mode = cooling_mode
+    if (target_mode < current_mode) and (relaxed_mode is not None):
+        target_mode = max(target_mode, min(relaxed_mode, current_mode))
+
+    if target_mode == current_mode:
+        return current_mode
+
+    if now - state["time"] < dwell_sec:
+        logging.info(
+            "最小滞在時間に達していないので、冷却モードを維持します。(cooling_mode: %d, 判定: %d)",
+            current_mode,
+            target_mode,
+        )
+        return current_mode
+
+    if step_max is not None:
+        target_mode = min(max(target_mode, current_mode - step_max), current_mode + step_max)
+
+    state.update(cooling_mode=target_mode, time=now)
+
+    return target_mode
+
+
+def force(state, cooling_mode, now):
+    """制限をかけずに冷却モードを変更する"""
+    if state["cooling_mode"] != cooling_mode:
+        state.update(cooling_mode=cooling_mode, time=now)
+
+    return cooling_mode
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Prometheus 形式のメトリクスを、プロセス内のレジストリに記録して /metrics で返します。
+
+値は処理の途中で set_gauge / inc_counter / observe で記録しておき、スクレイプ時には
+データベースへの問い合わせは行いません。スクレイプ時に求める値は、add_collector で
+登録した関数がメモリ上の状態から記録します。(Prometheus のテキスト形式の文字列を返すと、
+それも出力に加えます)
+
+Usage:
+  exporter.py [-p PORT] [-D]
+
+Options:
+  -p PORT           : /metrics を返す Web サーバーを動作させるポートを指定します。[default: 9100]
+  -D                : デバッグモードで動作します。
+"""
+
+import contextlib
+import logging
+import threading
+import time
+
+import flask
+import werkzeug.serving
+
+PREFIX = "unit_cooler"
+
+_lock = threading.Lock()
+_metric_map = {}
+_collector_list = []
+
+blueprint = flask.Blueprint("exporter", __name__)
+
+
+def _get_metric(name, metric_type, help_text):
+    # NOTE: _lock を取得した状態で呼ぶこと
+    if name not in _metric_map:
+        _metric_map[name] = {"type": metric_type, "help": help_text, "sample": {}}
+    return _metric_map[name]
+
+
+def _label_key(label_map):
+    return tuple(sorted(label_map.items()))
+
+
+def set_gauge(name, value, help_text="", **label_map):
+    with _lock:
+        _get_metric(name, "gauge", help_text)["sample"][_label_key(label_map)] = value
+
+
+def inc_counter(name, help_text="", value=1, **label_map):
+    with _lock:
+        sample = _get_metric(name, "counter", help_text)["sample"]
+        key = _label_key(label_map)
+        sample[key] = sample.get(key, 0) + value
+
+
+def observe(name, value, help_text="", **label_map):
+    """経過時間などを記録 (合計と回数を summary として出力)"""
+    with _lock:
+        sample = _get_metric(name, "summary", help_text)["sample"]
+        key = _label_key(label_map)
+        total, count = sample.get(key, (0.0, 0))
+        sample[key] = (total + value, count + 1)
+
+
+@contextlib.contextmanager
+def measure(name, help_text="", **label_map):
+    """処理の経過時間を observe で記録"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start_time, help_text, **label_map)
+
+
+def add_collector(func):
+    """スクレイプ時に呼ぶ関数を登録"""
+    with _lock:
+        if func not in _collector_list:
+            _collector_list.append(func)
+
+
+def clear():
+    with _lock:
+        _metric_map.clear()
+        _collector_list.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_label(label_key):
+    if not label_key:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in label_key) + "}"
+
+
+def format_text():
+    """記録した値を Prometheus のテキスト形式で返す"""
+    with _lock:
+        collector_list = list(_collector_list)
+
+    extra_list = []
+    for collector in collector_list:
+        try:
+            text = collector()
+        except Exception:
+            logging.exception("Failed to collect metrics")
+            continue
+        if text:
+            extra_list.append(text)
+
+    line_list = []
+    with _lock:
+        for name, metric in sorted(_metric_map.items()):
+            line_list.append(f"# HELP {name} {metric['help']}")
+            line_list.append(f"# TYPE {name} {metric['type']}")
+            for label_key, value in sorted(metric["sample"].items()):
+                if metric["type"] == "summary":
+                    line_list.append(f"{name}_sum{_format_label(label_key)} {value[0]}")
+                    line_list.append(f"{name}_count{_format_label(label_key)} {value[1]}")
+                else:
+                    line_list.append(f"{name}{_format_label(label_key)} {value}")
+
+    return "".join(text + "\n" for text in line_list) + "".join(extra_list)
+
+
+@blueprint.route("/metrics", methods=["GET"])
+def metrics():
+    return flask.Response(format_text(), mimetype="text/plain; version=0.0.4")
+
+
+def start_server(port):
+    """
+    /metrics のみを返す Web サーバーを起動する
+
+    Web サーバーを持たないプロセス (コントローラ) 用です。
+    """
+    # NOTE: アクセスログは無効にする
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    app = flask.Flask("unit-cooler-exporter")
+    app.register_blueprint(blueprint)
+
+    server = werkzeug.serving.make_server(
+        "0.0.0.0",  # noqa: S104
+        port,
+        app,
+        threaded=True,
+    )
+    thread = threading.Thread(target=server.serve_forever)
+
+    logging.info("Start metrics exporter (port: %d)", port)
+
+    thread.start()
+
+    return {
+        "server": server,
+        "thread": thread,
+    }
+
+
+def term(handle):
+    logging.warning("Stop metrics exporter")
+
+    handle["server"].shutdown()
+    handle["server"].server_close()
+    handle["thread"].join()
+
+
+if __name__ == "__main__":
+    # TEST Code
+    import docopt
+    import my_lib.logger
+
+    args = docopt.docopt(__doc__)
+
+    port = int(args["-p"])
+    debug_mode = args["-D"]
+
+    my_lib.logger.init("test", level=logging.DEBUG if debug_mode else logging.INFO)
+
+    set_gauge(f"{PREFIX}_test", 1, "Test gauge")
+
+    handle = start_server(port)
+    handle["thread"].join()
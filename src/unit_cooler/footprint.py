@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+状態を示すファイル (footprint) を、unit_cooler.clock の時刻で扱います。
+
+実時間の場合は my_lib.footprint をそのまま使います。仮想時間の場合はファイルを作らずに、
+パス毎の更新時刻を VirtualClock に保持します。
+"""
+
+import math
+
+import my_lib.footprint
+
+import unit_cooler.clock
+
+
+def get_mtime_map():
+    """仮想時間の場合は、パス毎の更新時刻を返す (実時間の場合は None)"""
+    clock = unit_cooler.clock.get_clock()
+
+    return clock.mtime_map if isinstance(clock, unit_cooler.clock.VirtualClock) else None
+
+
+def update(path):
+    mtime_map = get_mtime_map()
+    if mtime_map is None:
+        my_lib.footprint.update(path)
+        return
+
+    mtime_map[str(path)] = unit_cooler.clock.timestamp()
+
+
+def exists(path):
+    mtime_map = get_mtime_map()
+    if mtime_map is None:
+        return my_lib.footprint.exists(path)
+
+    return str(path) in mtime_map
+
+
+def clear(path):
+    mtime_map = get_mtime_map()
+    if mtime_map is None:
+        my_lib.footprint.clear(path)
+        return
+
+    mtime_map.pop(str(path), None)
+
+
+def elapsed(path):
+    """更新してからの経過時間 [秒] を返す (仮想時間で、ファイルが無い場合は無限大)"""
+    mtime_map = get_mtime_map()
+    if mtime_map is None:
+        return my_lib.footprint.elapsed(path)
+
+    mtime = mtime_map.get(str(path))
+
+    return math.inf if mtime is None else unit_cooler.clock.timestamp() - mtime
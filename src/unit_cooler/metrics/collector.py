@@ -18,8 +18,13 @@ import threading
 import zoneinfo
 from contextlib import contextmanager
 
+import unit_cooler.clock
+import unit_cooler.exporter
+
 TIMEZONE = zoneinfo.ZoneInfo("Asia/Tokyo")
 DEFAULT_DB_PATH = pathlib.Path("data/metrics.db")
+# Under a virtual clock, writes are committed together once per this many simulated seconds
+VIRTUAL_COMMIT_INTERVAL_SEC = 3600
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +36,12 @@ class MetricsCollector:
         """Initialize MetricsCollector with database path."""
         self.db_path = pathlib.Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Connection reused under a virtual clock (see _get_batch_connection)
+        self._batch_lock = threading.Lock()
+        self._batch_conn = None
+        self._batch_commit_time = None
+
         self._init_database()
         self._lock = threading.Lock()
 
@@ -40,6 +51,10 @@ class MetricsCollector:
         self._last_minute = None
         self._last_hour = None
 
+        # Newest saved minute (None until known) and callbacks notified after each save
+        self._last_saved_minute = None
+        self._save_listener_list = []
+
     def _init_database(self):
         """Initialize database tables for new metrics schema."""
         with self._get_db_connection() as conn:
@@ -88,9 +103,20 @@ class MetricsCollector:
             conn.execute("CREATE INDEX IF NOT EXISTS idx_hourly_timestamp ON hourly_metrics(timestamp)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_error_timestamp ON error_events(timestamp)")
 
+    def _measure_write(self, table: str):
+        """Measure SQLite write latency for the Prometheus exporter."""
+        return unit_cooler.exporter.measure(
+            f"{unit_cooler.exporter.PREFIX}_sqlite_write_seconds", "Latency of SQLite write", table=table
+        )
+
     @contextmanager
     def _get_db_connection(self):
         """Get database connection with proper error handling."""
+        if unit_cooler.clock.is_virtual():
+            with self._get_batch_connection() as conn:
+                yield conn
+            return
+
         conn = None
         try:
             conn = sqlite3.connect(str(self.db_path), timeout=30.0)
@@ -106,6 +132,41 @@ class MetricsCollector:
             if conn:
                 conn.close()
 
+    @contextmanager
+    def _get_batch_connection(self):
+        """
+        Reuse one connection and commit once per VIRTUAL_COMMIT_INTERVAL_SEC of simulated time.
+
+        A simulation writes every simulated minute, so opening a connection and committing for each
+        write would dominate its run time. Call flush() when the simulation ends.
+        """
+        with self._batch_lock:
+            if self._batch_conn is None:
+                self._batch_conn = sqlite3.connect(str(self.db_path), timeout=30.0, check_same_thread=False)
+                self._batch_conn.row_factory = sqlite3.Row
+                self._batch_commit_time = unit_cooler.clock.timestamp()
+
+            try:
+                yield self._batch_conn
+            except Exception:
+                self._batch_conn.rollback()
+                logger.exception("Database error")
+                raise
+
+            if unit_cooler.clock.timestamp() - self._batch_commit_time >= VIRTUAL_COMMIT_INTERVAL_SEC:
+                self._batch_conn.commit()
+                self._batch_commit_time = unit_cooler.clock.timestamp()
+
+    def flush(self):
+        """Commit and close the connection reused under a virtual clock."""
+        with self._batch_lock:
+            if self._batch_conn is None:
+                return
+
+            self._batch_conn.commit()
+            self._batch_conn.close()
+            self._batch_conn = None
+
     def update_cooling_mode(self, cooling_mode: int):
         """Update current cooling mode value."""
         with self._lock:
@@ -155,10 +216,10 @@ class MetricsCollector:
 
     def record_error(self, error_type: str, error_message: str | None = None):
         """Record an error event."""
-        now = datetime.datetime.now(TIMEZONE)
+        now = unit_cooler.clock.now()
 
         try:
-            with self._get_db_connection() as conn:
+            with self._measure_write("error_events"), self._get_db_connection() as conn:
                 conn.execute(
                     """
                     INSERT INTO error_events (timestamp, error_type, error_message)
@@ -172,7 +233,7 @@ class MetricsCollector:
 
     def _check_minute_boundary(self):
         """Check if we crossed a minute boundary and save data."""
-        now = datetime.datetime.now(TIMEZONE)
+        now = unit_cooler.clock.now()
         current_minute = now.replace(second=0, microsecond=0)
 
         if self._last_minute is None:
@@ -186,7 +247,7 @@ class MetricsCollector:
 
     def _check_hour_boundary(self):
         """Check if we crossed an hour boundary and save data."""
-        now = datetime.datetime.now(TIMEZONE)
+        now = unit_cooler.clock.now()
         current_hour = now.replace(minute=0, second=0, microsecond=0)
 
         if self._last_hour is None:
@@ -218,7 +279,7 @@ class MetricsCollector:
             )
             logger.info("Saving minute metrics for %s: %s", timestamp, self._current_minute_data)
 
-            with self._get_db_connection() as conn:
+            with self._measure_write("minute_metrics"), self._get_db_connection() as conn:
                 conn.execute(
                     """
                     INSERT OR REPLACE INTO minute_metrics
@@ -231,11 +292,25 @@ class MetricsCollector:
                 logger.info("Successfully saved minute metrics for %s", timestamp)
         except Exception:
             logger.exception("Failed to save minute data")
+            return
+
+        if (self._last_saved_minute is None) or (timestamp > self._last_saved_minute):
+            self._last_saved_minute = timestamp
+
+        for listener in self._save_listener_list:
+            try:
+                listener(timestamp)
+            except Exception:  # noqa: PERF203
+                logger.exception("Failed to notify minute data save")
+
+    def add_save_listener(self, listener):
+        """Register a callback invoked with the timestamp after minute data is saved."""
+        self._save_listener_list.append(listener)
 
     def _save_hour_data(self, timestamp: datetime.datetime):
         """Save accumulated hour data to database."""
         try:
-            with self._get_db_connection() as conn:
+            with self._measure_write("hourly_metrics"), self._get_db_connection() as conn:
                 conn.execute(
                     """
                     INSERT OR REPLACE INTO hourly_metrics
@@ -277,6 +352,25 @@ class MetricsCollector:
 
             return [dict(row) for row in conn.execute(query, params).fetchall()]
 
+    def get_last_minute_timestamp(self) -> datetime.datetime | None:
+        """Get timestamp of the most recently saved minute-level metrics."""
+        # NOTE: Once this process has saved minute data, no database access is needed
+        if self._last_saved_minute is not None:
+            return self._last_saved_minute
+
+        with self._get_db_connection() as conn:
+            row = conn.execute("SELECT MAX(timestamp) FROM minute_metrics").fetchone()
+
+        if row[0] is None:
+            return None
+
+        timestamp = datetime.datetime.fromisoformat(str(row[0]))
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=TIMEZONE)
+
+        self._last_saved_minute = timestamp
+        return timestamp
+
     def get_hourly_data(
         self,
         start_time: datetime.datetime | None = None,
@@ -6,75 +6,315 @@
 
 from __future__ import annotations
 
+import collections
 import datetime
+import functools
+import hashlib
 import io
 import json
 import logging
+import pathlib
+import threading
+import time
 import zoneinfo
 
 import flask
 import my_lib.webapp.config
+import numpy as np
 from PIL import Image, ImageDraw
 
+import unit_cooler.compress
 from unit_cooler.metrics.collector import get_metrics_collector
 
+TIMEZONE = zoneinfo.ZoneInfo("Asia/Tokyo")
+
 blueprint = flask.Blueprint("metrics", __name__, url_prefix=my_lib.webapp.config.URL_PREFIX)
 
+# 散布図を描画する (環境要因, システム指標) の組
+CORRELATION_PAIR_LIST = [
+    ("temperature", "cooling_mode"),
+    ("humidity", "duty_ratio"),
+    ("solar_radiation", "cooling_mode"),
+    ("lux", "duty_ratio"),
+]
+# 散布図 1 つあたりにブラウザへ送る点数の上限
+CORRELATION_SAMPLE_MAX = 2000
+
+# 時系列グラフに描画する指標
+TIMESERIES_METRIC_LIST = [
+    "cooling_mode",
+    "duty_ratio",
+    "temperature",
+    "humidity",
+    "lux",
+    "solar_radiation",
+    "rain_amount",
+]
+# 期間指定が無い場合に時系列グラフに表示する日数
+TIMESERIES_DAYS = 100
+# 時系列 1 系列あたりにブラウザへ送る点数 (デフォルト値と上限値)
+TIMESERIES_POINTS = 1000
+TIMESERIES_POINTS_MAX = 10000
+
+# 計算済み JSON のキャッシュに保持するエントリ数の上限
+CACHE_ENTRY_MAX = 32
+
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+_precompute_lock = threading.Lock()
+
+
+def _get_metrics_db_path() -> tuple[pathlib.Path | None, str | None]:
+    """設定からメトリクスデータベースのパスを取得 (見つからない場合はエラーメッセージを返す)"""
+    config = flask.current_app.config["CONFIG"]
+    metrics_data_path = config.get("actuator", {}).get("metrics", {}).get("data")
+
+    if not metrics_data_path:
+        return None, "config.yamlでactuator.metricsセクションが設定されていません。"
+
+    db_path = pathlib.Path(metrics_data_path)
+    if not db_path.exists():
+        return None, f"メトリクスデータベースが見つかりません: {db_path}"
+
+    return db_path, None
+
+
+def _is_not_modified(etag: str, last_modified: datetime.datetime) -> bool:
+    """条件付きリクエストに対してキャッシュが有効かどうかを判定"""
+    request = flask.request
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _build_stats_data(collector, _last_minute, _args) -> dict:
+    """基本統計とデータ期間を生成"""
+    minute_data = collector.get_minute_data()
+    hourly_data = collector.get_hourly_data()
+    error_data = collector.get_error_data()
+
+    period_info = get_data_period_info(minute_data, hourly_data)
+    for key in ["start_date", "end_date"]:
+        if period_info[key] is not None:
+            period_info[key] = period_info[key].isoformat()
 
-@blueprint.route("/api/metrics", methods=["GET"])
-def metrics_view():
-    """メトリクスダッシュボードページを表示"""
-    try:
-        # 設定からメトリクスデータパスを取得
-        config = flask.current_app.config["CONFIG"]
-        metrics_data_path = config.get("actuator", {}).get("metrics", {}).get("data")
+    return {
+        "stats": generate_statistics(minute_data, hourly_data, error_data),
+        "period": period_info,
+    }
+
+
+def _build_hourly_data(collector, _last_minute, _args) -> dict:
+    """時間別分布の箱ヒゲ図データを生成"""
+    return prepare_hourly_chart_data(collector.get_minute_data(), collector.get_hourly_data())
+
+
+def _build_timeseries_data(collector, last_minute, args) -> dict:
+    """時系列データを生成"""
+    option = parse_timeseries_option(args)
 
-        # データベースファイルの存在確認
-        if not metrics_data_path:
-            return flask.Response(
-                "<html><body><h1>メトリクス設定が見つかりません</h1>"
-                "<p>config.yamlでactuator.metricsセクションが設定されていません。</p></body></html>",
-                mimetype="text/html",
-                status=503,
-            )
+    if option["time_to"] is None and last_minute is not None:
+        option["time_to"] = last_minute.timestamp() * 1000
+    if option["time_from"] is None and option["time_to"] is not None:
+        option["time_from"] = option["time_to"] - TIMESERIES_DAYS * 24 * 60 * 60 * 1000
 
-        from pathlib import Path
+    # NOTE: 表示する期間のデータだけを読み込む
+    start_time = end_time = None
+    if option["time_from"] is not None:
+        start_time = datetime.datetime.fromtimestamp(option["time_from"] / 1000, TIMEZONE)
+    if option["time_to"] is not None:
+        end_time = datetime.datetime.fromtimestamp(option["time_to"] / 1000, TIMEZONE)
 
-        db_path = Path(metrics_data_path)
-        if not db_path.exists():
-            return flask.Response(
-                f"<html><body><h1>メトリクスデータベースが見つかりません</h1>"
-                f"<p>データベースファイル: {db_path}</p>"
-                f"<p>システムが十分に動作してからメトリクスが生成されます。</p></body></html>",
-                mimetype="text/html",
-                status=503,
-            )
+    minute_data = collector.get_minute_data(start_time, end_time)
 
-        # メトリクス収集器を取得
-        collector = get_metrics_collector(metrics_data_path)
+    return {"timeseries": _prepare_timeseries_data(minute_data, **option)}
 
-        # 全期間のデータを取得（制限なし）
-        end_time = datetime.datetime.now(zoneinfo.ZoneInfo("Asia/Tokyo"))
-        start_time = None  # 無制限
 
-        minute_data = collector.get_minute_data(start_time, end_time, limit=None)
-        hourly_data = collector.get_hourly_data(start_time, end_time, limit=None)
-        error_data = collector.get_error_data(start_time, end_time, limit=None)
+def _build_correlation_data(collector, _last_minute, _args) -> dict:
+    """環境要因との相関データを生成"""
+    return {"correlation": _prepare_correlation_data(collector.get_minute_data())}
 
-        # 統計データを生成
-        stats = generate_statistics(minute_data, hourly_data, error_data)
 
-        # データ期間情報を取得
-        period_info = get_data_period_info(minute_data, hourly_data)
+DATA_BUILDER_MAP = {
+    "stats": _build_stats_data,
+    "hourly": _build_hourly_data,
+    "timeseries": _build_timeseries_data,
+    "correlation": _build_correlation_data,
+}
 
-        # HTMLを生成
-        html_content = generate_metrics_html(stats, minute_data, hourly_data, period_info)
 
-        return flask.Response(html_content, mimetype="text/html")
+def _cache_get(key: tuple) -> dict | None:
+    """計算済みの JSON をキャッシュから取得"""
+    with _cache_lock:
+        body_map = _cache.get(key)
+        if body_map is not None:
+            _cache.move_to_end(key)
+        return body_map
+
+
+def _cache_put(key: tuple, body_map: dict) -> None:
+    """計算済みの JSON をキャッシュに保存"""
+    with _cache_lock:
+        # NOTE: 新しい分データが保存されたら、それより前の結果はもう使われない
+        for stale_key in [k for k in _cache if k[0] != key[0]]:
+            del _cache[stale_key]
+
+        _cache[key] = body_map
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_ENTRY_MAX:
+            _cache.popitem(last=False)
+
+
+def cache_clear() -> None:
+    """キャッシュを破棄"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _build_json(  # noqa: PLR0913
+    name: str, collector, last_minute, args, query_string: str, encoding: str | None = None
+) -> bytes:
+    """
+    データを生成して JSON にする
+
+    最新の分データのタイムスタンプ毎にキャッシュし、圧縮したものも合わせて保持します。
+    """
+    key = (last_minute, name, query_string)
 
+    body_map = _cache_get(key)
+    if body_map is None:
+        body_map = {None: json.dumps(DATA_BUILDER_MAP[name](collector, last_minute, args)).encode()}
+        if last_minute is not None:
+            _cache_put(key, body_map)
+
+    with _cache_lock:
+        body = body_map.get(encoding)
+    if body is None:
+        # NOTE: 圧縮はロックの外で行い、キャッシュしている body_map への追加だけをロック内で行う
+        body = unit_cooler.compress.compress(body_map[None], encoding)
+        with _cache_lock:
+            body = body_map.setdefault(encoding, body)
+
+    return body
+
+
+def precompute(collector, last_minute: datetime.datetime) -> None:
+    """デフォルトの表示範囲について、全パネルのデータを事前に計算してキャッシュする"""
+    if not _precompute_lock.acquire(blocking=False):
+        # NOTE: 前回の計算が終わっていない場合は、リクエスト時に計算させる
+        return
+
+    try:
+        start = time.perf_counter()
+        for name in DATA_BUILDER_MAP:
+            for encoding in [None, *unit_cooler.compress.ENCODING_LIST]:
+                _build_json(name, collector, last_minute, {}, "", encoding)
+        logging.debug("Precomputed metrics data (%.2f sec)", time.perf_counter() - start)
+    except Exception:
+        logging.exception("メトリクスデータの事前計算に失敗しました")
+    finally:
+        _precompute_lock.release()
+
+
+def start_precompute(collector) -> None:
+    """分データが保存される度に、バックグラウンドで事前計算するように設定"""
+
+    def on_save(last_minute):
+        threading.Thread(target=precompute, args=(collector, last_minute), daemon=True).start()
+
+    collector.add_save_listener(on_save)
+
+
+def _metrics_json_response(name: str):
+    """
+    メトリクスの JSON を返す
+
+    ETag と Last-Modified は最後に保存された分データのタイムスタンプから決めるので、
+    データが更新されるまではデータベースを読まずに 304 を返します。
+    """
+    db_path, error_message = _get_metrics_db_path()
+    if db_path is None:
+        return flask.jsonify({"error": error_message}), 503
+
+    try:
+        collector = get_metrics_collector(db_path)
+        last_minute = collector.get_last_minute_timestamp()
+        query_string = flask.request.query_string.decode()
+        encoding = unit_cooler.compress.negotiate(flask.request.accept_encodings)
+
+        etag = None
+        if last_minute is not None:
+            etag = hashlib.sha1(  # noqa: S324
+                f"{last_minute.isoformat()} {name}?{query_string} {encoding}".encode()
+            ).hexdigest()
+
+            if _is_not_modified(etag, last_minute):
+                response = flask.Response(status=304)
+                response.set_etag(etag)
+                response.last_modified = last_minute
+                return response
+
+        body = _build_json(name, collector, last_minute, flask.request.args, query_string, encoding)
+    except ValueError as e:
+        return flask.jsonify({"error": f"不正なパラメータです: {e!s}"}), 400
     except Exception as e:
-        logging.exception("メトリクス表示の生成エラー")
-        return flask.Response(f"エラー: {e!s}", mimetype="text/plain", status=500)
+        logging.exception("メトリクスデータの生成エラー")
+        return flask.jsonify({"error": str(e)}), 500
+
+    response = flask.Response(body, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    if etag is not None:
+        response.set_etag(etag)
+        response.last_modified = last_minute
+        # NOTE: キャッシュは保持してよいが、使う前に必ず再検証させる
+        response.cache_control.no_cache = True
+
+    return response
+
+
+@blueprint.route("/api/metrics", methods=["GET"])
+def metrics_view():
+    """メトリクスダッシュボードページを表示"""
+    db_path, error_message = _get_metrics_db_path()
+    if db_path is None:
+        return flask.Response(
+            "<html><body><h1>メトリクスデータが見つかりません</h1>"
+            f"<p>{error_message}</p>"
+            "<p>システムが十分に動作してからメトリクスが生成されます。</p></body></html>",
+            mimetype="text/html",
+            status=503,
+        )
+
+    # NOTE: データは各パネルが JSON API から個別に取得するので、ここでは枠だけを返す
+    return flask.Response(generate_metrics_html(), mimetype="text/html")
+
+
+@blueprint.route("/api/metrics/stats", methods=["GET"])
+def metrics_stats():
+    """基本統計とデータ期間を返す"""
+    return _metrics_json_response("stats")
+
+
+@blueprint.route("/api/metrics/hourly", methods=["GET"])
+def metrics_hourly():
+    """時間別分布の箱ヒゲ図データを返す"""
+    return _metrics_json_response("hourly")
+
+
+@blueprint.route("/api/metrics/timeseries", methods=["GET"])
+def metrics_timeseries():
+    """時系列データを返す (?from=&to=&points=)"""
+    return _metrics_json_response("timeseries")
+
+
+@blueprint.route("/api/metrics/correlation", methods=["GET"])
+def metrics_correlation():
+    """環境要因との相関データを返す"""
+    return _metrics_json_response("correlation")
 
 
 @blueprint.route("/favicon.ico", methods=["GET"])
@@ -252,36 +492,77 @@ def generate_statistics(minute_data: list[dict], hourly_data: list[dict], error_
     }
 
 
-def calculate_correlation(x_values: list, y_values: list) -> float:
+def _to_float_array(values) -> np.ndarray:
+    """None を NaN に置き換えた float 配列に変換"""
+    return np.asarray(values, dtype=float)
+
+
+def calculate_correlation(x_values, y_values) -> float:
     """ピアソンの相関係数を計算"""
-    if not x_values or not y_values or len(x_values) != len(y_values):
+    if x_values is None or y_values is None or len(x_values) == 0 or len(x_values) != len(y_values):
         return 0.0
 
-    # None値を除外
-    valid_pairs = [
-        (x, y) for x, y in zip(x_values, y_values, strict=False) if x is not None and y is not None
-    ]
-    if len(valid_pairs) < 2:
+    x = _to_float_array(x_values)
+    y = _to_float_array(y_values)
+
+    # 片方でも欠損している行は除外 (行の対応は維持する)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if np.count_nonzero(valid) < 2:
         return 0.0
 
-    x_vals, y_vals = zip(*valid_pairs, strict=False)
-    n = len(x_vals)
+    x = x[valid] - x[valid].mean()
+    y = y[valid] - y[valid].mean()
 
-    # 平均を計算
-    x_mean = sum(x_vals) / n
-    y_mean = sum(y_vals) / n
+    denominator = np.sqrt(np.dot(x, x) * np.dot(y, y))
+    if denominator == 0:
+        return 0.0
 
-    # 分子と分母を計算
-    numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_vals, y_vals, strict=False))
-    x_variance = sum((x - x_mean) ** 2 for x in x_vals)
-    y_variance = sum((y - y_mean) ** 2 for y in y_vals)
+    return float(np.dot(x, y) / denominator)
 
-    denominator = (x_variance * y_variance) ** 0.5
 
-    if denominator == 0:
+def _rank_average(values: np.ndarray) -> np.ndarray:
+    """同順位を平均順位として扱う順位付け"""
+    order = np.argsort(values, kind="stable")
+    values_sorted = values[order]
+
+    is_group_start = np.concatenate(([True], values_sorted[1:] != values_sorted[:-1]))
+    group_start = np.flatnonzero(is_group_start)
+    group_end = np.append(group_start[1:], len(values))
+    group_rank = (group_start + group_end + 1) / 2.0
+
+    ranks = np.empty(len(values), dtype=float)
+    ranks[order] = group_rank[np.cumsum(is_group_start) - 1]
+
+    return ranks
+
+
+def calculate_rank_correlation(x_values, y_values) -> float:
+    """スピアマンの順位相関係数を計算"""
+    if x_values is None or y_values is None or len(x_values) == 0 or len(x_values) != len(y_values):
         return 0.0
 
-    return numerator / denominator
+    x = _to_float_array(x_values)
+    y = _to_float_array(y_values)
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if np.count_nonzero(valid) < 2:
+        return 0.0
+
+    return calculate_correlation(_rank_average(x[valid]), _rank_average(y[valid]))
+
+
+def sample_stratified(x: np.ndarray, y: np.ndarray, max_points: int = CORRELATION_SAMPLE_MAX) -> np.ndarray:
+    """
+    散布図用に、x の値で層化した決定的なサンプルを返す
+
+    x でソートした上で等間隔に抽出するので、x の分布 (最小値・最大値を含む) が保たれ、
+    同じ入力に対しては常に同じ点が選ばれます。戻り値は [[x, y], ...] 形式の配列です。
+    """
+    order = np.argsort(x, kind="stable")
+    if len(order) > max_points:
+        order = order[np.linspace(0, len(order) - 1, max_points).round().astype(int)]
+
+    return np.column_stack((x[order], y[order]))
 
 
 def calculate_boxplot_stats(values: list) -> dict:
@@ -359,113 +640,169 @@ def _prepare_hourly_data(minute_data: list[dict], hourly_data: list[dict]) -> tu
     return hourly_cooling_mode, hourly_duty_ratio, hourly_valve_ops
 
 
-def _prepare_timeseries_data(minute_data: list[dict]) -> list[dict]:
-    """時系列データを準備（過去100日分）"""
-    timeseries_data = []
+def _parse_timestamp(timestamp) -> datetime.datetime:
+    """タイムスタンプ (文字列もしくは datetime) をタイムゾーン付きの datetime に変換"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
 
-    # 過去100日分のデータを取得（144000分）
-    recent_data = minute_data[-144000:] if len(minute_data) > 144000 else minute_data
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=TIMEZONE)
 
-    # 時系列表示のため、データを古い順（昇順）に並び替え
-    recent_data = list(reversed(recent_data))
+    return timestamp
 
-    # データポイント数が多い場合は平均化して処理
-    target_points = 1000  # 目標ポイント数
-    if len(recent_data) > target_points:
-        # データを等間隔に分割して平均化
-        chunk_size = len(recent_data) // target_points
-        averaged_data = []
 
-        for i in range(0, len(recent_data), chunk_size):
-            chunk = recent_data[i : i + chunk_size]
-            if not chunk:
-                continue
-
-            # チャンクの最初のタイムスタンプを使用
-            base_data = chunk[0]
+def _parse_range_arg(value: str | None, is_end: bool = False) -> float | None:  # noqa: FBT001
+    """期間指定パラメータ (UNIX 時間 [ms] もしくは ISO 8601 形式) を UNIX 時間 [ms] に変換"""
+    if value is None or value == "":
+        return None
 
-            # 数値データの平均を計算
-            avg_data = {
-                "timestamp": base_data.get("timestamp"),
-                "cooling_mode": sum(
-                    d.get("cooling_mode") or 0 for d in chunk if d.get("cooling_mode") is not None
-                )
-                / max(1, sum(1 for d in chunk if d.get("cooling_mode") is not None)),
-                "duty_ratio": sum(d.get("duty_ratio") or 0 for d in chunk if d.get("duty_ratio") is not None)
-                / max(1, sum(1 for d in chunk if d.get("duty_ratio") is not None)),
-                "temperature": sum(
-                    d.get("temperature") or 0 for d in chunk if d.get("temperature") is not None
-                )
-                / max(1, sum(1 for d in chunk if d.get("temperature") is not None)),
-                "humidity": sum(d.get("humidity") or 0 for d in chunk if d.get("humidity") is not None)
-                / max(1, sum(1 for d in chunk if d.get("humidity") is not None)),
-                "lux": sum(d.get("lux") or 0 for d in chunk if d.get("lux") is not None)
-                / max(1, sum(1 for d in chunk if d.get("lux") is not None)),
-                "solar_radiation": sum(
-                    d.get("solar_radiation") or 0 for d in chunk if d.get("solar_radiation") is not None
-                )
-                / max(1, sum(1 for d in chunk if d.get("solar_radiation") is not None)),
-                "rain_amount": sum(
-                    d.get("rain_amount") or 0 for d in chunk if d.get("rain_amount") is not None
-                )
-                / max(1, sum(1 for d in chunk if d.get("rain_amount") is not None)),
-            }
-            averaged_data.append(avg_data)
+    try:
+        return float(value)
+    except ValueError:
+        pass
 
-        recent_data = averaged_data
+    timestamp = _parse_timestamp(value)
+    if is_end and (len(value) == len("YYYY-MM-DD")):
+        # NOTE: 日付のみで終了を指定された場合は、その日の終わりまでを含める
+        timestamp += datetime.timedelta(days=1)
 
-    for data in recent_data:
-        if data.get("timestamp"):
-            # タイムスタンプを簡潔な形式に変換（月/日 時:分）
-            timestamp = data["timestamp"]
-            if isinstance(timestamp, str):
-                # ISO形式の場合は datetime に変換
-                try:
-                    if "T" in timestamp:
-                        timestamp = datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-                    else:
-                        timestamp = datetime.datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").replace(
-                            tzinfo=zoneinfo.ZoneInfo("Asia/Tokyo")
-                        )
-                except Exception:
-                    logging.debug("Failed to parse timestamp for time series formatting")
+    return timestamp.timestamp() * 1000
 
-            # 簡潔な形式にフォーマット
-            if hasattr(timestamp, "strftime"):
-                formatted_timestamp = timestamp.strftime("%m/%d %H:%M")
-            else:
-                formatted_timestamp = str(timestamp)
 
-            timeseries_data.append(
-                {
-                    "timestamp": formatted_timestamp,
-                    "cooling_mode": data.get("cooling_mode"),
-                    "duty_ratio": data.get("duty_ratio"),
-                    "temperature": data.get("temperature"),
-                    "humidity": data.get("humidity"),
-                    "lux": data.get("lux"),
-                    "solar_radiation": data.get("solar_radiation"),
-                    "rain_amount": data.get("rain_amount"),
-                }
-            )
-    return timeseries_data
+def parse_timeseries_option(args) -> dict:
+    """時系列グラフ用のクエリパラメータ (from, to, points) を解釈"""
+    time_from = _parse_range_arg(args.get("from"))
+    time_to = _parse_range_arg(args.get("to"), is_end=True)
+    points = int(args.get("points", TIMESERIES_POINTS))
 
+    if (time_from is not None) and (time_to is not None) and (time_from >= time_to):
+        raise ValueError("from は to より前の時刻を指定してください")  # noqa: TRY003, EM101
 
-def _prepare_correlation_data(minute_data: list[dict]) -> dict:
-    """環境要因との相関用データを準備"""
     return {
-        "cooling_mode": [d.get("cooling_mode") for d in minute_data if d.get("cooling_mode") is not None],
-        "duty_ratio": [d.get("duty_ratio") for d in minute_data if d.get("duty_ratio") is not None],
-        "temperature": [d.get("temperature") for d in minute_data if d.get("temperature") is not None],
-        "humidity": [d.get("humidity") for d in minute_data if d.get("humidity") is not None],
-        "lux": [d.get("lux") for d in minute_data if d.get("lux") is not None],
-        "solar_radiation": [
-            d.get("solar_radiation") for d in minute_data if d.get("solar_radiation") is not None
-        ],
-        "rain_amount": [d.get("rain_amount") for d in minute_data if d.get("rain_amount") is not None],
+        "time_from": time_from,
+        "time_to": time_to,
+        "points": min(max(points, 3), TIMESERIES_POINTS_MAX),
     }
 
 
+def downsample_lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets で間引く点のインデックスを返す
+
+    各バケットから、前に選んだ点と次のバケットの平均点とで作る三角形の面積が最大になる点を
+    選ぶので、平均化と違って短時間のピークが潰れません。x は昇順である必要があります。
+    """
+    n = len(x)
+    if (threshold >= n) or (threshold < 3):
+        return np.arange(n)
+
+    # NOTE: 先頭と末尾の点は必ず残し、残りを threshold - 2 個のバケットに分ける
+    every = (n - 2) / (threshold - 2)
+    edges = np.floor(np.arange(threshold - 1) * every).astype(int) + 1
+    edges[-1] = n - 1
+
+    bucket_count = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[1 : n - 1], edges[:-1] - 1) / bucket_count, x[n - 1])
+    avg_y = np.append(np.add.reduceat(y[1 : n - 1], edges[:-1] - 1) / bucket_count, y[n - 1])
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start = edges[i]
+        end = edges[i + 1]
+
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y[i + 1] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def _prepare_timeseries_data(
+    minute_data: list[dict],
+    points: int = TIMESERIES_POINTS,
+    time_from: float | None = None,
+    time_to: float | None = None,
+) -> dict:
+    """
+    時系列データを準備
+
+    指標毎に欠損を除いた上で LTTB により最大 points 点に間引き、[UNIX 時間 [ms], 値] の
+    配列として返します。期間 (UNIX 時間 [ms]) が指定された場合はその範囲のみを対象とし、
+    指定が無い場合は最新から TIMESERIES_DAYS 日分を対象とします。
+    """
+    timeseries_data = {"range": {"from": None, "to": None}}
+    for metric in TIMESERIES_METRIC_LIST:
+        timeseries_data[metric] = []
+
+    rows = [d for d in minute_data if d.get("timestamp")]
+    if not rows:
+        return timeseries_data
+
+    timestamp = np.array([_parse_timestamp(d["timestamp"]).timestamp() * 1000 for d in rows])
+
+    # NOTE: get_minute_data は新しい順に返すので、時系列表示のため古い順に並べる
+    order = np.argsort(timestamp, kind="stable")
+    timestamp = timestamp[order]
+
+    if time_to is None:
+        time_to = timestamp[-1]
+    if time_from is None:
+        time_from = time_to - TIMESERIES_DAYS * 24 * 60 * 60 * 1000
+
+    in_range = (timestamp >= time_from) & (timestamp <= time_to)
+    row_index = order[in_range]
+    timestamp = timestamp[in_range]
+
+    timeseries_data["range"] = {"from": float(time_from), "to": float(time_to)}
+
+    for metric in TIMESERIES_METRIC_LIST:
+        value = _to_float_array([rows[i].get(metric) for i in row_index])
+
+        valid = ~np.isnan(value)
+        x = timestamp[valid]
+        y = value[valid]
+
+        selected = downsample_lttb(x, y, points)
+        timeseries_data[metric] = np.column_stack((x[selected], np.round(y[selected], 4))).tolist()
+
+    return timeseries_data
+
+
+def _prepare_correlation_data(minute_data: list[dict], max_points: int = CORRELATION_SAMPLE_MAX) -> dict:
+    """
+    環境要因との相関用データを準備
+
+    同じ分のデータ同士を対にしたまま欠損行を除外し、相関係数はサーバー側で全データから計算します。
+    ブラウザには散布図用に間引いた点のみを送ります。
+    """
+    correlation_data = {}
+
+    for x_key, y_key in CORRELATION_PAIR_LIST:
+        x = _to_float_array([d.get(x_key) for d in minute_data])
+        y = _to_float_array([d.get(y_key) for d in minute_data])
+
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x = x[valid]
+        y = y[valid]
+
+        correlation_data[f"{x_key}_{y_key}"] = {
+            "x": x_key,
+            "y": y_key,
+            "count": len(x),
+            "pearson": calculate_correlation(x, y),
+            "spearman": calculate_rank_correlation(x, y),
+            "points": np.round(sample_stratified(x, y, max_points), 4).tolist(),
+        }
+
+    return correlation_data
+
+
 def _prepare_boxplot_data(
     hourly_cooling_mode: list, hourly_duty_ratio: list, hourly_valve_ops: list
 ) -> tuple:
@@ -490,36 +827,23 @@ def _prepare_boxplot_data(
     return boxplot_cooling_mode, boxplot_duty_ratio, boxplot_valve_ops
 
 
-def prepare_chart_data(minute_data: list[dict], hourly_data: list[dict]) -> dict:
-    """チャート用データを準備"""
-    # 各データ準備を個別の関数で処理
+def prepare_hourly_chart_data(minute_data: list[dict], hourly_data: list[dict]) -> dict:
+    """時間別分布の箱ヒゲ図用データを準備"""
     hourly_cooling_mode, hourly_duty_ratio, hourly_valve_ops = _prepare_hourly_data(minute_data, hourly_data)
-    timeseries_data = _prepare_timeseries_data(minute_data)
-    correlation_data = _prepare_correlation_data(minute_data)
     boxplot_cooling_mode, boxplot_duty_ratio, boxplot_valve_ops = _prepare_boxplot_data(
         hourly_cooling_mode, hourly_duty_ratio, hourly_valve_ops
     )
 
     return {
-        "hourly_cooling_mode": hourly_cooling_mode,
-        "hourly_duty_ratio": hourly_duty_ratio,
-        "hourly_valve_ops": hourly_valve_ops,
         "boxplot_cooling_mode": boxplot_cooling_mode,
         "boxplot_duty_ratio": boxplot_duty_ratio,
         "boxplot_valve_ops": boxplot_valve_ops,
-        "timeseries": timeseries_data,
-        "correlation": correlation_data,
     }
 
 
-def generate_metrics_html(
-    stats: dict, minute_data: list[dict], hourly_data: list[dict], period_info: dict
-) -> str:
-    """Bulma CSSを使用したメトリクスHTMLを生成"""
-    # JavaScript用データを準備
-    chart_data = prepare_chart_data(minute_data, hourly_data)
-    chart_data_json = json.dumps(chart_data)
-
+@functools.cache
+def generate_metrics_html() -> str:
+    """Bulma CSSを使用したメトリクスHTMLの枠を生成"""
     # URL_PREFIXを取得してfaviconパスを構築
     favicon_path = f"{my_lib.webapp.config.URL_PREFIX}/favicon.ico"
 
@@ -582,10 +906,10 @@ def generate_metrics_html(
                     <span class="icon is-large"><i class="fas fa-snowflake"></i></span>
                     室外機冷却システム メトリクス ダッシュボード
                 </h1>
-                <p class="subtitle has-text-centered">{period_info["period_text"]}</p>
+                <p class="subtitle has-text-centered" id="period-text">読み込み中...</p>
 
                 <!-- 基本統計 -->
-                {generate_basic_stats_section(stats)}
+                {generate_basic_stats_section()}
 
                 <!-- 時間別分布分析 -->
                 {generate_hourly_analysis_section()}
@@ -600,12 +924,16 @@ def generate_metrics_html(
     </div>
 
     <script>
-        const chartData = {chart_data_json};
+        // NOTE: WebUI の中継 (/api/proxy/html/) 経由で開かれた場合は、データも中継 (/api/proxy/json/)
+        // 経由で取得するように、API の URL はこのページの位置から決める
+        const metricsApiUrl = window.location.pathname.replace("/proxy/html/", "/proxy/json/");
+        const chartData = {{}};
 
-        // チャート生成
-        generateHourlyCharts();
-        generateTimeseriesCharts();
-        generateCorrelationCharts();
+        // NOTE: 各パネルのデータは並行して取得し、届いたものから描画する
+        loadMetrics('stats', '', renderBasicStats);
+        loadMetrics('hourly', '', generateHourlyCharts);
+        loadMetrics('timeseries', window.location.search, generateTimeseriesCharts);
+        loadMetrics('correlation', '', generateCorrelationCharts);
 
         // パーマリンク機能を初期化
         initializePermalinks();
@@ -616,24 +944,9 @@ def generate_metrics_html(
     """
 
 
-def _format_cooling_mode_avg(stats: dict) -> str:
-    """冷却モード平均値をフォーマット"""
-    return "N/A" if stats["cooling_mode_avg"] is None else f"{stats['cooling_mode_avg']:.2f}"
-
-
-def _format_duty_ratio_avg(stats: dict) -> str:
-    """Duty比平均値をフォーマット"""
-    return "N/A" if stats["duty_ratio_avg"] is None else f"{stats['duty_ratio_avg'] * 100:.1f}"
-
-
-def _format_valve_operations(stats: dict) -> str:
-    """バルブ操作回数をフォーマット"""
-    return f"{stats['valve_operations_total']:,}"
-
-
-def generate_basic_stats_section(stats: dict) -> str:
+def generate_basic_stats_section() -> str:
     """基本統計セクションのHTML生成"""
-    return f"""
+    return """
     <div class="section">
         <h2 class="title is-4 permalink-header" id="basic-stats">
             <span class="icon"><i class="fas fa-chart-bar"></i></span>
@@ -654,41 +967,37 @@ def generate_basic_stats_section(stats: dict) -> str:
                             <div class="column is-one-third">
                                 <div class="has-text-centered">
                                     <p class="heading">❄️ 冷却モード平均</p>
-                                    <p class="stat-number has-text-info">{_format_cooling_mode_avg(stats)}</p>
+                                    <p class="stat-number has-text-info" id="stat-cooling-mode-avg">-</p>
                                 </div>
                             </div>
                             <div class="column is-one-third">
                                 <div class="has-text-centered">
                                     <p class="heading">⚡ Duty比平均</p>
-                                    <p class="stat-number has-text-success">
-                                        {_format_duty_ratio_avg(stats)}%
-                                    </p>
+                                    <p class="stat-number has-text-success" id="stat-duty-ratio-avg">-</p>
                                 </div>
                             </div>
                             <div class="column is-one-third">
                                 <div class="has-text-centered">
                                     <p class="heading">🔧 バルブ操作回数</p>
-                                    <p class="stat-number has-text-warning">
-                                        {_format_valve_operations(stats)}
-                                    </p>
+                                    <p class="stat-number has-text-warning" id="stat-valve-operations">-</p>
                                 </div>
                             </div>
                             <div class="column is-one-third">
                                 <div class="has-text-centered">
                                     <p class="heading">❌ エラー数</p>
-                                    <p class="stat-number has-text-danger">{stats["error_total"]:,}</p>
+                                    <p class="stat-number has-text-danger" id="stat-error-total">-</p>
                                 </div>
                             </div>
                             <div class="column is-one-third">
                                 <div class="has-text-centered">
                                     <p class="heading">📊 データポイント数</p>
-                                    <p class="stat-number has-text-primary">{stats["data_points"]:,}</p>
+                                    <p class="stat-number has-text-primary" id="stat-data-points">-</p>
                                 </div>
                             </div>
                             <div class="column is-one-third">
                                 <div class="has-text-centered">
                                     <p class="heading">📅 データ収集日数</p>
-                                    <p class="stat-number has-text-primary">{stats["total_days"]:,}</p>
+                                    <p class="stat-number has-text-primary" id="stat-total-days">-</p>
                                 </div>
                             </div>
                         </div>
@@ -785,6 +1094,22 @@ def generate_timeseries_section() -> str:
             </span>
         </h2>
 
+        <form class="field is-grouped is-grouped-multiline" method="get" id="timeseries-range-form">
+            <p class="control">
+                <input class="input is-small" type="date" name="from" id="timeseries-from">
+            </p>
+            <p class="control"><span class="is-size-7">〜</span></p>
+            <p class="control">
+                <input class="input is-small" type="date" name="to" id="timeseries-to">
+            </p>
+            <p class="control">
+                <button class="button is-small is-link" type="submit">期間を表示</button>
+            </p>
+            <p class="control">
+                <a class="button is-small" href="?">最新</a>
+            </p>
+        </form>
+
         <div class="columns">
             <div class="column">
                 <div class="card metrics-card">
@@ -919,6 +1244,39 @@ def generate_correlation_section() -> str:
 def generate_chart_javascript() -> str:
     """チャート生成用JavaScriptを生成"""
     return """
+        function loadMetrics(name, query, render) {
+            return fetch(`${metricsApiUrl}/${name}${query}`)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`${response.status} ${response.statusText}`);
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    Object.assign(chartData, data);
+                    render();
+                })
+                .catch(error => console.error(`Failed to load ${name}: `, error));
+        }
+
+        function renderBasicStats() {
+            const stats = chartData.stats;
+            const formatValue = (value, digits, scale = 1) => (
+                value === null ? 'N/A' : (value * scale).toFixed(digits)
+            );
+            const setText = (id, text) => {
+                document.getElementById(id).textContent = text;
+            };
+
+            setText('period-text', chartData.period.period_text);
+            setText('stat-cooling-mode-avg', formatValue(stats.cooling_mode_avg, 2));
+            setText('stat-duty-ratio-avg', formatValue(stats.duty_ratio_avg, 1, 100) + '%');
+            setText('stat-valve-operations', stats.valve_operations_total.toLocaleString());
+            setText('stat-error-total', stats.error_total.toLocaleString());
+            setText('stat-data-points', stats.data_points.toLocaleString());
+            setText('stat-total-days', stats.total_days.toLocaleString());
+        }
+
         function initializePermalinks() {
             // ページ読み込み時にハッシュがある場合はスクロール
             if (window.location.hash) {
@@ -1181,33 +1539,80 @@ def generate_chart_javascript() -> str:
             }
         }
 
+        function formatTimestamp(value) {
+            const date = new Date(value);
+            const month = (date.getMonth() + 1).toString().padStart(2, '0');
+            const day = date.getDate().toString().padStart(2, '0');
+            const hours = date.getHours().toString().padStart(2, '0');
+            const minutes = date.getMinutes().toString().padStart(2, '0');
+            return `${month}/${day} ${hours}:${minutes}`;
+        }
+
+        function formatDate(value) {
+            const date = new Date(value);
+            const month = (date.getMonth() + 1).toString().padStart(2, '0');
+            const day = date.getDate().toString().padStart(2, '0');
+            return `${date.getFullYear()}-${month}-${day}`;
+        }
+
         function generateTimeseriesCharts() {
+            // NOTE: 各系列は [UNIX 時間 (ms), 値] の配列で、サーバー側で LTTB により間引き済み
+            const timeseries = chartData.timeseries;
+            if (!timeseries) return;
+
+            const toPoints = (key, scale = 1) => (timeseries[key] || []).map(
+                p => ({ x: p[0], y: p[1] * scale })
+            );
+
+            if (timeseries.range && timeseries.range.from !== null) {
+                document.getElementById('timeseries-from').value = formatDate(timeseries.range.from);
+                document.getElementById('timeseries-to').value = formatDate(timeseries.range.to - 1);
+            }
+
+            const timeScale = {
+                type: 'linear',
+                min: timeseries.range ? timeseries.range.from : undefined,
+                max: timeseries.range ? timeseries.range.to : undefined,
+                title: {
+                    display: true,
+                    text: '時刻'
+                },
+                ticks: {
+                    maxTicksLimit: 12,
+                    maxRotation: 45,
+                    minRotation: 0,
+                    callback: value => formatTimestamp(value)
+                }
+            };
+            const timeTooltip = {
+                callbacks: {
+                    title: context => context.length ? formatTimestamp(context[0].parsed.x) : ''
+                }
+            };
+
             // 冷却モードとDuty比の時系列
             const coolingDutyCtx = document.getElementById('coolingDutyTimeseriesChart');
-            if (coolingDutyCtx && chartData.timeseries) {
-                const timestamps = chartData.timeseries.map(d => d.timestamp);
-                const coolingModes = chartData.timeseries.map(d => d.cooling_mode);
-                const dutyRatios = chartData.timeseries.map(d => d.duty_ratio ? d.duty_ratio * 100 : null);
-
+            if (coolingDutyCtx) {
                 new Chart(coolingDutyCtx, {
                     type: 'line',
                     data: {
-                        labels: timestamps,
                         datasets: [
                             {
                                 label: '冷却モード',
-                                data: coolingModes,
+                                data: toPoints('cooling_mode'),
                                 borderColor: 'rgba(52, 152, 219, 1)',
                                 backgroundColor: 'rgba(52, 152, 219, 0.1)',
+                                pointRadius: 0,
                                 tension: 0.1,
                                 spanGaps: true,
                                 yAxisID: 'y'
                             },
                             {
                                 label: 'Duty比（%）',
-                                data: dutyRatios,
+                                data: toPoints('duty_ratio', 100),
                                 borderColor: 'rgba(46, 204, 113, 1)',
                                 backgroundColor: 'rgba(46, 204, 113, 0.1)',
+                                pointRadius: 0,
                                 tension: 0.1,
                                 spanGaps: true,
                                 yAxisID: 'y1'
@@ -1217,10 +1622,16 @@ def generate_chart_javascript() -> str:
                     options: {
                         responsive: true,
                         maintainAspectRatio: false,
+                        animation: false,
+                        parsing: false,
                         interaction: {
-                            mode: 'index',
+                            mode: 'nearest',
+                            axis: 'x',
                             intersect: false
                         },
+                        plugins: {
+                            tooltip: timeTooltip
+                        },
                         scales: {
                             y: {
                                 type: 'linear',
@@ -1245,37 +1656,7 @@ def generate_chart_javascript() -> str:
                                 max: 100,
                                 min: 0
                             },
-                            x: {
-                                title: {
-                                    display: true,
-                                    text: '時刻'
-                                },
-                                ticks: {
-                                    maxTicksLimit: Math.max(6,
-                                        Math.min(20, Math.floor(timestamps.length / 10))),
-                                    maxRotation: 45,
-                                    minRotation: 0,
-                                    autoSkip: true,
-                                    autoSkipPadding: 20,
-                                    callback: function(value, index, values) {
-                                        const timestamp = timestamps[index];
-                                        if (typeof timestamp === 'string' && timestamp.includes('/')) {
-                                            return timestamp;  // 既にフォーマット済み
-                                        }
-                                        // ISO形式の場合は変換
-                                        try {
-                                            const date = new Date(timestamp);
-                                            const month = (date.getMonth() + 1).toString().padStart(2, '0');
-                                            const day = date.getDate().toString().padStart(2, '0');
-                                            const hours = date.getHours().toString().padStart(2, '0');
-                                            const minutes = date.getMinutes().toString().padStart(2, '0');
-                                            return `${month}/${day} ${hours}:${minutes}`;
-                                        } catch {
-                                            return String(timestamp).substring(0, 16);
-                                        }
-                                    }
-                                }
-                            }
+                            x: timeScale
                         }
                     }
                 });
@@ -1283,30 +1664,27 @@ def generate_chart_javascript() -> str:
 
             // 環境データの時系列
             const environmentCtx = document.getElementById('environmentTimeseriesChart');
-            if (environmentCtx && chartData.timeseries) {
-                const timestamps = chartData.timeseries.map(d => d.timestamp);
-                const temperatures = chartData.timeseries.map(d => d.temperature);
-                const solarRadiation = chartData.timeseries.map(d => d.solar_radiation);
-
+            if (environmentCtx) {
                 new Chart(environmentCtx, {
                     type: 'line',
                     data: {
-                        labels: timestamps,
                         datasets: [
                             {
                                 label: '気温（°C）',
-                                data: temperatures,
+                                data: toPoints('temperature'),
                                 borderColor: 'rgba(231, 76, 60, 1)',
                                 backgroundColor: 'rgba(231, 76, 60, 0.1)',
+                                pointRadius: 0,
                                 tension: 0.1,
                                 spanGaps: true,
                                 yAxisID: 'y'
                             },
                             {
                                 label: '日射量（W/m²）',
-                                data: solarRadiation,
+                                data: toPoints('solar_radiation'),
                                 borderColor: 'rgba(255, 193, 7, 1)',
                                 backgroundColor: 'rgba(255, 193, 7, 0.1)',
+                                pointRadius: 0,
                                 tension: 0.1,
                                 spanGaps: true,
                                 yAxisID: 'y1'
@@ -1316,10 +1694,16 @@ def generate_chart_javascript() -> str:
                     options: {
                         responsive: true,
                         maintainAspectRatio: false,
+                        animation: false,
+                        parsing: false,
                         interaction: {
-                            mode: 'index',
+                            mode: 'nearest',
+                            axis: 'x',
                             intersect: false
                         },
+                        plugins: {
+                            tooltip: timeTooltip
+                        },
                         scales: {
                             y: {
                                 type: 'linear',
@@ -1343,37 +1727,7 @@ def generate_chart_javascript() -> str:
                                 },
                                 min: 0
                             },
-                            x: {
-                                title: {
-                                    display: true,
-                                    text: '時刻'
-                                },
-                                ticks: {
-                                    maxTicksLimit: Math.max(6,
-                                        Math.min(20, Math.floor(timestamps.length / 10))),
-                                    maxRotation: 45,
-                                    minRotation: 0,
-                                    autoSkip: true,
-                                    autoSkipPadding: 20,
-                                    callback: function(value, index, values) {
-                                        const timestamp = timestamps[index];
-                                        if (typeof timestamp === 'string' && timestamp.includes('/')) {
-                                            return timestamp;  // 既にフォーマット済み
-                                        }
-                                        // ISO形式の場合は変換
-                                        try {
-                                            const date = new Date(timestamp);
-                                            const month = (date.getMonth() + 1).toString().padStart(2, '0');
-                                            const day = date.getDate().toString().padStart(2, '0');
-                                            const hours = date.getHours().toString().padStart(2, '0');
-                                            const minutes = date.getMinutes().toString().padStart(2, '0');
-                                            return `${month}/${day} ${hours}:${minutes}`;
-                                        } catch {
-                                            return String(timestamp).substring(0, 16);
-                                        }
-                                    }
-                                }
-                            }
+                            x: timeScale
                         }
                     }
                 });
@@ -1381,322 +1735,99 @@ def generate_chart_javascript() -> str:
         }
 
         function generateCorrelationCharts() {
-            // 相関係数計算用のヘルパー関数
-            function calculateCorrelation(xVals, yVals) {
-                const validPairs = [];
-                for (let i = 0; i < Math.min(xVals.length, yVals.length); i++) {
-                    if (xVals[i] !== null && yVals[i] !== null) {
-                        validPairs.push([xVals[i], yVals[i]]);
-                    }
-                }
-
-                if (validPairs.length < 2) return 0;
-
-                const xMean = validPairs.reduce((sum, pair) => sum + pair[0], 0) / validPairs.length;
-                const yMean = validPairs.reduce((sum, pair) => sum + pair[1], 0) / validPairs.length;
-
-                let numerator = 0;
-                let xVariance = 0;
-                let yVariance = 0;
-
-                for (const [x, y] of validPairs) {
-                    numerator += (x - xMean) * (y - yMean);
-                    xVariance += Math.pow(x - xMean, 2);
-                    yVariance += Math.pow(y - yMean, 2);
-                }
-
-                const denominator = Math.sqrt(xVariance * yVariance);
-                return denominator === 0 ? 0 : numerator / denominator;
-            }
-
-            // 気温 vs 冷却モード
-            const tempCoolingCtx = document.getElementById('tempCoolingCorrelationChart');
-            if (tempCoolingCtx && chartData.correlation) {
-                const data = [];
-                const minLength = Math.min(
-                    chartData.correlation.temperature.length,
-                    chartData.correlation.cooling_mode.length
-                );
-                for (let i = 0; i < minLength; i++) {
-                    if (chartData.correlation.temperature[i] !== null &&
-                        chartData.correlation.cooling_mode[i] !== null) {
-                        data.push({
-                            x: chartData.correlation.temperature[i],
-                            y: chartData.correlation.cooling_mode[i]
-                        });
-                    }
-                }
-
-                const correlation = calculateCorrelation(
-                    chartData.correlation.temperature,
-                    chartData.correlation.cooling_mode
-                );
-
-                new Chart(tempCoolingCtx, {
-                    type: 'scatter',
-                    data: {
-                        datasets: [{
-                            label: `気温 vs 冷却モード (r=${correlation.toFixed(3)})`,
-                            data: data,
-                            backgroundColor: 'rgba(231, 76, 60, 0.6)',
-                            borderColor: 'rgba(231, 76, 60, 1)',
-                            pointRadius: 3
-                        }]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        scales: {
-                            x: {
-                                title: {
-                                    display: true,
-                                    text: '気温（°C）'
-                                }
-                            },
-                            y: {
-                                title: {
-                                    display: true,
-                                    text: '冷却モード'
-                                }
-                            }
-                        },
-                        plugins: {
-                            tooltip: {
-                                callbacks: {
-                                    title: function(context) {
-                                        return `データポイント: ${context.length}個`;
-                                    },
-                                    label: function(context) {
-                                        return [
-                                            `気温: ${context.parsed.x.toFixed(1)}°C`,
-                                            `冷却モード: ${context.parsed.y.toFixed(1)}`,
-                                            `相関係数: ${correlation.toFixed(3)}`
-                                        ];
-                                    },
-                                    afterLabel: function() {
-                                        const strength = Math.abs(correlation);
-                                        if (strength >= 0.8) return '強い相関';
-                                        if (strength >= 0.5) return '中程度の相関';
-                                        if (strength >= 0.3) return '弱い相関';
-                                        return '相関なし';
-                                    }
-                                }
-                            }
-                        }
-                    }
-                });
-            }
-
-            // 湿度 vs Duty比
-            const humidityDutyCtx = document.getElementById('humidityDutyCorrelationChart');
-            if (humidityDutyCtx && chartData.correlation) {
-                const data = [];
-                const minLength = Math.min(
-                    chartData.correlation.humidity.length,
-                    chartData.correlation.duty_ratio.length
-                );
-                for (let i = 0; i < minLength; i++) {
-                    if (
-                        chartData.correlation.humidity[i] !== null &&
-                        chartData.correlation.duty_ratio[i] !== null
-                    ) {
-                        data.push({
-                            x: chartData.correlation.humidity[i],
-                            y: chartData.correlation.duty_ratio[i] * 100
-                        });
-                    }
-                }
-
-                const correlation = calculateCorrelation(
-                    chartData.correlation.humidity,
-                    chartData.correlation.duty_ratio
-                );
-
-                new Chart(humidityDutyCtx, {
-                    type: 'scatter',
-                    data: {
-                        datasets: [{
-                            label: `湿度 vs Duty比 (r=${correlation.toFixed(3)})`,
-                            data: data,
-                            backgroundColor: 'rgba(155, 89, 182, 0.6)',
-                            borderColor: 'rgba(155, 89, 182, 1)',
-                            pointRadius: 3
-                        }]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        scales: {
-                            x: {
-                                title: {
-                                    display: true,
-                                    text: '湿度（%）'
-                                }
-                            },
-                            y: {
-                                title: {
-                                    display: true,
-                                    text: 'Duty比（%）'
-                                }
-                            }
-                        },
-                        plugins: {
-                            tooltip: {
-                                callbacks: {
-                                    title: function(context) {
-                                        return `データポイント: ${context.length}個`;
-                                    },
-                                    label: function(context) {
-                                        return [
-                                            `湿度: ${context.parsed.x.toFixed(1)}%`,
-                                            `Duty比: ${context.parsed.y.toFixed(1)}%`,
-                                            `相関係数: ${correlation.toFixed(3)}`
-                                        ];
-                                    },
-                                    afterLabel: function() {
-                                        const strength = Math.abs(correlation);
-                                        if (strength >= 0.8) return '強い相関';
-                                        if (strength >= 0.5) return '中程度の相関';
-                                        if (strength >= 0.3) return '弱い相関';
-                                        return '相関なし';
-                                    }
-                                }
-                            }
-                        }
-                    }
-                });
-            }
-
-            // 日射量 vs 冷却モード
-            const solarCoolingCtx = document.getElementById('solarCoolingCorrelationChart');
-            if (solarCoolingCtx && chartData.correlation) {
-                const data = [];
-                const minLength = Math.min(
-                    chartData.correlation.solar_radiation.length,
-                    chartData.correlation.cooling_mode.length
-                );
-                for (let i = 0; i < minLength; i++) {
-                    if (
-                        chartData.correlation.solar_radiation[i] !== null &&
-                        chartData.correlation.cooling_mode[i] !== null
-                    ) {
-                        data.push({
-                            x: chartData.correlation.solar_radiation[i],
-                            y: chartData.correlation.cooling_mode[i]
-                        });
-                    }
+            // NOTE: 相関係数と散布図の点はサーバー側で計算・間引き済み
+            const correlationChartList = [
+                {
+                    canvasId: 'tempCoolingCorrelationChart',
+                    key: 'temperature_cooling_mode',
+                    title: '気温 vs 冷却モード',
+                    xLabel: '気温（°C）',
+                    yLabel: '冷却モード',
+                    color: '231, 76, 60',
+                    yScale: 1,
+                    formatX: x => `気温: ${x.toFixed(1)}°C`,
+                    formatY: y => `冷却モード: ${y.toFixed(1)}`
+                },
+                {
+                    canvasId: 'humidityDutyCorrelationChart',
+                    key: 'humidity_duty_ratio',
+                    title: '湿度 vs Duty比',
+                    xLabel: '湿度（%）',
+                    yLabel: 'Duty比（%）',
+                    color: '155, 89, 182',
+                    yScale: 100,
+                    formatX: x => `湿度: ${x.toFixed(1)}%`,
+                    formatY: y => `Duty比: ${y.toFixed(1)}%`
+                },
+                {
+                    canvasId: 'solarCoolingCorrelationChart',
+                    key: 'solar_radiation_cooling_mode',
+                    title: '日射量 vs 冷却モード',
+                    xLabel: '日射量（W/m²）',
+                    yLabel: '冷却モード',
+                    color: '243, 156, 18',
+                    yScale: 1,
+                    formatX: x => `日射量: ${x.toFixed(1)} W/m²`,
+                    formatY: y => `冷却モード: ${y.toFixed(1)}`
+                },
+                {
+                    canvasId: 'luxDutyCorrelationChart',
+                    key: 'lux_duty_ratio',
+                    title: '照度 vs Duty比',
+                    xLabel: '照度（lux）',
+                    yLabel: 'Duty比（%）',
+                    color: '52, 152, 219',
+                    yScale: 100,
+                    formatX: x => `照度: ${x.toFixed(1)} lux`,
+                    formatY: y => `Duty比: ${y.toFixed(1)}%`
                 }
-
-                const solarCorrelation = calculateCorrelation(
-                    chartData.correlation.solar_radiation,
-                    chartData.correlation.cooling_mode
-                );
-
-                new Chart(solarCoolingCtx, {
-                    type: 'scatter',
-                    data: {
-                        datasets: [{
-                            label: `日射量 vs 冷却モード (r=${solarCorrelation.toFixed(3)})`,
-                            data: data,
-                            backgroundColor: 'rgba(243, 156, 18, 0.6)',
-                            borderColor: 'rgba(243, 156, 18, 1)',
-                            pointRadius: 3
-                        }]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        scales: {
-                            x: {
-                                title: {
-                                    display: true,
-                                    text: '日射量（W/m²）'
-                                }
-                            },
-                            y: {
-                                title: {
-                                    display: true,
-                                    text: '冷却モード'
-                                }
-                            }
-                        },
-                        plugins: {
-                            tooltip: {
-                                callbacks: {
-                                    title: function(context) {
-                                        return `データポイント: ${context.length}個`;
-                                    },
-                                    label: function(context) {
-                                        return [
-                                            `日射量: ${context.parsed.x.toFixed(1)} W/m²`,
-                                            `冷却モード: ${context.parsed.y.toFixed(1)}`,
-                                            `相関係数: ${solarCorrelation.toFixed(3)}`
-                                        ];
-                                    },
-                                    afterLabel: function() {
-                                        const strength = Math.abs(solarCorrelation);
-                                        if (strength >= 0.8) return '強い相関';
-                                        if (strength >= 0.5) return '中程度の相関';
-                                        if (strength >= 0.3) return '弱い相関';
-                                        return '相関なし';
-                                    }
-                                }
-                            }
-                        }
-                    }
-                });
+            ];
+
+            function correlationStrength(correlation) {
+                const strength = Math.abs(correlation);
+                if (strength >= 0.8) return '強い相関';
+                if (strength >= 0.5) return '中程度の相関';
+                if (strength >= 0.3) return '弱い相関';
+                return '相関なし';
             }
 
-            // 照度 vs Duty比
-            const luxDutyCtx = document.getElementById('luxDutyCorrelationChart');
-            if (luxDutyCtx && chartData.correlation) {
-                const data = [];
-                const minLength = Math.min(
-                    chartData.correlation.lux.length,
-                    chartData.correlation.duty_ratio.length
-                );
-                for (let i = 0; i < minLength; i++) {
-                    if (
-                        chartData.correlation.lux[i] !== null &&
-                        chartData.correlation.duty_ratio[i] !== null
-                    ) {
-                        data.push({
-                            x: chartData.correlation.lux[i],
-                            y: chartData.correlation.duty_ratio[i] * 100
-                        });
-                    }
+            for (const chart of correlationChartList) {
+                const ctx = document.getElementById(chart.canvasId);
+                const correlation = chartData.correlation && chartData.correlation[chart.key];
+                if (!ctx || !correlation) {
+                    continue;
                 }
 
-                const luxCorrelation = calculateCorrelation(
-                    chartData.correlation.lux,
-                    chartData.correlation.duty_ratio
-                );
+                const data = correlation.points.map(([x, y]) => ({ x: x, y: y * chart.yScale }));
 
-                new Chart(luxDutyCtx, {
+                new Chart(ctx, {
                     type: 'scatter',
                     data: {
                         datasets: [{
-                            label: `照度 vs Duty比 (r=${luxCorrelation.toFixed(3)})`,
+                            label: `${chart.title} (r=${correlation.pearson.toFixed(3)}, ` +
+                                `ρ=${correlation.spearman.toFixed(3)}, ` +
+                                `n=${correlation.count.toLocaleString()})`,
                             data: data,
-                            backgroundColor: 'rgba(52, 152, 219, 0.6)',
-                            borderColor: 'rgba(52, 152, 219, 1)',
+                            backgroundColor: `rgba(${chart.color}, 0.6)`,
+                            borderColor: `rgba(${chart.color}, 1)`,
                             pointRadius: 3
                         }]
                     },
                     options: {
                         responsive: true,
                         maintainAspectRatio: false,
+                        animation: false,
                         scales: {
                             x: {
                                 title: {
                                     display: true,
-                                    text: '照度（lux）'
+                                    text: chart.xLabel
                                 }
                             },
                             y: {
                                 title: {
                                     display: true,
-                                    text: 'Duty比（%）'
+                                    text: chart.yLabel
                                 }
                             }
                         },
@@ -1708,17 +1839,14 @@ def generate_chart_javascript() -> str:
                                     },
                                     label: function(context) {
                                         return [
-                                            `照度: ${context.parsed.x.toFixed(1)} lux`,
-                                            `Duty比: ${context.parsed.y.toFixed(1)}%`,
-                                            `相関係数: ${luxCorrelation.toFixed(3)}`
+                                            chart.formatX(context.parsed.x),
+                                            chart.formatY(context.parsed.y),
+                                            `相関係数: ${correlation.pearson.toFixed(3)}`,
+                                            `順位相関係数: ${correlation.spearman.toFixed(3)}`
                                         ];
                                     },
                                     afterLabel: function() {
-                                        const strength = Math.abs(luxCorrelation);
-                                        if (strength >= 0.8) return '強い相関';
-                                        if (strength >= 0.5) return '中程度の相関';
-                                        if (strength >= 0.3) return '弱い相関';
-                                        return '相関なし';
+                                        return correlationStrength(correlation.pearson);
                                     }
                                 }
                             }
@@ -24,6 +24,9 @@ import zmq
 
 import unit_cooler.const
 
+# 送信の間隔の最小値 (ベンチマークでは 0 にして最大の送信速度を計測する)
+SLEEP_MIN_SEC = 0.5
+
 
 def wait_first_client(socket, timeout=10):
     start_time = time.time()
@@ -46,6 +49,19 @@ def wait_first_client(socket, timeout=10):
             break
 
 
+def gen_message_list(message):
+    """
+    送信する (チャンネル, JSON 文字列) のリストを返す
+
+    message が (チャンネル, メッセージ) のリストの場合はそれぞれのチャンネルに、
+    それ以外の場合は制御用のチャンネルに送ります。JSON 化済みの文字列はそのまま送ります。
+    """
+    if not isinstance(message, list):
+        message = [(unit_cooler.const.PUBSUB_CH, message)]
+
+    return [(ch, body if isinstance(body, str) else my_lib.json_util.dumps(body)) for ch, body in message]
+
+
 def start_server(server_port, func, interval_sec, msg_count=0):
     logging.info("Start ZMQ server (port: %d)...", server_port)
 
@@ -75,7 +91,8 @@ def start_server(server_port, func, interval_sec, msg_count=0):
                 pass  # イベントなし
 
             start_time = time.time()
-            socket.send_string(f"{unit_cooler.const.PUBSUB_CH} {my_lib.json_util.dumps(func())}")
+            for ch, message in gen_message_list(func()):
+                socket.send_string(f"{ch} {message}")
 
             if msg_count != 0:
                 send_count += 1
@@ -85,7 +102,7 @@ def start_server(server_port, func, interval_sec, msg_count=0):
                     logging.info("Terminate, because the specified number of times has been reached.")
                     break
 
-            sleep_sec = max(interval_sec - (time.time() - start_time), 0.5)
+            sleep_sec = max(interval_sec - (time.time() - start_time), SLEEP_MIN_SEC)
             logging.debug("Seep %.1f sec...", sleep_sec)
             time.sleep(sleep_sec)
     except Exception:
@@ -99,7 +116,7 @@ def start_server(server_port, func, interval_sec, msg_count=0):
 
 # NOTE: Last Value Caching Proxy
 # see https://zguide.zeromq.org/docs/chapter5/
-def start_proxy(server_host, server_port, proxy_port, msg_count=0):  # noqa: PLR0915, C901
+def start_proxy(server_host, server_port, proxy_port, msg_count=0):  # noqa: PLR0915, PLR0912, C901
     logging.info("Start ZMQ proxy server (front: %s:%d, port: %d)...", server_host, server_port, proxy_port)
 
     context = zmq.Context()
@@ -107,6 +124,7 @@ def start_proxy(server_host, server_port, proxy_port, msg_count=0):  # noqa: PLR
     frontend = context.socket(zmq.SUB)
     frontend.connect(f"tcp://{server_host}:{server_port}")
     frontend.setsockopt_string(zmq.SUBSCRIBE, unit_cooler.const.PUBSUB_CH)
+    frontend.setsockopt_string(zmq.SUBSCRIBE, unit_cooler.const.PUBSUB_TELEMETRY_CH)
 
     backend = context.socket(zmq.XPUB)
     backend.setsockopt(zmq.XPUB_VERBOSE, 1)
@@ -135,7 +153,8 @@ def start_proxy(server_host, server_port, proxy_port, msg_count=0):  # noqa: PLR
             logging.info("Proxy message")
             backend.send_string(recv_data)
 
-            if subscribed:
+            # NOTE: テレメトリは回数に数えない
+            if subscribed and (ch == unit_cooler.const.PUBSUB_CH):
                 proxy_count += 1
 
         if backend in events:
@@ -149,8 +168,9 @@ def start_proxy(server_host, server_port, proxy_port, msg_count=0):  # noqa: PLR
                 ch = event[1:].decode("utf-8")
                 if ch in cache:
                     logging.info("Send cache")
-                    backend.send_string(f"{unit_cooler.const.PUBSUB_CH} {cache[unit_cooler.const.PUBSUB_CH]}")
-                    proxy_count += 1
+                    backend.send_string(f"{ch} {cache[ch]}")
+                    if ch == unit_cooler.const.PUBSUB_CH:
+                        proxy_count += 1
                 else:
                     logging.warning("Cache is empty")
             else:  # pragma: no cover
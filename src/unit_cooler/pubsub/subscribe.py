@@ -7,14 +7,16 @@ import zmq
 import unit_cooler.const
 
 
-def start_client(server_host, server_port, func, msg_count=0, should_terminate=None):
-    logging.info("Start ZMQ client...")
+def start_client(  # noqa: PLR0913
+    server_host, server_port, func, msg_count=0, should_terminate=None, ch=unit_cooler.const.PUBSUB_CH
+):
+    logging.info("Start ZMQ client (ch: %s)...", ch)
 
     context = zmq.Context()
     socket = context.socket(zmq.SUB)
     target = f"tcp://{server_host}:{server_port}"
     socket.connect(target)
-    socket.setsockopt_string(zmq.SUBSCRIBE, unit_cooler.const.PUBSUB_CH)
+    socket.setsockopt_string(zmq.SUBSCRIBE, ch)
 
     # ノンブロッキング受信のためにタイムアウトを設定
     socket.setsockopt(zmq.RCVTIMEO, 1000)  # 1秒タイムアウト
@@ -29,7 +31,11 @@ def start_client(server_host, server_port, func, msg_count=0, should_terminate=N
             break
 
         try:
-            ch, json_str = socket.recv_string().split(" ", 1)
+            recv_ch, json_str = socket.recv_string().split(" ", 1)
+            # NOTE: 前方一致で購読しているので、チャンネル名が異なるものは無視する
+            if recv_ch != ch:
+                continue
+
             json_data = my_lib.json_util.loads(json_str)
             logging.debug("recv %s", json_data)
             func(json_data)
@@ -1,9 +1,91 @@
 #!/usr/bin/env python3
+import atexit
 import logging
 import os
+import queue
+import threading
+import time
 
 import my_lib.notify.slack
 
+# 送信待ちの通知の上限
+NOTIFY_QUEUE_SIZE = 100
+# 送信に失敗した場合のリトライ回数と初回の待ち時間
+NOTIFY_RETRY_COUNT = 3
+NOTIFY_RETRY_WAIT_SEC = 1
+# 終了時に、送信待ちの通知を待つ最大時間
+NOTIFY_EXIT_TIMEOUT_SEC = 10
+
+_notify_queue = queue.Queue(NOTIFY_QUEUE_SIZE)
+_notify_lock = threading.Lock()
+_notify_thread = None
+_notify_atexit = False
+# メッセージ毎の最後に受け付けた時刻
+_notify_last = {}
+
+
+def _notify_slack(config, message):
+    for i in range(NOTIFY_RETRY_COUNT + 1):
+        try:
+            my_lib.notify.slack.error(
+                config["slack"]["bot_token"],
+                config["slack"]["error"]["channel"]["name"],
+                config["slack"]["from"],
+                message,
+                config["slack"]["error"]["interval_min"],
+            )
+            return
+        except Exception:  # noqa: PERF203
+            if i == NOTIFY_RETRY_COUNT:
+                logging.exception("Failed to Notify via Slack")
+                return
+
+            wait_sec = NOTIFY_RETRY_WAIT_SEC * (2**i)
+            logging.warning("Failed to Notify via Slack, retry after %d sec", wait_sec)
+            time.sleep(wait_sec)
+
+
+def _notify_worker():
+    while True:
+        config, message = _notify_queue.get()
+        try:
+            _notify_slack(config, message)
+        finally:
+            _notify_queue.task_done()
+
+
+def _notify_flush():
+    if not notify_wait(NOTIFY_EXIT_TIMEOUT_SEC):
+        logging.warning("Exit before sending all notifications")
+
+
+def _start_notify_worker():
+    global _notify_thread  # noqa: PLW0603
+    global _notify_atexit  # noqa: PLW0603
+
+    # NOTE: 送信スレッドは daemon なので、終了時に送信待ちの通知 (致命的なエラーなど) を待つ
+    if not _notify_atexit:
+        atexit.register(_notify_flush)
+        _notify_atexit = True
+
+    # NOTE: fork したプロセスではスレッドが引き継がれないので、生存確認して起動する
+    if (_notify_thread is None) or not _notify_thread.is_alive():
+        _notify_thread = threading.Thread(target=_notify_worker, name="notify", daemon=True)
+        _notify_thread.start()
+
+
+def _is_duplicate(message, interval_min):
+    now = time.monotonic()
+    last = _notify_last.get(message)
+    if (last is not None) and (now - last < interval_min * 60):
+        return True
+
+    for key in [key for key, value in _notify_last.items() if now - value >= interval_min * 60]:
+        del _notify_last[key]
+    _notify_last[message] = now
+
+    return False
+
 
 def notify_error(config, message, is_logging=True):
     if is_logging:
@@ -15,13 +97,27 @@ def notify_error(config, message, is_logging=True):
         # NOTE: テストではなく、ダミーモードで実行している時は Slack 通知しない
         return
 
+    # NOTE: Slack への送信は専用スレッドで行い、呼び出し元 (制御ループ) を待たせない
+    with _notify_lock:
+        if _is_duplicate(message, config["slack"]["error"]["interval_min"]):
+            logging.debug("Skip duplicate notification")
+            return
+
+        _start_notify_worker()
+
     try:
-        my_lib.notify.slack.error(
-            config["slack"]["bot_token"],
-            config["slack"]["error"]["channel"]["name"],
-            config["slack"]["from"],
-            message,
-            config["slack"]["error"]["interval_min"],
-        )
-    except Exception:
-        logging.exception("Failed to Notify via Slack")
+        _notify_queue.put_nowait((config, message))
+    except queue.Full:
+        logging.warning("Notification queue is full, drop message")
+
+
+def notify_wait(timeout=None):
+    """送信待ちの通知が全て処理されるまで最大 timeout 秒待ち、全て処理されたかを返す"""
+    with _notify_queue.all_tasks_done:
+        return _notify_queue.all_tasks_done.wait_for(lambda: _notify_queue.unfinished_tasks == 0, timeout)
+
+
+def notify_clear():
+    """重複判定の履歴をクリアする"""
+    with _notify_lock:
+        _notify_last.clear()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+メトリクスのダッシュボードの JSON API を、アクチュエータから WebUI に中継します。
+
+ダッシュボードは WebUI の /api/proxy/html/ 経由で開かれるので、各パネルのデータも
+/api/proxy/json/ 経由で取得されます。汎用の中継 (my_lib.webapp.proxy) は条件付きリクエストの
+ヘッダを転送しないので、ここで If-None-Match などを転送し、304 はそのままブラウザに返します。
+"""
+
+import logging
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import flask
+
+blueprint = flask.Blueprint("metrics-proxy", __name__)
+
+# アクチュエータに転送するリクエストヘッダ
+REQUEST_HEADER_LIST = ["If-None-Match", "If-Modified-Since", "Accept-Encoding"]
+# ブラウザに返すレスポンスヘッダ
+RESPONSE_HEADER_LIST = ["Content-Type", "Content-Encoding", "ETag", "Last-Modified", "Cache-Control", "Vary"]
+
+TIMEOUT_SEC = 30
+
+api_base_url = None
+
+
+def init(api_base_url_):
+    global api_base_url  # noqa: PLW0603
+
+    api_base_url = api_base_url_
+
+
+def relay_response(status, header_map, body):
+    response = flask.Response(body, status=status)
+    for name in RESPONSE_HEADER_LIST:
+        if name in header_map:
+            response.headers[name] = header_map[name]
+
+    return response
+
+
+@blueprint.route("/api/proxy/json/api/metrics/<name>", methods=["GET"])
+def api_metrics(name):
+    url = f"{api_base_url}/api/metrics/{urllib.parse.quote(name)}"
+    if flask.request.query_string:
+        url += "?" + flask.request.query_string.decode()
+
+    header_map = {
+        key: flask.request.headers[key] for key in REQUEST_HEADER_LIST if key in flask.request.headers
+    }
+
+    try:
+        with urllib.request.urlopen(  # noqa: S310
+            urllib.request.Request(url, headers=header_map),  # noqa: S310
+            timeout=TIMEOUT_SEC,
+        ) as res:
+            return relay_response(res.status, res.headers, res.read())
+    except urllib.error.HTTPError as e:
+        # NOTE: 304 も HTTPError として届く
+        return relay_response(e.code, e.headers, e.read())
+    except Exception as e:
+        logging.exception("Failed to relay %s", url)
+        return flask.jsonify({"error": str(e)}), 502
@@ -6,6 +6,7 @@ import traceback
 import my_lib.footprint
 
 import unit_cooler.const
+import unit_cooler.exporter
 import unit_cooler.pubsub.subscribe
 
 # グローバル終了フラグ
@@ -29,6 +30,19 @@ def queue_put(message_queue, message, liveness_file):
     message_queue.put(message)
     my_lib.footprint.update(liveness_file)
 
+    unit_cooler.exporter.inc_counter(
+        f"{unit_cooler.exporter.PREFIX}_message_receive_total",
+        "Number of received control messages",
+        component="webui",
+    )
+    if "mode_index" in message:
+        unit_cooler.exporter.set_gauge(
+            f"{unit_cooler.exporter.PREFIX}_cooling_mode",
+            message["mode_index"],
+            "Cooling mode",
+            component="webui",
+        )
+
 
 # NOTE: 制御メッセージを Subscribe して、キューに積み、cooler_stat.py で WebUI に渡すワーカ
 def subscribe_worker(config, control_host, pub_port, message_queue, liveness_file, msg_count=0):  # noqa: PLR0913
@@ -62,7 +62,7 @@ def signal_handler(signum, _frame):
     term()
 
 
-def create_app(config, arg):
+def create_app(config, arg):  # noqa: PLR0915
     setting = {
         "control_host": "localhost",
         "pub_port": 2222,
@@ -85,7 +85,10 @@ def create_app(config, arg):
     import my_lib.webapp.proxy
     import my_lib.webapp.util
 
+    import unit_cooler.compress
+    import unit_cooler.exporter
     import unit_cooler.webui.webapi.cooler_stat
+    import unit_cooler.webui.webapi.metrics_proxy
     import unit_cooler.webui.worker
 
     message_queue = multiprocessing.Manager().Queue(10)
@@ -129,6 +132,8 @@ def create_app(config, arg):
         pass
 
     flask_cors.CORS(app)
+    # NOTE: Content-Encoding が付いた中継レスポンスは、再圧縮せずにそのまま返す
+    unit_cooler.compress.init(app)
 
     app.config["CONFIG"] = config
     app.config["MESSAGE_QUEUE"] = message_queue
@@ -141,15 +146,22 @@ def create_app(config, arg):
 
     app.register_blueprint(my_lib.webapp.base.blueprint_default)
     app.register_blueprint(my_lib.webapp.base.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX)
+    # NOTE: メトリクスの JSON API は、汎用の中継より優先して条件付きリクエストのヘッダを転送する
+    app.register_blueprint(
+        unit_cooler.webui.webapi.metrics_proxy.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX
+    )
     app.register_blueprint(my_lib.webapp.proxy.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX)
     app.register_blueprint(my_lib.webapp.util.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX)
     app.register_blueprint(
         unit_cooler.webui.webapi.cooler_stat.blueprint, url_prefix=my_lib.webapp.config.URL_PREFIX
     )
+    # NOTE: Prometheus からスクレイプするので、/metrics はプレフィックス無しで提供する
+    app.register_blueprint(unit_cooler.exporter.blueprint)
 
     my_lib.webapp.config.show_handler_list(app)
 
     unit_cooler.webui.webapi.cooler_stat.init(api_base_url)
+    unit_cooler.webui.webapi.metrics_proxy.init(api_base_url)
 
     # app.debug = True
 
@@ -6,6 +6,7 @@ import json
 import logging
 import os
 import pathlib
+import sqlite3
 import sys
 import time
 import unittest
@@ -91,6 +92,7 @@ def _clear(config):
         import unit_cooler.actuator.control
         import unit_cooler.actuator.valve
         import unit_cooler.actuator.work_log
+        import unit_cooler.util
 
     liveness_conf_path_list = [
         ["controller"],
@@ -109,6 +111,8 @@ def _clear(config):
 
     my_lib.webapp.log.term()
 
+    unit_cooler.util.notify_wait()
+    unit_cooler.util.notify_clear()
     my_lib.notify.slack.interval_clear()
     my_lib.notify.slack.hist_clear()
 
@@ -208,6 +212,11 @@ def check_liveness(config, conf_path, is_healthy, threshold_sec=120):
 def check_notify_slack(message, index=-1):
     import my_lib.notify.slack
 
+    import unit_cooler.util
+
+    # NOTE: Slack への通知は非同期なので、送信が終わるのを待つ
+    unit_cooler.util.notify_wait()
+
     notify_hist = my_lib.notify.slack.hist_get(False)
     logging.debug(notify_hist)
 
@@ -712,6 +721,724 @@ def test_controller_dummy_error(controller_mocks, config, server_port, real_port
     check_notify_slack(None)
 
 
+def test_controller_replay(mocker, config, tmp_path):
+    import my_lib.time
+
+    import unit_cooler.controller.engine
+    import unit_cooler.controller.replay
+    from unit_cooler.metrics.collector import MetricsCollector
+
+    zoneinfo = my_lib.time.get_zoneinfo()
+    start = datetime.datetime(2025, 7, 1, 12, 0, tzinfo=zoneinfo)
+    end = start + datetime.timedelta(hours=2)
+
+    value_map = {"temp": 33, "humi": 50, "lux": 1000, "solar_rad": 800, "rain": 0, "power": 1100}
+
+    def fetch_data_mock(  # noqa: PLR0913
+        db_config,  # noqa: ARG001
+        measure,  # noqa: ARG001
+        hostname,  # noqa: ARG001
+        field,
+        start="-30h",
+        stop="now()",
+        every_min=1,  # noqa: ARG001
+        window_min=3,  # noqa: ARG001
+        create_empty=True,  # noqa: ARG001
+        last=False,  # noqa: ARG001
+    ):
+        time_list = []
+        fetch_time = datetime.datetime.fromisoformat(start)
+        # NOTE: 最初の 1 時間分のデータのみ返し、それ以降は欠損させる
+        while fetch_time < min(datetime.datetime.fromisoformat(stop), end - datetime.timedelta(hours=1)):
+            time_list.append(fetch_time.replace(tzinfo=None))
+            fetch_time += datetime.timedelta(minutes=1)
+
+        return {"value": [value_map[field]] * len(time_list), "time": time_list, "valid": True}
+
+    mocker.patch("my_lib.sensor_data.fetch_data", side_effect=fetch_data_mock)
+
+    sense_data = {
+        kind: [{"name": sensor["name"], "value": value_map[kind]} for sensor in sensor_list]
+        for kind, sensor_list in config["controller"]["sensor"].items()
+    }
+    sense_data["rain"][0]["value"] *= 60
+    mode_index = unit_cooler.controller.engine.judge_cooling_mode(config, sense_data)["cooling_mode"]
+
+    metrics_db_path = tmp_path / "metrics.db"
+    MetricsCollector(metrics_db_path)
+    with sqlite3.connect(metrics_db_path) as conn:
+        conn.execute(
+            "INSERT INTO minute_metrics (timestamp, cooling_mode) VALUES (?, ?)", (start.isoformat(" "), 0)
+        )
+
+    result = unit_cooler.controller.replay.replay(config, start, end, metrics_db_path=metrics_db_path)
+
+    assert result["minutes"] == 120
+    # NOTE: 欠損しても 1 時間は直前の値が使われる
+    assert result["timeline"][0]["value"] == min(
+        mode_index, len(unit_cooler.controller.message.CONTROL_MESSAGE_LIST) - 1
+    )
+    assert result["timeline"][0]["minutes"] == 120
+    assert result["compare"]["minutes"] == 1
+    assert result["compare"]["match_minutes"] == 0
+    assert result["compare"]["diff"][0]["actual"] == 0
+    assert result["watering"]["actual"]["on_min"] == 0
+
+    result = unit_cooler.controller.replay.replay(
+        config, start, end, {"TEMP_THRESHOLD_HIGH_L": 34}, metrics_db_path, flow_rate=2
+    )
+    assert result["timeline"][0]["value"] == 7
+    assert result["watering"]["replay"]["amount"] == result["watering"]["replay"]["on_min"] * 2
+
+
+def test_controller_replay_stateful(mocker, config):
+    import copy
+
+    import my_lib.time
+
+    import unit_cooler.clock
+    import unit_cooler.controller.engine
+    import unit_cooler.controller.replay
+
+    zoneinfo = my_lib.time.get_zoneinfo()
+    start = datetime.datetime(2025, 7, 1, 12, 0, tzinfo=zoneinfo)
+    end = start + datetime.timedelta(hours=1)
+
+    value_map = {"temp": 30, "humi": 50, "lux": 1000, "solar_rad": 300, "rain": 0}
+
+    def fetch_data_mock(  # noqa: PLR0913
+        db_config,  # noqa: ARG001
+        measure,  # noqa: ARG001
+        hostname,
+        field,
+        start="-30h",
+        stop="now()",
+        every_min=1,  # noqa: ARG001
+        window_min=3,  # noqa: ARG001
+        create_empty=True,  # noqa: ARG001
+        last=False,  # noqa: ARG001
+    ):
+        time_list = []
+        value_list = []
+        fetch_time = datetime.datetime.fromisoformat(start)
+        while fetch_time < datetime.datetime.fromisoformat(stop):
+            time_list.append(fetch_time.replace(tzinfo=None))
+            if field != "power":
+                value_list.append(value_map[field])
+            elif hostname != config["controller"]["sensor"]["power"][0]["hostname"]:
+                value_list.append(0)
+            else:
+                # NOTE: 消費電力が AIRCON_POWER_THRESHOLD_NORMAL 付近で 1 分毎に揺れる
+                value_list.append(520 if (int(fetch_time.timestamp()) // 60) % 2 == 0 else 480)
+            fetch_time += datetime.timedelta(minutes=1)
+
+        return {"value": value_list, "time": time_list, "valid": True}
+
+    mocker.patch("my_lib.sensor_data.fetch_data", side_effect=fetch_data_mock)
+
+    result = unit_cooler.controller.replay.replay(config, start, end)
+    assert not result["stateful"]
+    assert len(result["timeline"]) == 60
+
+    config_stabilize = copy.deepcopy(config)
+    config_stabilize["controller"]["stabilize"] = {
+        "hysteresis": {"AIRCON_POWER_THRESHOLD_NORMAL": 50},
+        "dwell_min": 5,
+        "step_max": 1,
+        "file": "/dev/null/stabilize.json",
+    }
+    prev_clock = unit_cooler.clock.get_clock()
+
+    # NOTE: 安定化を設定すると engine と同じ処理で判定されるので、モードが切り替わらない
+    result = unit_cooler.controller.replay.replay(config_stabilize, start, end)
+    assert result["stateful"]
+    assert len(result["timeline"]) == 1
+
+    # NOTE: 時刻や安定化の状態は元に戻り、設定したファイルにも書き込まない
+    assert unit_cooler.clock.get_clock() is prev_clock
+    assert unit_cooler.controller.engine.get_stabilizer_state.state is None
+
+    # NOTE: 直近 5 分間の最大値で判定すると、揺れていても高い方の値で判定される
+    config_aggregate = copy.deepcopy(config)
+    config_aggregate["controller"]["aggregate"] = {"power": {"window_min": 5, "value": "max"}}
+    result = unit_cooler.controller.replay.replay(config_aggregate, start, end)
+    assert not result["stateful"]
+    assert len(result["timeline"]) == 1
+
+
+def test_controller_rule(config):
+    import copy
+
+    import numpy as np
+
+    import unit_cooler.controller.engine
+    import unit_cooler.controller.replay
+
+    value_list = [
+        {"temp": 33, "humi": 50, "lux": 1000, "solar_rad": 800, "rain": 0, "power": 1100},
+        {"temp": 30, "humi": 50, "lux": 100, "solar_rad": 100, "rain": 0, "power": 600},
+        {"temp": 30, "humi": 98, "lux": 1000, "solar_rad": 800, "rain": 0, "power": 50},
+        {"temp": 25, "humi": 50, "lux": 1000, "solar_rad": 300, "rain": 0.5, "power": 1100},
+        {"temp": 30, "humi": 50, "lux": None, "solar_rad": 300, "rain": 0, "power": 1100},
+    ]
+
+    config_threshold = copy.deepcopy(config)
+    config_threshold["controller"]["threshold"] = {"TEMP_THRESHOLD_HIGH_L": 34}
+
+    for threshold_config in [config, config_threshold]:
+        mode_list = []
+        for value_map in value_list:
+            sense_data = {
+                kind: [{"name": sensor["name"], "value": value_map[kind]} for sensor in sensor_list]
+                for kind, sensor_list in config["controller"]["sensor"].items()
+            }
+            mode_list.append(
+                unit_cooler.controller.engine.judge_cooling_mode(threshold_config, sense_data)["cooling_mode"]
+            )
+
+        history = {
+            kind: np.array(
+                [[np.nan if value_map[kind] is None else value_map[kind] for value_map in value_list]]
+                * len(sensor_list)
+            )
+            for kind, sensor_list in config["controller"]["sensor"].items()
+        }
+        batch = unit_cooler.controller.replay.judge_cooling_mode_batch(
+            history, threshold_config["controller"].get("threshold")
+        )
+
+        assert batch["cooling_mode"].tolist() == mode_list
+
+    assert mode_list[0] == 7
+
+
+def test_controller_message_template(config):
+    import my_lib.json_util
+
+    import unit_cooler.controller.engine
+    import unit_cooler.controller.message
+
+    for mode_index in range(len(unit_cooler.controller.message.CONTROL_MESSAGE_LIST)):
+        unit_cooler.controller.engine.dummy_cooling_mode.prev_mode = mode_index
+        control_msg = unit_cooler.controller.engine.gen_control_msg(config, True, 100)
+
+        assert my_lib.json_util.loads(
+            unit_cooler.controller.engine.encode_control_msg(control_msg, True, 100)
+        ) == my_lib.json_util.loads(my_lib.json_util.dumps(control_msg))
+
+        # NOTE: センサーの詳細を含めない場合は、env のみを含める
+        compact_msg = my_lib.json_util.loads(
+            unit_cooler.controller.engine.encode_control_msg(control_msg, True, 100, False)
+        )
+        assert "sense_data" not in compact_msg
+        assert compact_msg["env"] == control_msg["env"]
+
+    # NOTE: ひな形は使い回され、生成したメッセージを変更しても影響しない
+    template_list = unit_cooler.controller.engine.get_control_msg_template(True, 100)
+    assert unit_cooler.controller.engine.get_control_msg_template(True, 100) is template_list
+    control_msg["sense_data"] = {"temp": []}
+    assert "sense_data" not in template_list[control_msg["mode_index"]]["message"]
+
+    unit_cooler.controller.engine.dummy_cooling_mode.prev_mode = 0
+
+
+def test_controller_forecast(mocker, config):
+    import copy
+
+    import my_lib.time
+
+    import unit_cooler.controller.engine
+    import unit_cooler.controller.forecast
+
+    # NOTE: 直線的に増加する値は、そのまま外挿される
+    state = unit_cooler.controller.forecast.gen_state()
+    start = datetime.datetime(2025, 7, 1, 12, 0, tzinfo=my_lib.time.get_zoneinfo())
+    for i in range(60):
+        unit_cooler.controller.forecast.update(state, start + datetime.timedelta(minutes=i), 100 + 10 * i)
+    assert unit_cooler.controller.forecast.predict(state, 15) == pytest.approx(100 + 10 * (59 + 15), rel=0.05)
+
+    config_forecast = copy.deepcopy(config)
+    config_forecast["controller"]["forecast"] = {"horizon_min": 15}
+    mocker.patch.object(unit_cooler.controller.engine.get_forecast_handle, "handle", None)
+
+    # NOTE: エアコンの消費電力が増加している途中で、予測により冷却を強化する
+    value_map = {"temp": 30, "humi": 50, "lux": 1000, "solar_rad": 300, "rain": 0}
+    for i in range(25):
+        sense_data = {
+            kind: [
+                {
+                    "name": sensor["name"],
+                    "time": start + datetime.timedelta(minutes=i),
+                    "value": (300 + 20 * i if j == 0 else 0) if kind == "power" else value_map[kind],
+                }
+                for j, sensor in enumerate(sensor_list)
+            ]
+            for kind, sensor_list in config["controller"]["sensor"].items()
+        }
+        mode = unit_cooler.controller.engine.judge_cooling_mode(config_forecast, sense_data)
+
+    assert mode["cooler_status"]["status"] == 3
+    assert mode["forecast"]["cooler_status"]["status"] == 4
+    assert mode["cooling_mode"] == 4
+
+    minute_data = [
+        {
+            "timestamp": (start + datetime.timedelta(minutes=i)).isoformat(" "),
+            "temperature": 25 + 0.1 * i,
+            "solar_radiation": None,
+        }
+        for i in range(120)
+    ]
+    result = unit_cooler.controller.forecast.backtest(minute_data, 15)
+    assert result["temp"]["count"] > 0
+    assert result["temp"]["mae"] < result["temp"]["mae_naive"]
+
+
+def test_controller_sensor_aggregate(mocker, config):
+    import copy
+
+    import unit_cooler.controller.sensor
+
+    time_last = datetime.datetime.now(datetime.timezone.utc)
+    value_map = {"last": 1.0, "mean": 2.0, "max": 3.0}
+
+    def record_mock(stat):
+        record = mocker.MagicMock()
+        record.values = {"stat": stat}
+        record.get_value.return_value = value_map[stat]
+        record.get_time.return_value = time_last
+        return record
+
+    table_mock = mocker.MagicMock()
+    table_mock.records = [record_mock(stat) for stat in value_map]
+    query_api_mock = mocker.MagicMock()
+    query_api_mock.query.return_value = [table_mock]
+    mocker.patch("influxdb_client.InfluxDBClient.query_api", return_value=query_api_mock)
+    fetch_data_mock = mocker.patch(
+        "my_lib.sensor_data.fetch_data",
+        return_value={"valid": True, "value": [4.0], "time": [datetime.datetime.now()]},  # noqa: DTZ005
+    )
+
+    config_aggregate = copy.deepcopy(config)
+    config_aggregate["controller"]["aggregate"] = {
+        "temp": {"window_min": 30},
+        "rain": {"window_min": 10, "value": "max"},
+    }
+
+    sense_data = unit_cooler.controller.sensor.get_sense_data(config_aggregate)
+
+    assert sense_data["temp"][0]["value"] == 2.0
+    assert sense_data["temp"][0]["last"] == 1.0
+    assert sense_data["temp"][0]["time"] == time_last
+    # NOTE: 雨量は 1 時間雨量に換算される
+    assert sense_data["rain"][0]["value"] == 3.0 * 60
+    assert sense_data["rain"][0]["mean"] == 2.0 * 60
+    # NOTE: 集計しない種類は、これまで通り最新の値のみ取得する
+    assert sense_data["humi"][0]["value"] == 4.0
+    assert "mean" not in sense_data["humi"][0]
+    assert fetch_data_mock.call_count == sum(
+        len(sensor_list)
+        for kind, sensor_list in config["controller"]["sensor"].items()
+        if kind not in ["temp", "rain"]
+    )
+
+    query = query_api_mock.query.call_args.kwargs["query"]
+    assert "range(start: -10m, stop: now())" in query
+    assert 'set(key: "stat", value: "max")' in query
+
+    # NOTE: 期間内のデータが無い場合は最新の値を使う
+    value_map["mean"] = None
+    table_mock.records = [record_mock(stat) for stat in value_map]
+    assert unit_cooler.controller.sensor.get_sense_data(config_aggregate)["temp"][0]["value"] == 1.0
+
+    query_api_mock.query.side_effect = RuntimeError()
+    mocker.patch("unit_cooler.util.notify_error")
+    assert unit_cooler.controller.sensor.get_sense_data(config_aggregate)["temp"][0]["value"] is None
+
+
+def test_controller_stabilize(mocker, config, tmp_path):
+    import copy
+
+    import unit_cooler.controller.engine
+    import unit_cooler.controller.stabilizer
+
+    def gen_sense_data_power(power):
+        value_map = {"temp": 30, "humi": 50, "lux": 1000, "solar_rad": 300, "rain": 0}
+        return {
+            kind: [
+                {
+                    "name": sensor["name"],
+                    "value": (power if j == 0 else 0) if kind == "power" else value_map[kind],
+                }
+                for j, sensor in enumerate(sensor_list)
+            ]
+            for kind, sensor_list in config["controller"]["sensor"].items()
+        }
+
+    def count_change(config, power_list):
+        mocker.patch.object(unit_cooler.controller.engine.get_stabilizer_state, "state", None)
+        change = 0
+        prev_mode = None
+        for i, power in enumerate(power_list):
+            time_mock.return_value = start + i * 60
+            sense_data = gen_sense_data_power(power)
+            mode = unit_cooler.controller.engine.stabilize_cooling_mode(
+                config, sense_data, unit_cooler.controller.engine.judge_cooling_mode(config, sense_data)
+            )
+            if (prev_mode is not None) and (mode["cooling_mode"] != prev_mode):
+                change += 1
+            prev_mode = mode["cooling_mode"]
+
+        return change
+
+    start = 1750000000
+    time_mock = mocker.patch("unit_cooler.clock.timestamp")
+
+    config_stabilize = copy.deepcopy(config)
+    config_stabilize["controller"]["stabilize"] = {
+        "hysteresis": {"AIRCON_POWER_THRESHOLD_NORMAL": 50},
+        "dwell_min": 5,
+        "step_max": 1,
+        "file": str(tmp_path / "stabilize.json"),
+    }
+
+    # NOTE: 消費電力が AIRCON_POWER_THRESHOLD_NORMAL 付近で揺れても、モードが切り替わらない
+    power_list = [520, 480] * 30
+    assert count_change(config, power_list) == len(power_list) - 1
+    assert count_change(config_stabilize, power_list) == 0
+
+    # NOTE: 状態は保存され、再起動後も引き継がれる
+    state = unit_cooler.controller.stabilizer.load_state(tmp_path / "stabilize.json", start + 30 * 60)
+    assert state["cooling_mode"] == 3
+    assert unit_cooler.controller.stabilizer.load_state(tmp_path / "stabilize.json", start + 100 * 60) == (
+        unit_cooler.controller.stabilizer.gen_state()
+    )
+
+    # NOTE: 閾値を大きく下回った場合は、最小滞在時間毎に 1 段階ずつ下がる
+    config_stabilize["controller"]["stabilize"]["file"] = str(tmp_path / "stabilize_step.json")
+    assert count_change(config_stabilize, [1000] * 10 + [100] * 20) == 3
+
+    # NOTE: エアコンが全て停止した場合は、最小滞在時間や最大変化幅に関わらず直ちに停止する
+    config_stabilize["controller"]["stabilize"]["file"] = str(tmp_path / "stabilize_off.json")
+    assert count_change(config_stabilize, [1000] * 10 + [0] * 20) == 1
+    assert unit_cooler.controller.engine.get_stabilizer_state(config_stabilize)["cooling_mode"] == 0
+
+    # NOTE: 停止条件は直ちに反映される
+    state = {"cooling_mode": 4, "time": start}
+    mode = {"cooling_mode": 0, "cooler_status": {"status": 3}, "outdoor_status": {"status": -4}}
+    assert unit_cooler.controller.stabilizer.is_stop(mode)
+    assert unit_cooler.controller.stabilizer.force(state, mode["cooling_mode"], start + 1) == 0
+
+    # NOTE: 外気温が不明な場合も停止条件だが、外気の条件で 0 になった場合は制限をかける
+    mode = {"cooling_mode": 0, "cooler_status": {"status": 0}, "outdoor_status": {"status": None}}
+    assert unit_cooler.controller.stabilizer.is_stop(mode)
+    mode = {"cooling_mode": 0, "cooler_status": {"status": 1}, "outdoor_status": {"status": -2}}
+    assert not unit_cooler.controller.stabilizer.is_stop(mode)
+
+
+def test_actuator_zone(mocker, config):
+    import copy
+
+    import unit_cooler.actuator.control
+    import unit_cooler.actuator.monitor
+    import unit_cooler.actuator.zone
+    import unit_cooler.const
+
+    mock_gpio(mocker)
+    mocker.patch.object(unit_cooler.actuator.zone, "zone_list", [])
+    mocker.patch("unit_cooler.actuator.work_log.add")
+
+    config_zone = copy.deepcopy(config)
+    config_zone["actuator"]["control"]["zones"] = [
+        {"name": "east", "pin_no": 17},
+        {"name": "west", "pin_no": 27},
+    ]
+
+    zone_list = unit_cooler.actuator.zone.init(config_zone)
+    assert [zone.name for zone in zone_list] == ["east", "west"]
+    assert unit_cooler.actuator.zone.get_zone("west") is zone_list[1]
+    assert unit_cooler.actuator.zone.get_zone(None) is zone_list[0]
+
+    control_message = {
+        "mode_index": 1,
+        "state": unit_cooler.const.COOLING_STATE.WORKING,
+        "duty": {"enable": True, "on_sec": 100, "off_sec": 100},
+    }
+
+    # NOTE: 全てのゾーンの電磁弁が、それぞれ制御される
+    unit_cooler.actuator.control.execute(config_zone, control_message)
+    for zone in zone_list:
+        assert zone.valve.get_state() == unit_cooler.const.VALVE_STATE.OPEN
+        assert unit_cooler.actuator.monitor.get_mist_condition(zone)["flow"] > 0
+        assert zone.last_flow > 0
+
+    # NOTE: ゾーン毎に独立している
+    zone_list[1].valve.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+    assert zone_list[0].valve.get_state() == unit_cooler.const.VALVE_STATE.OPEN
+    assert unit_cooler.actuator.monitor.get_mist_condition(zone_list[0])["flow"] > 0
+    assert unit_cooler.actuator.monitor.get_mist_condition(zone_list[1])["flow"] == 0
+
+    handle = unit_cooler.actuator.monitor.gen_handle(config_zone, 1, zone_list[1])
+    unit_cooler.actuator.monitor.log_condition(handle, "test", "Test condition")
+    unit_cooler.actuator.work_log.add.assert_called_with(
+        "[west] Test condition", unit_cooler.const.LOG_LEVEL.INFO
+    )
+
+    # NOTE: ハザードを検出している場合は、全てのゾーンを停止する
+    unit_cooler.actuator.control.hazard_register(config_zone)
+    unit_cooler.actuator.control.execute(config_zone, control_message)
+    for zone in zone_list:
+        assert zone.valve.get_state() == unit_cooler.const.VALVE_STATE.CLOSE
+
+    unit_cooler.actuator.control.hazard_clear(config_zone)
+    for zone in zone_list:
+        zone.valve.clear_stat()
+
+
+def test_actuator_zone_sensor(mocker, config):
+    import copy
+
+    import unit_cooler.actuator.sensor
+    import unit_cooler.actuator.zone
+
+    mock_gpio(mocker)
+    mocker.patch.object(unit_cooler.actuator.zone, "zone_list", [])
+    fd_q10c_mock = mocker.patch("unit_cooler.actuator.sensor.FD_Q10C")
+
+    config_zone = copy.deepcopy(config)
+    config_zone["actuator"]["control"]["zones"] = [
+        {"name": "east", "pin_no": 17, "sensor": {"lock_file": "east.lock"}},
+        {"name": "west", "pin_no": 27},
+    ]
+
+    # NOTE: 実機では、ゾーン毎に流量計を指定しないと初期化できない
+    mocker.patch.dict(os.environ, {"DUMMY_MODE": "false"})
+    with pytest.raises(ValueError, match="lock_file"):
+        unit_cooler.actuator.zone.init(config_zone)
+
+    config_zone["actuator"]["control"]["zones"][1]["sensor"] = {"lock_file": "east.lock"}
+    with pytest.raises(ValueError, match="lock_file"):
+        unit_cooler.actuator.zone.init(config_zone)
+
+    config_zone["actuator"]["control"]["zones"][1]["sensor"] = {"lock_file": "west.lock"}
+    unit_cooler.actuator.zone.init(config_zone)
+    assert fd_q10c_mock.call_args_list == [
+        mocker.call(lock_file="east.lock"),
+        mocker.call(lock_file="west.lock"),
+    ]
+
+    # NOTE: ダミーの流量計は電磁弁の端子毎に流量を返すので、指定しなくてもよい
+    mocker.patch.dict(os.environ, {"DUMMY_MODE": "true"})
+    del config_zone["actuator"]["control"]["zones"][1]["sensor"]
+    zone_list = unit_cooler.actuator.zone.init(config_zone)
+    assert fd_q10c_mock.call_args_list[-1] == mocker.call()
+
+    for zone in zone_list:
+        zone.valve.clear_stat()
+
+
+def test_actuator_zone_schedule(mocker, config):
+    import copy
+
+    import unit_cooler.actuator.control
+    import unit_cooler.actuator.scheduler
+    import unit_cooler.actuator.zone
+    import unit_cooler.const
+    import unit_cooler.controller.message
+
+    # NOTE: 位相をずらすと、ON 比率を保ったまま同時に開く数が減る
+    duty_info = unit_cooler.controller.message.CONTROL_MESSAGE_LIST[5]["duty"]
+    naive = unit_cooler.actuator.scheduler.simulate(3, duty_info, None, 2.0, False)
+    staggered = unit_cooler.actuator.scheduler.simulate(3, duty_info, 1, 2.0)
+    assert naive["peak_open"] == 3
+    assert staggered["peak_open"] == 1
+    assert staggered["peak_flow"] == pytest.approx(2.0)
+    assert staggered["on_ratio_list"] == pytest.approx(naive["on_ratio_list"])
+
+    # NOTE: 上限では ON 比率を満たせない場合も、上限は超えない
+    duty_info = unit_cooler.controller.message.CONTROL_MESSAGE_LIST[-1]["duty"]
+    staggered = unit_cooler.actuator.scheduler.simulate(3, duty_info, 2, 2.0)
+    assert staggered["peak_open"] == 2
+
+    mock_gpio(mocker)
+    mocker.patch.object(unit_cooler.actuator.zone, "zone_list", [])
+    mocker.patch("unit_cooler.actuator.work_log.add")
+    time_mock = mocker.patch("unit_cooler.clock.timestamp", return_value=1000)
+    unit_cooler.actuator.scheduler.reset()
+
+    config_zone = copy.deepcopy(config)
+    config_zone["actuator"]["control"]["zones"] = [
+        {"name": "east", "pin_no": 17},
+        {"name": "west", "pin_no": 27},
+    ]
+    config_zone["actuator"]["control"]["concurrent_max"] = 1
+
+    zone_list = unit_cooler.actuator.zone.init(config_zone)
+    control_message = {
+        "mode_index": 1,
+        "state": unit_cooler.const.COOLING_STATE.WORKING,
+        "duty": {"enable": True, "on_sec": 60, "off_sec": 60},
+    }
+
+    OPEN = unit_cooler.const.VALVE_STATE.OPEN
+    CLOSE = unit_cooler.const.VALVE_STATE.CLOSE
+    for elapsed, expected in [
+        (0, [OPEN, CLOSE]),
+        (59, [OPEN, CLOSE]),
+        (60, [CLOSE, OPEN]),
+        (120, [OPEN, CLOSE]),
+    ]:
+        time_mock.return_value = 1000 + elapsed
+        unit_cooler.actuator.control.execute(config_zone, control_message)
+        assert [zone.valve.get_state() for zone in zone_list] == expected
+
+    unit_cooler.actuator.control.execute(
+        config_zone, {"mode_index": 0, "state": unit_cooler.const.COOLING_STATE.IDLE}
+    )
+    assert [zone.valve.get_state() for zone in zone_list] == [CLOSE, CLOSE]
+
+    for zone in zone_list:
+        zone.valve.clear_stat()
+
+
+def test_actuator_timing(mocker, config):
+    import flask
+
+    import unit_cooler.actuator.timing
+    import unit_cooler.actuator.valve
+    import unit_cooler.actuator.webapi.timing
+    import unit_cooler.const
+
+    mock_gpio(mocker)
+    mocker.patch("unit_cooler.actuator.work_log.add")
+    unit_cooler.actuator.timing.clear()
+
+    unit_cooler.actuator.valve.init(config["actuator"]["control"]["valve"]["pin_no"], config)
+    for _ in range(3):
+        with unit_cooler.actuator.timing.measure_loop("control"):
+            unit_cooler.actuator.valve.set_state(unit_cooler.const.VALVE_STATE.OPEN)
+    unit_cooler.actuator.timing.record_jitter("control", 0.002)
+    unit_cooler.actuator.timing.record_jitter("control", -0.001)
+
+    stat = unit_cooler.actuator.timing.get_stat()["worker"]["control"]
+    assert stat["loop"]["count"] == 3
+    assert sum(stat["loop"]["bucket"]) == 3
+    assert stat["jitter"]["count"] == 2
+    assert stat["jitter"]["max"] == pytest.approx(0.002)
+    assert stat["stage"]["gpio"]["count"] >= 3
+    assert stat["stage"]["footprint"]["count"] == 3
+    assert stat["cpu_sec"] >= 0
+
+    app = flask.Flask("test")
+    app.register_blueprint(unit_cooler.actuator.webapi.timing.blueprint)
+    client = app.test_client()
+
+    res = client.get("/api/timing")
+    assert res.status_code == 200
+    assert res.json["worker"]["control"]["loop"]["count"] == 3
+
+    res = client.get("/api/timing/prometheus")
+    assert res.status_code == 200
+    assert res.mimetype == "text/plain"
+    text = res.get_data(as_text=True)
+    assert 'unit_cooler_actuator_worker_loop_seconds_count{worker="control"} 3' in text
+    assert 'unit_cooler_actuator_worker_loop_seconds_bucket{worker="control",le="+Inf"} 3' in text
+    assert 'unit_cooler_actuator_worker_stage_seconds_count{worker="control",stage="footprint"} 3' in text
+
+    unit_cooler.actuator.timing.clear()
+
+
+def test_exporter(mocker, config):
+    import flask
+
+    import unit_cooler.actuator.monitor
+    import unit_cooler.actuator.valve
+    import unit_cooler.const
+    import unit_cooler.exporter
+
+    mock_gpio(mocker)
+    mocker.patch("unit_cooler.actuator.work_log.add")
+    unit_cooler.exporter.clear()
+
+    unit_cooler.actuator.valve.init(config["actuator"]["control"]["valve"]["pin_no"], config)
+    unit_cooler.actuator.valve.set_state(unit_cooler.const.VALVE_STATE.OPEN)
+    mocker.patch.object(unit_cooler.actuator.monitor.get_mist_condition, "last_flow", 1.5)
+
+    with unit_cooler.exporter.measure("unit_cooler_test_seconds", "Test summary", table="test"):
+        pass
+    unit_cooler.exporter.set_gauge("unit_cooler_test_gauge", 1, "Test gauge", zone='a"b')
+
+    app = flask.Flask("test")
+    app.register_blueprint(unit_cooler.exporter.blueprint)
+    unit_cooler.exporter.add_collector(unit_cooler.actuator.monitor.collect_exporter_metrics)
+    client = app.test_client()
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.mimetype == "text/plain"
+    text = res.get_data(as_text=True)
+    assert "# TYPE unit_cooler_valve_operation_total counter" in text
+    assert "unit_cooler_valve_open 1\n" in text
+    assert "unit_cooler_flow_liters_per_minute 1.5\n" in text
+    assert 'unit_cooler_test_seconds_count{table="test"} 1\n' in text
+    assert 'unit_cooler_test_gauge{zone="a\\"b"} 1\n' in text
+
+    unit_cooler.actuator.valve.set_state(unit_cooler.const.VALVE_STATE.CLOSE)
+    text = client.get("/metrics").get_data(as_text=True)
+    assert "unit_cooler_valve_open 0\n" in text
+
+    unit_cooler.exporter.clear()
+
+
+def test_clock(tmp_path):
+    import datetime
+    import math
+    import threading
+
+    import unit_cooler.clock
+    import unit_cooler.footprint
+
+    start = datetime.datetime(2025, 7, 1, 12, 0, tzinfo=unit_cooler.clock.TIMEZONE)
+    clock = unit_cooler.clock.VirtualClock(start)
+    prev_clock = unit_cooler.clock.set_clock(clock)
+    try:
+        assert unit_cooler.clock.is_virtual()
+        assert unit_cooler.clock.now() == start
+
+        unit_cooler.clock.sleep(30)
+        assert unit_cooler.clock.timestamp() == start.timestamp() + 30
+
+        event = threading.Event()
+        assert not unit_cooler.clock.wait(event, 10)
+        assert unit_cooler.clock.now() == start + datetime.timedelta(seconds=40)
+
+        event.set()
+        assert unit_cooler.clock.wait(event, 10)
+        assert unit_cooler.clock.now() == start + datetime.timedelta(seconds=40)
+
+        clock.move_to(start.timestamp())
+        assert unit_cooler.clock.now() == start + datetime.timedelta(seconds=40)
+
+        path = tmp_path / "footprint"
+        assert not unit_cooler.footprint.exists(path)
+        assert unit_cooler.footprint.elapsed(path) == math.inf
+
+        unit_cooler.footprint.update(path)
+        clock.advance(60)
+        assert unit_cooler.footprint.exists(path)
+        assert unit_cooler.footprint.elapsed(path) == 60
+        # NOTE: 仮想時間ではファイルを作らない
+        assert not path.exists()
+
+        unit_cooler.footprint.clear(path)
+        assert not unit_cooler.footprint.exists(path)
+    finally:
+        unit_cooler.clock.set_clock(prev_clock)
+
+    assert not unit_cooler.clock.is_virtual()
+    assert unit_cooler.footprint.get_mtime_map() is None
+
+
 @pytest.mark.order(5)
 def test_actuator(component_manager, config, server_port, real_port, log_port):
     # Start actuator and controller in sequence
@@ -1443,6 +2170,9 @@ def test_actuator_leak(  # noqa: PLR0913
     check_liveness(config, ["actuator", "monitor"], True, 1000)
     check_liveness(config, ["webui", "subscribe"], False)
 
+    import unit_cooler.util
+
+    unit_cooler.util.notify_wait()
     logging.info(my_lib.notify.slack.hist_get(False))
 
     assert (
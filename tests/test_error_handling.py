@@ -135,6 +135,106 @@ def test_memory_ctrl_hist_growth(config):
     assert final_length <= initial_length + 100  # Should not exceed expected growth
 
 
+def test_work_log_buffer_bounded(mocker, config):
+    """Test work log keeps a bounded buffer with increasing IDs and batches events"""
+    import queue
+    import time
+
+    import unit_cooler.actuator.work_log
+    import unit_cooler.const
+
+    mocker.patch("my_lib.webapp.log.add")
+    event_queue = queue.Queue()
+    unit_cooler.actuator.work_log.init(config, event_queue)
+    unit_cooler.actuator.work_log.hist_clear()
+
+    start_id = unit_cooler.actuator.work_log.last_id()
+    count = unit_cooler.actuator.work_log.LOG_BUFFER_SIZE + 500
+    for i in range(count):
+        unit_cooler.actuator.work_log.add(f"Test {i}", unit_cooler.const.LOG_LEVEL.INFO)
+
+    # Memory is bounded and only the newest entries are kept
+    assert len(unit_cooler.actuator.work_log.hist_get()) == unit_cooler.actuator.work_log.LOG_BUFFER_SIZE
+    assert unit_cooler.actuator.work_log.hist_get()[-1] == f"Test {count - 1}"
+    assert unit_cooler.actuator.work_log.last_id() == start_id + count
+
+    entry_list = unit_cooler.actuator.work_log.get_since(start_id + count - 3)
+    assert [entry["message"] for entry in entry_list] == [f"Test {i}" for i in range(count - 3, count)]
+    assert [entry["id"] for entry in entry_list] == list(range(start_id + count - 2, start_id + count + 1))
+    assert len(unit_cooler.actuator.work_log.get_since(0, limit=10)) == 10
+
+    # Burst of log lines results in a single event
+    time.sleep(unit_cooler.actuator.work_log.EVENT_BATCH_SEC * 3)
+    assert event_queue.qsize() == 1
+
+    unit_cooler.actuator.work_log.hist_clear()
+
+
+def test_work_log_delta_api(mocker, config):
+    """Test cursor based work log API returns only new entries"""
+    import queue
+
+    import flask
+
+    import unit_cooler.actuator.webapi.work_log
+    import unit_cooler.actuator.work_log
+    import unit_cooler.const
+
+    mocker.patch("my_lib.webapp.log.add")
+    unit_cooler.actuator.work_log.init(config, queue.Queue())
+    unit_cooler.actuator.work_log.hist_clear()
+
+    app = flask.Flask("test")
+    app.register_blueprint(unit_cooler.actuator.webapi.work_log.blueprint)
+    client = app.test_client()
+
+    unit_cooler.actuator.work_log.add("Test 0", unit_cooler.const.LOG_LEVEL.INFO)
+
+    # Without cursor, the latest page and its position are returned together
+    response = client.get("/api/work_log").json
+    assert [entry["message"] for entry in response["data"]] == ["Test 0"]
+    assert response["last_id"] == response["data"][0]["id"]
+    assert not response["has_more"]
+    cursor = response["last_id"]
+    epoch = response["epoch"]
+    assert epoch == unit_cooler.actuator.work_log.epoch()
+
+    for i in range(1, 6):
+        unit_cooler.actuator.work_log.add(f"Test {i}", unit_cooler.const.LOG_LEVEL.INFO)
+
+    response = client.get(f"/api/work_log?since={cursor}&limit=3").json
+    assert [entry["message"] for entry in response["data"]] == ["Test 3", "Test 2", "Test 1"]
+    assert response["has_more"]
+    assert not response["reset"]
+
+    response = client.get(f"/api/work_log?since={response['last_id']}&limit=3").json
+    assert [entry["message"] for entry in response["data"]] == ["Test 5", "Test 4"]
+    assert not response["has_more"]
+
+    response = client.get(f"/api/work_log?since={response['last_id']}").json
+    assert response["data"] == []
+
+    # Cursor from before a restart can not be resumed
+    response = client.get(f"/api/work_log?since={response['last_id'] + 100}").json
+    assert response["reset"]
+
+    # Cursor from another process is detected even when the ID is still in range
+    response = client.get(f"/api/work_log?since={cursor}&epoch={epoch}").json
+    assert not response["reset"]
+    assert len(response["data"]) == 5
+    response = client.get(f"/api/work_log?since={cursor}&epoch=0123abcd").json
+    assert response["reset"]
+    assert response["data"] == []
+    assert response["last_id"] == unit_cooler.actuator.work_log.last_id()
+
+    # Initial page is limited to the newest entries
+    response = client.get("/api/work_log?limit=2").json
+    assert [entry["message"] for entry in response["data"]] == ["Test 5", "Test 4"]
+    assert response["last_id"] == unit_cooler.actuator.work_log.last_id()
+
+    unit_cooler.actuator.work_log.hist_clear()
+
+
 def test_influxdb_connection_error(mocker, config):
     """Test InfluxDB connection error handling"""
     import unit_cooler.controller.sensor
@@ -151,9 +251,143 @@ def test_slack_notification_error(mocker, config):
     import unit_cooler.util
 
     # Mock Slack to raise error
-    mocker.patch("my_lib.notify.slack.error", side_effect=Exception("Slack Error"))
+    slack_error = mocker.patch("my_lib.notify.slack.error", side_effect=Exception("Slack Error"))
+    mocker.patch.object(unit_cooler.util, "NOTIFY_RETRY_WAIT_SEC", 0)
+    unit_cooler.util.notify_clear()
     # Should not raise exception, should handle gracefully
     unit_cooler.util.notify_error(config, "Test error message")
+    unit_cooler.util.notify_wait()
+
+    # Retried before giving up
+    assert slack_error.call_count == unit_cooler.util.NOTIFY_RETRY_COUNT + 1
+
+
+def test_slack_notification_async(mocker, config):
+    """Test Slack notification does not block the caller and coalesces duplicates"""
+    import time
+
+    import unit_cooler.util
+
+    sent_list = []
+
+    def slow_slack_error(token, channel, name, message, interval_min):
+        time.sleep(0.5)
+        sent_list.append(message)
+
+    mocker.patch("my_lib.notify.slack.error", side_effect=slow_slack_error)
+    unit_cooler.util.notify_clear()
+
+    start = time.perf_counter()
+    for _ in range(10):
+        unit_cooler.util.notify_error(config, "Duplicate error message")
+    unit_cooler.util.notify_error(config, "Another error message")
+    assert time.perf_counter() - start < 0.1
+
+    unit_cooler.util.notify_wait()
+    assert sent_list == ["Duplicate error message", "Another error message"]
+
+
+def test_slack_notification_exit(tmp_path):
+    """Test a pending Slack notification is sent before the process exits"""
+    import os
+    import subprocess
+    import sys
+
+    sent_path = tmp_path / "sent"
+    config = {"slack": {"bot_token": "", "from": "", "error": {"channel": {"name": ""}, "interval_min": 1}}}
+    # NOTE: 致命的なエラーを通知した直後に終了しても、送信スレッドの処理を待つ
+    script = f"""
+import os
+import sys
+import time
+from unittest import mock
+
+os.environ["TEST"] = "true"
+
+import unit_cooler.util
+
+def slow_slack_error(token, channel, name, message, interval_min):
+    time.sleep(0.5)
+    open({str(sent_path)!r}, "w").write(message)
+
+mock.patch("my_lib.notify.slack.error", side_effect=slow_slack_error).start()
+unit_cooler.util.notify_error({config!r}, "Fatal error", False)
+sys.exit(1)
+"""
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", script],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        timeout=30,
+        check=False,
+    )
+
+    assert process.returncode == 1
+    assert sent_path.read_text() == "Fatal error"
+
+
+def test_monitor_log_condition_suppress(mocker, config):
+    """Test repeated monitor conditions are logged once and then periodically"""
+    import unit_cooler.actuator.monitor
+    import unit_cooler.const
+
+    add_mock = mocker.patch("unit_cooler.actuator.work_log.add")
+    time_mock = mocker.patch("unit_cooler.clock.timestamp", return_value=1000)
+
+    handle = unit_cooler.actuator.monitor.gen_handle(config, 1)
+    level = unit_cooler.const.LOG_LEVEL.WARN
+
+    for _ in range(5):
+        unit_cooler.actuator.monitor.log_condition(handle, "test", "Test condition", level)
+        unit_cooler.actuator.monitor.clear_inactive_condition(handle)
+    assert add_mock.call_count == 1
+
+    time_mock.return_value = 1000 + unit_cooler.actuator.monitor.LOG_REPEAT_INTERVAL_SEC
+    unit_cooler.actuator.monitor.log_condition(handle, "test", "Test condition", level)
+    unit_cooler.actuator.monitor.clear_inactive_condition(handle)
+    assert add_mock.call_count == 2
+    assert "5回繰り返し" in add_mock.call_args.args[0]
+    assert handle["condition_count"]["test"] == 6
+
+    # NOTE: 状態が解消されたら、次回はすぐに出力される
+    unit_cooler.actuator.monitor.clear_inactive_condition(handle)
+    unit_cooler.actuator.monitor.log_condition(handle, "test", "Test condition", level)
+    assert add_mock.call_count == 3
+    assert add_mock.call_args.args[0] == "Test condition"
+
+
+def test_monitor_log_condition_duty_cycle(mocker, config):
+    """Test a flow-on condition stays suppressed across duty cycle OFF phases"""
+    import unit_cooler.actuator.monitor
+    import unit_cooler.const
+
+    add_mock = mocker.patch("unit_cooler.actuator.work_log.add")
+    mocker.patch("unit_cooler.clock.timestamp", return_value=1000)
+
+    handle = unit_cooler.actuator.monitor.gen_handle(config, 1)
+
+    def observe(state, duration, flow):
+        unit_cooler.actuator.monitor.check(
+            handle, {"valve": {"state": state, "duration": duration}, "flow": flow}, False
+        )
+
+    def duty_cycle(flow):
+        # NOTE: 開いた直後と、閉じている間は元栓の状態を判定しない
+        observe(unit_cooler.const.VALVE_STATE.OPEN, 1, flow)
+        observe(unit_cooler.const.VALVE_STATE.OPEN, 10, flow)
+        observe(unit_cooler.const.VALVE_STATE.CLOSE, 1, 0)
+        observe(unit_cooler.const.VALVE_STATE.CLOSE, 60, 0)
+
+    for _ in range(5):
+        duty_cycle(0)
+    assert add_mock.call_count == 1
+    assert "元栓が閉じています" in add_mock.call_args.args[0]
+    assert handle["condition_count"]["flow_source_closed"] == 5
+
+    # NOTE: 開いている間に正常な流量を観測したら解消したとみなし、次回はすぐに出力される
+    duty_cycle(1.0)
+    assert "flow_source_closed" not in handle["condition_log"]
+    duty_cycle(0)
+    assert add_mock.call_count == 2
 
 
 def test_concurrent_valve_operations(config):
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# ruff: noqa: S101, SLF001
+"""Tests for the metrics dashboard data preparation."""
+
+import datetime
+import random
+import unittest.mock
+
+import my_lib.webapp.config
+import pytest
+
+my_lib.webapp.config.URL_PREFIX = "/unit-cooler"
+
+
+def gen_minute_data(count=5000, seed=0):
+    rng = random.Random(seed)  # noqa: S311
+    start = datetime.datetime(2025, 7, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=9)))
+
+    minute_data = []
+    for i in range(count):
+        temperature = rng.uniform(20, 38)
+        cooling_mode = max(0, min(8, round(temperature - 28 + rng.gauss(0, 1))))
+        minute_data.append(
+            {
+                "timestamp": (start + datetime.timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+                # NOTE: 欠損の位置を指標ごとにずらして、行の対応が崩れないことを確認する
+                "temperature": None if i % 7 == 0 else temperature,
+                "cooling_mode": None if i % 11 == 0 else cooling_mode,
+                "duty_ratio": None if i % 13 == 0 else cooling_mode / 8,
+                "humidity": rng.uniform(30, 90),
+                "lux": rng.uniform(0, 100000),
+                "solar_radiation": None,
+                "rain_amount": 0,
+            }
+        )
+
+    return minute_data
+
+
+def test_correlation_data_aligned():
+    """相関用データが同じ分同士の対になっていること"""
+    import unit_cooler.metrics.webapi.page
+
+    minute_data = gen_minute_data()
+    correlation = unit_cooler.metrics.webapi.page._prepare_correlation_data(minute_data)
+
+    pair_list = [
+        (d["temperature"], d["cooling_mode"])
+        for d in minute_data
+        if d["temperature"] is not None and d["cooling_mode"] is not None
+    ]
+    x_values, y_values = zip(*pair_list, strict=True)
+
+    temp_cooling = correlation["temperature_cooling_mode"]
+    assert temp_cooling["count"] == len(pair_list)
+    assert temp_cooling["pearson"] == pytest.approx(
+        unit_cooler.metrics.webapi.page.calculate_correlation(x_values, y_values)
+    )
+    assert temp_cooling["pearson"] > 0.8
+    assert temp_cooling["spearman"] > 0.8
+
+    pair_set = {(round(x, 4), round(y, 4)) for x, y in pair_list}
+    assert all(tuple(point) in pair_set for point in temp_cooling["points"])
+
+    # NOTE: データが無い組は空になる
+    assert correlation["solar_radiation_cooling_mode"]["count"] == 0
+    assert correlation["solar_radiation_cooling_mode"]["points"] == []
+
+
+def test_correlation_data_sampled():
+    """散布図の点数が上限以下で、決定的に選ばれること"""
+    import unit_cooler.metrics.webapi.page
+
+    minute_data = gen_minute_data(20000)
+
+    correlation_1 = unit_cooler.metrics.webapi.page._prepare_correlation_data(minute_data, max_points=500)
+    correlation_2 = unit_cooler.metrics.webapi.page._prepare_correlation_data(minute_data, max_points=500)
+
+    for value in correlation_1.values():
+        assert len(value["points"]) <= 500
+    assert correlation_1 == correlation_2
+
+    # NOTE: x の最小値と最大値は必ず含まれる
+    points = correlation_1["temperature_cooling_mode"]["points"]
+    x_values = [
+        d["temperature"]
+        for d in minute_data
+        if d["temperature"] is not None and d["cooling_mode"] is not None
+    ]
+    assert points[0][0] == round(min(x_values), 4)
+    assert points[-1][0] == round(max(x_values), 4)
+
+
+def test_rank_correlation_ties():
+    """同順位を含むデータの順位相関係数"""
+    import unit_cooler.metrics.webapi.page
+
+    calculate_rank_correlation = unit_cooler.metrics.webapi.page.calculate_rank_correlation
+
+    assert calculate_rank_correlation([1, 2, 2, 3], [1, 2, 2, 3]) == pytest.approx(1.0)
+    assert calculate_rank_correlation([1, 2, 3, 4], [4, 3, 2, 1]) == pytest.approx(-1.0)
+    assert calculate_rank_correlation([1, 1, 1], [1, 2, 3]) == 0.0
+    assert calculate_rank_correlation([None, 1], [1, None]) == 0.0
+
+
+def test_downsample_lttb_peak():
+    """LTTB で間引いても短時間のピークが残ること"""
+    import numpy as np
+
+    import unit_cooler.metrics.webapi.page
+
+    x = np.arange(100000, dtype=float)
+    y = np.sin(x / 5000)
+    y[12345] = 50
+    y[67890] = -50
+
+    selected = unit_cooler.metrics.webapi.page.downsample_lttb(x, y, 1000)
+
+    assert len(selected) == 1000
+    assert selected[0] == 0
+    assert selected[-1] == len(x) - 1
+    assert np.all(np.diff(selected) > 0)
+    assert 12345 in selected
+    assert 67890 in selected
+
+    # NOTE: 点数が閾値以下なら間引かない
+    assert len(unit_cooler.metrics.webapi.page.downsample_lttb(x[:10], y[:10], 1000)) == 10
+
+
+def test_timeseries_data_range():
+    """時系列データが期間指定の範囲内で間引かれること"""
+    import unit_cooler.metrics.webapi.page
+
+    # NOTE: get_minute_data と同じく新しい順に並べる
+    minute_data = list(reversed(gen_minute_data(20000)))
+
+    timeseries = unit_cooler.metrics.webapi.page._prepare_timeseries_data(minute_data, points=300)
+    for metric in ["temperature", "cooling_mode", "duty_ratio", "humidity", "lux"]:
+        assert len(timeseries[metric]) == 300
+        x_values = [p[0] for p in timeseries[metric]]
+        assert x_values == sorted(x_values)
+    assert timeseries["solar_radiation"] == []
+    assert timeseries["range"]["to"] == timeseries["humidity"][-1][0]
+
+    time_from = timeseries["temperature"][100][0]
+    time_to = timeseries["temperature"][110][0]
+    zoomed = unit_cooler.metrics.webapi.page._prepare_timeseries_data(
+        minute_data, points=300, time_from=time_from, time_to=time_to
+    )
+    assert timeseries["range"] != zoomed["range"]
+    assert 0 < len(zoomed["temperature"]) <= 300
+    assert all(time_from <= p[0] <= time_to for p in zoomed["temperature"])
+
+
+def test_timeseries_option():
+    """時系列グラフ用のクエリパラメータの解釈"""
+    import unit_cooler.metrics.webapi.page
+
+    parse_timeseries_option = unit_cooler.metrics.webapi.page.parse_timeseries_option
+
+    option = parse_timeseries_option({"from": "2025-07-01", "to": "2025-07-01", "points": "100000"})
+    assert option["time_to"] - option["time_from"] == 24 * 60 * 60 * 1000
+    assert option["points"] == unit_cooler.metrics.webapi.page.TIMESERIES_POINTS_MAX
+
+    option = parse_timeseries_option({"from": "1751295600000"})
+    assert option["time_from"] == 1751295600000
+    assert option["time_to"] is None
+
+    with pytest.raises(ValueError, match="from"):
+        parse_timeseries_option({"from": "2025-07-02", "to": "2025-07-01"})
+
+
+def test_metrics_api_conditional(tmp_path, monkeypatch):
+    """メトリクス API が最後に保存された分データで再検証できること"""
+    import flask
+
+    import unit_cooler.metrics.collector
+    import unit_cooler.metrics.webapi.page
+
+    monkeypatch.setattr(unit_cooler.metrics.collector, "_metrics_collector", None)
+    unit_cooler.metrics.webapi.page.cache_clear()
+
+    db_path = tmp_path / "metrics.db"
+    collector = unit_cooler.metrics.collector.get_metrics_collector(db_path)
+
+    def save_minute(timestamp, cooling_mode):
+        collector._current_minute_data = {"cooling_mode": cooling_mode, "duty_ratio": 0.5, "temperature": 30}
+        collector._save_minute_data(timestamp)
+
+    start = datetime.datetime(2025, 7, 1, tzinfo=unit_cooler.metrics.collector.TIMEZONE)
+    for i in range(10):
+        save_minute(start + datetime.timedelta(minutes=i), i % 3)
+    assert collector.get_last_minute_timestamp() == start + datetime.timedelta(minutes=9)
+
+    app = flask.Flask("test")
+    app.config["CONFIG"] = {"actuator": {"metrics": {"data": str(db_path)}}}
+    app.register_blueprint(unit_cooler.metrics.webapi.page.blueprint)
+    client = app.test_client()
+
+    url_prefix = my_lib.webapp.config.URL_PREFIX
+
+    response = client.get(f"{url_prefix}/api/metrics")
+    assert response.status_code == 200
+    assert "chartData" in response.text
+
+    for name in ["stats", "hourly", "timeseries", "correlation"]:
+        response = client.get(f"{url_prefix}/api/metrics/{name}")
+        assert response.status_code == 200
+        assert response.headers["ETag"]
+        assert response.headers["Last-Modified"]
+
+        response = client.get(
+            f"{url_prefix}/api/metrics/{name}", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+    response = client.get(f"{url_prefix}/api/metrics/stats")
+    assert response.json["stats"]["data_points"] == 10
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    response = client.get(f"{url_prefix}/api/metrics/stats", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    # NOTE: 新しい分データが保存されると再取得される
+    save_minute(start + datetime.timedelta(minutes=10), 1)
+    response = client.get(f"{url_prefix}/api/metrics/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json["stats"]["data_points"] == 11
+
+    response = client.get(f"{url_prefix}/api/metrics/timeseries")
+    assert len(response.json["timeseries"]["cooling_mode"]) == 11
+
+    response = client.get(f"{url_prefix}/api/metrics/timeseries?from=2025-07-02&to=2025-07-01")
+    assert response.status_code == 400
+
+
+def test_metrics_api_relay(tmp_path, monkeypatch):
+    """WebUI の中継経由でも、条件付きリクエストで再検証できること"""
+    import threading
+
+    import flask
+    import werkzeug.serving
+
+    import unit_cooler.metrics.collector
+    import unit_cooler.metrics.webapi.page
+    import unit_cooler.webui.webapi.metrics_proxy
+
+    monkeypatch.setattr(unit_cooler.metrics.collector, "_metrics_collector", None)
+    unit_cooler.metrics.webapi.page.cache_clear()
+
+    db_path = tmp_path / "metrics.db"
+    collector = unit_cooler.metrics.collector.get_metrics_collector(db_path)
+
+    start = datetime.datetime(2025, 7, 1, tzinfo=unit_cooler.metrics.collector.TIMEZONE)
+    for i in range(10):
+        collector._current_minute_data = {"cooling_mode": i % 3, "duty_ratio": 0.5, "temperature": 30}
+        collector._save_minute_data(start + datetime.timedelta(minutes=i))
+
+    url_prefix = my_lib.webapp.config.URL_PREFIX
+
+    actuator_app = flask.Flask("actuator")
+    actuator_app.config["CONFIG"] = {"actuator": {"metrics": {"data": str(db_path)}}}
+    actuator_app.register_blueprint(unit_cooler.metrics.webapi.page.blueprint)
+
+    server = werkzeug.serving.make_server("127.0.0.1", 0, actuator_app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    try:
+        unit_cooler.webui.webapi.metrics_proxy.init(f"http://127.0.0.1:{server.server_port}{url_prefix}")
+
+        webui_app = flask.Flask("webui")
+        webui_app.register_blueprint(unit_cooler.webui.webapi.metrics_proxy.blueprint, url_prefix=url_prefix)
+
+        # NOTE: 汎用の中継より優先されること
+        @webui_app.route(f"{url_prefix}/api/proxy/json/<path:subpath>")
+        def proxy_json(subpath):
+            return flask.jsonify({"subpath": subpath}), 404
+
+        client = webui_app.test_client()
+        url = f"{url_prefix}/api/proxy/json/api/metrics/stats"
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json["stats"]["data_points"] == 10
+        etag = response.headers["ETag"]
+        assert response.headers["Last-Modified"]
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+        response = client.get(f"{url_prefix}/api/proxy/json/api/metrics/timeseries?points=5")
+        assert response.status_code == 200
+        assert len(response.json["timeseries"]["cooling_mode"]) == 5
+
+        unit_cooler.webui.webapi.metrics_proxy.init("http://127.0.0.1:1")
+        assert client.get(url).status_code == 502
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def test_metrics_api_precompute(tmp_path, monkeypatch):
+    """分データの保存後に事前計算され、リクエスト時にはデータベースを読まないこと"""
+    import flask
+
+    import unit_cooler.metrics.collector
+    import unit_cooler.metrics.webapi.page
+
+    monkeypatch.setattr(unit_cooler.metrics.collector, "_metrics_collector", None)
+    unit_cooler.metrics.webapi.page.cache_clear()
+
+    db_path = tmp_path / "metrics.db"
+    collector = unit_cooler.metrics.collector.get_metrics_collector(db_path)
+
+    saved_list = []
+    collector.add_save_listener(saved_list.append)
+
+    start = datetime.datetime(2025, 8, 1, tzinfo=unit_cooler.metrics.collector.TIMEZONE)
+    for i in range(5):
+        collector._current_minute_data = {"cooling_mode": i, "duty_ratio": 0.5, "temperature": 30}
+        collector._save_minute_data(start + datetime.timedelta(minutes=i))
+
+    assert saved_list == [start + datetime.timedelta(minutes=i) for i in range(5)]
+    unit_cooler.metrics.webapi.page.precompute(collector, saved_list[-1])
+
+    get_minute_data = unittest.mock.MagicMock(wraps=collector.get_minute_data)
+    monkeypatch.setattr(collector, "get_minute_data", get_minute_data)
+
+    app = flask.Flask("test")
+    app.config["CONFIG"] = {"actuator": {"metrics": {"data": str(db_path)}}}
+    app.register_blueprint(unit_cooler.metrics.webapi.page.blueprint)
+    client = app.test_client()
+
+    url_prefix = my_lib.webapp.config.URL_PREFIX
+    for name in ["stats", "hourly", "timeseries", "correlation"]:
+        response = client.get(f"{url_prefix}/api/metrics/{name}")
+        assert response.status_code == 200
+
+    assert client.get(f"{url_prefix}/api/metrics/stats").json["stats"]["data_points"] == 5
+    assert get_minute_data.call_count == 0
+
+    # NOTE: 事前計算されていない範囲はデータベースから計算する
+    response = client.get(f"{url_prefix}/api/metrics/timeseries?points=100")
+    assert response.status_code == 200
+    assert len(response.json["timeseries"]["cooling_mode"]) == 5
+    assert get_minute_data.call_count == 1
+
+
+def test_metrics_api_compress(tmp_path, monkeypatch):
+    """Accept-Encoding に応じてレスポンスが圧縮されること"""
+    import gzip
+    import json
+
+    import flask
+
+    import unit_cooler.compress
+    import unit_cooler.metrics.collector
+    import unit_cooler.metrics.webapi.page
+
+    monkeypatch.setattr(unit_cooler.metrics.collector, "_metrics_collector", None)
+    unit_cooler.metrics.webapi.page.cache_clear()
+
+    db_path = tmp_path / "metrics.db"
+    collector = unit_cooler.metrics.collector.get_metrics_collector(db_path)
+
+    start = datetime.datetime(2025, 9, 1, tzinfo=unit_cooler.metrics.collector.TIMEZONE)
+    for i in range(100):
+        collector._current_minute_data = {"cooling_mode": i % 8, "duty_ratio": 0.5, "temperature": 30}
+        collector._save_minute_data(start + datetime.timedelta(minutes=i))
+
+    app = flask.Flask("test")
+    app.config["CONFIG"] = {"actuator": {"metrics": {"data": str(db_path)}}}
+    app.register_blueprint(unit_cooler.metrics.webapi.page.blueprint)
+    unit_cooler.compress.init(app)
+
+    @app.route("/stream")
+    def stream():
+        return flask.Response((f"{i}\n" for i in range(10000)), mimetype="text/plain")
+
+    client = app.test_client()
+    url = f"{my_lib.webapp.config.URL_PREFIX}/api/metrics/timeseries"
+
+    plain = client.get(url)
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    assert json.loads(gzip.decompress(compressed.data)) == plain.json
+    assert len(compressed.data) < len(plain.data)
+
+    response = client.get(
+        url, headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip;q=1.0, identity;q=0.5"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert gzip.decompress(response.data).decode() == "".join(f"{i}\n" for i in range(10000))
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_collector_virtual_commit(tmp_path):
+    import sqlite3
+
+    import unit_cooler.clock
+    from unit_cooler.metrics.collector import VIRTUAL_COMMIT_INTERVAL_SEC, MetricsCollector
+
+    def count_row():
+        with sqlite3.connect(tmp_path / "metrics.db") as conn:
+            return conn.execute("SELECT COUNT(*) FROM minute_metrics").fetchone()[0]
+
+    start = datetime.datetime(2025, 7, 1, 12, 0, tzinfo=unit_cooler.clock.TIMEZONE)
+    clock = unit_cooler.clock.VirtualClock(start)
+    prev_clock = unit_cooler.clock.set_clock(clock)
+    try:
+        collector = MetricsCollector(tmp_path / "metrics.db")
+        for _ in range(3):
+            collector.update_cooling_mode(1)
+            clock.advance(60)
+        collector.update_cooling_mode(1)
+
+        # NOTE: 仮想時間では、シミュレーション上の 1 時間毎にまとめてコミットする
+        assert len(collector.get_minute_data()) == 3
+        assert count_row() == 0
+
+        clock.advance(VIRTUAL_COMMIT_INTERVAL_SEC)
+        collector.update_cooling_mode(1)
+        assert count_row() == 4
+
+        clock.advance(60)
+        collector.update_cooling_mode(1)
+        collector.flush()
+        assert count_row() == 5
+    finally:
+        unit_cooler.clock.set_clock(prev_clock)